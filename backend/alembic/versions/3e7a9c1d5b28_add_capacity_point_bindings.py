@@ -0,0 +1,42 @@
+"""add capacity point bindings
+
+Revision ID: 3e7a9c1d5b28
+Revises: 8c2f4b7d91a3
+Create Date: 2026-10-19 14:05:12.537201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7a9c1d5b28'
+down_revision: Union[str, None] = '8c2f4b7d91a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'capacity_point_bindings',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('capacity_type', sa.Enum('space', 'power', 'cooling', 'weight', 'network', name='capacitytype'),
+                  nullable=False, comment='容量类型: power/cooling'),
+        sa.Column('capacity_id', sa.Integer(), nullable=False, comment='容量记录ID'),
+        sa.Column('metric', sa.String(length=20), nullable=False, comment='指标: load_kw/temperature/humidity'),
+        sa.Column('point_id', sa.Integer(), nullable=True, comment='点位ID'),
+        sa.Column('power_device_id', sa.Integer(), nullable=True, comment='用电设备ID(取其有功功率点位)'),
+        sa.Column('scale', sa.Float(), nullable=True, comment='换算系数'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.ForeignKeyConstraint(['point_id'], ['points.id'], ),
+        sa.ForeignKeyConstraint(['power_device_id'], ['power_devices.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_capacity_point_bindings_capacity_id'), 'capacity_point_bindings', ['capacity_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_capacity_point_bindings_capacity_id'), table_name='capacity_point_bindings')
+    op.drop_table('capacity_point_bindings')
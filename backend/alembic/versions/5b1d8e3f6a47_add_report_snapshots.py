@@ -0,0 +1,36 @@
+"""add report snapshots
+
+Revision ID: 5b1d8e3f6a47
+Revises: 3e7a9c1d5b28
+Create Date: 2026-10-19 16:42:08.913564
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1d8e3f6a47'
+down_revision: Union[str, None] = '3e7a9c1d5b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'report_snapshots',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('period_type', sa.String(length=20), nullable=False, comment='周期类型: daily/weekly/monthly'),
+        sa.Column('period_start', sa.DateTime(), nullable=False, comment='周期开始时间'),
+        sa.Column('period_end', sa.DateTime(), nullable=False, comment='周期结束时间'),
+        sa.Column('content', sa.Text(), nullable=False, comment='报表内容(JSON)'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('period_type', 'period_start', name='uq_report_snapshot_period')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('report_snapshots')
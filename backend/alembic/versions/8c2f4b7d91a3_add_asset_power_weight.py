@@ -0,0 +1,28 @@
+"""add asset power and weight
+
+Revision ID: 8c2f4b7d91a3
+Revises: 46e4ea651319
+Create Date: 2026-10-19 10:12:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2f4b7d91a3'
+down_revision: Union[str, None] = '46e4ea651319'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('assets', sa.Column('rated_power', sa.Float(), nullable=True, comment='额定功率 kW'))
+    op.add_column('assets', sa.Column('weight', sa.Float(), nullable=True, comment='重量 kg'))
+
+
+def downgrade() -> None:
+    op.drop_column('assets', 'weight')
+    op.drop_column('assets', 'rated_power')
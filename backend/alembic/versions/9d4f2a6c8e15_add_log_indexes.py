@@ -0,0 +1,37 @@
+"""add log indexes
+
+Revision ID: 9d4f2a6c8e15
+Revises: 5b1d8e3f6a47
+Create Date: 2026-10-19 18:20:37.402911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f2a6c8e15'
+down_revision: Union[str, None] = '5b1d8e3f6a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('idx_operation_log_time', 'operation_logs', ['created_at']),
+    ('idx_operation_log_user_time', 'operation_logs', ['user_id', 'created_at']),
+    ('idx_operation_log_module_time', 'operation_logs', ['module', 'created_at']),
+    ('idx_system_log_time', 'system_logs', ['created_at']),
+    ('idx_system_log_module_time', 'system_logs', ['module', 'created_at']),
+    ('idx_communication_log_time', 'communication_logs', ['created_at']),
+    ('idx_communication_log_device_time', 'communication_logs', ['device_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
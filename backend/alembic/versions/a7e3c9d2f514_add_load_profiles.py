@@ -0,0 +1,63 @@
+"""add load profiles
+
+Revision ID: a7e3c9d2f514
+Revises: 9d4f2a6c8e15
+Create Date: 2026-10-19 20:14:52.318407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3c9d2f514'
+down_revision: Union[str, None] = '9d4f2a6c8e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'load_profile_days',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('subject_type', sa.String(length=20), nullable=False, comment='对象类型: meter/device'),
+        sa.Column('subject_id', sa.Integer(), nullable=False, comment='计量点ID或设备ID'),
+        sa.Column('profile_date', sa.Date(), nullable=False, comment='日期'),
+        sa.Column('day_type', sa.String(length=10), nullable=False, comment='日类型: weekday/weekend'),
+        sa.Column('season', sa.String(length=10), nullable=False, comment='季节: spring/summer/autumn/winter'),
+        sa.Column('slot_avg', sa.JSON(), nullable=True, comment='时段平均值'),
+        sa.Column('slot_max', sa.JSON(), nullable=True, comment='时段最大值'),
+        sa.Column('slot_min', sa.JSON(), nullable=True, comment='时段最小值'),
+        sa.Column('slot_count', sa.JSON(), nullable=True, comment='时段采样数'),
+        sa.Column('is_complete', sa.Boolean(), nullable=True, comment='当日是否已结束且数据完整物化'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('subject_type', 'subject_id', 'profile_date', name='uq_load_profile_day')
+    )
+    op.create_index('idx_load_profile_day_type', 'load_profile_days',
+                    ['subject_type', 'subject_id', 'day_type', 'season'], unique=False)
+    op.create_table(
+        'typical_day_profiles',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('subject_type', sa.String(length=20), nullable=False, comment='对象类型: meter/device'),
+        sa.Column('subject_id', sa.Integer(), nullable=False, comment='计量点ID或设备ID'),
+        sa.Column('day_type', sa.String(length=10), nullable=False, comment='日类型: weekday/weekend/all'),
+        sa.Column('season', sa.String(length=10), nullable=False, comment='季节: spring/summer/autumn/winter/all'),
+        sa.Column('sample_days', sa.Integer(), nullable=True, comment='样本天数'),
+        sa.Column('mean_values', sa.JSON(), nullable=True, comment='时段均值'),
+        sa.Column('max_values', sa.JSON(), nullable=True, comment='时段最大值'),
+        sa.Column('min_values', sa.JSON(), nullable=True, comment='时段最小值'),
+        sa.Column('p95_values', sa.JSON(), nullable=True, comment='时段95%分位数'),
+        sa.Column('last_profile_date', sa.Date(), nullable=True, comment='已汇总的最后日期'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('subject_type', 'subject_id', 'day_type', 'season', name='uq_typical_day_profile')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('typical_day_profiles')
+    op.drop_index('idx_load_profile_day_type', table_name='load_profile_days')
+    op.drop_table('load_profile_days')
@@ -0,0 +1,45 @@
+"""add load forecast models
+
+Revision ID: c2b8f4e6a913
+Revises: a7e3c9d2f514
+Create Date: 2026-10-19 20:31:07.645183
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2b8f4e6a913'
+down_revision: Union[str, None] = 'a7e3c9d2f514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'load_forecast_models',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('meter_point_id', sa.Integer(), nullable=False, comment='计量点ID'),
+        sa.Column('method', sa.String(length=20), nullable=True, comment='方法: regression/similar_day'),
+        sa.Column('features', sa.JSON(), nullable=True, comment='特征名称列表'),
+        sa.Column('coefficients', sa.JSON(), nullable=True, comment='各时段回归系数 (96 × 特征数)'),
+        sa.Column('trained_days', sa.Integer(), nullable=True, comment='参与拟合的天数'),
+        sa.Column('trained_until', sa.Date(), nullable=True, comment='已拟合数据的最后日期'),
+        sa.Column('backtest_days', sa.Integer(), nullable=True, comment='回测天数'),
+        sa.Column('mape', sa.Float(), nullable=True, comment='平均绝对百分比误差 %'),
+        sa.Column('mae', sa.Float(), nullable=True, comment='平均绝对误差 kW'),
+        sa.Column('rmse', sa.Float(), nullable=True, comment='均方根误差 kW'),
+        sa.Column('peak_error', sa.Float(), nullable=True, comment='日最大负荷平均绝对百分比误差 %'),
+        sa.Column('baseline_mape', sa.Float(), nullable=True, comment='同类日基线的平均绝对百分比误差 %'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.ForeignKeyConstraint(['meter_point_id'], ['meter_points.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('meter_point_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('load_forecast_models')
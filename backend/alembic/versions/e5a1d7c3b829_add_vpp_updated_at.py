@@ -0,0 +1,30 @@
+"""add updated_at to load curves and electricity prices
+
+Revision ID: e5a1d7c3b829
+Revises: c2b8f4e6a913
+Create Date: 2026-10-19 21:02:44.170356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1d7c3b829'
+down_revision: Union[str, None] = 'c2b8f4e6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('load_curves', sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'))
+    op.add_column('electricity_prices', sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('electricity_prices') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('load_curves') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -32,8 +32,7 @@ from .dispatch import router as dispatch_router
 from .monitoring import router as monitoring_router
 from .topology import router as topology_router
 from .trace import router as trace_router
-# TODO: Enable after installing numpy
-# from .optimization import router as optimization_router
+from .optimization import router as optimization_router
 
 # 深度学习节能优化模块 (需要安装 torch)
 try:
@@ -73,8 +72,7 @@ api_router.include_router(dispatch_router, prefix="/dispatch", tags=["可调度
 api_router.include_router(monitoring_router, prefix="/monitoring", tags=["电费监控"])
 api_router.include_router(topology_router, prefix="/topology", tags=["拓扑编辑"])
 api_router.include_router(trace_router, tags=["数据追溯链"])
-# TODO: Enable after installing numpy
-# api_router.include_router(optimization_router, prefix="/optimization", tags=["日前调度优化"])
+api_router.include_router(optimization_router, prefix="/optimization", tags=["日前调度优化"])
 
 # 深度学习节能优化API
 if _ml_available:
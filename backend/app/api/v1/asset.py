@@ -19,9 +19,15 @@ from ...schemas.asset import (
     LifecycleResponse,
     MaintenanceCreate, MaintenanceResponse,
     InventoryCreate, InventoryItemUpdate, InventoryResponse, InventoryItemResponse,
+    InventoryScanRequest, InventoryScanResult,
     AssetStatistics
 )
 from ...schemas.common import PageResponse
+from ...services.rack_occupancy import CabinetOccupancy, get_occupancy_index, occupancy_index
+from ...services.statistics import get_asset_statistics
+from ...services.asset_inventory import (
+    generate_inventory_items, reconcile_scans, refresh_inventory_stats
+)
 
 router = APIRouter(prefix="/asset", tags=["资产管理"])
 
@@ -38,22 +44,18 @@ async def get_cabinets(
     """
     获取机柜列表（分页）
     """
-    query = select(Cabinet).offset(skip).limit(limit)
+    # 单条分组查询获取机柜及其资产占用的U数
+    query = select(
+        Cabinet,
+        func.coalesce(func.sum(Asset.u_height), 0)
+    ).outerjoin(
+        Asset, Asset.cabinet_id == Cabinet.id
+    ).group_by(Cabinet.id).order_by(Cabinet.id).offset(skip).limit(limit)
     result = await db.execute(query)
-    cabinets = result.scalars().all()
 
     # 计算每个机柜的已使用U数和可用U数
     cabinet_list = []
-    for cabinet in cabinets:
-        # 获取该机柜中所有资产占用的U数
-        used_u_result = await db.execute(
-            select(func.sum(Asset.u_height)).where(
-                Asset.cabinet_id == cabinet.id,
-                Asset.u_height.isnot(None)
-            )
-        )
-        used_u = used_u_result.scalar() or 0
-
+    for cabinet, used_u in result.all():
         cabinet_data = CabinetResponse.model_validate(cabinet)
         cabinet_data.used_u = used_u
         cabinet_data.available_u = (cabinet.total_u or 42) - used_u
@@ -62,6 +64,41 @@ async def get_cabinets(
     return cabinet_list
 
 
+@router.get("/cabinets/find-space", summary="查找可放置设备的机柜")
+async def find_cabinet_space(
+    u_height: int = Query(..., ge=1, le=64, description="所需连续U数"),
+    power_kw: float = Query(0, ge=0, description="所需功率余量 kW"),
+    weight_kg: float = Query(0, ge=0, description="所需承重余量 kg"),
+    limit: int = Query(20, ge=1, le=500, description="返回数量"),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+) -> Dict[str, Any]:
+    """
+    基于U位占用索引，在全部机柜中查找 N 个连续空闲U位且功率、承重余量满足要求的机柜
+
+    结果按放置后剩余空闲U数升序，优先填满已用机柜
+    """
+    index = await get_occupancy_index(db)
+    candidates = index.find_space(u_height, power_kw, weight_kg, limit)
+    return {
+        "total_cabinets": len(index.cabinets),
+        "matched": len(candidates),
+        "candidates": candidates
+    }
+
+
+@router.get("/cabinets/u-conflicts", summary="获取U位冲突资产")
+async def get_u_conflicts(
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+) -> List[Dict[str, Any]]:
+    """
+    列出U位范围重叠的资产对
+    """
+    index = await get_occupancy_index(db)
+    return index.conflicts()
+
+
 @router.get("/cabinets/{cabinet_id}", response_model=CabinetResponse, summary="获取机柜详情")
 async def get_cabinet(
     cabinet_id: int,
@@ -118,24 +155,24 @@ async def get_cabinet_usage(
             Asset.u_height.isnot(None)
         )
     )
-    assets = assets_result.scalars().all()
-
-    # 构建U位映射表
-    u_map = {}
-    used_u = 0
+    assets = {asset.id: asset for asset in assets_result.scalars().all()}
 
-    for asset in assets:
-        if asset.u_position and asset.u_height:
-            for u in range(asset.u_position, asset.u_position + asset.u_height):
-                if u <= total_u:
-                    u_map[str(u)] = {
-                        "asset_id": asset.id,
-                        "asset_code": asset.asset_code,
-                        "asset_name": asset.asset_name,
-                        "asset_type": asset.asset_type.value if asset.asset_type else None
-                    }
-            used_u += asset.u_height
+    # 按U位位图构建映射表
+    occupancy = CabinetOccupancy.from_cabinet(cabinet)
+    for asset in assets.values():
+        occupancy.place(asset)
 
+    u_map = {}
+    for u, asset_id in sorted(occupancy.u_map().items()):
+        asset = assets[asset_id]
+        u_map[str(u)] = {
+            "asset_id": asset.id,
+            "asset_code": asset.asset_code,
+            "asset_name": asset.asset_name,
+            "asset_type": asset.asset_type.value if asset.asset_type else None
+        }
+
+    used_u = occupancy.used_u
     available_u = total_u - used_u
     usage_rate = round((used_u / total_u * 100), 2) if total_u > 0 else 0
 
@@ -146,6 +183,9 @@ async def get_cabinet_usage(
         "used_u": used_u,
         "available_u": available_u,
         "usage_rate": usage_rate,
+        "used_power": round(occupancy.used_power, 2),
+        "used_weight": round(occupancy.used_weight, 2),
+        "conflicts": [list(pair) for pair in occupancy.conflicts()],
         "u_map": u_map
     }
 
@@ -170,6 +210,7 @@ async def create_cabinet(
     db.add(cabinet)
     await db.commit()
     await db.refresh(cabinet)
+    await occupancy_index().apply_cabinet(db, cabinet)
 
     cabinet_data = CabinetResponse.model_validate(cabinet)
     cabinet_data.used_u = 0
@@ -210,6 +251,7 @@ async def update_cabinet(
     cabinet.updated_at = datetime.now()
     await db.commit()
     await db.refresh(cabinet)
+    await occupancy_index().apply_cabinet(db, cabinet)
 
     # 计算已使用U数
     used_u_result = await db.execute(
@@ -253,6 +295,7 @@ async def delete_cabinet(
 
     await db.delete(cabinet)
     await db.commit()
+    await occupancy_index().remove_cabinet(db, cabinet_id)
 
     return {"message": "机柜删除成功"}
 
@@ -378,10 +421,17 @@ async def create_asset(
             raise HTTPException(status_code=400, detail="指定的机柜不存在")
         cabinet_name = cabinet.cabinet_name
 
+        # 检查U位是否与已上架资产重叠
+        index = await get_occupancy_index(db)
+        overlaps = index.overlapping(data.cabinet_id, data.u_position, data.u_height)
+        if overlaps:
+            raise HTTPException(status_code=400, detail=f"U位与资产 {overlaps} 冲突")
+
     asset = Asset(**data.model_dump())
     db.add(asset)
     await db.commit()
     await db.refresh(asset)
+    await occupancy_index().apply_asset(db, asset)
 
     # 添加生命周期记录
     to_location = None
@@ -440,6 +490,14 @@ async def update_asset(
     new_u_position = update_data.get("u_position", old_u_position)
     location_changed = (old_cabinet_id != new_cabinet_id) or (old_u_position != new_u_position)
 
+    # 检查新U位是否与其他资产重叠
+    new_u_height = update_data.get("u_height") or asset.u_height
+    if new_cabinet_id and (location_changed or new_u_height != asset.u_height):
+        index = await get_occupancy_index(db)
+        overlaps = index.overlapping(new_cabinet_id, new_u_position, new_u_height, exclude_asset_id=asset_id)
+        if overlaps:
+            raise HTTPException(status_code=400, detail=f"U位与资产 {overlaps} 冲突")
+
     # 记录状态变更
     old_status = asset.status
     new_status = update_data.get("status", old_status)
@@ -453,6 +511,7 @@ async def update_asset(
     asset.updated_at = datetime.now()
     await db.commit()
     await db.refresh(asset)
+    await occupancy_index().apply_asset(db, asset)
 
     # 添加位置变更生命周期记录
     if location_changed:
@@ -566,6 +625,7 @@ async def delete_asset(
 
     await db.delete(asset)
     await db.commit()
+    await occupancy_index().remove_asset(db, asset_id)
 
     return {"message": "资产删除成功"}
 
@@ -730,43 +790,14 @@ async def create_inventory(
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="盘点编码已存在")
 
-    # 创建盘点主记录
+    # 创建盘点主记录，INSERT ... SELECT 一次生成全部盘点明细
     inventory = AssetInventory(**data.model_dump())
     inventory.status = "pending"
     db.add(inventory)
-    await db.commit()
-    await db.refresh(inventory)
-
-    # 获取所有在用和借出的资产，创建盘点明细
-    assets_result = await db.execute(
-        select(Asset).where(
-            Asset.status.in_([AssetStatus.in_use, AssetStatus.borrowed])
-        )
-    )
-    assets = assets_result.scalars().all()
-
-    for asset in assets:
-        expected_location = None
-        if asset.cabinet_id:
-            cabinet_result = await db.execute(
-                select(Cabinet).where(Cabinet.id == asset.cabinet_id)
-            )
-            cabinet = cabinet_result.scalar_one_or_none()
-            if cabinet:
-                expected_location = f"{cabinet.cabinet_name} U{asset.u_position}" if asset.u_position else cabinet.cabinet_name
-
-        item = AssetInventoryItem(
-            inventory_id=inventory.id,
-            asset_id=asset.id,
-            expected_location=expected_location,
-            is_matched=False
-        )
-        db.add(item)
+    await db.flush()
 
+    await generate_inventory_items(db, inventory)
     await db.commit()
-
-    # 更新统计信息
-    await _update_inventory_stats(db, inventory.id)
     await db.refresh(inventory)
 
     return InventoryResponse.model_validate(inventory)
@@ -818,6 +849,32 @@ async def get_inventory_items(
     return [InventoryItemResponse.model_validate(item) for item in items]
 
 
+@router.post("/inventory/{inventory_id}/scans", response_model=InventoryScanResult, summary="批量扫码对账")
+async def reconcile_inventory_scans(
+    inventory_id: int,
+    data: InventoryScanRequest,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_operator)
+):
+    """
+    上传扫码记录，按资产编码/序列号批量核对盘点明细
+    """
+    result = await db.execute(
+        select(AssetInventory).where(AssetInventory.id == inventory_id)
+    )
+    inventory = result.scalar_one_or_none()
+    if not inventory:
+        raise HTTPException(status_code=404, detail="盘点任务不存在")
+
+    summary = await reconcile_scans(
+        db, inventory, [scan.model_dump() for scan in data.scans], data.check_time
+    )
+    await db.commit()
+    await db.refresh(inventory)
+
+    return InventoryScanResult(**summary, inventory=InventoryResponse.model_validate(inventory))
+
+
 @router.put("/inventory/items/{item_id}", response_model=InventoryItemResponse, summary="更新盘点明细")
 async def update_inventory_item(
     item_id: int,
@@ -863,63 +920,7 @@ async def get_statistics(
     """
     获取资产统计信息
     """
-    # 资产总数
-    total_result = await db.execute(select(func.count(Asset.id)))
-    total_count = total_result.scalar() or 0
-
-    # 按状态统计
-    status_result = await db.execute(
-        select(Asset.status, func.count(Asset.id)).group_by(Asset.status)
-    )
-    by_status = {
-        status.value if status else "unknown": count
-        for status, count in status_result.all()
-    }
-
-    # 按类型统计
-    type_result = await db.execute(
-        select(Asset.asset_type, func.count(Asset.id)).group_by(Asset.asset_type)
-    )
-    by_type = {
-        asset_type.value if asset_type else "unknown": count
-        for asset_type, count in type_result.all()
-    }
-
-    # 按部门统计
-    dept_result = await db.execute(
-        select(Asset.department, func.count(Asset.id)).where(
-            Asset.department.isnot(None)
-        ).group_by(Asset.department)
-    )
-    by_department = {
-        dept or "未分配": count
-        for dept, count in dept_result.all()
-    }
-
-    # 资产总价值
-    value_result = await db.execute(select(func.sum(Asset.purchase_price)))
-    total_value = value_result.scalar() or 0
-
-    # 保修即将到期数量（30天内）
-    expiring_date = date.today() + timedelta(days=30)
-    expiring_result = await db.execute(
-        select(func.count(Asset.id)).where(
-            Asset.warranty_end.isnot(None),
-            Asset.warranty_end <= expiring_date,
-            Asset.warranty_end >= date.today(),
-            Asset.status != AssetStatus.scrapped
-        )
-    )
-    warranty_expiring_count = expiring_result.scalar() or 0
-
-    return AssetStatistics(
-        total_count=total_count,
-        by_status=by_status,
-        by_type=by_type,
-        by_department=by_department,
-        total_value=float(total_value),
-        warranty_expiring_count=warranty_expiring_count
-    )
+    return await get_asset_statistics(db)
 
 
 @router.get("/warranty-expiring", response_model=List[AssetResponse], summary="获取即将过保资产")
@@ -1002,30 +1003,5 @@ async def _update_inventory_stats(db: AsyncSession, inventory_id: int) -> None:
     if not inventory:
         return
 
-    items_result = await db.execute(
-        select(AssetInventoryItem).where(
-            AssetInventoryItem.inventory_id == inventory_id
-        )
-    )
-    items = items_result.scalars().all()
-
-    total_count = len(items)
-    checked_count = sum(1 for item in items if item.check_time is not None)
-    matched_count = sum(1 for item in items if item.is_matched)
-    unmatched_count = sum(1 for item in items if item.check_time is not None and not item.is_matched)
-
-    inventory.total_count = total_count
-    inventory.checked_count = checked_count
-    inventory.matched_count = matched_count
-    inventory.unmatched_count = unmatched_count
-
-    # 更新盘点状态
-    if checked_count == 0:
-        inventory.status = "pending"
-    elif checked_count < total_count:
-        inventory.status = "in_progress"
-    else:
-        inventory.status = "completed"
-        inventory.completed_at = datetime.now()
-
+    await refresh_inventory_stats(db, inventory)
     await db.commit()
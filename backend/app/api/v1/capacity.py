@@ -11,16 +11,20 @@ from ..deps import get_db, require_viewer, require_operator
 from ...models.user import User
 from ...models.capacity import (
     SpaceCapacity, PowerCapacity, CoolingCapacity, WeightCapacity,
-    CapacityPlan, CapacityStatus
+    CapacityPlan, CapacityStatus, CapacityType, CapacityPointBinding
 )
 from ...schemas.capacity import (
     SpaceCapacityCreate, SpaceCapacityUpdate, SpaceCapacityResponse,
     PowerCapacityCreate, PowerCapacityUpdate, PowerCapacityResponse,
     CoolingCapacityCreate, CoolingCapacityUpdate, CoolingCapacityResponse,
     WeightCapacityCreate, WeightCapacityUpdate, WeightCapacityResponse,
-    CapacityPlanCreate, CapacityPlanResponse,
+    CapacityPlanCreate, CapacityPlanResponse, CapacityPlacementRequest,
+    CapacityPointBindingCreate, CapacityPointBindingResponse,
     CapacityStatistics
 )
+from ...services.capacity_placement import DeviceSpec, evaluate_plan, place_devices
+from ...services.statistics import get_capacity_statistics
+from ...services.capacity_telemetry import capacity_telemetry, invalidate_capacity_telemetry
 
 router = APIRouter(prefix="/capacity", tags=["容量管理"])
 
@@ -270,6 +274,7 @@ async def create_power_capacity(
 
     db.add(capacity)
     await db.commit()
+    invalidate_capacity_telemetry()
     await db.refresh(capacity)
 
     capacity_data = PowerCapacityResponse.model_validate(capacity)
@@ -333,6 +338,7 @@ async def update_power_capacity(
 
     capacity.updated_at = datetime.now()
     await db.commit()
+    invalidate_capacity_telemetry()
     await db.refresh(capacity)
 
     capacity_data = PowerCapacityResponse.model_validate(capacity)
@@ -360,6 +366,7 @@ async def delete_power_capacity(
 
     await db.delete(capacity)
     await db.commit()
+    invalidate_capacity_telemetry()
 
     return {"message": "删除成功"}
 
@@ -413,6 +420,7 @@ async def create_cooling_capacity(
 
     db.add(capacity)
     await db.commit()
+    invalidate_capacity_telemetry()
     await db.refresh(capacity)
 
     capacity_data = CoolingCapacityResponse.model_validate(capacity)
@@ -476,6 +484,7 @@ async def update_cooling_capacity(
 
     capacity.updated_at = datetime.now()
     await db.commit()
+    invalidate_capacity_telemetry()
     await db.refresh(capacity)
 
     capacity_data = CoolingCapacityResponse.model_validate(capacity)
@@ -503,6 +512,7 @@ async def delete_cooling_capacity(
 
     await db.delete(capacity)
     await db.commit()
+    invalidate_capacity_telemetry()
 
     return {"message": "删除成功"}
 
@@ -650,6 +660,87 @@ async def delete_weight_capacity(
     return {"message": "删除成功"}
 
 
+# ==================== 容量遥测 ====================
+
+@router.get("/telemetry", response_model=Dict[str, Any], summary="获取容量实时汇总")
+async def get_capacity_telemetry(
+    _: User = Depends(require_viewer)
+):
+    """
+    获取由实时采集汇总的电力/制冷节点负荷、温湿度和状态
+    """
+    return capacity_telemetry.snapshot()
+
+
+@router.get("/bindings", response_model=List[CapacityPointBindingResponse], summary="获取容量点位绑定列表")
+async def get_capacity_bindings(
+    capacity_type: Optional[CapacityType] = Query(None, description="容量类型"),
+    capacity_id: Optional[int] = Query(None, description="容量记录ID"),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    获取容量节点与点位/用电设备的绑定
+    """
+    query = select(CapacityPointBinding).order_by(CapacityPointBinding.id)
+    if capacity_type:
+        query = query.where(CapacityPointBinding.capacity_type == capacity_type)
+    if capacity_id:
+        query = query.where(CapacityPointBinding.capacity_id == capacity_id)
+    result = await db.execute(query)
+    return [CapacityPointBindingResponse.model_validate(b) for b in result.scalars().all()]
+
+
+@router.post("/bindings", response_model=CapacityPointBindingResponse, summary="创建容量点位绑定")
+async def create_capacity_binding(
+    data: CapacityPointBindingCreate,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_operator)
+):
+    """
+    将电力/制冷容量节点绑定到实时点位或用电设备
+    """
+    if data.capacity_type not in (CapacityType.power, CapacityType.cooling):
+        raise HTTPException(status_code=400, detail="仅支持电力和制冷容量绑定遥测")
+    if not data.point_id and not data.power_device_id:
+        raise HTTPException(status_code=400, detail="需指定点位或用电设备")
+
+    model = PowerCapacity if data.capacity_type == CapacityType.power else CoolingCapacity
+    result = await db.execute(select(model.id).where(model.id == data.capacity_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="容量记录不存在")
+
+    binding = CapacityPointBinding(**data.model_dump())
+    db.add(binding)
+    await db.commit()
+    await db.refresh(binding)
+    invalidate_capacity_telemetry()
+
+    return CapacityPointBindingResponse.model_validate(binding)
+
+
+@router.delete("/bindings/{id}", summary="删除容量点位绑定")
+async def delete_capacity_binding(
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_operator)
+):
+    """
+    删除容量点位绑定
+    """
+    result = await db.execute(select(CapacityPointBinding).where(CapacityPointBinding.id == id))
+    binding = result.scalar_one_or_none()
+
+    if not binding:
+        raise HTTPException(status_code=404, detail="绑定不存在")
+
+    await db.delete(binding)
+    await db.commit()
+    invalidate_capacity_telemetry()
+
+    return {"message": "删除成功"}
+
+
 # ==================== 容量规划管理 ====================
 
 @router.get("/plans", response_model=List[CapacityPlanResponse], summary="获取容量规划列表")
@@ -682,71 +773,8 @@ async def create_capacity_plan(
     db.add(plan)
     await db.flush()  # 获取ID但不提交
 
-    # 评估可行性
-    notes = []
-    is_feasible = True
-
-    # 检查空间容量（U位）
-    if plan.required_u:
-        space_result = await db.execute(select(SpaceCapacity))
-        space_capacities = space_result.scalars().all()
-        total_available_u = sum(
-            (sc.total_u_positions or 0) - (sc.used_u_positions or 0)
-            for sc in space_capacities
-        )
-        if total_available_u >= plan.required_u:
-            notes.append(f"空间容量检查通过: 可用U位 {total_available_u}U >= 所需 {plan.required_u}U")
-        else:
-            notes.append(f"空间容量不足: 可用U位 {total_available_u}U < 所需 {plan.required_u}U")
-            is_feasible = False
-
-    # 检查电力容量
-    if plan.required_power_kw:
-        power_result = await db.execute(select(PowerCapacity))
-        power_capacities = power_result.scalars().all()
-        total_available_power = sum(
-            (pc.total_capacity_kw or 0) - (pc.used_capacity_kw or 0)
-            for pc in power_capacities
-        )
-        if total_available_power >= plan.required_power_kw:
-            notes.append(f"电力容量检查通过: 可用电力 {total_available_power:.2f}kW >= 所需 {plan.required_power_kw:.2f}kW")
-        else:
-            notes.append(f"电力容量不足: 可用电力 {total_available_power:.2f}kW < 所需 {plan.required_power_kw:.2f}kW")
-            is_feasible = False
-
-    # 检查制冷容量
-    if plan.required_cooling_kw:
-        cooling_result = await db.execute(select(CoolingCapacity))
-        cooling_capacities = cooling_result.scalars().all()
-        total_available_cooling = sum(
-            (cc.total_cooling_kw or 0) - (cc.used_cooling_kw or 0)
-            for cc in cooling_capacities
-        )
-        if total_available_cooling >= plan.required_cooling_kw:
-            notes.append(f"制冷容量检查通过: 可用制冷 {total_available_cooling:.2f}kW >= 所需 {plan.required_cooling_kw:.2f}kW")
-        else:
-            notes.append(f"制冷容量不足: 可用制冷 {total_available_cooling:.2f}kW < 所需 {plan.required_cooling_kw:.2f}kW")
-            is_feasible = False
-
-    # 检查承重容量
-    if plan.required_weight_kg:
-        weight_result = await db.execute(select(WeightCapacity))
-        weight_capacities = weight_result.scalars().all()
-        total_available_weight = sum(
-            (wc.total_weight_kg or 0) - (wc.used_weight_kg or 0)
-            for wc in weight_capacities
-        )
-        if total_available_weight >= plan.required_weight_kg:
-            notes.append(f"承重容量检查通过: 可用承重 {total_available_weight:.2f}kg >= 所需 {plan.required_weight_kg:.2f}kg")
-        else:
-            notes.append(f"承重容量不足: 可用承重 {total_available_weight:.2f}kg < 所需 {plan.required_weight_kg:.2f}kg")
-            is_feasible = False
-
-    if not notes:
-        notes.append("无容量需求，规划可行")
-
-    plan.is_feasible = is_feasible
-    plan.feasibility_notes = "\n".join(notes)
+    # 评估可行性 (逐台布局到机柜、电力路径、制冷和承重区域)
+    plan.is_feasible, plan.feasibility_notes, _ = await evaluate_plan(db, plan)
 
     await db.commit()
     await db.refresh(plan)
@@ -754,6 +782,46 @@ async def create_capacity_plan(
     return CapacityPlanResponse.model_validate(plan)
 
 
+@router.post("/plans/placement", response_model=Dict[str, Any], summary="批量设备布局试算")
+async def plan_placement(
+    data: CapacityPlacementRequest,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    按设备清单试算布局（不保存），返回每台设备的机柜和U位
+    """
+    specs = [DeviceSpec(**device.model_dump()) for device in data.devices]
+    result = await place_devices(db, specs, data.cabinet_ids)
+    if result is None:
+        raise HTTPException(status_code=404, detail="没有可用机柜")
+    return result.to_dict()
+
+
+@router.get("/plans/{id}/placement", response_model=Dict[str, Any], summary="获取容量规划布局方案")
+async def get_capacity_plan_placement(
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    按当前容量重新计算规划的布局方案
+    """
+    result = await db.execute(select(CapacityPlan).where(CapacityPlan.id == id))
+    plan = result.scalar_one_or_none()
+
+    if not plan:
+        raise HTTPException(status_code=404, detail="容量规划不存在")
+
+    is_feasible, notes, placement = await evaluate_plan(db, plan)
+    return {
+        "plan_id": plan.id,
+        "is_feasible": is_feasible,
+        "feasibility_notes": notes,
+        "placement": placement.to_dict() if placement else None,
+    }
+
+
 @router.get("/plans/{id}", response_model=CapacityPlanResponse, summary="获取容量规划详情")
 async def get_capacity_plan(
     id: int,
@@ -796,94 +864,11 @@ async def delete_capacity_plan(
 # ==================== 容量统计 ====================
 
 @router.get("/statistics", response_model=Dict[str, Any], summary="获取容量统计信息")
-async def get_capacity_statistics(
+async def get_statistics(
     db: AsyncSession = Depends(get_db),
     _: User = Depends(require_viewer)
 ):
     """
     获取所有类型容量的统计信息
     """
-    # 空间容量统计
-    space_result = await db.execute(select(SpaceCapacity))
-    space_capacities = space_result.scalars().all()
-    total_u = sum(sc.total_u_positions or 0 for sc in space_capacities)
-    used_u = sum(sc.used_u_positions or 0 for sc in space_capacities)
-    space_stats = {
-        "total_u_positions": total_u,
-        "used_u_positions": used_u,
-        "available_u_positions": total_u - used_u,
-        "usage_rate": round(used_u / total_u * 100, 2) if total_u > 0 else 0,
-        "count": len(space_capacities)
-    }
-
-    # 电力容量统计
-    power_result = await db.execute(select(PowerCapacity))
-    power_capacities = power_result.scalars().all()
-    total_power = sum(pc.total_capacity_kw or 0 for pc in power_capacities)
-    used_power = sum(pc.used_capacity_kw or 0 for pc in power_capacities)
-    power_stats = {
-        "total_capacity_kw": total_power,
-        "used_capacity_kw": used_power,
-        "available_capacity_kw": total_power - used_power,
-        "usage_rate": round(used_power / total_power * 100, 2) if total_power > 0 else 0,
-        "count": len(power_capacities)
-    }
-
-    # 制冷容量统计
-    cooling_result = await db.execute(select(CoolingCapacity))
-    cooling_capacities = cooling_result.scalars().all()
-    total_cooling = sum(cc.total_cooling_kw or 0 for cc in cooling_capacities)
-    used_cooling = sum(cc.used_cooling_kw or 0 for cc in cooling_capacities)
-    cooling_stats = {
-        "total_cooling_kw": total_cooling,
-        "used_cooling_kw": used_cooling,
-        "available_cooling_kw": total_cooling - used_cooling,
-        "usage_rate": round(used_cooling / total_cooling * 100, 2) if total_cooling > 0 else 0,
-        "count": len(cooling_capacities)
-    }
-
-    # 承重容量统计
-    weight_result = await db.execute(select(WeightCapacity))
-    weight_capacities = weight_result.scalars().all()
-    total_weight = sum(wc.total_weight_kg or 0 for wc in weight_capacities)
-    used_weight = sum(wc.used_weight_kg or 0 for wc in weight_capacities)
-    weight_stats = {
-        "total_weight_kg": total_weight,
-        "used_weight_kg": used_weight,
-        "available_weight_kg": total_weight - used_weight,
-        "usage_rate": round(used_weight / total_weight * 100, 2) if total_weight > 0 else 0,
-        "count": len(weight_capacities)
-    }
-
-    # 状态统计
-    status_counts = {
-        "normal": 0,
-        "warning": 0,
-        "critical": 0,
-        "full": 0
-    }
-
-    for sc in space_capacities:
-        if sc.status:
-            status_counts[sc.status.value] = status_counts.get(sc.status.value, 0) + 1
-    for pc in power_capacities:
-        if pc.status:
-            status_counts[pc.status.value] = status_counts.get(pc.status.value, 0) + 1
-    for cc in cooling_capacities:
-        if cc.status:
-            status_counts[cc.status.value] = status_counts.get(cc.status.value, 0) + 1
-    for wc in weight_capacities:
-        if wc.status:
-            status_counts[wc.status.value] = status_counts.get(wc.status.value, 0) + 1
-
-    return {
-        "space": space_stats,
-        "power": power_stats,
-        "cooling": cooling_stats,
-        "weight": weight_stats,
-        "status_summary": status_counts,
-        "total_capacity_records": (
-            len(space_capacities) + len(power_capacities) +
-            len(cooling_capacities) + len(weight_capacities)
-        )
-    }
+    return await get_capacity_statistics(db)
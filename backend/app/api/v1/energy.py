@@ -23,6 +23,7 @@ from ...schemas.common import ResponseModel, PageResponse
 from ...services.energy_topology import topology_service
 from ...services.power_device import power_device_service
 from ...services.energy_analysis import demand_analysis_service, load_shift_analysis_service
+from ...services.tariff_compiler import get_tariff, reload_tariff
 from ...schemas.energy import (
     PowerDeviceCreate, PowerDeviceUpdate, PowerDeviceResponse, PowerDeviceTree,
     RealtimePowerData, RealtimePowerSummary,
@@ -370,6 +371,8 @@ async def get_device_typical_day_profile(
     result = await service.get_device_typical_profile(device_id, days)
     if not result:
         raise HTTPException(status_code=404, detail=f"设备 {device_id} 不存在")
+    # 保存本次补齐的日负荷曲线
+    await db.commit()
     return ResponseModel(data=result)
 
 
@@ -1264,6 +1267,7 @@ async def create_pricing(
     db.add(new_pricing)
     await db.commit()
     await db.refresh(new_pricing)
+    await reload_tariff(db)
 
     return ResponseModel(data=ElectricityPricingResponse.model_validate(new_pricing))
 
@@ -1289,6 +1293,7 @@ async def update_pricing(
         update(ElectricityPricing).where(ElectricityPricing.id == pricing_id).values(**update_data)
     )
     await db.commit()
+    await reload_tariff(db)
 
     result = await db.execute(select(ElectricityPricing).where(ElectricityPricing.id == pricing_id))
     updated = result.scalar_one()
@@ -1309,6 +1314,7 @@ async def delete_pricing(
 
     await db.execute(delete(ElectricityPricing).where(ElectricityPricing.id == pricing_id))
     await db.commit()
+    await reload_tariff(db)
 
     return ResponseModel(message="删除成功")
 
@@ -1708,6 +1714,24 @@ async def get_current_pricing(
     })
 
 
+@router.get("/pricing/compiled", response_model=ResponseModel, summary="获取编译后的分时电价")
+async def get_compiled_pricing(
+    target_date: Optional[date] = Query(None, description="日期，默认今天"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取指定日期生效的分时电价编译结果
+
+    返回按分钟合并的时段区间、各小时时段及96个15分钟时段电价
+    """
+    tariff = await get_tariff(db, target_date)
+    data = tariff.to_dict()
+    data["slot_prices"] = [round(float(p), 4) for p in tariff.slot_prices]
+    data["slot_periods"] = tariff.slot_periods
+    return ResponseModel(data=data)
+
+
 @router.post("/suggestions/{suggestion_id}/recalculate", response_model=ResponseModel, summary="调整参数并重算")
 async def recalculate_suggestion(
     suggestion_id: int,
@@ -2649,6 +2673,16 @@ async def get_distribution_topology(
 
 # ==================== 功率曲线 ====================
 
+# 模拟功率曲线各时段的负载系数范围
+_PERIOD_LOAD_FACTORS = {
+    "sharp": (0.85, 1.0),
+    "peak": (0.7, 0.9),
+    "flat": (0.5, 0.7),
+    "valley": (0.3, 0.5),
+    "deep_valley": (0.3, 0.5),
+}
+
+
 @router.get("/power-curve", response_model=ResponseModel[PowerCurveResponse], summary="获取功率曲线")
 async def get_power_curve(
     start_time: datetime = Query(..., description="开始时间"),
@@ -2675,6 +2709,7 @@ async def get_power_curve(
     query = query.order_by(PowerCurveData.timestamp)
     result = await db.execute(query)
     curve_data = result.scalars().all()
+    tariff = await get_tariff(db, start_time.date())
 
     # 如果没有数据，生成模拟数据
     # [V2.11] 使用确定性模拟数据
@@ -2688,22 +2723,12 @@ async def get_power_curve(
         idx = 0
 
         while current <= end_time:
-            hour = current.hour
             seed = _time_seed(current, idx)
 
             # 根据时段确定负载系数（确定性）
-            if 10 <= hour < 12 or 19 <= hour < 21:
-                time_period = "sharp"
-                load_factor = _deterministic_ratio(seed, 0.85, 1.0)
-            elif 8 <= hour < 10 or 12 <= hour < 14 or 17 <= hour < 19 or 21 <= hour < 23:
-                time_period = "peak"
-                load_factor = _deterministic_ratio(seed, 0.7, 0.9)
-            elif 0 <= hour < 7:
-                time_period = "valley"
-                load_factor = _deterministic_ratio(seed, 0.3, 0.5)
-            else:
-                time_period = "flat"
-                load_factor = _deterministic_ratio(seed, 0.5, 0.7)
+            time_period = tariff.period_at(current)
+            low, high = _PERIOD_LOAD_FACTORS[time_period]
+            load_factor = _deterministic_ratio(seed, low, high)
 
             base_power = 100  # 基准功率
             power = base_power * load_factor
@@ -2757,7 +2782,7 @@ async def get_power_curve(
             reactive_power=d.reactive_power or 0,
             power_factor=d.power_factor or 0.9,
             demand_15min=d.demand_15min or 0,
-            time_period=d.time_period or "flat"
+            time_period=d.time_period or tariff.period_at(d.timestamp)
         ))
 
     avg_power = total_power / len(curve_data) if curve_data else 0
@@ -3219,7 +3244,7 @@ async def run_energy_analysis(
     ensure_plugins_registered()
 
     try:
-        results = await plugin_manager.run_analysis(
+        report = await plugin_manager.run_analysis_with_report(
             db=db,
             plugin_ids=plugin_ids,
             days=days,
@@ -3228,7 +3253,7 @@ async def run_energy_analysis(
 
         # 转换结果格式
         suggestions = []
-        for r in results:
+        for r in report.results:
             suggestions.append({
                 "suggestion_type": r.suggestion_type.value,
                 "priority": r.priority.name,
@@ -3246,7 +3271,8 @@ async def run_energy_analysis(
 
         return ResponseModel(data={
             "total": len(suggestions),
-            "suggestions": suggestions
+            "suggestions": suggestions,
+            "execution": report.to_dict()
         })
 
     except Exception as e:
@@ -3452,8 +3478,10 @@ async def get_demand_aggregated_curve(
 
     按15分钟时段聚合过去N天的数据，返回每个时段(96个)的平均/最大/最小需量。
     用于需量分析页面展示30天或90天的典型日负荷曲线。
+    数据来自日负荷曲线物化表，只有当天和未物化的日期才读取原始需量数据。
     """
-    from ...models.energy import Demand15MinData
+    import numpy as np
+    from ...services.load_profile_service import LoadProfileService, SUBJECT_METER, slot_label
 
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
@@ -3468,47 +3496,29 @@ async def get_demand_aggregated_curve(
 
     declared_demand = meter.declared_demand or 100
 
-    # 查询历史需量数据
-    result = await db.execute(
-        select(Demand15MinData).where(
-            Demand15MinData.meter_point_id == meter_point_id,
-            Demand15MinData.timestamp >= start_date,
-            Demand15MinData.timestamp <= end_date
-        ).order_by(Demand15MinData.timestamp)
+    # 读取物化的日负荷矩阵 (天数 × 96)
+    matrix = await LoadProfileService(db).get_day_matrix(
+        SUBJECT_METER, meter_point_id, start_date.date(), end_date.date()
     )
-    records = result.scalars().all()
-
-    # 按时段(小时+分钟)聚合数据 - 96个时段
-    time_slot_data: dict[int, list[float]] = {i: [] for i in range(96)}
-    actual_days = set()
-
-    for r in records:
-        if r.rolling_demand is not None:
-            hour = r.timestamp.hour
-            minute = r.timestamp.minute
-            slot = hour * 4 + minute // 15  # 0-95
-            time_slot_data[slot].append(r.rolling_demand)
-            actual_days.add(r.timestamp.date())
+    # 保存本次补齐的日负荷曲线
+    await db.commit()
+    values = matrix.avg
+    valid = ~np.isnan(values)
+    slot_counts = valid.sum(axis=0)
+    slot_over = (valid & (np.nan_to_num(values) > declared_demand)).sum(axis=0)
+    stats = matrix.slot_stats()
 
     # 计算每个时段的统计值
     aggregated_points = []
-    total_over_declared = 0
-    total_points_count = 0
-    all_demands = []
-
     for slot in range(96):
-        slot_demands = time_slot_data[slot]
         hour = slot // 4
-        minute = (slot % 4) * 15
-
-        if slot_demands:
-            avg_demand = sum(slot_demands) / len(slot_demands)
-            max_demand = max(slot_demands)
-            min_demand = min(slot_demands)
-            over_count = sum(1 for d in slot_demands if d > declared_demand)
-            total_over_declared += over_count
-            total_points_count += len(slot_demands)
-            all_demands.extend(slot_demands)
+        data_count = int(slot_counts[slot])
+
+        if data_count:
+            avg_demand = float(stats["mean"][slot])
+            max_demand = float(np.nanmax(values[:, slot]))
+            min_demand = float(np.nanmin(values[:, slot]))
+            over_count = int(slot_over[slot])
         else:
             # 无数据时使用模拟值（基于典型数据中心负荷曲线）
             base_factor = 0.6 + 0.3 * abs(((hour - 14) / 10))  # 14点最高
@@ -3519,20 +3529,22 @@ async def get_demand_aggregated_curve(
 
         aggregated_points.append({
             "slot": slot,
-            "time": f"{hour:02d}:{minute:02d}",
+            "time": slot_label(slot),
             "avg_demand": round(avg_demand, 2),
             "max_demand": round(max_demand, 2),
             "min_demand": round(min_demand, 2),
-            "over_declared_ratio": round(over_count / len(slot_demands) * 100, 1) if slot_demands else 0,
-            "data_count": len(slot_demands)
+            "over_declared_ratio": round(over_count / data_count * 100, 1) if data_count else 0,
+            "data_count": data_count
         })
 
     # 计算整体统计
-    if all_demands:
-        overall_max = max(all_demands)
-        overall_avg = sum(all_demands) / len(all_demands)
+    total_points_count = int(slot_counts.sum())
+    total_over_declared = int(slot_over.sum())
+    if total_points_count:
+        overall_max = float(np.nanmax(values))
+        overall_avg = float(np.nanmean(values))
         utilization = overall_max / declared_demand * 100 if declared_demand > 0 else 0
-        over_declared_ratio = total_over_declared / total_points_count * 100 if total_points_count > 0 else 0
+        over_declared_ratio = total_over_declared / total_points_count * 100
     else:
         overall_max = 0
         overall_avg = 0
@@ -3547,7 +3559,7 @@ async def get_demand_aggregated_curve(
             "start": start_date.isoformat(),
             "end": end_date.isoformat(),
             "requested_days": days,
-            "actual_days": len(actual_days)
+            "actual_days": matrix.days_with_data
         },
         "statistics": {
             "max_demand": round(overall_max, 2),
@@ -3561,6 +3573,65 @@ async def get_demand_aggregated_curve(
     })
 
 
+@router.get("/demand/typical-profile", response_model=ResponseModel, summary="获取典型日需量曲线")
+async def get_demand_typical_profile(
+    meter_point_id: int = Query(..., description="计量点ID"),
+    day_type: str = Query("all", pattern="^(all|weekday|weekend)$", description="日类型"),
+    season: str = Query("all", pattern="^(all|spring|summer|autumn|winter)$", description="季节"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取计量点的物化典型日需量曲线
+
+    按工作日/周末与季节区分，返回96个时段的均值/最大/最小/P95。
+    """
+    from ...services.load_profile_service import LoadProfileService, SUBJECT_METER
+
+    meter_result = await db.execute(
+        select(MeterPoint).where(MeterPoint.id == meter_point_id)
+    )
+    if not meter_result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="计量点不存在")
+
+    profile = await LoadProfileService(db).get_typical_profile(
+        SUBJECT_METER, meter_point_id, day_type, season
+    )
+    await db.commit()
+    return ResponseModel(data=profile)
+
+
+@router.post("/demand/recompute", response_model=ResponseModel, summary="重算15分钟需量")
+async def recompute_demand(
+    meter_point_id: int = Query(..., description="计量点ID"),
+    start_date: date = Query(..., description="开始日期"),
+    end_date: Optional[date] = Query(None, description="结束日期，默认今天"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_operator)
+):
+    """
+    从计量点原始功率重算15分钟需量
+
+    范围扩展到整月，重写滑差需量、当日/当月最大需量及超申报标记，并更新月度需量历史。
+    没有原始功率数据时按已有15分钟需量重算标记。
+    """
+    from ...services.demand_engine import DemandEngine
+
+    end_date = end_date or datetime.now().date()
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+
+    meter_result = await db.execute(
+        select(MeterPoint).where(MeterPoint.id == meter_point_id)
+    )
+    if not meter_result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="计量点不存在")
+
+    summary = await DemandEngine(db).recompute(meter_point_id, start_date, end_date)
+    await db.commit()
+    return ResponseModel(data=summary)
+
+
 @router.get("/demand/peak-analysis", response_model=ResponseModel, summary="需量峰值分析")
 async def get_demand_peak_analysis(
     meter_point_id: int = Query(..., description="计量点ID"),
@@ -3573,7 +3644,8 @@ async def get_demand_peak_analysis(
 
     统计峰值出现的时段分布、超需量次数等
     """
-    from ...models.energy import Demand15MinData, DemandAnalysisRecord
+    import numpy as np
+    from ...services.load_profile_service import LoadProfileService, SUBJECT_METER
 
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
@@ -3588,46 +3660,45 @@ async def get_demand_peak_analysis(
 
     declared_demand = meter.declared_demand or 100
 
-    # 查询历史需量数据
-    result = await db.execute(
-        select(Demand15MinData).where(
-            Demand15MinData.meter_point_id == meter_point_id,
-            Demand15MinData.timestamp >= start_date,
-            Demand15MinData.timestamp <= end_date
-        ).order_by(Demand15MinData.timestamp)
+    # 读取物化的日负荷矩阵 (天数 × 96)
+    matrix = await LoadProfileService(db).get_day_matrix(
+        SUBJECT_METER, meter_point_id, start_date.date(), end_date.date()
     )
-    records = result.scalars().all()
+    # 保存本次补齐的日负荷曲线
+    await db.commit()
+    values = matrix.avg
+    valid = ~np.isnan(values) & (np.nan_to_num(values) != 0)
+    all_demands = values[valid]
 
-    # 统计分析
-    hourly_peaks = {i: [] for i in range(24)}
-    over_declared_records = []
-    all_demands = []
+    # 各小时平均峰值 (天数 × 24 × 4)
+    hourly_values = np.where(valid, values, 0).reshape(len(matrix.dates), 24, 4)
+    hourly_counts = valid.reshape(len(matrix.dates), 24, 4).sum(axis=(0, 2))
+    hourly_sums = hourly_values.sum(axis=(0, 2))
 
-    for r in records:
-        if r.rolling_demand:
-            hour = r.timestamp.hour
-            hourly_peaks[hour].append(r.rolling_demand)
-            all_demands.append(r.rolling_demand)
-            if r.is_over_declared:
-                over_declared_records.append({
-                    "timestamp": r.timestamp.isoformat(),
-                    "demand": r.rolling_demand,
-                    "over_ratio": (r.rolling_demand - declared_demand) / declared_demand * 100
-                })
-
-    # 计算各时段平均峰值
     hourly_avg = {}
     peak_hours = []
-    for hour, demands in hourly_peaks.items():
-        if demands:
-            avg = sum(demands) / len(demands)
+    for hour in range(24):
+        if hourly_counts[hour]:
+            avg = float(hourly_sums[hour] / hourly_counts[hour])
             hourly_avg[f"{hour:02d}:00"] = round(avg, 2)
             if avg > declared_demand * 0.9:
                 peak_hours.append(hour)
 
+    # 超需量记录 (按时间顺序)
+    over_declared_records = []
+    day_idx, slot_idx = np.nonzero(valid & (np.nan_to_num(values) > declared_demand))
+    for d, slot in zip(day_idx.tolist(), slot_idx.tolist()):
+        demand = float(values[d, slot])
+        timestamp = datetime.combine(matrix.dates[d], datetime.min.time()) + timedelta(minutes=15 * slot)
+        over_declared_records.append({
+            "timestamp": timestamp.isoformat(),
+            "demand": demand,
+            "over_ratio": (demand - declared_demand) / declared_demand * 100
+        })
+
     # 计算统计指标
-    max_demand = max(all_demands) if all_demands else 0
-    avg_demand = sum(all_demands) / len(all_demands) if all_demands else 0
+    max_demand = float(all_demands.max()) if len(all_demands) else 0
+    avg_demand = float(all_demands.mean()) if len(all_demands) else 0
     utilization = (max_demand / declared_demand * 100) if declared_demand > 0 else 0
 
     return ResponseModel(data={
@@ -3644,7 +3715,7 @@ async def get_demand_peak_analysis(
             "avg_demand": round(avg_demand, 2),
             "utilization_rate": round(utilization, 1),
             "over_declared_count": len(over_declared_records),
-            "over_declared_ratio": round(len(over_declared_records) / len(all_demands) * 100, 2) if all_demands else 0
+            "over_declared_ratio": round(len(over_declared_records) / len(all_demands) * 100, 2) if len(all_demands) else 0
         },
         "hourly_distribution": hourly_avg,
         "peak_hours": peak_hours,
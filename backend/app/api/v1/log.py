@@ -6,15 +6,14 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-import csv
-import io
+from sqlalchemy import select, func
 
 from ..deps import get_db, require_admin
 from ...models.user import User
 from ...models.log import OperationLog, SystemLog, CommunicationLog
 from ...schemas.log import OperationLogInfo, SystemLogInfo, CommunicationLogInfo
 from ...schemas.common import PageResponse
+from ...services.log_pipeline import LOG_MODELS, log_pipeline, stream_logs_csv
 
 router = APIRouter()
 
@@ -35,6 +34,7 @@ async def get_operation_logs(
     """
     获取操作日志（分页）
     """
+    await log_pipeline.flush()
     query = select(OperationLog)
 
     if user_id:
@@ -84,6 +84,7 @@ async def get_system_logs(
     """
     获取系统日志（分页）
     """
+    await log_pipeline.flush()
     query = select(SystemLog)
 
     if log_level:
@@ -127,6 +128,7 @@ async def get_communication_logs(
     """
     获取通讯日志（分页）
     """
+    await log_pipeline.flush()
     query = select(CommunicationLog)
 
     if device_id:
@@ -159,80 +161,21 @@ async def export_logs(
     log_type: str = Query(..., description="日志类型: operation/system/communication"),
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_db),
     _: User = Depends(require_admin)
 ):
     """
-    导出日志为CSV
+    导出日志为CSV (分批读取，流式输出)
     """
+    if log_type not in LOG_MODELS:
+        raise HTTPException(status_code=400, detail="无效的日志类型")
     if not start_time:
         start_time = datetime.now() - timedelta(days=7)
     if not end_time:
         end_time = datetime.now()
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    if log_type == "operation":
-        query = select(OperationLog).where(
-            and_(
-                OperationLog.created_at >= start_time,
-                OperationLog.created_at <= end_time
-            )
-        ).order_by(OperationLog.created_at.desc())
-
-        result = await db.execute(query)
-        logs = result.scalars().all()
-
-        writer.writerow(["时间", "用户", "模块", "操作", "目标", "IP地址", "备注"])
-        for log in logs:
-            writer.writerow([
-                log.created_at, log.username, log.module, log.action,
-                log.target_name, log.ip_address, log.remark
-            ])
-
-    elif log_type == "system":
-        query = select(SystemLog).where(
-            and_(
-                SystemLog.created_at >= start_time,
-                SystemLog.created_at <= end_time
-            )
-        ).order_by(SystemLog.created_at.desc())
-
-        result = await db.execute(query)
-        logs = result.scalars().all()
-
-        writer.writerow(["时间", "级别", "模块", "消息", "异常信息"])
-        for log in logs:
-            writer.writerow([
-                log.created_at, log.log_level, log.module,
-                log.message, log.exception
-            ])
-
-    elif log_type == "communication":
-        query = select(CommunicationLog).where(
-            and_(
-                CommunicationLog.created_at >= start_time,
-                CommunicationLog.created_at <= end_time
-            )
-        ).order_by(CommunicationLog.created_at.desc())
-
-        result = await db.execute(query)
-        logs = result.scalars().all()
-
-        writer.writerow(["时间", "设备ID", "类型", "协议", "状态", "耗时(ms)", "错误信息"])
-        for log in logs:
-            writer.writerow([
-                log.created_at, log.device_id, log.comm_type,
-                log.protocol, log.status, log.duration_ms, log.error_message
-            ])
-
-    else:
-        raise HTTPException(status_code=400, detail="无效的日志类型")
-
-    output.seek(0)
+    await log_pipeline.flush()
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode("utf-8-sig")),
+        stream_logs_csv(log_type, start_time, end_time),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={log_type}_logs.csv"}
     )
@@ -247,14 +190,10 @@ async def get_log_statistics(
     """
     获取日志统计信息
     """
+    await log_pipeline.flush()
     start_time = datetime.now() - timedelta(days=days)
 
     # 操作日志统计
-    op_total_result = await db.execute(
-        select(func.count(OperationLog.id)).where(OperationLog.created_at >= start_time)
-    )
-    op_total = op_total_result.scalar()
-
     op_by_module_result = await db.execute(
         select(OperationLog.module, func.count(OperationLog.id)).where(
             OperationLog.created_at >= start_time
@@ -271,11 +210,6 @@ async def get_log_statistics(
     sys_by_level = {row[0]: row[1] for row in sys_by_level_result.all()}
 
     # 通讯日志统计
-    comm_total_result = await db.execute(
-        select(func.count(CommunicationLog.id)).where(CommunicationLog.created_at >= start_time)
-    )
-    comm_total = comm_total_result.scalar()
-
     comm_by_status_result = await db.execute(
         select(CommunicationLog.status, func.count(CommunicationLog.id)).where(
             CommunicationLog.created_at >= start_time
@@ -286,14 +220,19 @@ async def get_log_statistics(
     return {
         "period_days": days,
         "operation_logs": {
-            "total": op_total,
+            "total": sum(op_by_module.values()),
             "by_module": op_by_module
         },
         "system_logs": {
             "by_level": sys_by_level
         },
         "communication_logs": {
-            "total": comm_total,
+            "total": sum(comm_by_status.values()),
             "by_status": comm_by_status
+        },
+        "pipeline": {
+            "pending": log_pipeline.pending,
+            "written": log_pipeline.written,
+            "dropped": log_pipeline.dropped
         }
     }
@@ -584,6 +584,7 @@ class DispatchStatus(BaseModel):
 
 @router.get("/dispatch/status", summary="获取实时调度状态")
 async def get_dispatch_status(
+    meter_point_id: Optional[int] = Query(None, description="计量点ID，为空时返回全站控制器"),
     db: AsyncSession = Depends(get_db),
     _: User = Depends(require_viewer)
 ):
@@ -599,8 +600,24 @@ async def get_dispatch_status(
     数据来源:
     - 优先从实时监控数据获取当前功率
     - 若无数据且启用模拟模式，使用 demo_provider 提供的模拟数据
+    - 指定计量点时返回实时采集周期驱动的该计量点控制器状态
     """
-    from app.services.realtime_dispatch import get_dispatch_controller
+    from app.services.realtime_dispatch import get_dispatch_controller, dispatch_registry
+
+    if meter_point_id is not None:
+        if meter_point_id not in dispatch_registry.meter_ids():
+            return {"code": 404, "message": "该计量点暂无实时功率数据", "data": None}
+        controller = dispatch_registry.get(meter_point_id)
+        readings = controller.power_readings
+        return {
+            "code": 0,
+            "message": "success",
+            "data": {
+                "meter_point_id": meter_point_id,
+                "current_power": round(readings[-1].power, 1) if readings else 0,
+                **controller.get_status()
+            }
+        }
 
     settings = get_settings()
 
@@ -640,6 +657,32 @@ async def get_dispatch_status(
     }
 
 
+@router.get("/dispatch/meters", summary="获取各计量点实时调度状态")
+async def get_dispatch_meters(
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    获取所有计量点控制器的预测结果
+
+    控制器由实时采集周期按计量点汇总有功功率后驱动。
+    """
+    from app.services.realtime_dispatch import dispatch_registry
+
+    meters = []
+    for meter_point_id, status in dispatch_registry.get_statuses().items():
+        if meter_point_id is None:
+            continue
+        meters.append({"meter_point_id": meter_point_id, **status})
+    meters.sort(key=lambda m: m["meter_point_id"])
+
+    return {
+        "code": 0,
+        "message": "success",
+        "data": {"total": len(meters), "meters": meters}
+    }
+
+
 @router.post("/dispatch/command", summary="发送调度指令")
 async def send_dispatch_command(
     request: DispatchCommandRequest,
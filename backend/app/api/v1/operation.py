@@ -22,6 +22,8 @@ from ...schemas.operation import (
     KnowledgeCreate, KnowledgeUpdate, KnowledgeResponse,
     OperationStatistics
 )
+from ...services.statistics import get_operation_statistics
+from ...services.search_index import SOURCES, get_search_index
 
 router = APIRouter(prefix="/operation", tags=["运维管理"])
 
@@ -655,21 +657,32 @@ async def get_knowledge_list(
         query = query.where(KnowledgeBase.category == category)
 
     if keyword:
-        query = query.where(
-            KnowledgeBase.title.contains(keyword) |
-            KnowledgeBase.content.contains(keyword) |
-            KnowledgeBase.tags.contains(keyword)
-        )
-
-    # 获取总数
-    from sqlalchemy import func
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+        # 全文索引检索，按相关度排序
+        index = await get_search_index(db, ["knowledge"])
+        ranked = index.ranked_ids(keyword, "knowledge")
+        if category and ranked:
+            result = await db.execute(
+                select(KnowledgeBase.id).where(
+                    KnowledgeBase.category == category, KnowledgeBase.id.in_(ranked)
+                )
+            )
+            allowed = set(result.scalars().all())
+            ranked = [article_id for article_id in ranked if article_id in allowed]
+        total = len(ranked)
+        page_ids = ranked[skip:skip + limit]
+
+        result = await db.execute(select(KnowledgeBase).where(KnowledgeBase.id.in_(page_ids)))
+        by_id = {article.id: article for article in result.scalars().all()}
+        articles = [by_id[article_id] for article_id in page_ids if article_id in by_id]
+    else:
+        # 获取总数
+        count_query = select(func.count()).select_from(query.subquery())
+        total_result = await db.execute(count_query)
+        total = total_result.scalar() or 0
 
-    query = query.order_by(KnowledgeBase.created_at.desc()).offset(skip).limit(limit)
-    result = await db.execute(query)
-    articles = result.scalars().all()
+        query = query.order_by(KnowledgeBase.created_at.desc()).offset(skip).limit(limit)
+        result = await db.execute(query)
+        articles = result.scalars().all()
 
     return {
         "code": 0,
@@ -773,50 +786,48 @@ async def delete_knowledge(
     return {"message": "操作成功"}
 
 
-# ==================== 运维统计 ====================
+# ==================== 全文检索 ====================
 
-@router.get("/statistics", response_model=OperationStatistics, summary="获取运维统计信息")
-async def get_statistics(
+@router.get("/search", summary="全文检索知识库/工单/告警")
+async def search_operations(
+    q: str = Query(..., min_length=1, description="检索词"),
+    types: Optional[str] = Query(None, description="文档类型，逗号分隔: knowledge/work_order/alarm"),
+    skip: int = Query(0, ge=0, description="跳过记录数"),
+    limit: int = Query(20, ge=1, le=100, description="返回记录数"),
     db: AsyncSession = Depends(get_db),
     _: User = Depends(require_viewer)
 ):
     """
-    获取运维统计信息
+    按相关度检索知识库、工单和告警消息，返回命中片段高亮
     """
-    # 工单统计
-    total_orders_result = await db.execute(select(func.count(WorkOrder.id)))
-    total_orders = total_orders_result.scalar() or 0
+    doc_types = [t.strip() for t in types.split(",") if t.strip()] if types else list(SOURCES)
+    unknown = [t for t in doc_types if t not in SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的文档类型: {', '.join(unknown)}")
 
-    pending_orders_result = await db.execute(
-        select(func.count(WorkOrder.id)).where(WorkOrder.status == WorkOrderStatus.pending)
-    )
-    pending_orders = pending_orders_result.scalar() or 0
+    index = await get_search_index(db, doc_types)
+    total, hits = index.search(q, doc_types, limit=limit, offset=skip)
 
-    processing_orders_result = await db.execute(
-        select(func.count(WorkOrder.id)).where(WorkOrder.status == WorkOrderStatus.processing)
-    )
-    processing_orders = processing_orders_result.scalar() or 0
+    return {
+        "code": 0,
+        "message": "success",
+        "data": {
+            "items": hits,
+            "total": total,
+            "skip": skip,
+            "limit": limit
+        }
+    }
 
-    completed_orders_result = await db.execute(
-        select(func.count(WorkOrder.id)).where(WorkOrder.status == WorkOrderStatus.completed)
-    )
-    completed_orders = completed_orders_result.scalar() or 0
 
-    # 逾期巡检统计
-    overdue_result = await db.execute(
-        select(func.count(InspectionTask.id)).where(InspectionTask.status == InspectionStatus.overdue)
-    )
-    overdue_inspections = overdue_result.scalar() or 0
-
-    # 知识库统计
-    knowledge_result = await db.execute(select(func.count(KnowledgeBase.id)))
-    knowledge_count = knowledge_result.scalar() or 0
-
-    return OperationStatistics(
-        total_orders=total_orders,
-        pending_orders=pending_orders,
-        processing_orders=processing_orders,
-        completed_orders=completed_orders,
-        overdue_inspections=overdue_inspections,
-        knowledge_count=knowledge_count
-    )
+# ==================== 运维统计 ====================
+
+@router.get("/statistics", response_model=OperationStatistics, summary="获取运维统计信息")
+async def get_statistics(
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    获取运维统计信息
+    """
+    return await get_operation_statistics(db)
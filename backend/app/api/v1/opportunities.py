@@ -20,7 +20,7 @@ from ...schemas.energy import (
     ExecutionPlanCreate, ExecutionPlanResponse,
     ExecutionTaskCreate, ExecutionTaskResponse,
     DashboardResponse, DashboardSummaryCards, OpportunitySummary,
-    SimulationRequest, SimulationResponse,
+    SimulationRequest, SimulationResponse, CombinedSimulationRequest,
     DeviceSelectionRequest, DeviceSelectionResponse
 )
 from ...services.opportunity_engine import OpportunityEngine, OpportunityCategory
@@ -217,6 +217,49 @@ async def simulate_opportunity(
         raise HTTPException(status_code=500, detail=f"模拟失败: {str(e)}")
 
 
+@router.post("/{opportunity_id}/simulate/combined", summary="组合模拟及收益分布")
+async def simulate_opportunity_combined(
+    opportunity_id: int,
+    request: CombinedSimulationRequest,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    组合模拟多个场景，返回各场景及组合年收益的蒙特卡洛分布 (P10/P50/P90)
+    """
+    result = await db.execute(
+        select(EnergyOpportunity).where(EnergyOpportunity.id == opportunity_id)
+    )
+    if not result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail=f"机会ID {opportunity_id} 不存在")
+
+    unknown = [s.get("type") for s in request.scenarios
+               if s.get("type") not in ("demand_adjustment", "peak_shift", "device_regulation")]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的模拟类型: {', '.join(map(str, unknown))}")
+
+    simulation = SimulationService(db)
+    try:
+        combined = await simulation.run_combined_simulation(
+            request.scenarios, draws=request.draws, seed=request.seed
+        )
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=f"模拟参数错误: {str(e)}")
+
+    for entry in combined["results"]:
+        res = entry["result"]
+        entry["result"] = SimulationResponse(
+            is_feasible=res.is_feasible,
+            current_state=res.current_state,
+            simulated_state=res.simulated_state,
+            benefit=res.benefit,
+            confidence=res.confidence,
+            warnings=res.warnings,
+            recommendations=res.recommendations
+        )
+    return combined
+
+
 # ========== 设备选择 ==========
 
 @router.get("/{opportunity_id}/devices", summary="获取可参与设备列表")
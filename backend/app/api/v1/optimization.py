@@ -11,12 +11,16 @@ from pydantic import BaseModel, Field
 
 from ..deps import get_db, get_current_user
 from ...models.user import User
+from ...services import forecasting
 from ...services.forecasting import LoadForecaster, generate_demo_forecast
+from ...services.load_forecast_engine import LoadForecastEngine
 from ...services.optimizer import (
-    run_day_ahead_optimization,
+    SOLVERS,
     PricingConfig,
     StorageConfig,
 )
+from ...services.optimization_service import optimization_service
+from ...services.tariff_compiler import get_tariff
 
 router = APIRouter()
 
@@ -48,6 +52,18 @@ class OptimizationRequest(BaseModel):
     storage_discharge_power: float = Field(100.0, description="最大放电功率 kW")
     storage_initial_soc: float = Field(0.5, description="初始SOC")
 
+    # 求解控制
+    time_limit: int = Field(30, ge=1, le=300, description="求解时间上限 秒")
+    mip_gap: Optional[float] = Field(None, ge=0, le=1, description="相对MIP间隙，达到即停止求解")
+    solver: str = Field('auto', description="求解器: auto/milp/heuristic，auto 按问题规模和时间预算选择")
+
+
+class RollingHorizonRequest(OptimizationRequest):
+    """多日滚动优化请求"""
+    days: int = Field(7, ge=1, le=31, description="执行天数 (从目标日期起)")
+    horizon_days: int = Field(3, ge=1, le=7, description="每个滚动窗口优化的天数")
+    month_peak: float = Field(0.0, ge=0, description="本月已发生的最大需量 kW")
+
 
 class ScheduleUpdateRequest(BaseModel):
     """调度状态更新请求"""
@@ -55,12 +71,52 @@ class ScheduleUpdateRequest(BaseModel):
     notes: Optional[str] = Field(None, description="备注")
 
 
+def _pricing_config(request: OptimizationRequest) -> dict:
+    """由请求构建电价配置"""
+    return {
+        'demand_price': request.demand_price,
+        'declared_demand': request.declared_demand,
+        'period_prices': request.period_prices or {
+            'sharp': 1.20,
+            'peak': 0.95,
+            'flat': 0.65,
+            'valley': 0.35,
+            'deep_valley': 0.20,
+        }
+    }
+
+
+def _storage_config(request: OptimizationRequest) -> Optional[dict]:
+    """由请求构建储能配置"""
+    if not request.use_storage:
+        return None
+    return {
+        'capacity': request.storage_capacity,
+        'max_charge_power': request.storage_charge_power,
+        'max_discharge_power': request.storage_discharge_power,
+        'initial_soc': request.storage_initial_soc,
+        'charge_efficiency': 0.95,
+        'discharge_efficiency': 0.95,
+        'min_soc': 0.10,
+        'max_soc': 0.90,
+        'cycle_cost': 0.10,
+    }
+
+
+async def _load_forecast(db: AsyncSession, date_obj: datetime) -> dict:
+    """优化用负荷预测: 有计量点历史数据时数据驱动预测，否则使用演示负荷模式"""
+    return await forecasting.get_load_forecast(
+        db, date_obj, base_load=350.0, peak_load=850.0, noise_level=0.03
+    )
+
+
 # ==================== API 端点 ====================
 
 @router.get("/forecast", summary="获取负荷预测")
 async def get_load_forecast(
     target_date: Optional[str] = Query(None, description="目标日期 YYYY-MM-DD"),
     meter_point_id: Optional[int] = Query(None, description="计量点ID"),
+    method: str = Query("auto", description="预测方法: auto/data/pattern"),
     base_load: float = Query(350.0, description="基础负荷 kW"),
     peak_load: float = Query(850.0, description="峰值负荷 kW"),
     db: AsyncSession = Depends(get_db),
@@ -74,7 +130,15 @@ async def get_load_forecast(
     - 置信区间
     - 时段分类
     - 统计汇总
+
+    预测方法：
+    - auto: 有计量点历史数据时数据驱动预测，否则按典型负荷模式
+    - data: 仅数据驱动预测，无历史数据时返回404
+    - pattern: 按典型负荷模式 (base_load/peak_load)
     """
+    if method not in ('auto', 'data', 'pattern'):
+        raise HTTPException(status_code=400, detail=f"预测方法无效: {method}")
+
     # 解析目标日期
     if target_date:
         try:
@@ -84,11 +148,19 @@ async def get_load_forecast(
     else:
         date_obj = datetime.now() + timedelta(days=1)
 
-    # 创建预测器
-    forecaster = LoadForecaster(base_load=base_load, peak_load=peak_load)
+    # 预热目标日期的分时电价编译缓存
+    await get_tariff(db, date_obj.date())
 
-    # 执行预测
-    forecast = forecaster.forecast_day(date_obj, noise_level=0.03)
+    if method == 'pattern':
+        forecaster = LoadForecaster(base_load=base_load, peak_load=peak_load)
+        forecast = {**forecaster.forecast_day(date_obj, noise_level=0.03), 'method': 'pattern'}
+    else:
+        forecast = await forecasting.get_load_forecast(
+            db, date_obj, meter_point_id,
+            base_load=base_load, peak_load=peak_load, noise_level=0.03
+        )
+        if method == 'data' and forecast['method'] == 'pattern':
+            raise HTTPException(status_code=404, detail="没有可用于预测的计量点历史数据")
 
     return {
         'code': 0,
@@ -97,6 +169,70 @@ async def get_load_forecast(
     }
 
 
+@router.get("/forecast/meters", summary="批量预测各计量点负荷")
+async def get_meter_forecasts(
+    target_date: Optional[str] = Query(None, description="目标日期 YYYY-MM-DD"),
+    meter_ids: Optional[str] = Query(None, description="计量点ID，逗号分隔，默认全部启用的计量点"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """一次预测多个计量点的96时段负荷，无历史数据的计量点不返回"""
+    if target_date:
+        try:
+            date_obj = datetime.strptime(target_date, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="日期格式错误，请使用 YYYY-MM-DD")
+    else:
+        date_obj = datetime.now() + timedelta(days=1)
+
+    ids = None
+    if meter_ids:
+        try:
+            ids = [int(x) for x in meter_ids.split(',') if x.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="计量点ID格式错误")
+
+    forecasts = await LoadForecastEngine(db).forecast(date_obj.date(), ids)
+
+    return {
+        'code': 0,
+        'message': 'success',
+        'data': {
+            'date': date_obj.strftime('%Y-%m-%d'),
+            'count': len(forecasts),
+            'forecasts': list(forecasts.values()),
+        }
+    }
+
+
+@router.post("/forecast/refit", summary="重新拟合负荷预测模型")
+async def refit_forecast_models(
+    meter_ids: Optional[str] = Query(None, description="计量点ID，逗号分隔，默认全部启用的计量点"),
+    full: bool = Query(False, description="是否丢弃缓存按全部历史重新拟合"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    拟合负荷预测模型并返回滚动回测误差
+
+    默认只用上次拟合之后的新数据增量更新。
+    """
+    ids = None
+    if meter_ids:
+        try:
+            ids = [int(x) for x in meter_ids.split(',') if x.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="计量点ID格式错误")
+
+    models = await LoadForecastEngine(db).fit(ids, full=full)
+
+    return {
+        'code': 0,
+        'message': 'success',
+        'data': [model.summary() for model in models.values() if model.trained_until]
+    }
+
+
 @router.post("/day-ahead", summary="执行日前优化")
 async def run_optimization(
     request: OptimizationRequest,
@@ -112,6 +248,9 @@ async def run_optimization(
     3. 执行MILP优化
     4. 返回最优调度计划
     """
+    if request.solver not in SOLVERS:
+        raise HTTPException(status_code=400, detail=f"求解器无效: {request.solver}")
+
     # 解析目标日期
     if request.target_date:
         try:
@@ -122,46 +261,29 @@ async def run_optimization(
         date_obj = datetime.now() + timedelta(days=1)
 
     # 1. 获取负荷预测
-    forecast_data = generate_demo_forecast(date_obj)
+    tariff = await get_tariff(db, date_obj.date())
+    forecast_data = await _load_forecast(db, date_obj)
 
     # 2. 构建电价配置
-    pricing_config = {
-        'demand_price': request.demand_price,
-        'declared_demand': request.declared_demand,
-        'period_prices': request.period_prices or {
-            'sharp': 1.20,
-            'peak': 0.95,
-            'flat': 0.65,
-            'valley': 0.35,
-            'deep_valley': 0.20,
-        }
-    }
+    pricing_config = _pricing_config(request)
 
     # 3. 构建储能配置
-    storage_config = None
-    if request.use_storage:
-        storage_config = {
-            'capacity': request.storage_capacity,
-            'max_charge_power': request.storage_charge_power,
-            'max_discharge_power': request.storage_discharge_power,
-            'initial_soc': request.storage_initial_soc,
-            'charge_efficiency': 0.95,
-            'discharge_efficiency': 0.95,
-            'min_soc': 0.10,
-            'max_soc': 0.90,
-            'cycle_cost': 0.10,
-        }
+    storage_config = _storage_config(request)
 
     # 4. TODO: 从数据库加载可调度设备
     devices = []
 
     # 5. 执行优化
-    result = run_day_ahead_optimization(
+    result = await optimization_service.run_day_ahead(
         forecast_data=forecast_data,
         pricing_config=pricing_config,
         storage_config=storage_config,
         devices=devices,
         demand_target=request.demand_target,
+        tariff=tariff,
+        time_limit=request.time_limit,
+        gap_rel=request.mip_gap,
+        solver=request.solver,
     )
 
     # 6. TODO: 保存调度计划到数据库
@@ -173,6 +295,52 @@ async def run_optimization(
     }
 
 
+@router.post("/rolling-horizon", summary="执行多日滚动优化")
+async def run_rolling_horizon(
+    request: RollingHorizonRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    执行多日滚动时域优化
+
+    每天优化未来 horizon_days 天 (首日15分钟、后续天按小时)，只执行首日计划，
+    并将期末SOC和本月最大需量带入下一天。
+    """
+    if request.solver not in SOLVERS:
+        raise HTTPException(status_code=400, detail=f"求解器无效: {request.solver}")
+    if request.target_date:
+        try:
+            date_obj = datetime.strptime(request.target_date, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="日期格式错误")
+    else:
+        date_obj = datetime.now() + timedelta(days=1)
+
+    tariff = await get_tariff(db, date_obj.date())
+    forecasts = [await _load_forecast(db, date_obj + timedelta(days=i)) for i in range(request.days)]
+
+    result = await optimization_service.run_rolling_horizon(
+        forecasts=forecasts,
+        pricing_config=_pricing_config(request),
+        storage_config=_storage_config(request),
+        devices=[],
+        demand_target=request.demand_target,
+        tariff=tariff,
+        horizon_days=request.horizon_days,
+        month_peak=request.month_peak,
+        time_limit=request.time_limit,
+        gap_rel=request.mip_gap,
+        solver=request.solver,
+    )
+
+    return {
+        'code': 0,
+        'message': 'success',
+        'data': result
+    }
+
+
 @router.get("/day-ahead/{date}", summary="获取日前调度计划")
 async def get_schedule(
     date: str,
@@ -193,7 +361,7 @@ async def get_schedule(
     # 暂时返回实时计算的结果
 
     # 生成预测和优化
-    forecast_data = generate_demo_forecast(date_obj)
+    forecast_data = await _load_forecast(db, date_obj)
 
     pricing_config = {
         'demand_price': 40.0,
@@ -219,7 +387,7 @@ async def get_schedule(
         'cycle_cost': 0.10,
     }
 
-    result = run_day_ahead_optimization(
+    result = await optimization_service.run_day_ahead(
         forecast_data=forecast_data,
         pricing_config=pricing_config,
         storage_config=storage_config,
@@ -268,6 +436,20 @@ async def update_schedule_status(
     }
 
 
+@router.get("/solver/stats", summary="获取求解服务统计")
+async def get_solver_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取日前优化求解服务的缓存命中、热启动模型数和进行中的求解数
+    """
+    return {
+        'code': 0,
+        'message': 'success',
+        'data': optimization_service.stats()
+    }
+
+
 @router.get("/summary", summary="获取优化汇总")
 async def get_optimization_summary(
     month: Optional[str] = Query(None, description="月份 YYYY-MM"),
@@ -566,8 +748,6 @@ async def create_opportunity_from_optimization(
     自动执行优化并将结果转化为节能机会
     """
     from app.services.optimization_integration import OptimizationIntegrationService
-    from app.services.forecasting import generate_demo_forecast
-    from app.services.optimizer import run_day_ahead_optimization
 
     # 解析日期
     if target_date:
@@ -576,7 +756,7 @@ async def create_opportunity_from_optimization(
         date_obj = datetime.now() + timedelta(days=1)
 
     # 执行优化
-    forecast = generate_demo_forecast(date_obj)
+    forecast = await _load_forecast(db, date_obj)
 
     pricing_config = {
         'demand_price': 40.0,
@@ -597,7 +777,7 @@ async def create_opportunity_from_optimization(
         'initial_soc': 0.50,
     }
 
-    result = run_day_ahead_optimization(
+    result = await optimization_service.run_day_ahead(
         forecast_data=forecast,
         pricing_config=pricing_config,
         storage_config=storage_config,
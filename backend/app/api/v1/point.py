@@ -12,6 +12,7 @@ import csv
 import io
 
 from ..deps import get_db, require_viewer, require_operator, require_admin
+from ...core.config import get_settings
 from ...models.user import User
 from ...models.point import Point, PointRealtime, PointGroup, PointGroupMember
 from ...models.energy import PowerDevice
@@ -20,6 +21,8 @@ from ...schemas.point import (
     PointGroupCreate, PointGroupInfo
 )
 from ...schemas.common import PageResponse
+from ...services.log_pipeline import log_pipeline
+from ...services.point_import import ImportFileError, import_points
 
 router = APIRouter()
 
@@ -211,51 +214,32 @@ async def export_points(
 async def batch_import_points(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(require_operator)
+    current_user: User = Depends(require_operator)
 ):
     """
     从CSV文件批量导入点位
+
+    流式读取并分块校验、批量写入，同时创建实时值记录；返回逐行诊断信息
     """
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="请上传CSV文件")
 
-    content = await file.read()
     try:
-        content = content.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        content = content.decode("gbk")
-
-    reader = csv.DictReader(io.StringIO(content))
-    success_count = 0
-    error_list = []
-
-    for row in reader:
-        try:
-            point = Point(
-                point_code=row.get("点位编码", ""),
-                point_name=row.get("点位名称", ""),
-                point_type=row.get("点位类型", "AI"),
-                device_type=row.get("设备类型", ""),
-                area_code=row.get("区域", "A1"),
-                unit=row.get("单位", ""),
-                min_range=float(row.get("量程下限", 0)) if row.get("量程下限") else None,
-                max_range=float(row.get("量程上限", 100)) if row.get("量程上限") else None,
-                precision=int(row.get("精度", 2)) if row.get("精度") else 2,
-                collect_interval=int(row.get("采集周期", 10)) if row.get("采集周期") else 10,
-                is_enabled=row.get("启用", "是") == "是"
-            )
-            db.add(point)
-            success_count += 1
-        except Exception as e:
-            error_list.append(f"行 {success_count + len(error_list) + 2}: {str(e)}")
-
-    await db.commit()
+        result = await import_points(db, file.file, get_settings().max_points)
+    except ImportFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    log_pipeline.record_operation(
+        user_id=current_user.id,
+        username=current_user.username,
+        module="point",
+        action="import",
+        target_type="point",
+        target_name=file.filename,
+        remark=f"导入成功 {result.success_count} 条，失败 {result.error_count} 条"
+    )
 
-    return {
-        "success_count": success_count,
-        "error_count": len(error_list),
-        "errors": error_list[:10]  # 只返回前10个错误
-    }
+    return result.to_dict()
 
 
 @router.get("/{point_id}", response_model=PointInfo, summary="获取点位详情")
@@ -2,7 +2,7 @@
 电价配置 API - v1
 提供完整电价配置的查询、更新和电费计算功能
 """
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Union
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
@@ -45,6 +45,16 @@ class EstimateSavingsRequest(BaseModel):
     avg_power_factor: float = Field(0.9, description="平均功率因数", ge=0, le=1)
 
 
+class BatchBillRequest(BaseModel):
+    """批量电费计算请求"""
+    loads: List[List[float]] = Field(
+        ..., description="各场景15分钟平均功率 kW，每条长度为 96×天数", min_length=1
+    )
+    power_factor: Union[float, List[float]] = Field(0.9, description="平均功率因数，单值或每场景一个值")
+    include_fixed_fees: bool = Field(True, description="是否包含固定费用")
+    baseline: int = Field(0, description="作为节省计算基准的场景序号", ge=0)
+
+
 # ========== 完整电价配置 ==========
 
 @router.get("/full-config", summary="获取完整电价配置")
@@ -142,6 +152,38 @@ async def calculate_bill(
     )
 
 
+@router.post("/calculate-bill/batch", summary="批量计算电费")
+async def calculate_bill_batch(
+    request: BatchBillRequest,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    按负荷曲线批量计算多个场景的电费，返回各场景费用汇总
+    及相对基准场景的节省，用于 What-if 方案对比
+    """
+    lengths = {len(curve) for curve in request.loads}
+    if len(lengths) != 1:
+        raise HTTPException(status_code=400, detail="各场景负荷曲线长度必须一致")
+    if request.baseline >= len(request.loads):
+        raise HTTPException(status_code=400, detail="基准场景序号超出范围")
+    if isinstance(request.power_factor, list) and len(request.power_factor) != len(request.loads):
+        raise HTTPException(status_code=400, detail="功率因数数量与场景数量不一致")
+
+    service = PricingService(db)
+    try:
+        batch = await service.calculate_bills_batch(
+            request.loads, request.power_factor, request.include_fixed_fees
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        **batch.summary(request.baseline),
+        "bills": [batch.totals(i) for i in range(len(batch))]
+    }
+
+
 @router.post("/estimate-savings", summary="估算优化节省")
 async def estimate_savings(
     request: EstimateSavingsRequest,
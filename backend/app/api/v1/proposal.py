@@ -2,6 +2,8 @@
 节能方案 API 端点
 提供方案生成、查询、接受、执行和监控功能
 """
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -12,6 +14,7 @@ from decimal import Decimal
 from app.api.deps import get_db
 from app.schemas.proposal_schema import (
     ProposalCreate,
+    ProposalBatchCreate,
     ProposalResponse,
     MeasureAcceptRequest,
     ProposalMonitoringResponse,
@@ -81,42 +84,52 @@ async def analyze_and_generate(
     """
     智能分析并批量生成节能方案
 
-    为所有6种模板各生成一个方案，返回生成的方案数量
+    为尚无待处理方案的模板各生成一个方案 (共享数据快照并发生成，一次提交)，
+    返回生成的方案数量和各模板耗时
     """
-    generator = TemplateGenerator(db)
-    template_ids = list(TemplateGenerator.TEMPLATE_CONFIGS.keys())
-
-    new_proposals = []
-    for template_id in template_ids:
-        try:
-            # 检查是否已存在相同模板的待处理方案
-            query = select(EnergySavingProposal).where(
-                EnergySavingProposal.template_id == template_id,
-                EnergySavingProposal.status == "pending"
-            )
-            result = await db.execute(query)
-            existing = result.scalar_one_or_none()
-
-            if not existing:
-                proposal = generator.generate_proposal(template_id, analysis_days=30)
-                db.add(proposal)
-                new_proposals.append(proposal)
-        except Exception as e:
-            print(f"生成{template_id}方案失败: {str(e)}")
-            continue
+    # 检查是否已存在相同模板的待处理方案
+    query = select(EnergySavingProposal.template_id).where(
+        EnergySavingProposal.status == "pending"
+    )
+    result = await db.execute(query)
+    existing = set(result.scalars().all())
+    template_ids = [t for t in TemplateGenerator.TEMPLATE_CONFIGS if t not in existing]
 
-    await db.commit()
+    results = []
+    if template_ids:
+        generator = TemplateGenerator(db)
+        results = await generator.generate_batch(template_ids, analysis_days=30)
+        for item in results:
+            if item["error"]:
+                print(f"生成{item['template_id']}方案失败: {item['error']}")
+        await db.commit()
 
+    new_count = sum(1 for item in results if item["proposal"] is not None)
     return {
         "code": 0,
         "message": "success",
         "data": {
-            "new_suggestions": len(new_proposals),
-            "total": len(new_proposals)
+            "new_suggestions": new_count,
+            "total": new_count,
+            "timings": _batch_timings(results)
         }
     }
 
 
+def _batch_timings(results: List[dict]) -> List[dict]:
+    """批量生成结果转换为各模板耗时摘要"""
+    return [
+        {
+            "template_id": item["template_id"],
+            "proposal_id": item["proposal"].id if item["proposal"] is not None else None,
+            "proposal_code": item["proposal"].proposal_code if item["proposal"] is not None else None,
+            "elapsed_ms": item["elapsed_ms"],
+            "error": item["error"]
+        }
+        for item in results
+    ]
+
+
 # ==================== 0.2 兼容旧前端的建议格式API ====================
 
 @router.get("/as-suggestions", summary="获取方案列表（建议格式）")
@@ -234,7 +247,7 @@ async def generate_proposal(
     """
     try:
         generator = TemplateGenerator(db)
-        proposal = generator.generate_proposal(
+        proposal = await generator.generate_proposal(
             request.template_id,
             request.analysis_days
         )
@@ -252,6 +265,44 @@ async def generate_proposal(
         raise HTTPException(status_code=500, detail=f"生成方案失败: {str(e)}")
 
 
+# ==================== 1.0 批量生成方案 ====================
+
+@router.post("/generate-batch", summary="批量并发生成节能方案")
+async def generate_proposals_batch(
+    request: ProposalBatchCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    一次读取数据快照，并发生成多个模板的方案，方案和措施在同一事务中写入
+
+    - **template_ids**: 模板ID列表 (默认全部 A1/A2/A3/A4/A5/B1)
+    - **analysis_days**: 分析天数 (1-365，默认30)
+
+    返回各模板生成的方案编号、耗时 (ms) 及失败原因
+    """
+    started = time.perf_counter()
+    try:
+        generator = TemplateGenerator(db)
+        results = await generator.generate_batch(request.template_ids, request.analysis_days)
+        await db.commit()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"批量生成方案失败: {str(e)}")
+
+    return {
+        "code": 0,
+        "message": "success",
+        "data": {
+            "generated": sum(1 for item in results if item["proposal"] is not None),
+            "failed": sum(1 for item in results if item["error"]),
+            "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            "templates": _batch_timings(results)
+        }
+    }
+
+
 # ==================== 1.1 ML 增强方案生成 (专利 S2) ====================
 
 @router.post("/generate-ml-enhanced", response_model=ProposalResponse, summary="ML增强方案生成")
@@ -12,6 +12,7 @@ from ..deps import get_db, require_viewer, require_operator
 from ...models.user import User
 from ...models.point import Point, PointRealtime
 from ...schemas.realtime import RealtimeData, RealtimeSummary, ControlCommand
+from ...services.log_pipeline import log_pipeline
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -562,9 +563,8 @@ async def send_control_command(
     if not point.is_enabled:
         raise HTTPException(status_code=400, detail="点位已禁用")
 
-    # 记录操作日志
-    from ...models.log import OperationLog
-    log = OperationLog(
+    # 记录操作日志 (后台批量写入)
+    log_pipeline.record_operation(
         user_id=current_user.id,
         username=current_user.username,
         module="realtime",
@@ -575,7 +575,6 @@ async def send_control_command(
         new_value=str(command.value),
         remark=command.remark
     )
-    db.add(log)
 
     # 更新实时值（模拟控制）
     await db.execute(
@@ -4,11 +4,10 @@
 from datetime import datetime, timedelta
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update, delete, and_
+from sqlalchemy import select, func, update, delete
 import os
-import io
 
 from ..deps import get_db, require_viewer, require_operator
 from ...models.user import User
@@ -18,6 +17,8 @@ from ...schemas.report import (
     ReportRecordInfo, ReportGenerate
 )
 from ...schemas.common import PageResponse
+from ...services.report_jobs import REPORT_FORMATS, artifact_path, report_jobs
+from ...services.report_snapshots import PERIOD_TYPES, compare_periods, get_period_report
 
 router = APIRouter()
 
@@ -117,11 +118,10 @@ async def generate_report(
 ):
     """
     生成报表
+
+    创建报表记录并提交后台生成，通过 GET /records/{record_id} 查询状态，完成后下载
     """
     import json
-    from ...models.point import Point
-    from ...models.history import PointHistory
-    from ...models.alarm import Alarm
 
     # 获取模板
     if data.template_id:
@@ -140,65 +140,6 @@ async def generate_report(
     start_time = data.start_time
     end_time = data.end_time
 
-    # 生成报表数据
-    report_data = {
-        "title": f"{report_type}报表",
-        "generated_at": datetime.now().isoformat(),
-        "period": {
-            "start": start_time.isoformat(),
-            "end": end_time.isoformat()
-        },
-        "summary": {},
-        "points": [],
-        "alarms": []
-    }
-
-    # 获取点位数据
-    for point_id in point_ids:
-        point_result = await db.execute(select(Point).where(Point.id == point_id))
-        point = point_result.scalar_one_or_none()
-        if not point:
-            continue
-
-        # 获取统计数据
-        stats_result = await db.execute(
-            select(
-                func.min(PointHistory.value),
-                func.max(PointHistory.value),
-                func.avg(PointHistory.value),
-                func.count(PointHistory.id)
-            ).where(
-                and_(
-                    PointHistory.point_id == point_id,
-                    PointHistory.recorded_at >= start_time,
-                    PointHistory.recorded_at <= end_time
-                )
-            )
-        )
-        stats = stats_result.first()
-
-        report_data["points"].append({
-            "code": point.point_code,
-            "name": point.point_name,
-            "unit": point.unit,
-            "min": stats[0],
-            "max": stats[1],
-            "avg": round(stats[2], 2) if stats[2] else None,
-            "count": stats[3]
-        })
-
-    # 获取告警统计
-    alarm_result = await db.execute(
-        select(Alarm.alarm_level, func.count(Alarm.id)).where(
-            and_(
-                Alarm.created_at >= start_time,
-                Alarm.created_at <= end_time
-            )
-        ).group_by(Alarm.alarm_level)
-    )
-    alarm_counts = {row[0]: row[1] for row in alarm_result.all()}
-    report_data["alarms"] = alarm_counts
-
     # 创建报表记录
     report_name = f"{report_type}_{start_time.strftime('%Y%m%d')}_{end_time.strftime('%Y%m%d')}"
     record = ReportRecord(
@@ -207,17 +148,19 @@ async def generate_report(
         report_type=report_type,
         start_time=start_time,
         end_time=end_time,
-        status="completed",
+        status="pending",
         generated_by=current_user.id
     )
     db.add(record)
     await db.commit()
     await db.refresh(record)
 
+    report_jobs.submit(record.id, point_ids)
+
     return {
         "record_id": record.id,
         "report_name": report_name,
-        "data": report_data
+        "status": record.status
     }
 
 
@@ -252,36 +195,49 @@ async def get_records(
     )
 
 
+@router.get("/records/{record_id}", response_model=ReportRecordInfo, summary="获取报表记录状态")
+async def get_record(
+    record_id: int,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    获取报表记录 (轮询生成状态)
+    """
+    record = await db.get(ReportRecord, record_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="报表记录不存在")
+    return ReportRecordInfo.model_validate(record)
+
+
 @router.get("/download/{record_id}", summary="下载报表")
 async def download_report(
     record_id: int,
-    format: str = Query("json", description="格式: json/csv"),
+    format: str = Query("json", description="格式: json/xlsx"),
     db: AsyncSession = Depends(get_db),
     _: User = Depends(require_viewer)
 ):
     """
-    下载报表文件
+    下载已生成的报表文件
     """
+    if format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的格式: {format}")
+
     result = await db.execute(select(ReportRecord).where(ReportRecord.id == record_id))
     record = result.scalar_one_or_none()
     if not record:
         raise HTTPException(status_code=404, detail="报表记录不存在")
+    if record.status != "completed":
+        raise HTTPException(status_code=409, detail=f"报表尚未生成完成，当前状态: {record.status}")
 
-    # 这里返回简单的JSON响应，实际可以根据file_path返回文件
-    import json
+    path = artifact_path(record, format)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="报表文件不存在，请重新生成")
 
-    content = json.dumps({
-        "report_name": record.report_name,
-        "report_type": record.report_type,
-        "start_time": record.start_time.isoformat() if record.start_time else None,
-        "end_time": record.end_time.isoformat() if record.end_time else None,
-        "status": record.status
-    }, ensure_ascii=False)
-
-    return StreamingResponse(
-        io.BytesIO(content.encode("utf-8")),
-        media_type="application/json",
-        headers={"Content-Disposition": f"attachment; filename={record.report_name}.json"}
+    return FileResponse(
+        path,
+        media_type=REPORT_FORMATS[format],
+        filename=f"{record.report_name}.{format}"
     )
 
 
@@ -292,69 +248,11 @@ async def get_daily_report(
     _: User = Depends(require_viewer)
 ):
     """
-    获取日报数据
+    获取日报数据 (已结束的日读取快照)
     """
     if not date:
         date = datetime.now() - timedelta(days=1)
-
-    start_time = date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_time = start_time + timedelta(days=1)
-
-    # 调用生成报表逻辑
-    from ...models.point import Point
-    from ...models.history import PointHistory
-    from ...models.alarm import Alarm
-
-    # 获取所有启用的点位
-    points_result = await db.execute(
-        select(Point).where(Point.is_enabled == True)
-    )
-    points = points_result.scalars().all()
-
-    point_stats = []
-    for point in points[:20]:  # 限制数量
-        stats_result = await db.execute(
-            select(
-                func.min(PointHistory.value),
-                func.max(PointHistory.value),
-                func.avg(PointHistory.value)
-            ).where(
-                and_(
-                    PointHistory.point_id == point.id,
-                    PointHistory.recorded_at >= start_time,
-                    PointHistory.recorded_at < end_time
-                )
-            )
-        )
-        stats = stats_result.first()
-        if stats[0] is not None:
-            point_stats.append({
-                "code": point.point_code,
-                "name": point.point_name,
-                "unit": point.unit,
-                "min": round(stats[0], 2) if stats[0] else None,
-                "max": round(stats[1], 2) if stats[1] else None,
-                "avg": round(stats[2], 2) if stats[2] else None
-            })
-
-    # 告警统计
-    alarm_result = await db.execute(
-        select(Alarm.alarm_level, func.count(Alarm.id)).where(
-            and_(
-                Alarm.created_at >= start_time,
-                Alarm.created_at < end_time
-            )
-        ).group_by(Alarm.alarm_level)
-    )
-    alarm_counts = {row[0]: row[1] for row in alarm_result.all()}
-
-    return {
-        "date": start_time.strftime("%Y-%m-%d"),
-        "title": f"{start_time.strftime('%Y-%m-%d')} 日报",
-        "points": point_stats,
-        "alarms": alarm_counts,
-        "alarm_total": sum(alarm_counts.values())
-    }
+    return await get_period_report(db, "daily", date)
 
 
 @router.get("/weekly", summary="获取周报数据")
@@ -364,87 +262,36 @@ async def get_weekly_report(
     _: User = Depends(require_viewer)
 ):
     """
-    获取周报数据
+    获取周报数据 (已结束的周读取快照，本周由日快照加当天实时统计组成)
     """
-    if not date:
-        date = datetime.now()
-
-    # 计算本周开始日期（周一）
-    start_of_week = date - timedelta(days=date.weekday())
-    start_time = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_time = start_time + timedelta(days=7)
-
-    from ...models.alarm import Alarm
-
-    # 按天统计告警
-    daily_alarms = []
-    for i in range(7):
-        day_start = start_time + timedelta(days=i)
-        day_end = day_start + timedelta(days=1)
-
-        count_result = await db.execute(
-            select(func.count(Alarm.id)).where(
-                and_(
-                    Alarm.created_at >= day_start,
-                    Alarm.created_at < day_end
-                )
-            )
-        )
-        count = count_result.scalar()
-        daily_alarms.append({
-            "date": day_start.strftime("%Y-%m-%d"),
-            "weekday": ["周一", "周二", "周三", "周四", "周五", "周六", "周日"][i],
-            "alarm_count": count
-        })
-
-    return {
-        "week_start": start_time.strftime("%Y-%m-%d"),
-        "week_end": (end_time - timedelta(days=1)).strftime("%Y-%m-%d"),
-        "title": f"{start_time.strftime('%Y-%m-%d')} ~ {(end_time - timedelta(days=1)).strftime('%Y-%m-%d')} 周报",
-        "daily_alarms": daily_alarms,
-        "total_alarms": sum(d["alarm_count"] for d in daily_alarms)
-    }
+    return await get_period_report(db, "weekly", date or datetime.now())
 
 
 @router.get("/monthly", summary="获取月报数据")
 async def get_monthly_report(
     year: Optional[int] = Query(None),
-    month: Optional[int] = Query(None),
+    month: Optional[int] = Query(None, ge=1, le=12),
     db: AsyncSession = Depends(get_db),
     _: User = Depends(require_viewer)
 ):
     """
-    获取月报数据
+    获取月报数据 (已结束的月读取快照，本月由日快照加当天实时统计组成)
     """
     now = datetime.now()
-    if not year:
-        year = now.year
-    if not month:
-        month = now.month
-
-    start_time = datetime(year, month, 1)
-    if month == 12:
-        end_time = datetime(year + 1, 1, 1)
-    else:
-        end_time = datetime(year, month + 1, 1)
-
-    from ...models.alarm import Alarm
-
-    # 按级别统计告警
-    alarm_result = await db.execute(
-        select(Alarm.alarm_level, func.count(Alarm.id)).where(
-            and_(
-                Alarm.created_at >= start_time,
-                Alarm.created_at < end_time
-            )
-        ).group_by(Alarm.alarm_level)
-    )
-    alarm_by_level = {row[0]: row[1] for row in alarm_result.all()}
+    return await get_period_report(db, "monthly", datetime(year or now.year, month or now.month, 1))
 
-    return {
-        "year": year,
-        "month": month,
-        "title": f"{year}年{month}月 月报",
-        "alarm_by_level": alarm_by_level,
-        "total_alarms": sum(alarm_by_level.values())
-    }
+
+@router.get("/compare", summary="周期报表对比")
+async def compare_reports(
+    period_type: str = Query("daily", description="周期类型: daily/weekly/monthly"),
+    date: Optional[datetime] = Query(None, description="截止周期内任意日期，默认当前"),
+    count: int = Query(7, ge=2, le=31, description="对比周期数"),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_viewer)
+):
+    """
+    连续多个周期的告警统计对比 (已结束的周期读取快照)
+    """
+    if period_type not in PERIOD_TYPES:
+        raise HTTPException(status_code=400, detail=f"不支持的周期类型: {period_type}")
+    return await compare_periods(db, period_type, date or datetime.now(), count)
@@ -38,11 +38,16 @@ class Settings(BaseSettings):
     # 数据采集配置
     collect_interval: int = 10  # 秒
     data_retention_days: int = 30
+    log_retention_days: int = 90     # 操作/系统/通讯日志保留天数
 
     # 模拟模式配置
     simulation_enabled: bool = True  # 是否启用模拟数据
     simulation_interval: int = 5     # 模拟数据生成间隔(秒)
 
+    # 报表配置
+    report_dir: str = "./reports"    # 报表文件保存目录
+    report_workers: int = 2          # 报表生成并发数
+
     # 授权配置
     license_key: str = "DEMO-0000-0000-0000"
     max_points: int = 100
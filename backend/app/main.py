@@ -17,6 +17,11 @@ from .models import User
 from .api.v1 import api_router
 from .services.websocket import ws_manager
 from .services.simulator import simulator
+from .services.tariff_compiler import reload_tariff
+from .services.optimization_service import optimization_service
+from .services.report_jobs import report_jobs
+from .services.report_snapshots import run_snapshot_scheduler
+from .services.log_pipeline import log_pipeline
 
 settings = get_settings()
 
@@ -150,8 +155,18 @@ async def lifespan(app: FastAPI):
     await init_default_data()
     await init_default_configs()
 
+    # 预编译当日分时电价
+    async with async_session() as session:
+        await reload_tariff(session)
+        # 上次运行未完成的报表任务标记为失败
+        await report_jobs.recover(session)
+
     # 启动数据模拟器（后台任务）
     simulator_task = asyncio.create_task(simulator.start(interval=5))
+    # 定期生成已结束周期的报表快照
+    snapshot_task = asyncio.create_task(run_snapshot_scheduler())
+    # 日志后台批量写入
+    log_task = asyncio.create_task(log_pipeline.run())
 
     print(f"{'='*50}")
     print(f"{settings.app_name} v{settings.app_version} 启动成功")
@@ -164,6 +179,11 @@ async def lifespan(app: FastAPI):
     # 停止模拟器
     simulator.stop()
     simulator_task.cancel()
+    snapshot_task.cancel()
+    await log_pipeline.stop()
+    log_task.cancel()
+    optimization_service.shutdown()
+    report_jobs.shutdown()
     print("应用关闭")
 
 
@@ -7,7 +7,7 @@ from .point import Point, PointRealtime, PointGroup, PointGroupMember
 from .alarm import AlarmThreshold, Alarm, AlarmRule, AlarmShield, AlarmDailyStats
 from .history import PointHistory, PointHistoryArchive, PointChangeLog
 from .log import OperationLog, SystemLog, CommunicationLog
-from .report import ReportTemplate, ReportRecord
+from .report import ReportTemplate, ReportRecord, ReportSnapshot
 from .config import SystemConfig, Dictionary, License
 from .energy import (
     PowerDevice, EnergyHourly, EnergyDaily, EnergyMonthly,
@@ -28,7 +28,8 @@ from .asset import (
 )
 from .capacity import (
     CapacityType, CapacityStatus, SpaceCapacity, PowerCapacity,
-    CoolingCapacity, WeightCapacity, CapacityPlan, CapacityHistory
+    CoolingCapacity, WeightCapacity, CapacityPlan, CapacityHistory,
+    CapacityPointBinding
 )
 from .operation import (
     WorkOrderStatus, WorkOrderType, WorkOrderPriority, InspectionStatus,
@@ -77,6 +78,7 @@ __all__ = [
     # 报表
     "ReportTemplate",
     "ReportRecord",
+    "ReportSnapshot",
     # 配置
     "SystemConfig",
     "Dictionary",
@@ -122,6 +124,7 @@ __all__ = [
     "WeightCapacity",
     "CapacityPlan",
     "CapacityHistory",
+    "CapacityPointBinding",
     # 运维管理
     "WorkOrderStatus",
     "WorkOrderType",
@@ -73,6 +73,8 @@ class Asset(Base):
     cabinet_id = Column(Integer, ForeignKey("cabinets.id"), comment="机柜ID")
     u_position = Column(Integer, comment="U位起始位置")
     u_height = Column(Integer, comment="占用U数")
+    rated_power = Column(Float, comment="额定功率 kW")
+    weight = Column(Float, comment="重量 kg")
 
     # 资产状态
     status = Column(Enum(AssetStatus), default=AssetStatus.in_stock, comment="资产状态")
@@ -117,6 +117,22 @@ class WeightCapacity(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
 
 
+# ==================== 容量遥测绑定模型 ====================
+
+class CapacityPointBinding(Base):
+    """容量节点与实时点位/用电设备的绑定表"""
+    __tablename__ = "capacity_point_bindings"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    capacity_type = Column(Enum(CapacityType), nullable=False, comment="容量类型: power/cooling")
+    capacity_id = Column(Integer, nullable=False, index=True, comment="容量记录ID")
+    metric = Column(String(20), nullable=False, default="load_kw", comment="指标: load_kw/temperature/humidity")
+    point_id = Column(Integer, ForeignKey("points.id"), comment="点位ID")
+    power_device_id = Column(Integer, ForeignKey("power_devices.id"), comment="用电设备ID(取其有功功率点位)")
+    scale = Column(Float, default=1.0, comment="换算系数")
+    created_at = Column(DateTime, default=datetime.now, comment="创建时间")
+
+
 # ==================== 容量规划模型 ====================
 
 class CapacityPlan(Base):
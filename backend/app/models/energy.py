@@ -3,7 +3,7 @@
 Enhanced with meter points, transformers, distribution panels for comprehensive energy analysis
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, Float, Text, DateTime, Date, ForeignKey, JSON, func, Numeric
+from sqlalchemy import Column, Integer, String, Boolean, Float, Text, DateTime, Date, ForeignKey, JSON, func, Numeric, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from ..core.database import Base
@@ -652,6 +652,95 @@ class Demand15MinData(Base):
     recorded_at = Column(DateTime, default=datetime.now, comment="记录时间")
 
 
+# ==================== 典型日负荷曲线物化 ====================
+
+class LoadProfileDay(Base):
+    """
+    日负荷曲线物化表 (每个计量点/设备每天一行, 96个15分钟时段)
+
+    计量点取 Demand15MinData.rolling_demand，设备取 EnergyHourly 小时功率。
+    """
+    __tablename__ = "load_profile_days"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    subject_type = Column(String(20), nullable=False, comment="对象类型: meter/device")
+    subject_id = Column(Integer, nullable=False, comment="计量点ID或设备ID")
+    profile_date = Column(Date, nullable=False, comment="日期")
+    day_type = Column(String(10), nullable=False, comment="日类型: weekday/weekend")
+    season = Column(String(10), nullable=False, comment="季节: spring/summer/autumn/winter")
+
+    # 96个时段的统计值 (JSON数组, 无数据为null)
+    slot_avg = Column(JSON, comment="时段平均值")
+    slot_max = Column(JSON, comment="时段最大值")
+    slot_min = Column(JSON, comment="时段最小值")
+    slot_count = Column(JSON, comment="时段采样数")
+
+    is_complete = Column(Boolean, default=False, comment="当日是否已结束且数据完整物化")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
+
+    __table_args__ = (
+        UniqueConstraint("subject_type", "subject_id", "profile_date", name="uq_load_profile_day"),
+        Index("idx_load_profile_day_type", "subject_type", "subject_id", "day_type", "season"),
+    )
+
+
+class TypicalDayProfile(Base):
+    """
+    典型日负荷曲线表 (按对象 × 日类型 × 季节, 96个时段的均值/最大/最小/P95)
+
+    day_type/season 为 all 时表示不区分。由已结束的 LoadProfileDay 汇总。
+    """
+    __tablename__ = "typical_day_profiles"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    subject_type = Column(String(20), nullable=False, comment="对象类型: meter/device")
+    subject_id = Column(Integer, nullable=False, comment="计量点ID或设备ID")
+    day_type = Column(String(10), nullable=False, comment="日类型: weekday/weekend/all")
+    season = Column(String(10), nullable=False, comment="季节: spring/summer/autumn/winter/all")
+
+    sample_days = Column(Integer, default=0, comment="样本天数")
+    mean_values = Column(JSON, comment="时段均值")
+    max_values = Column(JSON, comment="时段最大值")
+    min_values = Column(JSON, comment="时段最小值")
+    p95_values = Column(JSON, comment="时段95%分位数")
+
+    last_profile_date = Column(Date, comment="已汇总的最后日期")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
+
+    __table_args__ = (
+        UniqueConstraint("subject_type", "subject_id", "day_type", "season", name="uq_typical_day_profile"),
+    )
+
+
+# ==================== 负荷预测模型 ====================
+
+class LoadForecastModel(Base):
+    """
+    计量点负荷预测模型表 (每个计量点一行)
+
+    保存按时段拟合的回归系数和滚动回测误差，进程内缓存失效后可直接加载系数。
+    """
+    __tablename__ = "load_forecast_models"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    meter_point_id = Column(Integer, ForeignKey("meter_points.id"), nullable=False, unique=True, comment="计量点ID")
+    method = Column(String(20), default="regression", comment="方法: regression/similar_day")
+    features = Column(JSON, comment="特征名称列表")
+    coefficients = Column(JSON, comment="各时段回归系数 (96 × 特征数)")
+    trained_days = Column(Integer, default=0, comment="参与拟合的天数")
+    trained_until = Column(Date, comment="已拟合数据的最后日期")
+
+    # 滚动回测误差 (逐日先预测后更新)
+    backtest_days = Column(Integer, default=0, comment="回测天数")
+    mape = Column(Float, comment="平均绝对百分比误差 %")
+    mae = Column(Float, comment="平均绝对误差 kW")
+    rmse = Column(Float, comment="均方根误差 kW")
+    peak_error = Column(Float, comment="日最大负荷平均绝对百分比误差 %")
+    baseline_mape = Column(Float, comment="同类日基线的平均绝对百分比误差 %")
+
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
+
+
 # ==================== V2.4 新增: 节能方案模型 ====================
 
 class EnergySavingProposal(Base):
@@ -2,7 +2,7 @@
 日志模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 
 from ..core.database import Base
 
@@ -31,6 +31,12 @@ class OperationLog(Base):
     remark = Column(Text, comment="备注")
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
 
+    __table_args__ = (
+        Index("idx_operation_log_time", "created_at"),
+        Index("idx_operation_log_user_time", "user_id", "created_at"),
+        Index("idx_operation_log_module_time", "module", "created_at"),
+    )
+
 
 class SystemLog(Base):
     """系统日志表"""
@@ -44,6 +50,11 @@ class SystemLog(Base):
     stack_trace = Column(Text, comment="堆栈跟踪")
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
 
+    __table_args__ = (
+        Index("idx_system_log_time", "created_at"),
+        Index("idx_system_log_module_time", "module", "created_at"),
+    )
+
 
 class CommunicationLog(Base):
     """通讯日志表"""
@@ -59,3 +70,8 @@ class CommunicationLog(Base):
     error_message = Column(Text, comment="错误信息")
     duration_ms = Column(Integer, comment="耗时(毫秒)")
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
+
+    __table_args__ = (
+        Index("idx_communication_log_time", "created_at"),
+        Index("idx_communication_log_device_time", "device_id", "created_at"),
+    )
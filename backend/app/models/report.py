@@ -2,7 +2,7 @@
 报表模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, UniqueConstraint
 
 from ..core.database import Base
 
@@ -38,3 +38,19 @@ class ReportRecord(Base):
     error_message = Column(Text, comment="错误信息")
     generated_by = Column(Integer, ForeignKey("users.id"), comment="生成人")
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
+
+
+class ReportSnapshot(Base):
+    """周期报表快照表 (已结束周期的日报/周报/月报)"""
+    __tablename__ = "report_snapshots"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    period_type = Column(String(20), nullable=False, comment="周期类型: daily/weekly/monthly")
+    period_start = Column(DateTime, nullable=False, comment="周期开始时间")
+    period_end = Column(DateTime, nullable=False, comment="周期结束时间")
+    content = Column(Text, nullable=False, comment="报表内容(JSON)")
+    created_at = Column(DateTime, default=datetime.now, comment="创建时间")
+
+    __table_args__ = (
+        UniqueConstraint("period_type", "period_start", name="uq_report_snapshot_period"),
+    )
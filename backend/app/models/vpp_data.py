@@ -57,6 +57,7 @@ class LoadCurve(Base):
     is_workday = Column(Boolean, default=True, comment="是否工作日")
 
     created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
 
 
 class ElectricityPrice(Base):
@@ -71,6 +72,7 @@ class ElectricityPrice(Base):
     effective_date = Column(Date, comment="生效日期")
 
     created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
 
 
 class AdjustableLoad(Base):
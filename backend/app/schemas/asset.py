@@ -65,6 +65,8 @@ class AssetBase(BaseModel):
     cabinet_id: Optional[int] = Field(None, description="机柜ID")
     u_position: Optional[int] = Field(None, description="U位起始位置")
     u_height: Optional[int] = Field(None, description="占用U数")
+    rated_power: Optional[float] = Field(None, description="额定功率 kW")
+    weight: Optional[float] = Field(None, description="重量 kg")
     # 资产状态
     status: AssetStatus = Field(AssetStatus.in_stock, description="资产状态")
     # 采购信息
@@ -100,6 +102,8 @@ class AssetUpdate(BaseModel):
     cabinet_id: Optional[int] = Field(None, description="机柜ID")
     u_position: Optional[int] = Field(None, description="U位起始位置")
     u_height: Optional[int] = Field(None, description="占用U数")
+    rated_power: Optional[float] = Field(None, description="额定功率 kW")
+    weight: Optional[float] = Field(None, description="重量 kg")
     # 资产状态
     status: Optional[AssetStatus] = Field(None, description="资产状态")
     # 采购信息
@@ -245,6 +249,30 @@ class InventoryResponse(BaseModel):
         from_attributes = True
 
 
+class InventoryScan(BaseModel):
+    """扫码记录"""
+    code: str = Field(..., description="扫码编码(资产编码或序列号)")
+    location: Optional[str] = Field(None, description="实际位置")
+
+
+class InventoryScanRequest(BaseModel):
+    """批量扫码对账请求"""
+    scans: List[InventoryScan] = Field(..., min_length=1, max_length=50000, description="扫码记录")
+    check_time: Optional[datetime] = Field(None, description="盘点时间")
+
+
+class InventoryScanResult(BaseModel):
+    """批量扫码对账结果"""
+    scanned: int = Field(0, description="扫码数")
+    checked: int = Field(0, description="核对的盘点明细数")
+    matched: int = Field(0, description="位置一致数")
+    mismatched: int = Field(0, description="位置不符数")
+    duplicates: int = Field(0, description="重复扫码数")
+    not_in_inventory: List[str] = Field(default_factory=list, description="不在本次盘点范围内的资产编码")
+    unknown_codes: List[str] = Field(default_factory=list, description="未知编码")
+    inventory: InventoryResponse = Field(..., description="盘点任务")
+
+
 # ==================== 资产统计 Schemas ====================
 
 class AssetStatistics(BaseModel):
@@ -1,7 +1,7 @@
 """
 容量管理数据模型
 """
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Literal
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -224,6 +224,41 @@ class CapacityPlanResponse(CapacityPlanBase):
         from_attributes = True
 
 
+class CapacityPointBindingCreate(BaseModel):
+    """创建容量点位绑定"""
+    capacity_type: CapacityType = Field(..., description="容量类型: power/cooling")
+    capacity_id: int = Field(..., description="容量记录ID")
+    metric: Literal["load_kw", "temperature", "humidity"] = Field("load_kw", description="指标")
+    point_id: Optional[int] = Field(None, description="点位ID")
+    power_device_id: Optional[int] = Field(None, description="用电设备ID(取其有功功率点位)")
+    scale: float = Field(1.0, description="换算系数")
+
+
+class CapacityPointBindingResponse(CapacityPointBindingCreate):
+    """容量点位绑定响应"""
+    id: int = Field(..., description="ID")
+    created_at: Optional[datetime] = Field(None, description="创建时间")
+
+    class Config:
+        from_attributes = True
+
+
+class PlacementDevice(BaseModel):
+    """待放置设备"""
+    u_height: int = Field(0, ge=0, le=64, description="设备U数")
+    power_kw: float = Field(0, ge=0, description="功率(kW)")
+    cooling_kw: float = Field(0, ge=0, description="制冷需求(kW)")
+    weight_kg: float = Field(0, ge=0, description="重量(kg)")
+    count: int = Field(1, ge=1, le=10000, description="台数")
+    name: str = Field("", description="设备名称")
+
+
+class CapacityPlacementRequest(BaseModel):
+    """批量设备布局请求"""
+    devices: List[PlacementDevice] = Field(..., min_length=1, description="设备清单")
+    cabinet_ids: Optional[List[int]] = Field(None, description="限定机柜ID列表")
+
+
 # ==================== 容量统计 Schemas ====================
 
 class CapacityStatistics(BaseModel):
@@ -1583,6 +1583,13 @@ class SimulationResponse(BaseModel):
     recommendations: List[str] = []
 
 
+class CombinedSimulationRequest(BaseModel):
+    """组合模拟请求"""
+    scenarios: List[Dict] = Field(..., description="模拟场景列表 [{type, params}]")
+    draws: int = Field(10000, ge=100, le=200000, description="蒙特卡洛抽样次数")
+    seed: Optional[int] = Field(20240101, description="随机种子，相同种子结果可复现")
+
+
 class DeviceCapability(BaseModel):
     """设备能力"""
     device_id: int
@@ -57,6 +57,12 @@ class ProposalCreate(BaseModel):
     analysis_days: int = Field(30, description="分析天数", ge=1, le=365)
 
 
+class ProposalBatchCreate(BaseModel):
+    """批量生成方案请求模型"""
+    template_ids: Optional[List[str]] = Field(None, description="模板ID列表，默认全部 A1-A5/B1")
+    analysis_days: int = Field(30, description="分析天数", ge=1, le=365)
+
+
 class MeasureAcceptRequest(BaseModel):
     """接受方案请求模型"""
     selected_measure_ids: List[int] = Field(..., description="选中的措施ID列表")
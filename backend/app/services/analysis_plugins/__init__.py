@@ -14,7 +14,9 @@ from .base import (
     DeviceData,
     EnvironmentData
 )
+from .frames import PowerCurveFrame, EnergyFrame
 from .manager import PluginManager, plugin_manager
+from .scheduler import PluginScheduler, PluginRunStatus, PluginExecution, ScheduleReport
 from .registry import register_all_plugins
 
 # 具体插件
@@ -38,10 +40,18 @@ __all__ = [
     'BillData',
     'DeviceData',
     'EnvironmentData',
+    # 列式数据帧
+    'PowerCurveFrame',
+    'EnergyFrame',
     # 管理器
     'PluginManager',
     'plugin_manager',
     'register_all_plugins',
+    # 调度器
+    'PluginScheduler',
+    'PluginRunStatus',
+    'PluginExecution',
+    'ScheduleReport',
     # 插件
     'LoadShiftingPlugin',
     'DemandOptimizationPlugin',
@@ -10,9 +10,12 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 import logging
 
+if TYPE_CHECKING:
+    from .frames import PowerCurveFrame, EnergyFrame
+
 logger = logging.getLogger(__name__)
 
 
@@ -213,8 +216,12 @@ class AnalysisContext:
     meter_points: List[MeterPointData] = field(default_factory=list)
 
     # 功率曲线数据 (15分钟粒度)
+    # 大数据量时由加载器直接填充 power_curve_frame，此列表可为空
     power_curve_data: List[PowerCurvePoint] = field(default_factory=list)
 
+    # 功率曲线列式数据帧 (NumPy，按时间排序，带计量点/设备索引)
+    power_curve_frame: Optional['PowerCurveFrame'] = None
+
     # 需量历史数据 (按计量点)
     demand_history: Dict[int, List[DemandHistoryData]] = field(default_factory=dict)
 
@@ -250,6 +257,43 @@ class AnalysisContext:
     # 额外参数
     extra_params: Dict[str, Any] = field(default_factory=dict)
 
+    # 能耗列式数据帧缓存 (key: None 表示全站 energy_data，否则为 device_energy_data 的键)
+    _energy_frames: Dict[Optional[int], 'EnergyFrame'] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    # ==================== 列式数据帧 ====================
+
+    def get_power_curve_frame(self) -> 'PowerCurveFrame':
+        """
+        获取功率曲线数据帧
+
+        未直接提供 power_curve_frame 时由 power_curve_data 构建并缓存，
+        power_curve_data 长度变化时重建。
+        """
+        from .frames import PowerCurveFrame
+
+        frame = self.power_curve_frame
+        if frame is None or (frame.source_len is not None and frame.source_len != len(self.power_curve_data)):
+            frame = PowerCurveFrame.from_points(self.power_curve_data)
+            self.power_curve_frame = frame
+        return frame
+
+    def get_energy_frame(self, meter_point_id: Optional[int] = None) -> 'EnergyFrame':
+        """获取能耗数据帧 (按计量点，缺省为全站)"""
+        from .frames import EnergyFrame
+
+        if meter_point_id is not None and meter_point_id in self.device_energy_data:
+            key, records = meter_point_id, self.device_energy_data[meter_point_id]
+        else:
+            key, records = None, self.energy_data
+
+        frame = self._energy_frames.get(key)
+        if frame is None or frame.source_len != len(records):
+            frame = EnergyFrame.from_records(records)
+            self._energy_frames[key] = frame
+        return frame
+
     # ==================== 辅助方法 ====================
 
     def get_meter_point_by_id(self, meter_point_id: int) -> Optional[MeterPointData]:
@@ -279,41 +323,24 @@ class AnalysisContext:
         device_id: Optional[int] = None
     ) -> List[PowerCurvePoint]:
         """获取指定时间段的功率曲线"""
-        result = []
-        for point in self.power_curve_data:
-            if start_time <= point.timestamp <= end_time:
-                if meter_point_id is not None and point.meter_point_id != meter_point_id:
-                    continue
-                if device_id is not None and point.device_id != device_id:
-                    continue
-                result.append(point)
-        return result
+        frame = self.get_power_curve_frame()
+        positions = frame.select(start_time, end_time, meter_point_id, device_id)
+        return frame.to_points(positions)
+
+    def get_power_curve_slice(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        meter_point_id: Optional[int] = None,
+        device_id: Optional[int] = None
+    ) -> 'PowerCurveFrame':
+        """获取指定时间段的功率曲线子帧 (列式，不创建逐点对象)"""
+        frame = self.get_power_curve_frame()
+        return frame.take(frame.select(start_time, end_time, meter_point_id, device_id))
 
     def calculate_peak_valley_ratio(self, meter_point_id: Optional[int] = None) -> Dict[str, float]:
         """计算峰谷比例"""
-        if meter_point_id:
-            energy_list = self.device_energy_data.get(meter_point_id, self.energy_data)
-        else:
-            energy_list = self.energy_data
-
-        if not energy_list:
-            return {'peak': 0, 'flat': 0, 'valley': 0, 'sharp': 0}
-
-        total_peak = sum(e.peak_energy for e in energy_list)
-        total_flat = sum(e.flat_energy for e in energy_list)
-        total_valley = sum(e.valley_energy for e in energy_list)
-        total_sharp = sum(e.sharp_energy for e in energy_list)
-        total = total_peak + total_flat + total_valley + total_sharp
-
-        if total == 0:
-            return {'peak': 0, 'flat': 0, 'valley': 0, 'sharp': 0}
-
-        return {
-            'peak': total_peak / total,
-            'flat': total_flat / total,
-            'valley': total_valley / total,
-            'sharp': total_sharp / total
-        }
+        return self.get_energy_frame(meter_point_id).period_ratios()
 
 
 @dataclass
@@ -389,6 +416,18 @@ class PluginConfig:
     # 额外配置
     extra_config: Dict[str, Any] = field(default_factory=dict)
 
+    # 依赖的插件ID (这些插件成功后才执行本插件)
+    depends_on: List[str] = field(default_factory=list)
+
+    # 单次执行时限 (秒)，0 表示不限制
+    timeout_seconds: float = 30.0
+
+    # CPU 密集型插件在线程池中执行，避免阻塞事件循环
+    cpu_bound: bool = False
+
+    # 需要功率曲线 (power_curve_frame) 的插件声明此项，否则构建上下文时不加载功率曲线
+    needs_power_curve: bool = False
+
 
 class AnalysisPlugin(ABC):
     """
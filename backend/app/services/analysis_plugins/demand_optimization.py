@@ -64,6 +64,7 @@ class DemandOptimizationPlugin(AnalysisPlugin):
             name=self.plugin_name,
             enabled=True,
             execution_order=20,
+            cpu_bound=True,
             min_data_days=30,
             thresholds={
                 'low_utilization': 0.80,       # 低利用率阈值
@@ -0,0 +1,342 @@
+"""
+列式分析数据帧
+Columnar Analysis Frames
+
+以 NumPy 数组按字段存储功率曲线和能耗数据，替代大量 dataclass 对象列表
+Stores power curve and energy data as per-field NumPy arrays instead of lists of dataclasses
+
+- 数据按时间戳排序，时间范围查询使用二分查找 (np.searchsorted)
+- 按计量点/设备建立位置索引，按对象查询不再全表扫描
+- 汇总统计使用向量化归约
+"""
+
+from datetime import datetime, date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .base import EnergyData, PowerCurvePoint
+
+# 空ID占位 (meter_point_id / device_id 为 None)
+NULL_ID = -1
+
+# 时段编码
+TIME_PERIODS: Tuple[str, ...] = ('sharp', 'peak', 'flat', 'valley', 'deep_valley')
+_PERIOD_CODES = {name: code for code, name in enumerate(TIME_PERIODS)}
+_UNKNOWN_PERIOD = -1
+
+
+def _to_datetime64(values: Iterable, unit: str) -> np.ndarray:
+    return np.array(list(values), dtype=f'datetime64[{unit}]')
+
+
+def _encode_ids(values: Iterable[Optional[int]]) -> np.ndarray:
+    return np.fromiter((NULL_ID if v is None else v for v in values), dtype=np.int64)
+
+
+def _encode_periods(values: Iterable[Optional[str]]) -> np.ndarray:
+    return np.fromiter((_PERIOD_CODES.get(v, _UNKNOWN_PERIOD) for v in values), dtype=np.int8)
+
+
+class PowerCurveFrame:
+    """
+    功率曲线列式数据帧 (15分钟粒度)
+
+    每个字段一个 NumPy 数组，按时间戳升序排列。
+    单行约 50 字节，而一个 PowerCurvePoint 对象约 500 字节以上。
+    """
+
+    FLOAT_FIELDS = ('active_power', 'reactive_power', 'power_factor', 'demand_15min')
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        meter_point_ids: np.ndarray,
+        device_ids: np.ndarray,
+        active_power: np.ndarray,
+        reactive_power: np.ndarray,
+        power_factor: np.ndarray,
+        demand_15min: np.ndarray,
+        time_periods: np.ndarray,
+        presorted: bool = False
+    ):
+        timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+        columns = {
+            'meter_point_ids': np.asarray(meter_point_ids, dtype=np.int64),
+            'device_ids': np.asarray(device_ids, dtype=np.int64),
+            'active_power': np.asarray(active_power, dtype=np.float64),
+            'reactive_power': np.asarray(reactive_power, dtype=np.float64),
+            'power_factor': np.asarray(power_factor, dtype=np.float64),
+            'demand_15min': np.asarray(demand_15min, dtype=np.float64),
+            'time_periods': np.asarray(time_periods, dtype=np.int8),
+        }
+
+        if not presorted and len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps = timestamps[order]
+            columns = {name: col[order] for name, col in columns.items()}
+
+        self.timestamps = timestamps
+        self.meter_point_ids = columns['meter_point_ids']
+        self.device_ids = columns['device_ids']
+        self.active_power = columns['active_power']
+        self.reactive_power = columns['reactive_power']
+        self.power_factor = columns['power_factor']
+        self.demand_15min = columns['demand_15min']
+        self.time_periods = columns['time_periods']
+
+        # 对象位置索引 (延迟构建): id -> (行号数组, 对应时间戳数组)
+        self._meter_index: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]] = None
+        self._device_index: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]] = None
+
+        # 构建来源列表长度，用于判断 AnalysisContext 中的列表是否变更
+        self.source_len: Optional[int] = None
+
+    # ==================== 构建 ====================
+
+    @classmethod
+    def empty(cls) -> 'PowerCurveFrame':
+        return cls.from_rows([])
+
+    @classmethod
+    def from_points(cls, points: Sequence[PowerCurvePoint]) -> 'PowerCurveFrame':
+        """从 PowerCurvePoint 列表构建"""
+        frame = cls(
+            timestamps=_to_datetime64((p.timestamp for p in points), 's'),
+            meter_point_ids=_encode_ids(p.meter_point_id for p in points),
+            device_ids=_encode_ids(p.device_id for p in points),
+            active_power=np.fromiter((p.active_power or 0 for p in points), dtype=np.float64),
+            reactive_power=np.fromiter((p.reactive_power or 0 for p in points), dtype=np.float64),
+            power_factor=np.fromiter((p.power_factor or 0 for p in points), dtype=np.float64),
+            demand_15min=np.fromiter((p.demand_15min or 0 for p in points), dtype=np.float64),
+            time_periods=_encode_periods(p.time_period for p in points)
+        )
+        frame.source_len = len(points)
+        return frame
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence]) -> 'PowerCurveFrame':
+        """
+        从查询结果行构建
+
+        行格式: (timestamp, meter_point_id, device_id, active_power,
+                 reactive_power, power_factor, demand_15min, time_period)
+        """
+        if not rows:
+            columns = [[] for _ in range(8)]
+        else:
+            columns = list(zip(*rows))
+        return cls(
+            timestamps=_to_datetime64(columns[0], 's'),
+            meter_point_ids=_encode_ids(columns[1]),
+            device_ids=_encode_ids(columns[2]),
+            active_power=np.array([v or 0 for v in columns[3]], dtype=np.float64),
+            reactive_power=np.array([v or 0 for v in columns[4]], dtype=np.float64),
+            power_factor=np.array([v or 0 for v in columns[5]], dtype=np.float64),
+            demand_15min=np.array([v or 0 for v in columns[6]], dtype=np.float64),
+            time_periods=_encode_periods(columns[7])
+        )
+
+    # ==================== 基本属性 ====================
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self) -> int:
+        """数据占用字节数"""
+        return sum(col.nbytes for col in (
+            self.timestamps, self.meter_point_ids, self.device_ids, self.active_power,
+            self.reactive_power, self.power_factor, self.demand_15min, self.time_periods
+        ))
+
+    # ==================== 索引与查询 ====================
+
+    @staticmethod
+    def _build_index(ids: np.ndarray, timestamps: np.ndarray) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        # 稳定排序保证同一ID内的行号仍按时间升序
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        boundaries = np.flatnonzero(np.diff(sorted_ids)) + 1
+        index = {}
+        for positions in np.split(order, boundaries):
+            if len(positions):
+                index[int(ids[positions[0]])] = (positions, timestamps[positions])
+        return index
+
+    def _index_for(self, kind: str) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        if kind == 'meter':
+            if self._meter_index is None:
+                self._meter_index = self._build_index(self.meter_point_ids, self.timestamps)
+            return self._meter_index
+        if self._device_index is None:
+            self._device_index = self._build_index(self.device_ids, self.timestamps)
+        return self._device_index
+
+    @staticmethod
+    def _time_bounds(
+        timestamps: np.ndarray,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime]
+    ) -> Tuple[int, int]:
+        lo = 0 if start_time is None else int(np.searchsorted(
+            timestamps, np.datetime64(start_time, 's'), side='left'))
+        hi = len(timestamps) if end_time is None else int(np.searchsorted(
+            timestamps, np.datetime64(end_time, 's'), side='right'))
+        return lo, max(lo, hi)
+
+    def select(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        meter_point_id: Optional[int] = None,
+        device_id: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        查询满足条件的行号 (升序)
+
+        时间范围为闭区间 [start_time, end_time]，与原列表扫描语义一致。
+        """
+        if meter_point_id is None and device_id is None:
+            lo, hi = self._time_bounds(self.timestamps, start_time, end_time)
+            return np.arange(lo, hi)
+
+        # 优先使用计量点索引，再按设备过滤
+        if meter_point_id is not None:
+            positions, stamps = self._index_for('meter').get(
+                meter_point_id, (np.empty(0, dtype=np.int64), self.timestamps[:0]))
+        else:
+            positions, stamps = self._index_for('device').get(
+                device_id, (np.empty(0, dtype=np.int64), self.timestamps[:0]))
+
+        lo, hi = self._time_bounds(stamps, start_time, end_time)
+        positions = positions[lo:hi]
+
+        if meter_point_id is not None and device_id is not None:
+            positions = positions[self.device_ids[positions] == device_id]
+        return positions
+
+    def take(self, positions: np.ndarray) -> 'PowerCurveFrame':
+        """按行号取子帧"""
+        return PowerCurveFrame(
+            timestamps=self.timestamps[positions],
+            meter_point_ids=self.meter_point_ids[positions],
+            device_ids=self.device_ids[positions],
+            active_power=self.active_power[positions],
+            reactive_power=self.reactive_power[positions],
+            power_factor=self.power_factor[positions],
+            demand_15min=self.demand_15min[positions],
+            time_periods=self.time_periods[positions],
+            presorted=True
+        )
+
+    def to_points(self, positions: Optional[np.ndarray] = None) -> List[PowerCurvePoint]:
+        """物化为 PowerCurvePoint 列表 (兼容旧接口，仅用于小结果集)"""
+        if positions is None:
+            positions = np.arange(len(self))
+        timestamps = self.timestamps[positions].astype(datetime)
+        meter_ids = self.meter_point_ids[positions].tolist()
+        device_ids = self.device_ids[positions].tolist()
+        active = self.active_power[positions].tolist()
+        reactive = self.reactive_power[positions].tolist()
+        pf = self.power_factor[positions].tolist()
+        demand = self.demand_15min[positions].tolist()
+        periods = self.time_periods[positions].tolist()
+        return [
+            PowerCurvePoint(
+                timestamp=timestamps[i],
+                meter_point_id=None if meter_ids[i] == NULL_ID else meter_ids[i],
+                device_id=None if device_ids[i] == NULL_ID else device_ids[i],
+                active_power=active[i],
+                reactive_power=reactive[i],
+                power_factor=pf[i],
+                demand_15min=demand[i],
+                time_period=TIME_PERIODS[periods[i]] if periods[i] >= 0 else ''
+            )
+            for i in range(len(positions))
+        ]
+
+    # ==================== 向量化统计 ====================
+
+    def energy_by_period(self, positions: Optional[np.ndarray] = None, interval_hours: float = 0.25) -> Dict[str, float]:
+        """按时段汇总电量 kWh (有功功率 × 采样间隔)"""
+        active = self.active_power if positions is None else self.active_power[positions]
+        periods = self.time_periods if positions is None else self.time_periods[positions]
+        valid = periods >= 0
+        sums = np.bincount(periods[valid], weights=active[valid], minlength=len(TIME_PERIODS))
+        return {name: float(sums[code] * interval_hours) for code, name in enumerate(TIME_PERIODS)}
+
+    def max_demand(self, positions: Optional[np.ndarray] = None) -> float:
+        """最大15分钟需量 kW"""
+        demand = self.demand_15min if positions is None else self.demand_15min[positions]
+        return float(demand.max()) if len(demand) else 0.0
+
+
+class EnergyFrame:
+    """
+    日能耗列式数据帧
+
+    每个字段一个 NumPy 数组，按日期升序排列。
+    """
+
+    FIELDS = (
+        'total_energy', 'peak_energy', 'valley_energy', 'flat_energy', 'sharp_energy',
+        'peak_cost', 'valley_cost', 'flat_cost', 'total_cost'
+    )
+
+    def __init__(self, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        dates = np.asarray(dates, dtype='datetime64[s]')
+        columns = {name: np.asarray(columns.get(name, np.zeros(len(dates))), dtype=np.float64)
+                   for name in self.FIELDS}
+        if len(dates) > 1 and np.any(dates[1:] < dates[:-1]):
+            order = np.argsort(dates, kind='stable')
+            dates = dates[order]
+            columns = {name: col[order] for name, col in columns.items()}
+        self.dates = dates
+        self.columns = columns
+        self.source_len: Optional[int] = None
+
+    @classmethod
+    def from_records(cls, records: Sequence[EnergyData]) -> 'EnergyFrame':
+        """从 EnergyData 列表构建"""
+        frame = cls(
+            dates=_to_datetime64((r.date for r in records), 's'),
+            columns={
+                name: np.fromiter((getattr(r, name) or 0 for r in records), dtype=np.float64)
+                for name in cls.FIELDS
+            }
+        )
+        frame.source_len = len(records)
+        return frame
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def select(self, start: Optional[date] = None, end: Optional[date] = None) -> 'EnergyFrame':
+        """按日期闭区间取子帧"""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, 's'), side='left'))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(end, 's'), side='right'))
+        return EnergyFrame(self.dates[lo:hi], {name: col[lo:hi] for name, col in self.columns.items()})
+
+    def totals(self) -> Dict[str, float]:
+        """各字段合计"""
+        return {name: float(col.sum()) for name, col in self.columns.items()}
+
+    def period_ratios(self) -> Dict[str, float]:
+        """峰/平/谷/尖峰电量占比"""
+        totals = self.totals()
+        total = totals['peak_energy'] + totals['flat_energy'] + totals['valley_energy'] + totals['sharp_energy']
+        if total == 0:
+            return {'peak': 0, 'flat': 0, 'valley': 0, 'sharp': 0}
+        return {
+            'peak': totals['peak_energy'] / total,
+            'flat': totals['flat_energy'] / total,
+            'valley': totals['valley_energy'] / total,
+            'sharp': totals['sharp_energy'] / total
+        }
@@ -61,6 +61,7 @@ class LoadShiftingPlugin(AnalysisPlugin):
             name=self.plugin_name,
             enabled=True,
             execution_order=10,
+            cpu_bound=True,
             min_data_days=7,
             thresholds={
                 'peak_ratio_threshold': 0.35,  # 峰时占比阈值
@@ -99,10 +100,11 @@ class LoadShiftingPlugin(AnalysisPlugin):
         results = []
 
         # 计算平均峰时占比
-        total_energy = sum(d.total_energy for d in context.energy_data)
-        total_peak = sum(d.peak_energy for d in context.energy_data)
-        total_valley = sum(d.valley_energy for d in context.energy_data)
-        total_sharp = sum(d.sharp_energy for d in context.energy_data)
+        totals = context.get_energy_frame().totals()
+        total_energy = totals['total_energy']
+        total_peak = totals['peak_energy']
+        total_valley = totals['valley_energy']
+        total_sharp = totals['sharp_energy']
 
         if total_energy == 0:
             return results
@@ -423,12 +425,13 @@ class LoadShiftingPlugin(AnalysisPlugin):
                 continue
 
             # 计算峰谷比例
-            total_energy = sum(e.total_energy for e in mp_energy)
+            mp_totals = context.get_energy_frame(mp_id).totals()
+            total_energy = mp_totals['total_energy']
             if total_energy == 0:
                 continue
 
-            peak_energy = sum(e.peak_energy + e.sharp_energy for e in mp_energy)
-            valley_energy = sum(e.valley_energy for e in mp_energy)
+            peak_energy = mp_totals['peak_energy'] + mp_totals['sharp_energy']
+            valley_energy = mp_totals['valley_energy']
 
             peak_ratio = peak_energy / total_energy
             valley_ratio = valley_energy / total_energy
@@ -24,13 +24,16 @@ from .base import (
     DeviceData,
     EnvironmentData
 )
+from .frames import PowerCurveFrame
+from .scheduler import PluginScheduler, ScheduleReport
 from app.models.energy import (
     PowerDevice,
     EnergyDaily,
     EnergyMonthly,
     ElectricityPricing,
     EnergySuggestion,
-    PUEHistory
+    PUEHistory,
+    PowerCurveData
 )
 from app.models.point import Point, PointRealtime
 
@@ -51,6 +54,8 @@ class PluginManager:
     _instance: Optional['PluginManager'] = None
     _plugins: Dict[str, AnalysisPlugin] = {}
     _plugin_classes: Dict[str, Type[AnalysisPlugin]] = {}
+    _scheduler: PluginScheduler
+    _last_report: Optional[ScheduleReport] = None
 
     def __new__(cls):
         """单例模式"""
@@ -58,6 +63,8 @@ class PluginManager:
             cls._instance = super().__new__(cls)
             cls._instance._plugins = {}
             cls._instance._plugin_classes = {}
+            cls._instance._scheduler = PluginScheduler()
+            cls._instance._last_report = None
         return cls._instance
 
     @classmethod
@@ -172,7 +179,8 @@ class PluginManager:
     async def build_context(
         self,
         db: AsyncSession,
-        days: int = 30
+        days: int = 30,
+        load_power_curve: bool = False
     ) -> AnalysisContext:
         """
         构建分析上下文
@@ -180,6 +188,7 @@ class PluginManager:
         Args:
             db: 数据库会话
             days: 分析数据天数
+            load_power_curve: 是否加载功率曲线 (仅在有插件声明 needs_power_curve 时加载)
 
         Returns:
             分析上下文
@@ -210,11 +219,16 @@ class PluginManager:
         # 6. 加载电价配置
         context.pricing_config = await self._load_pricing_config(db)
 
+        # 7. 加载功率曲线 (列式)
+        if load_power_curve:
+            context.power_curve_frame = await self._load_power_curve_frame(db, start_date, now)
+
         logger.info(
             f"构建分析上下文完成: "
             f"能耗数据 {len(context.energy_data)} 条, "
             f"功率数据 {len(context.power_data)} 条, "
-            f"设备数据 {len(context.device_data)} 条"
+            f"设备数据 {len(context.device_data)} 条, "
+            f"功率曲线 {len(context.power_curve_frame) if context.power_curve_frame is not None else 0} 点"
         )
 
         return context
@@ -632,6 +646,40 @@ class PluginManager:
 
         return environment_data
 
+    async def _load_power_curve_frame(
+        self,
+        db: AsyncSession,
+        start_date: datetime,
+        end_date: datetime
+    ) -> PowerCurveFrame:
+        """
+        加载功率曲线数据
+
+        只查询所需列并直接构建列式数据帧，不创建 ORM 对象和逐点 dataclass。
+        """
+        try:
+            result = await db.execute(
+                select(
+                    PowerCurveData.timestamp,
+                    PowerCurveData.meter_point_id,
+                    PowerCurveData.device_id,
+                    PowerCurveData.active_power,
+                    PowerCurveData.reactive_power,
+                    PowerCurveData.power_factor,
+                    PowerCurveData.demand_15min,
+                    PowerCurveData.time_period
+                ).where(
+                    and_(
+                        PowerCurveData.timestamp >= start_date,
+                        PowerCurveData.timestamp <= end_date
+                    )
+                ).order_by(PowerCurveData.timestamp)
+            )
+            return PowerCurveFrame.from_rows(result.all())
+        except Exception as e:
+            logger.error(f"加载功率曲线数据失败: {e}")
+            return PowerCurveFrame.empty()
+
     async def _load_pricing_config(self, db: AsyncSession) -> Dict[str, float]:
         """加载电价配置"""
         pricing_config = {
@@ -666,23 +714,51 @@ class PluginManager:
         db: AsyncSession,
         plugin_ids: Optional[List[str]] = None,
         days: int = 30,
-        save_results: bool = True
+        save_results: bool = True,
+        total_timeout: Optional[float] = None
     ) -> List[SuggestionResult]:
         """
         执行分析
 
+        相互独立的插件并发执行，单个插件超时或失败时返回其余插件的结果，
+        各插件状态与耗时可通过 last_report 获取。
+
         Args:
             db: 数据库会话
             plugin_ids: 要执行的插件ID列表，为None则执行所有启用的插件
             days: 分析数据天数
             save_results: 是否保存结果到数据库
+            total_timeout: 整体执行时限 (秒)
 
         Returns:
             所有建议结果
         """
-        # 构建分析上下文
-        context = await self.build_context(db, days)
+        report = await self.run_analysis_with_report(
+            db, plugin_ids, days, save_results, total_timeout
+        )
+        return report.results
 
+    async def run_analysis_with_report(
+        self,
+        db: AsyncSession,
+        plugin_ids: Optional[List[str]] = None,
+        days: int = 30,
+        save_results: bool = True,
+        total_timeout: Optional[float] = None
+    ) -> ScheduleReport:
+        """
+        执行分析并返回调度报告 (含各插件状态与耗时)
+
+        Args:
+            db: 数据库会话
+            plugin_ids: 要执行的插件ID列表，为None则执行所有启用的插件
+            days: 分析数据天数
+            save_results: 是否保存结果到数据库
+            total_timeout: 整体执行时限 (秒)
+
+        Returns:
+            ScheduleReport
+        """
         # 确定要执行的插件
         if plugin_ids:
             plugins = [self._plugins[pid] for pid in plugin_ids if pid in self._plugins]
@@ -692,32 +768,31 @@ class PluginManager:
         # 按执行顺序排序
         plugins.sort(key=lambda p: p.config.execution_order)
 
-        all_results: List[SuggestionResult] = []
-
-        # 执行每个插件
-        for plugin in plugins:
-            try:
-                logger.info(f"执行插件: {plugin.plugin_id} ({plugin.plugin_name})")
-
-                # 验证上下文
-                if not plugin.validate_context(context):
-                    logger.warning(f"插件 {plugin.plugin_id} 上下文验证失败，跳过")
-                    continue
+        # 构建分析上下文
+        context = await self.build_context(
+            db, days, load_power_curve=any(p.config.needs_power_curve for p in plugins)
+        )
 
-                # 执行分析
-                results = await plugin.analyze(context)
-                all_results.extend(results)
+        report = await self._scheduler.run(plugins, context, total_timeout=total_timeout)
+        self._last_report = report
 
-                logger.info(f"插件 {plugin.plugin_id} 生成 {len(results)} 条建议")
+        logger.info(
+            f"分析完成: {len(plugins)} 个插件, 耗时 {report.total_elapsed_ms:.0f}ms, "
+            f"{'全部成功' if report.is_complete else '部分结果'}"
+        )
 
-            except Exception as e:
-                logger.error(f"插件 {plugin.plugin_id} 执行失败: {e}", exc_info=True)
+        all_results = report.results
 
         # 保存结果
         if save_results and all_results:
             await self._save_suggestions(db, all_results)
 
-        return all_results
+        return report
+
+    @property
+    def last_report(self) -> Optional[ScheduleReport]:
+        """最近一次分析的调度报告"""
+        return self._last_report
 
     async def run_single_plugin(
         self,
@@ -781,7 +856,11 @@ class PluginManager:
                 'description': p.plugin_description,
                 'suggestion_type': p.suggestion_type.value,
                 'enabled': p.config.enabled,
-                'execution_order': p.config.execution_order
+                'execution_order': p.config.execution_order,
+                'depends_on': p.config.depends_on,
+                'timeout_seconds': p.config.timeout_seconds,
+                'cpu_bound': p.config.cpu_bound,
+                'needs_power_curve': p.config.needs_power_curve
             }
             for p in self._plugins.values()
         ]
@@ -51,6 +51,7 @@ class PeakValleyOptimizationPlugin(AnalysisPlugin):
             name=self.plugin_name,
             enabled=True,
             execution_order=40,
+            cpu_bound=True,
             min_data_days=30,
             thresholds={
                 'ideal_peak_ratio': 0.30,       # 理想峰时占比
@@ -69,11 +70,12 @@ class PeakValleyOptimizationPlugin(AnalysisPlugin):
             return results
 
         # 计算平均能耗分布
-        total_energy = sum(d.total_energy for d in context.energy_data)
-        total_peak = sum(d.peak_energy for d in context.energy_data)
-        total_valley = sum(d.valley_energy for d in context.energy_data)
-        total_flat = sum(d.flat_energy for d in context.energy_data)
-        total_cost = sum(d.total_cost for d in context.energy_data)
+        totals = context.get_energy_frame().totals()
+        total_energy = totals['total_energy']
+        total_peak = totals['peak_energy']
+        total_valley = totals['valley_energy']
+        total_flat = totals['flat_energy']
+        total_cost = totals['total_cost']
 
         days = len(context.energy_data)
         if days == 0 or total_energy == 0:
@@ -100,7 +100,7 @@ class PowerFactorPlugin(AnalysisPlugin):
 
             # 计算电费影响
             # 假设月均电费 30000 元
-            monthly_bill = sum(d.total_cost for d in context.energy_data) / len(context.energy_data) * 30 if context.energy_data else 30000
+            monthly_bill = context.get_energy_frame().totals()['total_cost'] / len(context.energy_data) * 30 if context.energy_data else 30000
 
             if avg_pf < penalty_threshold:
                 # 计算罚款
@@ -0,0 +1,318 @@
+"""
+插件调度器
+Plugin Scheduler
+
+根据插件依赖关系构建执行图，并发执行相互独立的插件
+Builds a dependency graph of plugins and runs independent plugins concurrently
+
+- 依赖关系来自 PluginConfig.depends_on，execution_order 决定同批次的启动顺序
+- CPU 密集型插件 (PluginConfig.cpu_bound) 在线程池中执行，不阻塞事件循环
+- 每个插件受 PluginConfig.timeout_seconds 限制，整体受 total_timeout 限制
+- 超时/失败的插件不影响其他插件，返回部分结果及各插件耗时
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from .base import AnalysisPlugin, AnalysisContext, SuggestionResult
+
+logger = logging.getLogger(__name__)
+
+
+class PluginRunStatus(Enum):
+    """插件执行状态"""
+    SUCCESS = "success"          # 执行成功
+    SKIPPED = "skipped"          # 上下文验证失败或依赖未成功
+    TIMEOUT = "timeout"          # 超过单插件时限
+    FAILED = "failed"            # 执行异常
+    CANCELLED = "cancelled"      # 超过整体时限被取消
+
+
+@dataclass
+class PluginExecution:
+    """单个插件的执行记录"""
+    plugin_id: str
+    plugin_name: str
+    execution_order: int
+    status: PluginRunStatus = PluginRunStatus.SKIPPED
+    results: List[SuggestionResult] = field(default_factory=list)
+    started_at: Optional[datetime] = None
+    elapsed_ms: float = 0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'plugin_id': self.plugin_id,
+            'plugin_name': self.plugin_name,
+            'status': self.status.value,
+            'suggestion_count': len(self.results),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+            'error': self.error
+        }
+
+
+@dataclass
+class ScheduleReport:
+    """一次调度的执行报告"""
+    executions: Dict[str, PluginExecution] = field(default_factory=dict)
+    total_elapsed_ms: float = 0
+
+    @property
+    def results(self) -> List[SuggestionResult]:
+        """按执行顺序汇总所有成功插件的建议"""
+        ordered = sorted(self.executions.values(), key=lambda e: (e.execution_order, e.plugin_id))
+        all_results: List[SuggestionResult] = []
+        for execution in ordered:
+            all_results.extend(execution.results)
+        return all_results
+
+    @property
+    def is_complete(self) -> bool:
+        """是否所有插件均执行成功"""
+        return all(e.status == PluginRunStatus.SUCCESS for e in self.executions.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.executions.values(), key=lambda e: (e.execution_order, e.plugin_id))
+        return {
+            'total_elapsed_ms': round(self.total_elapsed_ms, 2),
+            'complete': self.is_complete,
+            'plugins': [e.to_dict() for e in ordered]
+        }
+
+
+def _run_plugin_sync(plugin: AnalysisPlugin, context: AnalysisContext) -> List[SuggestionResult]:
+    """在工作线程中以独立事件循环执行插件"""
+    return asyncio.run(plugin.analyze(context))
+
+
+class PluginScheduler:
+    """
+    插件调度器
+
+    用法:
+        scheduler = PluginScheduler(max_workers=4)
+        report = await scheduler.run(plugins, context)
+        report.results        # 部分或全部建议
+        report.to_dict()      # 各插件状态与耗时
+    """
+
+    def __init__(self, max_workers: int = 4, total_timeout: Optional[float] = None):
+        """
+        Args:
+            max_workers: CPU 密集型插件线程池大小
+            total_timeout: 整体执行时限 (秒)，None 表示不限制
+        """
+        self.max_workers = max_workers
+        self.total_timeout = total_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="analysis-plugin"
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def build_graph(plugins: List[AnalysisPlugin]) -> Dict[str, List[str]]:
+        """
+        构建依赖图
+
+        只保留本次参与调度的插件之间的依赖，依赖未被选中的插件视为已满足。
+
+        Returns:
+            plugin_id -> 依赖的 plugin_id 列表
+
+        Raises:
+            ValueError: 存在循环依赖
+        """
+        selected = {p.plugin_id for p in plugins}
+        graph = {
+            p.plugin_id: [dep for dep in p.config.depends_on if dep in selected and dep != p.plugin_id]
+            for p in plugins
+        }
+
+        # Kahn 算法检测环
+        indegree = {pid: len(deps) for pid, deps in graph.items()}
+        dependents: Dict[str, List[str]] = {pid: [] for pid in graph}
+        for pid, deps in graph.items():
+            for dep in deps:
+                dependents[dep].append(pid)
+
+        ready = [pid for pid, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            pid = ready.pop()
+            visited += 1
+            for child in dependents[pid]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+
+        if visited != len(graph):
+            cyclic = sorted(pid for pid, degree in indegree.items() if degree > 0)
+            raise ValueError(f"插件存在循环依赖: {', '.join(cyclic)}")
+
+        return graph
+
+    async def run(
+        self,
+        plugins: List[AnalysisPlugin],
+        context: AnalysisContext,
+        total_timeout: Optional[float] = None
+    ) -> ScheduleReport:
+        """
+        调度执行插件
+
+        依赖全部成功的插件立即启动；任一依赖未成功则跳过。
+        成功插件的结果写入 context.extra_params['plugin_results'] 供下游插件使用。
+
+        Args:
+            plugins: 要执行的插件
+            context: 分析上下文
+            total_timeout: 整体时限 (秒)，覆盖构造参数
+
+        Returns:
+            ScheduleReport
+        """
+        graph = self.build_graph(plugins)
+        by_id = {p.plugin_id: p for p in plugins}
+        report = ScheduleReport(executions={
+            p.plugin_id: PluginExecution(
+                plugin_id=p.plugin_id,
+                plugin_name=p.plugin_name,
+                execution_order=p.config.execution_order
+            )
+            for p in plugins
+        })
+        plugin_results = context.extra_params.setdefault('plugin_results', {})
+
+        timeout = total_timeout if total_timeout is not None else self.total_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        run_started = time.perf_counter()
+
+        pending = dict(graph)
+        running: Dict[asyncio.Task, str] = {}
+
+        def finished(pid: str) -> bool:
+            return pid not in pending and pid not in running.values()
+
+        def start_ready() -> None:
+            # 跳过的插件会立即结束，可能使其下游也变为就绪，因此循环直到没有新进展
+            progressed = True
+            while progressed:
+                progressed = False
+                ready = [pid for pid, deps in pending.items() if all(finished(d) for d in deps)]
+                ready.sort(key=lambda pid: (by_id[pid].config.execution_order, pid))
+                for pid in ready:
+                    deps = pending.pop(pid)
+                    failed_deps = [d for d in deps if report.executions[d].status != PluginRunStatus.SUCCESS]
+                    if failed_deps:
+                        execution = report.executions[pid]
+                        execution.status = PluginRunStatus.SKIPPED
+                        execution.error = f"依赖插件未成功: {', '.join(failed_deps)}"
+                        logger.warning(f"插件 {pid} 跳过: {execution.error}")
+                        progressed = True
+                        continue
+                    task = asyncio.ensure_future(self._run_one(by_id[pid], context, report.executions[pid]))
+                    running[task] = pid
+
+        start_ready()
+
+        while running:
+            wait_timeout = None
+            if deadline is not None:
+                wait_timeout = max(0.0, deadline - loop.time())
+
+            done, _ = await asyncio.wait(
+                running.keys(), timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                # 超过整体时限，取消剩余插件
+                for task, pid in running.items():
+                    task.cancel()
+                    execution = report.executions[pid]
+                    execution.status = PluginRunStatus.CANCELLED
+                    execution.error = "超过整体执行时限"
+                await asyncio.gather(*running.keys(), return_exceptions=True)
+                running.clear()
+                break
+
+            for task in done:
+                pid = running.pop(task)
+                if report.executions[pid].status == PluginRunStatus.SUCCESS:
+                    plugin_results[pid] = report.executions[pid].results
+
+            start_ready()
+
+        # 未启动的插件 (整体超时导致)
+        for pid in pending:
+            execution = report.executions[pid]
+            execution.status = PluginRunStatus.CANCELLED
+            execution.error = "超过整体执行时限，未启动"
+
+        report.total_elapsed_ms = (time.perf_counter() - run_started) * 1000
+        return report
+
+    async def _run_one(
+        self,
+        plugin: AnalysisPlugin,
+        context: AnalysisContext,
+        execution: PluginExecution
+    ) -> None:
+        """执行单个插件并记录状态和耗时"""
+        execution.started_at = datetime.now()
+        started = time.perf_counter()
+
+        try:
+            logger.info(f"执行插件: {plugin.plugin_id} ({plugin.plugin_name})")
+
+            if not plugin.validate_context(context):
+                logger.warning(f"插件 {plugin.plugin_id} 上下文验证失败，跳过")
+                execution.status = PluginRunStatus.SKIPPED
+                execution.error = "上下文验证失败"
+                return
+
+            if plugin.config.cpu_bound:
+                loop = asyncio.get_running_loop()
+                coro = loop.run_in_executor(self._get_executor(), _run_plugin_sync, plugin, context)
+            else:
+                coro = plugin.analyze(context)
+
+            # 线程池中的插件超时后结果被丢弃，线程自然结束
+            timeout = plugin.config.timeout_seconds or None
+            execution.results = await asyncio.wait_for(coro, timeout=timeout)
+            execution.status = PluginRunStatus.SUCCESS
+
+            logger.info(f"插件 {plugin.plugin_id} 生成 {len(execution.results)} 条建议")
+
+        except asyncio.TimeoutError:
+            execution.status = PluginRunStatus.TIMEOUT
+            execution.error = f"超过执行时限 {plugin.config.timeout_seconds}s"
+            logger.warning(f"插件 {plugin.plugin_id} 执行超时")
+        except asyncio.CancelledError:
+            execution.status = PluginRunStatus.CANCELLED
+            execution.error = execution.error or "已取消"
+            raise
+        except Exception as e:
+            execution.status = PluginRunStatus.FAILED
+            execution.error = str(e)
+            logger.error(f"插件 {plugin.plugin_id} 执行失败: {e}", exc_info=True)
+        finally:
+            execution.elapsed_ms = (time.perf_counter() - started) * 1000
@@ -20,6 +20,9 @@ from ..schemas.asset import (
     InventoryCreate, InventoryItemUpdate,
     AssetStatistics
 )
+from .rack_occupancy import CabinetOccupancy
+from .statistics import asset_statistics_query, build_asset_statistics
+from .asset_inventory import apply_inventory_stats, inventory_items_insert, inventory_stats_query
 
 
 class AssetService:
@@ -147,7 +150,7 @@ class AssetService:
             cabinet_id: 机柜ID
 
         Returns:
-            包含total_u, used_u, available_u, usage_rate, u_map的字典
+            包含total_u, used_u, available_u, usage_rate, conflicts, u_map的字典
         """
         cabinet = self.get_cabinet(cabinet_id)
         if not cabinet:
@@ -156,6 +159,7 @@ class AssetService:
                 "used_u": 0,
                 "available_u": 0,
                 "usage_rate": 0,
+                "conflicts": [],
                 "u_map": {}
             }
 
@@ -168,21 +172,22 @@ class AssetService:
             Asset.u_height.isnot(None)
         ).all()
 
-        # 构建U位映射表
-        u_map = {}
-        used_u = 0
-
+        # 按U位位图构建映射表
+        occupancy = CabinetOccupancy.from_cabinet(cabinet)
         for asset in assets:
-            if asset.u_position and asset.u_height:
-                for u in range(asset.u_position, asset.u_position + asset.u_height):
-                    if u <= total_u:
-                        u_map[u] = {
-                            "asset_id": asset.id,
-                            "asset_code": asset.asset_code,
-                            "asset_name": asset.asset_name,
-                            "asset_type": asset.asset_type.value if asset.asset_type else None
-                        }
-                used_u += asset.u_height
+            occupancy.place(asset)
+
+        by_id = {asset.id: asset for asset in assets}
+        u_map = {
+            u: {
+                "asset_id": asset_id,
+                "asset_code": by_id[asset_id].asset_code,
+                "asset_name": by_id[asset_id].asset_name,
+                "asset_type": by_id[asset_id].asset_type.value if by_id[asset_id].asset_type else None
+            }
+            for u, asset_id in sorted(occupancy.u_map().items())
+        }
+        used_u = occupancy.used_u
 
         available_u = total_u - used_u
         usage_rate = round((used_u / total_u * 100), 2) if total_u > 0 else 0
@@ -192,6 +197,7 @@ class AssetService:
             "used_u": used_u,
             "available_u": available_u,
             "usage_rate": usage_rate,
+            "conflicts": [list(pair) for pair in occupancy.conflicts()],
             "u_map": u_map
         }
 
@@ -595,38 +601,16 @@ class AssetService:
         Returns:
             创建的盘点记录
         """
-        # 创建盘点主记录
+        # 创建盘点主记录，INSERT ... SELECT 一次生成全部盘点明细
         inventory = AssetInventory(**data.model_dump())
         inventory.status = "pending"
         self.db.add(inventory)
-        self.db.commit()
-        self.db.refresh(inventory)
-
-        # 获取所有在用和借出的资产，创建盘点明细
-        assets = self.db.query(Asset).filter(
-            Asset.status.in_([AssetStatus.in_use, AssetStatus.borrowed])
-        ).all()
-
-        for asset in assets:
-            expected_location = None
-            if asset.cabinet_id:
-                cabinet = self.get_cabinet(asset.cabinet_id)
-                if cabinet:
-                    expected_location = f"{cabinet.cabinet_name} U{asset.u_position}" if asset.u_position else cabinet.cabinet_name
-
-            item = AssetInventoryItem(
-                inventory_id=inventory.id,
-                asset_id=asset.id,
-                expected_location=expected_location,
-                is_matched=False
-            )
-            self.db.add(item)
+        self.db.flush()
 
+        self.db.execute(inventory_items_insert(inventory.id))
+        apply_inventory_stats(inventory, self.db.execute(inventory_stats_query(inventory.id)).one())
         self.db.commit()
 
-        # 更新统计信息
-        self._update_inventory_stats(inventory.id)
-
         self.db.refresh(inventory)
         return inventory
 
@@ -711,27 +695,7 @@ class AssetService:
         if not inventory:
             return
 
-        items = self.get_inventory_items(inventory_id)
-
-        total_count = len(items)
-        checked_count = sum(1 for item in items if item.check_time is not None)
-        matched_count = sum(1 for item in items if item.is_matched)
-        unmatched_count = sum(1 for item in items if item.check_time is not None and not item.is_matched)
-
-        inventory.total_count = total_count
-        inventory.checked_count = checked_count
-        inventory.matched_count = matched_count
-        inventory.unmatched_count = unmatched_count
-
-        # 更新盘点状态
-        if checked_count == 0:
-            inventory.status = "pending"
-        elif checked_count < total_count:
-            inventory.status = "in_progress"
-        else:
-            inventory.status = "completed"
-            inventory.completed_at = datetime.now()
-
+        apply_inventory_stats(inventory, self.db.execute(inventory_stats_query(inventory_id)).one())
         self.db.commit()
 
     # ==================== 统计分析 ====================
@@ -743,50 +707,7 @@ class AssetService:
         Returns:
             资产统计信息
         """
-        # 资产总数
-        total_count = self.db.query(func.count(Asset.id)).scalar() or 0
-
-        # 按状态统计
-        status_counts = self.db.query(
-            Asset.status,
-            func.count(Asset.id)
-        ).group_by(Asset.status).all()
-        by_status = {status.value if status else "unknown": count for status, count in status_counts}
-
-        # 按类型统计
-        type_counts = self.db.query(
-            Asset.asset_type,
-            func.count(Asset.id)
-        ).group_by(Asset.asset_type).all()
-        by_type = {asset_type.value if asset_type else "unknown": count for asset_type, count in type_counts}
-
-        # 按部门统计
-        dept_counts = self.db.query(
-            Asset.department,
-            func.count(Asset.id)
-        ).filter(Asset.department.isnot(None)).group_by(Asset.department).all()
-        by_department = {dept or "未分配": count for dept, count in dept_counts}
-
-        # 资产总价值
-        total_value = self.db.query(func.sum(Asset.purchase_price)).scalar() or 0
-
-        # 保修即将到期数量（30天内）
-        expiring_date = date.today() + timedelta(days=30)
-        warranty_expiring_count = self.db.query(func.count(Asset.id)).filter(
-            Asset.warranty_end.isnot(None),
-            Asset.warranty_end <= expiring_date,
-            Asset.warranty_end >= date.today(),
-            Asset.status != AssetStatus.scrapped
-        ).scalar() or 0
-
-        return AssetStatistics(
-            total_count=total_count,
-            by_status=by_status,
-            by_type=by_type,
-            by_department=by_department,
-            total_value=float(total_value),
-            warranty_expiring_count=warranty_expiring_count
-        )
+        return build_asset_statistics(self.db.execute(asset_statistics_query()).all())
 
     def get_warranty_expiring_assets(self, days: int = 30) -> List[Asset]:
         """
@@ -0,0 +1,180 @@
+"""
+资产盘点批量处理
+Asset Inventory Bulk Operations
+
+- 盘点明细由一条 INSERT ... SELECT (关联机柜生成预期位置) 一次生成
+- 盘点统计由一条聚合查询完成
+- 批量扫码对账: 以资产编码/序列号建立哈希索引，一次请求核对数千条扫码记录并批量更新明细
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, and_, case, cast, false, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.asset import Asset, AssetInventory, AssetInventoryItem, AssetStatus, Cabinet
+
+# 参与盘点的资产状态
+INVENTORY_STATUSES = [AssetStatus.in_use, AssetStatus.borrowed]
+# 核对未知编码时每批查询的编码数
+LOOKUP_CHUNK = 500
+
+
+def inventory_items_insert(inventory_id: int):
+    """按在用/借出资产生成盘点明细，预期位置为 "机柜名 U位" """
+    expected_location = case(
+        (Asset.u_position.isnot(None), Cabinet.cabinet_name + " U" + cast(Asset.u_position, String)),
+        else_=Cabinet.cabinet_name
+    )
+    source = select(
+        literal(inventory_id), Asset.id, expected_location, false()
+    ).outerjoin(Cabinet, Asset.cabinet_id == Cabinet.id).where(
+        Asset.status.in_(INVENTORY_STATUSES)
+    ).order_by(Asset.id)
+    return insert(AssetInventoryItem).from_select(
+        ["inventory_id", "asset_id", "expected_location", "is_matched"], source
+    )
+
+
+def inventory_stats_query(inventory_id: int):
+    """盘点明细总数、已盘点数、匹配数和不匹配数"""
+    checked = AssetInventoryItem.check_time.isnot(None)
+    return select(
+        func.count(AssetInventoryItem.id),
+        func.sum(case((checked, 1), else_=0)),
+        func.sum(case((AssetInventoryItem.is_matched, 1), else_=0)),
+        func.sum(case((and_(checked, AssetInventoryItem.is_matched.isnot(True)), 1), else_=0)),
+    ).where(AssetInventoryItem.inventory_id == inventory_id)
+
+
+def apply_inventory_stats(inventory: AssetInventory, row: Tuple) -> None:
+    """写入盘点统计并更新盘点状态"""
+    total_count, checked_count, matched_count, unmatched_count = (value or 0 for value in row)
+    inventory.total_count = total_count
+    inventory.checked_count = checked_count
+    inventory.matched_count = matched_count
+    inventory.unmatched_count = unmatched_count
+
+    if checked_count == 0:
+        inventory.status = "pending"
+    elif checked_count < total_count:
+        inventory.status = "in_progress"
+    else:
+        inventory.status = "completed"
+        inventory.completed_at = datetime.now()
+
+
+async def generate_inventory_items(db: AsyncSession, inventory: AssetInventory) -> int:
+    """
+    生成盘点明细并计算统计 (由调用方提交事务)
+
+    Returns:
+        生成的明细数
+    """
+    result = await db.execute(inventory_items_insert(inventory.id))
+    await refresh_inventory_stats(db, inventory)
+    return result.rowcount
+
+
+async def refresh_inventory_stats(db: AsyncSession, inventory: AssetInventory) -> None:
+    """重新计算盘点统计 (由调用方提交事务)"""
+    row = (await db.execute(inventory_stats_query(inventory.id))).one()
+    apply_inventory_stats(inventory, row)
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip()
+    return value or None
+
+
+async def reconcile_scans(
+    db: AsyncSession,
+    inventory: AssetInventory,
+    scans: Iterable[Dict[str, Optional[str]]],
+    checked_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    批量扫码对账 (由调用方提交事务)
+
+    扫码编码按资产编码或序列号匹配盘点明细；带位置的扫码与预期位置一致时记为匹配，
+    不带位置时视为在预期位置找到。同一资产多次扫码以最后一次为准。
+
+    Args:
+        inventory: 盘点任务
+        scans: 扫码记录 [{"code": 编码, "location": 实际位置}]
+        checked_at: 盘点时间 (默认当前时间)
+
+    Returns:
+        对账结果: 扫码数、匹配数、位置不符数、重复数、未知编码、不在本次盘点中的资产编码
+    """
+    checked_at = checked_at or datetime.now()
+    result = await db.execute(
+        select(
+            AssetInventoryItem.id, AssetInventoryItem.expected_location,
+            Asset.asset_code, Asset.serial_number
+        )
+        .join(Asset, AssetInventoryItem.asset_id == Asset.id)
+        .where(AssetInventoryItem.inventory_id == inventory.id)
+    )
+    items: Dict[int, Optional[str]] = {}
+    index: Dict[str, int] = {}
+    serials: Dict[str, int] = {}
+    for item_id, expected_location, asset_code, serial_number in result.all():
+        items[item_id] = expected_location
+        index[asset_code] = item_id
+        if serial_number:
+            serials.setdefault(serial_number, item_id)
+    for serial_number, item_id in serials.items():
+        index.setdefault(serial_number, item_id)
+
+    updates: Dict[int, Dict[str, Any]] = {}
+    missing: List[str] = []
+    scanned = duplicates = 0
+    for scan in scans:
+        code = _normalize(scan.get("code"))
+        if code is None:
+            continue
+        scanned += 1
+        item_id = index.get(code)
+        if item_id is None:
+            missing.append(code)
+            continue
+        if item_id in updates:
+            duplicates += 1
+
+        expected_location = items[item_id]
+        location = _normalize(scan.get("location"))
+        updates[item_id] = {
+            "id": item_id,
+            "actual_location": location or expected_location,
+            "is_matched": location is None or location == _normalize(expected_location),
+            "check_time": checked_at,
+        }
+
+    if updates:
+        await db.execute(update(AssetInventoryItem), list(updates.values()))
+    await refresh_inventory_stats(db, inventory)
+
+    # 区分系统中存在但不在本次盘点范围内的资产与完全未知的编码
+    missing = list(dict.fromkeys(missing))
+    known = set()
+    for start in range(0, len(missing), LOOKUP_CHUNK):
+        chunk = missing[start:start + LOOKUP_CHUNK]
+        rows = await db.execute(
+            select(Asset.asset_code, Asset.serial_number).where(
+                or_(Asset.asset_code.in_(chunk), Asset.serial_number.in_(chunk))
+            )
+        )
+        for asset_code, serial_number in rows.all():
+            known.update(code for code in (asset_code, serial_number) if code)
+
+    matched = sum(1 for values in updates.values() if values["is_matched"])
+    return {
+        "scanned": scanned,
+        "checked": len(updates),
+        "matched": matched,
+        "mismatched": len(updates) - matched,
+        "duplicates": duplicates,
+        "not_in_inventory": [code for code in missing if code in known],
+        "unknown_codes": [code for code in missing if code not in known],
+    }
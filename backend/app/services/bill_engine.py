@@ -0,0 +1,265 @@
+"""
+批量电费计算引擎
+Batch Bill Engine
+
+基于编译后的分时电价 (CompiledTariff) 一次计算多个场景的电费:
+- 负荷曲线矩阵 (场景 × 天数 × 96时段) 或各时段电量矩阵 (场景 × 5时段) 作为输入
+- 电度电费、基本电费 (需量/容量)、功率因数调整、固定费用全部按列向量化计算
+- 用于 What-if 对比、方案评估等需要成百上千次计费的场景
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Union
+
+import numpy as np
+
+from .tariff_compiler import (
+    CompiledTariff,
+    PERIOD_CODES,
+    SLOTS_PER_DAY,
+    TIME_PERIODS,
+    get_cached_tariff,
+    normalize_period,
+)
+
+PERIOD_COUNT = len(TIME_PERIODS)
+
+ArrayLike = Union[float, Iterable[float], np.ndarray]
+
+
+def energy_matrix(records: Iterable[Mapping[str, float]]) -> np.ndarray:
+    """
+    各时段电量字典列表 → 电量矩阵 (场景 × 5时段)
+
+    时段键支持别名 (normal/mid → flat 等)，同一时段的多个键累加。
+    """
+    rows = []
+    for record in records:
+        row = np.zeros(PERIOD_COUNT)
+        for period, energy in record.items():
+            row[PERIOD_CODES[normalize_period(period)]] += energy or 0
+        rows.append(row)
+    return np.array(rows).reshape(-1, PERIOD_COUNT)
+
+
+def as_scenarios(loads: ArrayLike) -> np.ndarray:
+    """
+    负荷曲线 → (场景 × 天数 × 96) 数组
+
+    接受 96/96×天数 长度的单条曲线、(场景 × 96×天数) 或 (场景 × 天数 × 96) 数组。
+    """
+    arr = np.asarray(loads, dtype=np.float64)
+    if arr.ndim == 1:
+        arr = arr[np.newaxis, :]
+    if arr.ndim == 2:
+        if arr.shape[1] % SLOTS_PER_DAY:
+            raise ValueError(f"负荷曲线长度 {arr.shape[1]} 不是 {SLOTS_PER_DAY} 的整数倍")
+        arr = arr.reshape(arr.shape[0], -1, SLOTS_PER_DAY)
+    if arr.ndim != 3 or arr.shape[2] != SLOTS_PER_DAY:
+        raise ValueError(f"负荷曲线形状 {arr.shape} 无效，应为 (场景, 天数, {SLOTS_PER_DAY})")
+    return np.nan_to_num(arr) if np.isnan(arr).any() else arr
+
+
+@dataclass
+class BillBatch:
+    """批量电费结果 (每个数组第一维为场景)"""
+    energy_by_period: np.ndarray         # (S, 5) 各时段电量 kWh
+    energy_charge_by_period: np.ndarray  # (S, 5) 各时段电度电费 元
+    max_demand: np.ndarray               # (S,) 最大需量 kW
+    basic_charge: np.ndarray             # (S,) 基本电费 元
+    over_demand: np.ndarray              # (S,) 超申报需量 kW
+    over_charge: np.ndarray              # (S,) 超需量加价电费 元
+    power_factor: np.ndarray             # (S,) 平均功率因数
+    pf_adjustment_rate: np.ndarray       # (S,) 功率因数调整比例 %
+    pf_adjustment: np.ndarray            # (S,) 功率因数调整金额 元
+    fixed_fees: np.ndarray               # (S,) 固定费用 元
+
+    def __len__(self) -> int:
+        return len(self.max_demand)
+
+    @property
+    def energy_kwh(self) -> np.ndarray:
+        return self.energy_by_period.sum(axis=1)
+
+    @property
+    def energy_charge(self) -> np.ndarray:
+        return self.energy_charge_by_period.sum(axis=1)
+
+    @property
+    def optimizable_total(self) -> np.ndarray:
+        """可优化电费 (电度 + 基本 + 功率因数调整)"""
+        return self.energy_charge + self.basic_charge + self.pf_adjustment
+
+    @property
+    def grand_total(self) -> np.ndarray:
+        return self.optimizable_total + self.fixed_fees
+
+    @property
+    def unit_price(self) -> np.ndarray:
+        """综合单价 元/kWh (无电量时为0)"""
+        energy = self.energy_kwh
+        return np.divide(self.grand_total, energy, out=np.zeros_like(energy), where=energy > 0)
+
+    def savings(self, baseline: int = 0, optimizable_only: bool = False) -> np.ndarray:
+        """各场景相对基准场景的节省金额"""
+        total = self.optimizable_total if optimizable_only else self.grand_total
+        return total[baseline] - total
+
+    def totals(self, index: int) -> Dict[str, float]:
+        """单个场景的费用汇总"""
+        return {
+            "energy_charge": round(float(self.energy_charge[index]), 2),
+            "basic_charge": round(float(self.basic_charge[index]), 2),
+            "power_factor_adjustment": round(float(self.pf_adjustment[index]), 2),
+            "fixed_fees": round(float(self.fixed_fees[index]), 2),
+            "optimizable_total": round(float(self.optimizable_total[index]), 2),
+            "grand_total": round(float(self.grand_total[index]), 2),
+            "unit_price": round(float(self.unit_price[index]), 4),
+        }
+
+    def summary(self, baseline: int = 0) -> Dict[str, Any]:
+        """批量结果摘要 (各场景总费用及相对基准的节省)"""
+        savings = self.savings(baseline)
+        best = int(np.argmin(self.grand_total))
+        return {
+            "scenarios": len(self),
+            "baseline": baseline,
+            "best_scenario": best,
+            "best_saving": round(float(savings[best]), 2),
+            "grand_total": np.round(self.grand_total, 2).tolist(),
+            "savings": np.round(savings, 2).tolist(),
+        }
+
+
+class BillEngine:
+    """
+    批量电费计算引擎
+
+    计费规则与 PricingService.calculate_electricity_bill 一致:
+    - 按需量: 申报需量 × 需量电价，超出部分按加价倍数计费
+    - 按容量: 变压器容量 × 容量电价
+    - 功率因数调整基数为电度电费 + 基本电费，按首条命中的规则取调整比例
+    - 未配置全局电价配置时不计基本电费、功率因数调整和固定费用
+    """
+
+    def __init__(self, tariff: CompiledTariff):
+        self.tariff = tariff
+        # 时段电量计费使用已配置时段的电价，未配置的时段电价为0
+        configured = tariff.configured_period_prices
+        self.period_prices = np.array([configured.get(p, 0.0) for p in TIME_PERIODS])
+        # 负荷曲线计费按15分钟时段电价，电量按时段归类
+        self.slot_prices = tariff.slot_prices
+        self.slot_periods = np.eye(PERIOD_COUNT)[tariff.slot_period_codes]
+
+    def bill_curves(
+        self,
+        loads: ArrayLike,
+        power_factor: ArrayLike = 0.9,
+        include_fixed_fees: bool = True,
+        slot_hours: float = 0.25
+    ) -> BillBatch:
+        """
+        按负荷曲线批量计费 (一个计费周期)
+
+        Args:
+            loads: 15分钟平均功率 kW，形状见 as_scenarios
+            power_factor: 平均功率因数，标量或每场景一个值
+            include_fixed_fees: 是否包含固定费用
+            slot_hours: 时段时长 h
+        """
+        curves = as_scenarios(loads)
+        slot_energy = curves.sum(axis=1) * slot_hours          # (S, 96)
+        return self._finish(
+            energy_by_period=slot_energy @ self.slot_periods,
+            energy_charge_by_period=(slot_energy * self.slot_prices) @ self.slot_periods,
+            max_demand=curves.max(axis=(1, 2)) if curves.shape[1] else np.zeros(len(curves)),
+            power_factor=power_factor,
+            include_fixed_fees=include_fixed_fees,
+        )
+
+    def bill_energy(
+        self,
+        energy_by_period: ArrayLike,
+        max_demand: ArrayLike = 0.0,
+        power_factor: ArrayLike = 0.9,
+        include_fixed_fees: bool = True
+    ) -> BillBatch:
+        """
+        按各时段电量批量计费
+
+        Args:
+            energy_by_period: 电量矩阵 (场景 × 5时段)，列顺序同 TIME_PERIODS
+            max_demand: 最大需量 kW，标量或每场景一个值
+            power_factor: 平均功率因数，标量或每场景一个值
+            include_fixed_fees: 是否包含固定费用
+        """
+        energy = np.asarray(energy_by_period, dtype=np.float64).reshape(-1, PERIOD_COUNT)
+        return self._finish(
+            energy_by_period=energy,
+            energy_charge_by_period=energy * self.period_prices,
+            max_demand=max_demand,
+            power_factor=power_factor,
+            include_fixed_fees=include_fixed_fees,
+        )
+
+    def _finish(
+        self,
+        energy_by_period: np.ndarray,
+        energy_charge_by_period: np.ndarray,
+        max_demand: ArrayLike,
+        power_factor: ArrayLike,
+        include_fixed_fees: bool
+    ) -> BillBatch:
+        tariff = self.tariff
+        n = len(energy_by_period)
+        max_demand = np.broadcast_to(np.asarray(max_demand, dtype=np.float64), (n,)).copy()
+        power_factor = np.broadcast_to(np.asarray(power_factor, dtype=np.float64), (n,)).copy()
+        zeros = np.zeros(n)
+        has_config = tariff.config_id is not None
+
+        # 基本电费
+        basic_charge, over_demand, over_charge = zeros, zeros, zeros
+        if has_config:
+            active = max_demand > 0
+            if tariff.billing_mode == "demand":
+                declared = tariff.declared_demand or 0
+                price = tariff.demand_price or 0
+                over_demand = np.where(active, np.maximum(max_demand - declared, 0), 0)
+                over_charge = over_demand * price * (tariff.over_demand_multiplier or 2.0)
+                basic_charge = np.where(active, declared * price + over_charge, 0)
+            elif tariff.billing_mode == "capacity":
+                basic = (tariff.transformer_capacity or 0) * (tariff.capacity_price or 0)
+                basic_charge = np.where(active, basic, 0)
+
+        # 功率因数调整 (按规则顺序取首条命中)
+        rate = zeros
+        if has_config and tariff.power_factor_rules:
+            rate = np.zeros(n)
+            matched = np.zeros(n, dtype=bool)
+            for rule in tariff.power_factor_rules:
+                hit = ~matched & (power_factor >= rule.get("min", 0)) & (power_factor < rule.get("max", 1.0))
+                rate[hit] = rule.get("adjustment", 0)
+                matched |= hit
+        energy_charge = energy_charge_by_period.sum(axis=1)
+        pf_adjustment = (energy_charge + basic_charge) * rate / 100
+
+        fixed_fees = zeros
+        if include_fixed_fees and has_config:
+            fixed_fees = energy_by_period.sum(axis=1) * tariff.fixed_fee_per_kwh
+
+        return BillBatch(
+            energy_by_period=energy_by_period,
+            energy_charge_by_period=energy_charge_by_period,
+            max_demand=max_demand,
+            basic_charge=basic_charge,
+            over_demand=over_demand,
+            over_charge=over_charge,
+            power_factor=power_factor,
+            pf_adjustment_rate=rate,
+            pf_adjustment=pf_adjustment,
+            fixed_fees=fixed_fees,
+        )
+
+
+def bill_engine_for(tariff: Optional[CompiledTariff] = None) -> BillEngine:
+    """按编译电价创建计费引擎，默认使用缓存中的当日电价"""
+    return BillEngine(tariff or get_cached_tariff())
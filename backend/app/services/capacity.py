@@ -20,6 +20,7 @@ from ..schemas.capacity import (
     WeightCapacityCreate, WeightCapacityUpdate,
     CapacityPlanCreate
 )
+from .statistics import build_capacity_statistics, capacity_statistics_query
 
 
 class CapacityService:
@@ -66,7 +67,7 @@ class CapacityService:
         plan: CapacityPlan
     ) -> Tuple[bool, str]:
         """
-        评估容量规划的可行性
+        评估容量规划的可行性 (按汇总容量; 逐台布局到机柜见 capacity_placement.evaluate_plan)
 
         Args:
             db: 数据库会话
@@ -748,86 +749,7 @@ class CapacityService:
         Returns:
             包含各类容量统计的字典
         """
-        # 空间容量统计
-        space_capacities = db.query(SpaceCapacity).all()
-        total_u = sum(sc.total_u_positions or 0 for sc in space_capacities)
-        used_u = sum(sc.used_u_positions or 0 for sc in space_capacities)
-        space_stats = {
-            "total_u_positions": total_u,
-            "used_u_positions": used_u,
-            "available_u_positions": total_u - used_u,
-            "usage_rate": round(used_u / total_u * 100, 2) if total_u > 0 else 0,
-            "count": len(space_capacities)
-        }
-
-        # 电力容量统计
-        power_capacities = db.query(PowerCapacity).all()
-        total_power = sum(pc.total_capacity_kw or 0 for pc in power_capacities)
-        used_power = sum(pc.used_capacity_kw or 0 for pc in power_capacities)
-        power_stats = {
-            "total_capacity_kw": total_power,
-            "used_capacity_kw": used_power,
-            "available_capacity_kw": total_power - used_power,
-            "usage_rate": round(used_power / total_power * 100, 2) if total_power > 0 else 0,
-            "count": len(power_capacities)
-        }
-
-        # 制冷容量统计
-        cooling_capacities = db.query(CoolingCapacity).all()
-        total_cooling = sum(cc.total_cooling_kw or 0 for cc in cooling_capacities)
-        used_cooling = sum(cc.used_cooling_kw or 0 for cc in cooling_capacities)
-        cooling_stats = {
-            "total_cooling_kw": total_cooling,
-            "used_cooling_kw": used_cooling,
-            "available_cooling_kw": total_cooling - used_cooling,
-            "usage_rate": round(used_cooling / total_cooling * 100, 2) if total_cooling > 0 else 0,
-            "count": len(cooling_capacities)
-        }
-
-        # 承重容量统计
-        weight_capacities = db.query(WeightCapacity).all()
-        total_weight = sum(wc.total_weight_kg or 0 for wc in weight_capacities)
-        used_weight = sum(wc.used_weight_kg or 0 for wc in weight_capacities)
-        weight_stats = {
-            "total_weight_kg": total_weight,
-            "used_weight_kg": used_weight,
-            "available_weight_kg": total_weight - used_weight,
-            "usage_rate": round(used_weight / total_weight * 100, 2) if total_weight > 0 else 0,
-            "count": len(weight_capacities)
-        }
-
-        # 状态统计
-        status_counts = {
-            "normal": 0,
-            "warning": 0,
-            "critical": 0,
-            "full": 0
-        }
-
-        for sc in space_capacities:
-            if sc.status:
-                status_counts[sc.status.value] = status_counts.get(sc.status.value, 0) + 1
-        for pc in power_capacities:
-            if pc.status:
-                status_counts[pc.status.value] = status_counts.get(pc.status.value, 0) + 1
-        for cc in cooling_capacities:
-            if cc.status:
-                status_counts[cc.status.value] = status_counts.get(cc.status.value, 0) + 1
-        for wc in weight_capacities:
-            if wc.status:
-                status_counts[wc.status.value] = status_counts.get(wc.status.value, 0) + 1
-
-        return {
-            "space": space_stats,
-            "power": power_stats,
-            "cooling": cooling_stats,
-            "weight": weight_stats,
-            "status_summary": status_counts,
-            "total_capacity_records": (
-                len(space_capacities) + len(power_capacities) +
-                len(cooling_capacities) + len(weight_capacities)
-            )
-        }
+        return build_capacity_statistics(db.execute(capacity_statistics_query()).all())
 
 
 # 单例实例
@@ -0,0 +1,406 @@
+"""
+容量规划布局引擎
+Capacity Placement Engine
+
+将机柜视为多维装箱问题中的箱子 (连续U位 / 功率 / 承重)，
+机柜按位置前缀归属电力容量树节点 (PowerCapacity.parent_id 逐级向上)、制冷区域和楼板承重区域，
+放置设备时沿整条电力路径以及所属制冷/承重区域扣减余量。
+
+算法: 首次适应递减 (First-Fit Decreasing)
+- 设备按 (U数, 功率, 重量) 降序，机柜按空闲U数升序 (优先填满已用机柜)
+- 余量只减不增，同规格设备在某机柜放不下后续也放不下，
+  因此每种规格维护扫描起点，数百台同规格设备的批量规划为近线性时间
+"""
+import asyncio
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.asset import Asset, Cabinet
+from ..models.capacity import (
+    CapacityPlan, CoolingCapacity, PowerCapacity, SpaceCapacity, WeightCapacity
+)
+from .rack_occupancy import CabinetOccupancy, free_runs, u_mask
+
+# 放不下的原因
+REASON_LABELS = {
+    "space": "连续U位不足",
+    "cabinet_power": "机柜功率余量不足",
+    "power_tree": "上级配电容量不足",
+    "cabinet_weight": "机柜承重余量不足",
+    "cooling": "制冷区域余量不足",
+    "floor": "楼板承重区域余量不足",
+}
+# 可行性说明中列出的机柜数上限
+MAX_NOTE_CABINETS = 10
+
+
+@dataclass
+class DeviceSpec:
+    """待放置设备规格"""
+    u_height: int = 0
+    power_kw: float = 0.0
+    cooling_kw: float = 0.0
+    weight_kg: float = 0.0
+    count: int = 1
+    name: str = ""
+
+    @property
+    def signature(self) -> tuple:
+        return (self.u_height, self.power_kw, self.cooling_kw, self.weight_kg)
+
+
+@dataclass
+class Bin:
+    """机柜箱子"""
+    cabinet_id: int
+    cabinet_name: str
+    total_u: int
+    bitmap: int
+    power_headroom: Optional[float]
+    weight_headroom: Optional[float]
+    power_path: Tuple[int, ...] = ()
+    cooling_zone: Optional[int] = None
+    floor_zone: Optional[int] = None
+
+    @property
+    def free_u(self) -> int:
+        return self.total_u - bin(self.bitmap).count("1")
+
+
+@dataclass
+class PlacementResult:
+    """布局结果"""
+    placements: List[Dict[str, Any]] = field(default_factory=list)
+    unplaced: List[Dict[str, Any]] = field(default_factory=list)
+    reasons: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def feasible(self) -> bool:
+        return not self.unplaced
+
+    def by_cabinet(self) -> List[Dict[str, Any]]:
+        """按机柜汇总放置结果"""
+        summary: Dict[int, Dict[str, Any]] = {}
+        for p in self.placements:
+            item = summary.setdefault(p["cabinet_id"], {
+                "cabinet_id": p["cabinet_id"], "cabinet_name": p["cabinet_name"],
+                "devices": 0, "u_positions": [], "power_kw": 0.0, "weight_kg": 0.0,
+            })
+            item["devices"] += 1
+            if p["u_position"] is not None:
+                item["u_positions"].append(p["u_position"])
+            item["power_kw"] = round(item["power_kw"] + p["power_kw"], 3)
+            item["weight_kg"] = round(item["weight_kg"] + p["weight_kg"], 3)
+        return list(summary.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "feasible": self.feasible,
+            "placed": len(self.placements),
+            "unplaced": len(self.unplaced),
+            "reasons": {REASON_LABELS[k]: v for k, v in self.reasons.items()},
+            "cabinets": self.by_cabinet(),
+            "placements": self.placements,
+        }
+
+    def notes(self) -> str:
+        """可行性说明"""
+        total = len(self.placements) + len(self.unplaced)
+        cabinets = self.by_cabinet()
+        if self.feasible:
+            lines = [f"布局检查通过: {total} 台设备可放入 {len(cabinets)} 个机柜"]
+        else:
+            lines = [f"布局不可行: {len(self.unplaced)}/{total} 台设备无法放置"]
+            if self.reasons:
+                lines.append("原因统计: " + ", ".join(
+                    f"{REASON_LABELS[k]} {v} 个机柜" for k, v in self.reasons.items()
+                ))
+        for item in cabinets[:MAX_NOTE_CABINETS]:
+            positions = ", ".join(f"U{u}" for u in item["u_positions"])
+            lines.append(f"{item['cabinet_name']}: {item['devices']} 台 {positions}".rstrip())
+        if len(cabinets) > MAX_NOTE_CABINETS:
+            lines.append(f"... 共 {len(cabinets)} 个机柜")
+        return "\n".join(lines)
+
+
+def _available(total: Optional[float], used: Optional[float]) -> Optional[float]:
+    """余量 (未配置总量时不限制)"""
+    return None if total is None else total - (used or 0)
+
+
+def _match_location(location: Optional[str], nodes: Iterable[Any]) -> Optional[Any]:
+    """位置前缀最长匹配的容量节点"""
+    if not location:
+        return None
+    best = None
+    for node in nodes:
+        if node.location and location.startswith(node.location):
+            if best is None or len(node.location) > len(best.location):
+                best = node
+    return best
+
+
+class PlacementEngine:
+    """
+    多维装箱布局引擎
+
+    用法:
+        engine = await load_placement_engine(db)
+        result = engine.place([DeviceSpec(u_height=2, power_kw=0.8, weight_kg=25, count=300)])
+    """
+
+    def __init__(
+        self,
+        bins: List[Bin],
+        power_headroom: Dict[int, float],
+        cooling_headroom: Dict[int, float],
+        floor_headroom: Dict[int, float]
+    ):
+        self.bins = bins
+        self.power_headroom = power_headroom
+        self.cooling_headroom = cooling_headroom
+        self.floor_headroom = floor_headroom
+
+    @classmethod
+    def from_rows(
+        cls,
+        cabinets: List[Cabinet],
+        assets: List[Asset],
+        power_nodes: List[PowerCapacity],
+        cooling_zones: List[CoolingCapacity],
+        floor_zones: List[WeightCapacity]
+    ) -> "PlacementEngine":
+        """由机柜、已上架资产和容量记录构建"""
+        occupancy = {c.id: CabinetOccupancy.from_cabinet(c) for c in cabinets}
+        for asset in assets:
+            if asset.cabinet_id in occupancy:
+                occupancy[asset.cabinet_id].place(asset)
+
+        parents = {n.id: n.parent_id for n in power_nodes}
+        power_headroom = {
+            n.id: value for n in power_nodes
+            if (value := _available(n.total_capacity_kw, n.used_capacity_kw)) is not None
+        }
+        cooling_headroom = {
+            z.id: value for z in cooling_zones
+            if (value := _available(z.total_cooling_kw, z.used_cooling_kw)) is not None
+        }
+        floor_headroom = {
+            z.id: value for z in floor_zones
+            if (value := _available(z.total_weight_kg, z.used_weight_kg)) is not None
+        }
+
+        def power_path(node) -> Tuple[int, ...]:
+            path, node_id = [], node.id if node else None
+            while node_id is not None and node_id not in path:
+                path.append(node_id)
+                node_id = parents.get(node_id)
+            return tuple(n for n in path if n in power_headroom)
+
+        bins = []
+        for cabinet in cabinets:
+            occ = occupancy[cabinet.id]
+            cooling = _match_location(cabinet.location, cooling_zones)
+            floor = _match_location(cabinet.location, floor_zones)
+            bins.append(Bin(
+                cabinet_id=cabinet.id,
+                cabinet_name=cabinet.cabinet_name,
+                total_u=occ.total_u,
+                bitmap=occ.bitmap,
+                power_headroom=occ.power_headroom,
+                weight_headroom=occ.weight_headroom,
+                power_path=power_path(_match_location(cabinet.location, power_nodes)),
+                cooling_zone=cooling.id if cooling and cooling.id in cooling_headroom else None,
+                floor_zone=floor.id if floor and floor.id in floor_headroom else None,
+            ))
+        return cls(bins, power_headroom, cooling_headroom, floor_headroom)
+
+    # ==================== 布局 ====================
+
+    def _check(self, b: Bin, spec: DeviceSpec) -> Tuple[Optional[str], Optional[int]]:
+        """检查设备能否放入机柜，返回 (不满足的原因, U位起始位置)"""
+        if b.power_headroom is not None and b.power_headroom < spec.power_kw:
+            return "cabinet_power", None
+        if b.weight_headroom is not None and b.weight_headroom < spec.weight_kg:
+            return "cabinet_weight", None
+        if any(self.power_headroom[n] < spec.power_kw for n in b.power_path):
+            return "power_tree", None
+        if b.cooling_zone is not None and self.cooling_headroom[b.cooling_zone] < spec.cooling_kw:
+            return "cooling", None
+        if b.floor_zone is not None and self.floor_headroom[b.floor_zone] < spec.weight_kg:
+            return "floor", None
+        if spec.u_height <= 0:
+            return None, None
+        runs = free_runs(b.bitmap, b.total_u, spec.u_height)
+        if not runs:
+            return "space", None
+        return None, (runs & -runs).bit_length()
+
+    def _commit(self, b: Bin, spec: DeviceSpec, u_position: Optional[int]) -> None:
+        """扣减机柜及所属电力路径、制冷、承重区域的余量"""
+        if u_position is not None:
+            b.bitmap |= u_mask(u_position, spec.u_height, b.total_u)
+        if b.power_headroom is not None:
+            b.power_headroom -= spec.power_kw
+        if b.weight_headroom is not None:
+            b.weight_headroom -= spec.weight_kg
+        for n in b.power_path:
+            self.power_headroom[n] -= spec.power_kw
+        if b.cooling_zone is not None:
+            self.cooling_headroom[b.cooling_zone] -= spec.cooling_kw
+        if b.floor_zone is not None:
+            self.floor_headroom[b.floor_zone] -= spec.weight_kg
+
+    def place(self, specs: List[DeviceSpec]) -> PlacementResult:
+        """
+        首次适应递减放置全部设备 (会扣减引擎内余量)
+
+        Args:
+            specs: 设备规格列表 (count 为同规格台数)
+
+        Returns:
+            布局结果，包含每台设备的机柜和U位，以及无法放置的设备和原因统计
+        """
+        items = [(i, spec) for i, spec in enumerate(specs) for _ in range(max(spec.count, 0))]
+        items.sort(key=lambda x: (x[1].u_height, x[1].power_kw, x[1].weight_kg), reverse=True)
+        bins = sorted(self.bins, key=lambda b: (b.free_u, b.cabinet_id))
+
+        result = PlacementResult()
+        start: Dict[tuple, int] = {}
+        reasons: Counter = Counter()
+
+        for spec_index, spec in items:
+            sig = spec.signature
+            pos = start.get(sig, 0)
+            while pos < len(bins):
+                reason, u_position = self._check(bins[pos], spec)
+                if reason is None:
+                    break
+                # 余量只减不增: 该规格以后也放不进这个机柜
+                pos += 1
+
+            if pos == len(bins):
+                if sig not in start or start[sig] < len(bins):
+                    # 首次放不下时统计各机柜不满足的约束
+                    reasons.update(r for r in (self._check(b, spec)[0] for b in bins) if r)
+                start[sig] = pos
+                result.unplaced.append({"spec_index": spec_index, "name": spec.name})
+                continue
+
+            start[sig] = pos
+            b = bins[pos]
+            self._commit(b, spec, u_position)
+            result.placements.append({
+                "spec_index": spec_index,
+                "name": spec.name,
+                "cabinet_id": b.cabinet_id,
+                "cabinet_name": b.cabinet_name,
+                "u_position": u_position,
+                "u_height": spec.u_height,
+                "power_kw": spec.power_kw,
+                "weight_kg": spec.weight_kg,
+            })
+
+        result.reasons = dict(reasons)
+        return result
+
+
+def plan_devices(plan: CapacityPlan) -> List[DeviceSpec]:
+    """容量规划的总需求均分为 device_count 台设备"""
+    count = max(plan.device_count or 1, 1)
+    return [DeviceSpec(
+        u_height=math.ceil((plan.required_u or 0) / count),
+        power_kw=(plan.required_power_kw or 0) / count,
+        cooling_kw=(plan.required_cooling_kw or 0) / count,
+        weight_kg=(plan.required_weight_kg or 0) / count,
+        count=count,
+        name=plan.name or "",
+    )]
+
+
+async def load_placement_engine(
+    db: AsyncSession,
+    cabinet_ids: Optional[List[int]] = None
+) -> PlacementEngine:
+    """加载机柜占用和容量记录，构建布局引擎"""
+    cabinet_query = select(Cabinet)
+    asset_query = select(Asset).where(Asset.cabinet_id.isnot(None))
+    if cabinet_ids:
+        cabinet_query = cabinet_query.where(Cabinet.id.in_(cabinet_ids))
+        asset_query = asset_query.where(Asset.cabinet_id.in_(cabinet_ids))
+
+    cabinets = (await db.execute(cabinet_query)).scalars().all()
+    assets = (await db.execute(asset_query)).scalars().all()
+    power_nodes = (await db.execute(select(PowerCapacity))).scalars().all()
+    cooling_zones = (await db.execute(select(CoolingCapacity))).scalars().all()
+    floor_zones = (await db.execute(select(WeightCapacity))).scalars().all()
+    return PlacementEngine.from_rows(cabinets, assets, power_nodes, cooling_zones, floor_zones)
+
+
+async def place_devices(
+    db: AsyncSession,
+    specs: List[DeviceSpec],
+    cabinet_ids: Optional[List[int]] = None
+) -> Optional[PlacementResult]:
+    """
+    加载引擎并在线程池中完成布局
+
+    Returns:
+        布局结果；系统中没有机柜时返回 None (调用方退回汇总容量检查)
+    """
+    engine = await load_placement_engine(db, cabinet_ids)
+    if not engine.bins:
+        return None
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, engine.place, specs)
+
+
+async def aggregate_feasibility(db: AsyncSession, plan: CapacityPlan) -> Tuple[bool, str]:
+    """汇总容量检查 (各类容量余量总和与需求比较，不区分机柜)"""
+    notes = []
+    is_feasible = True
+    checks = [
+        (plan.required_u, SpaceCapacity, "total_u_positions", "used_u_positions", "空间容量", "可用U位", "U", "d"),
+        (plan.required_power_kw, PowerCapacity, "total_capacity_kw", "used_capacity_kw", "电力容量", "可用电力", "kW", ".2f"),
+        (plan.required_cooling_kw, CoolingCapacity, "total_cooling_kw", "used_cooling_kw", "制冷容量", "可用制冷", "kW", ".2f"),
+        (plan.required_weight_kg, WeightCapacity, "total_weight_kg", "used_weight_kg", "承重容量", "可用承重", "kg", ".2f"),
+    ]
+    for required, model, total_attr, used_attr, label, available_label, unit, fmt in checks:
+        if not required:
+            continue
+        rows = (await db.execute(select(model))).scalars().all()
+        available = sum((getattr(r, total_attr) or 0) - (getattr(r, used_attr) or 0) for r in rows)
+        if available >= required:
+            notes.append(f"{label}检查通过: {available_label} {available:{fmt}}{unit} >= 所需 {required:{fmt}}{unit}")
+        else:
+            notes.append(f"{label}不足: {available_label} {available:{fmt}}{unit} < 所需 {required:{fmt}}{unit}")
+            is_feasible = False
+
+    if not notes:
+        notes.append("无容量需求，规划可行")
+    return is_feasible, "\n".join(notes)
+
+
+async def evaluate_plan(
+    db: AsyncSession,
+    plan: CapacityPlan
+) -> Tuple[bool, str, Optional[PlacementResult]]:
+    """
+    评估容量规划可行性: 逐台布局到具体机柜，没有机柜数据时退回汇总容量检查
+
+    Returns:
+        (是否可行, 可行性说明, 布局结果)
+    """
+    cabinet_ids = [plan.target_cabinet_id] if plan.target_cabinet_id else None
+    result = await place_devices(db, plan_devices(plan), cabinet_ids)
+    if result is None:
+        if plan.target_cabinet_id:
+            return False, f"目标机柜 {plan.target_cabinet_id} 不存在", None
+        is_feasible, notes = await aggregate_feasibility(db, plan)
+        return is_feasible, notes, None
+    return result.feasible, result.notes(), result
@@ -0,0 +1,283 @@
+"""
+容量实时遥测汇总
+Capacity Telemetry Roll-up
+
+由实时采集周期驱动，将 CapacityPointBinding 绑定的点位 (或用电设备的有功功率点位)
+汇总为各电力/制冷容量节点的实时负荷、温湿度，并回写 used_* 字段和容量状态
+
+- 点位值变化时只把差值沿 PowerCapacity.parent_id 向上累加，每个点位 O(树深度)
+- 温度、湿度按绑定点位取平均
+- 只有绑定了遥测 (或下级绑定了遥测) 的节点会被回写，其余节点保留人工维护的数值
+- 状态变化时写入 CapacityHistory
+"""
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+
+from ..models.capacity import (
+    CapacityHistory, CapacityPointBinding, CapacityStatus, CapacityType,
+    CoolingCapacity, PowerCapacity
+)
+from ..models.energy import PowerDevice
+from ..models.point import PointRealtime
+from .capacity import capacity_service
+
+METRIC_LOAD = "load_kw"
+METRIC_TEMPERATURE = "temperature"
+METRIC_HUMIDITY = "humidity"
+# 按点位平均的指标
+AVERAGED_METRICS = (METRIC_TEMPERATURE, METRIC_HUMIDITY)
+
+# 容量类型 → (模型, 负荷字段, 总量字段, 默认告警阈值, 默认严重阈值)
+NODE_MODELS = {
+    CapacityType.power: (PowerCapacity, "used_capacity_kw", "total_capacity_kw", 70, 85),
+    CapacityType.cooling: (CoolingCapacity, "used_cooling_kw", "total_cooling_kw", 75, 90),
+}
+# 制冷节点的平均指标回写字段
+AVERAGED_COLUMNS = {METRIC_TEMPERATURE: "current_temperature", METRIC_HUMIDITY: "current_humidity"}
+
+NodeKey = Tuple[CapacityType, int]
+
+
+class CapacityTelemetry:
+    """
+    容量节点实时遥测汇总
+
+    用法 (实时采集周期):
+        await capacity_telemetry.ingest_point_values(session, {point_id: value})
+        transitions = await capacity_telemetry.flush(session)
+    """
+
+    MAPPING_TTL = 300
+
+    def __init__(self):
+        # 点位ID → [(节点, 指标, 换算系数)]
+        self._targets: Dict[int, List[Tuple[NodeKey, str, float]]] = {}
+        # 节点 → 自身及全部上级节点 (负荷差值沿此路径累加)
+        self._lineage: Dict[NodeKey, Tuple[NodeKey, ...]] = {}
+        # 节点 → (名称, 总量, 告警阈值, 严重阈值)
+        self._limits: Dict[NodeKey, Tuple[str, Optional[float], float, float]] = {}
+        self._values: Dict[int, float] = {}
+        self._load: Dict[NodeKey, float] = {}
+        self._sums: Dict[Tuple[NodeKey, str], float] = defaultdict(float)
+        self._counts: Dict[Tuple[NodeKey, str], int] = defaultdict(int)
+        self._status: Dict[NodeKey, CapacityStatus] = {}
+        self._dirty: Set[NodeKey] = set()
+        self._mapping_loaded_at: Optional[float] = None
+        self.updated_at: Optional[datetime] = None
+
+    def invalidate_mapping(self) -> None:
+        """点位绑定、容量节点层级或阈值变更后调用"""
+        self._mapping_loaded_at = None
+
+    # ==================== 采集 ====================
+
+    async def ingest_point_values(self, session, point_values: Dict[int, float]) -> int:
+        """
+        写入一个采集周期的点位值
+
+        Args:
+            session: 数据库会话 (仅在映射过期时查询)
+            point_values: 点位ID → 当前值
+
+        Returns:
+            受影响的容量节点数
+        """
+        await self._ensure_mapping(session)
+        for point_id, value in point_values.items():
+            if point_id in self._targets and value is not None:
+                self._apply(point_id, float(value))
+        return len(self._dirty)
+
+    def _apply(self, point_id: int, value: float) -> None:
+        """按差值更新点位所绑定节点的汇总值"""
+        old = self._values.get(point_id)
+        if old == value:
+            return
+        self._values[point_id] = value
+
+        for key, metric, scale in self._targets[point_id]:
+            delta = (value - (old or 0.0)) * scale
+            if metric == METRIC_LOAD:
+                for node in self._lineage[key]:
+                    self._load[node] += delta
+                    self._dirty.add(node)
+            else:
+                if old is None:
+                    self._counts[(key, metric)] += 1
+                self._sums[(key, metric)] += delta
+                self._dirty.add(key)
+
+    # ==================== 回写 ====================
+
+    def _average(self, key: NodeKey, metric: str) -> Optional[float]:
+        count = self._counts.get((key, metric))
+        return round(self._sums[(key, metric)] / count, 2) if count else None
+
+    async def flush(self, session) -> List[Dict[str, Any]]:
+        """
+        将变化节点的负荷、温湿度和状态批量回写 (由调用方提交事务)
+
+        Returns:
+            状态变化列表
+        """
+        if not self._dirty:
+            return []
+
+        rows: Dict[CapacityType, Dict[tuple, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+        transitions = []
+        statuses = {}
+        now = datetime.now()
+        for key in self._dirty:
+            capacity_type, capacity_id = key
+            _, used_attr, _, _, _ = NODE_MODELS[capacity_type]
+            name, total, warning, critical = self._limits[key]
+            values: Dict[str, Any] = {"id": capacity_id}
+
+            if key in self._load:
+                load = round(self._load[key], 3)
+                status = capacity_service._calculate_status(load, total or 0, warning, critical)
+                values[used_attr] = load
+                values["status"] = status
+                previous = self._status.get(key)
+                if status != previous:
+                    statuses[key] = status
+                    transitions.append({
+                        "capacity_type": capacity_type.value, "capacity_id": capacity_id, "name": name,
+                        "from": previous.value if previous else None, "to": status.value,
+                    })
+                    session.add(CapacityHistory(
+                        capacity_type=capacity_type, reference_id=capacity_id, reference_name=name,
+                        total_value=total, used_value=load,
+                        usage_rate=round(load / total * 100, 2) if total else None, recorded_at=now,
+                    ))
+            if capacity_type == CapacityType.cooling:
+                for metric, column in AVERAGED_COLUMNS.items():
+                    average = self._average(key, metric)
+                    if average is not None:
+                        values[column] = average
+
+            rows[capacity_type][tuple(sorted(values))].append(values)
+
+        # 同一组字段的节点合并为一次按主键的批量更新
+        for capacity_type, groups in rows.items():
+            model = NODE_MODELS[capacity_type][0]
+            for batch in groups.values():
+                await session.execute(update(model), batch)
+        await session.flush()
+
+        # 写入成功后才更新内存状态，写入失败时下次重试并重新产生状态变化
+        self._status.update(statuses)
+        self._dirty.clear()
+        self.updated_at = now
+        return transitions
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前各节点的实时汇总值"""
+        nodes: Dict[str, List[Dict[str, Any]]] = {t.value: [] for t in NODE_MODELS}
+        for key, (name, total, _, _) in sorted(self._limits.items(), key=lambda x: (x[0][0].value, x[0][1])):
+            capacity_type, capacity_id = key
+            load = self._load.get(key)
+            item = {
+                "id": capacity_id,
+                "name": name,
+                "total": total,
+                "load_kw": round(load, 3) if load is not None else None,
+                "usage_rate": round(load / total * 100, 2) if load is not None and total else None,
+                "status": self._status[key].value if key in self._status else None,
+            }
+            if capacity_type == CapacityType.cooling:
+                item.update({metric: self._average(key, metric) for metric in AVERAGED_METRICS})
+            nodes[capacity_type.value].append(item)
+        return {"updated_at": self.updated_at, **nodes}
+
+    # ==================== 映射 ====================
+
+    async def _ensure_mapping(self, session) -> None:
+        now = time.monotonic()
+        if self._mapping_loaded_at is not None and now - self._mapping_loaded_at < self.MAPPING_TTL:
+            return
+
+        result = await session.execute(
+            select(
+                CapacityPointBinding.capacity_type, CapacityPointBinding.capacity_id,
+                CapacityPointBinding.metric, CapacityPointBinding.scale,
+                CapacityPointBinding.point_id, PowerDevice.power_point_id
+            )
+            .outerjoin(PowerDevice, CapacityPointBinding.power_device_id == PowerDevice.id)
+            .where(CapacityPointBinding.capacity_type.in_(list(NODE_MODELS)))
+        )
+        bindings = result.all()
+
+        parents: Dict[NodeKey, Optional[NodeKey]] = {}
+        limits = {}
+        statuses = {}
+        for capacity_type, (model, _, total_attr, warning, critical) in NODE_MODELS.items():
+            columns = [model.id, model.name, getattr(model, total_attr),
+                       model.warning_threshold, model.critical_threshold, model.status]
+            if model is PowerCapacity:
+                columns.append(model.parent_id)
+            for row in (await session.execute(select(*columns))).all():
+                key = (capacity_type, row[0])
+                limits[key] = (row[1], row[2], row[3] or warning, row[4] or critical)
+                if row[5] is not None:
+                    statuses[key] = row[5]
+                parents[key] = (capacity_type, row[6]) if len(row) > 6 and row[6] is not None else None
+
+        def lineage(key: NodeKey) -> Tuple[NodeKey, ...]:
+            path = []
+            while key is not None and key in limits and key not in path:
+                path.append(key)
+                key = parents.get(key)
+            return tuple(path)
+
+        targets: Dict[int, List[Tuple[NodeKey, str, float]]] = defaultdict(list)
+        for capacity_type, capacity_id, metric, scale, point_id, device_point_id in bindings:
+            key = (capacity_type, capacity_id)
+            point_id = point_id or device_point_id
+            if point_id is None or key not in limits:
+                continue
+            targets[point_id].append((key, metric or METRIC_LOAD, scale if scale is not None else 1.0))
+
+        self._targets = dict(targets)
+        self._limits = limits
+        self._status = statuses
+        self._lineage = {}
+        self._load = {}
+        self._values = {}
+        self._sums = defaultdict(float)
+        self._counts = defaultdict(int)
+        self._dirty = set()
+        for entries in self._targets.values():
+            for key, metric, _ in entries:
+                if metric == METRIC_LOAD:
+                    self._lineage[key] = lineage(key)
+                    for node in self._lineage[key]:
+                        self._load[node] = 0.0
+                        self._dirty.add(node)
+                else:
+                    self._dirty.add(key)
+
+        # 以当前实时值重建全部汇总
+        if self._targets:
+            result = await session.execute(
+                select(PointRealtime.point_id, PointRealtime.value)
+                .where(PointRealtime.point_id.in_(list(self._targets)))
+            )
+            for point_id, value in result.all():
+                if value is not None:
+                    self._apply(point_id, float(value))
+
+        self._mapping_loaded_at = now
+
+
+# 全局容量遥测汇总
+capacity_telemetry = CapacityTelemetry()
+
+
+def invalidate_capacity_telemetry() -> None:
+    """容量节点或点位绑定变更后调用"""
+    capacity_telemetry.invalidate_mapping()
@@ -0,0 +1,897 @@
+"""
+15分钟需量计算引擎
+15-minute Demand Engine
+
+从计量点原始有功功率计算需量，替代演示数据中写死的需量字段:
+- 固定窗口需量: 每个15分钟时段的时间加权平均功率 (Demand15MinData.average_power)
+- 滑差需量: 15分钟窗口按1分钟滑动，取窗口终点落在该时段内的最大值 (Demand15MinData.rolling_demand)
+- 当日/当月最大需量与超申报标记 (is_max_of_day / is_max_of_month / is_over_declared)
+- 月度汇总写入 DemandHistory (最大/平均/P95/超申报次数/需量电费)
+
+批量计算使用 NumPy 累积和，实时数据通过 DemandStream 增量计算，每条读数 O(1)。
+"""
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from sqlalchemy import select, and_, delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.energy import MeterPoint, Demand15MinData, DemandHistory, PowerCurveData
+
+logger = logging.getLogger(__name__)
+
+SLOT_MINUTES = 15
+# 需量窗口 (分钟) 与滑差步长 (分钟)
+DEMAND_WINDOW_MINUTES = 15
+DEMAND_SLIDE_MINUTES = 1
+# 超过申报需量该比例的部分按超需量加价计费
+OVER_DEMAND_TOLERANCE = 1.05
+
+PEAK_PERIODS = ("sharp", "peak")
+
+
+# ==================== 批量计算 (NumPy) ====================
+
+@dataclass
+class DemandSeries:
+    """按15分钟时段输出的需量序列 (仅包含有数据的时段)"""
+    timestamps: np.ndarray          # datetime64[m] 时段起点
+    average_power: np.ndarray       # 固定窗口需量 kW
+    max_power: np.ndarray           # 时段内最大功率 kW
+    min_power: np.ndarray           # 时段内最小功率 kW
+    rolling_demand: np.ndarray      # 滑差需量 kW
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+def _minute_grid(
+    timestamps: np.ndarray,
+    power: np.ndarray,
+    max_gap_minutes: int
+) -> Tuple[np.datetime64, np.ndarray]:
+    """
+    将原始读数映射到分钟网格
+
+    同一分钟多条读数取平均；读数之间按最后值保持，超过 max_gap_minutes 视为缺失 (NaN)。
+
+    Returns:
+        (网格起点, 每分钟功率)
+    """
+    minutes = timestamps.astype('datetime64[m]')
+    origin = minutes[0] - (minutes[0].astype(np.int64) % SLOT_MINUTES)
+    idx = (minutes - origin).astype(np.int64)
+    n = int(idx[-1]) + 1
+    n += (-n) % SLOT_MINUTES
+
+    sums = np.bincount(idx, weights=power, minlength=n)
+    counts = np.bincount(idx, minlength=n)
+    has = counts > 0
+
+    # 前值保持: 每分钟最近一次有读数的分钟下标
+    last = np.where(has, np.arange(n), -1)
+    np.maximum.accumulate(last, out=last)
+    held = (last >= 0) & (np.arange(n) - last < max_gap_minutes)
+
+    values = np.full(n, np.nan)
+    values[has] = sums[has] / counts[has]
+    values[held] = values[last[held]]
+    return origin, values
+
+
+def compute_demand(
+    timestamps,
+    power,
+    window_minutes: int = DEMAND_WINDOW_MINUTES,
+    slide_minutes: int = DEMAND_SLIDE_MINUTES,
+    max_gap_minutes: Optional[int] = None
+) -> DemandSeries:
+    """
+    从原始功率读数计算15分钟固定窗口需量和滑差需量
+
+    Args:
+        timestamps: 读数时间 (任意分辨率，不要求有序)
+        power: 有功功率 kW
+        window_minutes: 需量窗口
+        slide_minutes: 滑差步长
+        max_gap_minutes: 读数保持的最长时间，默认等于需量窗口
+
+    Returns:
+        DemandSeries
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[s]')
+    values = np.asarray(power, dtype=np.float64)
+    keep = ~np.isnan(values)
+    ts, values = ts[keep], values[keep]
+    if not len(ts):
+        empty = np.array([], dtype=np.float64)
+        return DemandSeries(np.array([], dtype='datetime64[m]'), empty, empty, empty, empty)
+
+    order = np.argsort(ts, kind='stable')
+    ts, values = ts[order], values[order]
+    max_gap = max_gap_minutes or window_minutes
+
+    origin, minute_power = _minute_grid(ts, values, max_gap)
+    n = len(minute_power)
+    n_slots = n // SLOT_MINUTES
+    valid = ~np.isnan(minute_power)
+
+    # 累积和: 任意窗口的和/有效分钟数均为 O(1)
+    cs_power = np.concatenate(([0.0], np.cumsum(np.where(valid, minute_power, 0.0))))
+    cs_count = np.concatenate(([0], np.cumsum(valid)))
+
+    # 固定窗口 (15分钟时段)
+    bounds = np.arange(0, n + 1, SLOT_MINUTES)
+    slot_count = np.diff(cs_count[bounds])
+    slot_sum = np.diff(cs_power[bounds])
+    has_slot = slot_count > 0
+    average = np.full(n_slots, np.nan)
+    average[has_slot] = slot_sum[has_slot] / slot_count[has_slot]
+
+    # 滑差窗口: 窗口终点为分钟 e，覆盖 [e-window+1, e]，有效分钟不少于一半才计算
+    ends = np.arange(n)
+    starts = np.maximum(ends + 1 - window_minutes, 0)
+    win_count = cs_count[ends + 1] - cs_count[starts]
+    win_sum = cs_power[ends + 1] - cs_power[starts]
+    ok = (win_count * 2 >= window_minutes) & ((ends + 1) % slide_minutes == 0)
+    sliding = np.full(n, -np.inf)
+    sliding[ok] = win_sum[ok] / win_count[ok]
+    rolling = sliding.reshape(n_slots, SLOT_MINUTES).max(axis=1)
+    rolling = np.where(np.isfinite(rolling), rolling, average)
+
+    # 时段内原始读数的最大/最小值
+    raw_slot = ((ts.astype('datetime64[m]') - origin).astype(np.int64)) // SLOT_MINUTES
+    slot_max = np.full(n_slots, -np.inf)
+    slot_min = np.full(n_slots, np.inf)
+    np.maximum.at(slot_max, raw_slot, values)
+    np.minimum.at(slot_min, raw_slot, values)
+    slot_max = np.where(np.isfinite(slot_max), slot_max, average)
+    slot_min = np.where(np.isfinite(slot_min), slot_min, average)
+
+    slot_times = origin + np.arange(n_slots) * SLOT_MINUTES
+    return DemandSeries(
+        timestamps=slot_times[has_slot],
+        average_power=average[has_slot],
+        max_power=slot_max[has_slot],
+        min_power=slot_min[has_slot],
+        rolling_demand=rolling[has_slot]
+    )
+
+
+def _first_max_of_group(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """每组最大值的首次出现位置标记"""
+    flags = np.zeros(len(values), dtype=bool)
+    if not len(values):
+        return flags
+    _, inverse = np.unique(keys, return_inverse=True)
+    finite = np.where(np.isnan(values), -np.inf, values)
+    group_max = np.full(inverse.max() + 1, -np.inf)
+    np.maximum.at(group_max, inverse, finite)
+    candidates = np.flatnonzero((finite == group_max[inverse]) & np.isfinite(finite))
+    _, first = np.unique(inverse[candidates], return_index=True)
+    flags[candidates[first]] = True
+    return flags
+
+
+def flag_extremes(
+    timestamps: np.ndarray,
+    demand: np.ndarray,
+    declared: Union[float, np.ndarray, None]
+) -> Dict[str, np.ndarray]:
+    """
+    计算当日最大/当月最大/超申报标记
+
+    同一天(月)内出现多个相同最大值时只标记第一个。
+
+    Returns:
+        {is_max_of_day, is_max_of_month, is_over_declared}
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[m]')
+    demand = np.asarray(demand, dtype=np.float64)
+    declared_arr = np.broadcast_to(
+        np.asarray(np.nan if declared is None else declared, dtype=np.float64), demand.shape
+    )
+    return {
+        "is_max_of_day": _first_max_of_group(ts.astype('datetime64[D]'), demand),
+        "is_max_of_month": _first_max_of_group(ts.astype('datetime64[M]'), demand),
+        "is_over_declared": (declared_arr > 0) & (demand > declared_arr),
+    }
+
+
+@dataclass
+class MonthlyDemand:
+    """月度需量汇总"""
+    year: int
+    month: int
+    max_demand: float
+    avg_demand: float
+    demand_95th: float
+    max_demand_time: datetime
+    over_declared_times: int
+    over_declared_max: Optional[float]
+
+
+def monthly_aggregates(
+    timestamps: np.ndarray,
+    demand: np.ndarray,
+    declared: Union[float, np.ndarray, None]
+) -> List[MonthlyDemand]:
+    """按月汇总需量 (最大/平均/P95/超申报)"""
+    ts = np.asarray(timestamps, dtype='datetime64[m]')
+    demand = np.asarray(demand, dtype=np.float64)
+    declared_arr = np.broadcast_to(
+        np.asarray(np.nan if declared is None else declared, dtype=np.float64), demand.shape
+    )
+    keep = ~np.isnan(demand)
+    ts, demand, declared_arr = ts[keep], demand[keep], declared_arr[keep]
+    if not len(ts):
+        return []
+
+    months = ts.astype('datetime64[M]')
+    order = np.argsort(months, kind='stable')
+    ts, demand, declared_arr, months = ts[order], demand[order], declared_arr[order], months[order]
+    uniq, starts = np.unique(months, return_index=True)
+    ends = np.append(starts[1:], len(months))
+
+    result = []
+    for month, lo, hi in zip(uniq, starts, ends):
+        values = demand[lo:hi]
+        over = values - declared_arr[lo:hi]
+        over_mask = (declared_arr[lo:hi] > 0) & (over > 0)
+        peak = int(np.argmax(values))
+        month_start = month.astype(datetime)
+        result.append(MonthlyDemand(
+            year=month_start.year,
+            month=month_start.month,
+            max_demand=float(values[peak]),
+            avg_demand=float(values.mean()),
+            demand_95th=float(np.percentile(values, 95)),
+            max_demand_time=ts[lo + peak].astype(datetime),
+            over_declared_times=int(over_mask.sum()),
+            over_declared_max=float(over[over_mask].max()) if over_mask.any() else None
+        ))
+    return result
+
+
+def demand_charges(
+    max_demand: float,
+    declared: Optional[float],
+    demand_price: float,
+    over_multiplier: float
+) -> Tuple[float, float]:
+    """
+    月度需量电费
+
+    申报需量 OVER_DEMAND_TOLERANCE 倍以内按需量电价计费，超出部分按加价倍数计费。
+
+    Returns:
+        (需量电费, 超需量罚款)
+    """
+    if not declared:
+        return round(max_demand * demand_price, 2), 0.0
+    limit = declared * OVER_DEMAND_TOLERANCE
+    billed = min(max_demand, limit)
+    over = max(0.0, max_demand - limit)
+    return round(billed * demand_price, 2), round(over * demand_price * over_multiplier, 2)
+
+
+# ==================== 增量计算 ====================
+
+@dataclass
+class DemandSlot:
+    """DemandStream 输出的一个已结束15分钟时段"""
+    timestamp: datetime
+    average_power: float
+    max_power: float
+    min_power: float
+    rolling_demand: float
+    is_max_of_day: bool
+    is_max_of_month: bool
+    is_over_declared: bool
+    # 被新最大值取代的旧最大值时段 (需清除其标记)
+    replaced_day_max: Optional[datetime] = None
+    replaced_month_max: Optional[datetime] = None
+
+
+@dataclass
+class _MonthState:
+    key: Tuple[int, int]
+    count: int = 0
+    total: float = 0.0
+    max_demand: float = float("-inf")
+    max_time: Optional[datetime] = None
+    over_times: int = 0
+    over_max: Optional[float] = None
+    values: List[float] = field(default_factory=list)
+
+
+class DemandStream:
+    """
+    单个计量点的增量需量计算
+
+    每条读数 O(1): 维护最近 window 分钟的环形缓冲和运行和，时段结束时输出 DemandSlot。
+    读数间隔内的分钟按最后值保持 (最多 max_gap 分钟)，与 compute_demand 的批量结果一致。
+    时段在下一时段的首条读数到达时输出。
+    """
+
+    def __init__(
+        self,
+        declared_demand: Optional[float] = None,
+        window_minutes: int = DEMAND_WINDOW_MINUTES,
+        slide_minutes: int = DEMAND_SLIDE_MINUTES,
+        max_gap_minutes: Optional[int] = None
+    ):
+        self.declared_demand = declared_demand
+        self.window_minutes = window_minutes
+        self.slide_minutes = slide_minutes
+        self.max_gap_minutes = max_gap_minutes or window_minutes
+
+        self._window: deque = deque(maxlen=window_minutes)
+        self._window_sum = 0.0
+        self._window_count = 0
+
+        # 当前分钟
+        self._minute: Optional[datetime] = None
+        self._minute_sum = 0.0
+        self._minute_count = 0
+        self._minute_max = float("-inf")
+        self._minute_min = float("inf")
+        self._last_value: Optional[float] = None
+        self._last_minute: Optional[datetime] = None
+
+        # 当前时段
+        self._slot: Optional[datetime] = None
+        self._slot_sum = 0.0
+        self._slot_count = 0
+        self._slot_max = float("-inf")
+        self._slot_min = float("inf")
+        self._slot_rolling = float("-inf")
+
+        # 当日/当月
+        self._day: Optional[date] = None
+        self._day_max = float("-inf")
+        self._day_max_time: Optional[datetime] = None
+        self._month: Optional[_MonthState] = None
+
+    # ---------- 状态恢复 ----------
+
+    def seed(self, slots: List[Tuple[datetime, float]]) -> None:
+        """用已落库的时段需量 (时间, 滑差需量) 恢复当日/当月状态，需按时间升序"""
+        for ts, demand in slots:
+            if demand is None:
+                continue
+            self._update_extremes(ts, float(demand))
+
+    # ---------- 读数 ----------
+
+    def push(self, timestamp: datetime, power: float) -> List[DemandSlot]:
+        """
+        写入一条原始功率读数
+
+        Returns:
+            本次读数导致结束的时段 (通常为空或一个)
+        """
+        minute = timestamp.replace(second=0, microsecond=0)
+        closed: List[DemandSlot] = []
+
+        if self._minute is None:
+            self._start_minute(minute)
+        elif minute > self._minute:
+            self._finish_minute(closed)
+            gap = int((minute - self._minute).total_seconds() // 60)
+            # 中间分钟按最后值保持；超过保持时长+窗口后已不影响任何时段，直接跳过
+            limit = min(gap - 1, self.max_gap_minutes + self.window_minutes)
+            for step in range(1, limit + 1):
+                held = self._last_value if step < self.max_gap_minutes else None
+                self._advance(self._minute + timedelta(minutes=step), held, closed)
+            if gap - 1 > limit:
+                self._close_slot(closed)
+                self._reset_window()
+            elif self._slot is not None and self._slot_start(minute) != self._slot:
+                # 下一时段的首条读数到达，上一时段已不会再变化
+                self._close_slot(closed)
+            self._start_minute(minute)
+        elif minute < self._minute:
+            logger.debug(f"忽略乱序读数: {timestamp}")
+            return closed
+
+        self._minute_sum += power
+        self._minute_count += 1
+        self._minute_max = max(self._minute_max, power)
+        self._minute_min = min(self._minute_min, power)
+        return closed
+
+    def month_summary(self) -> Optional[MonthlyDemand]:
+        """当前月的汇总 (P95 按当月已结束时段计算)"""
+        state = self._month
+        if state is None or not state.count:
+            return None
+        return MonthlyDemand(
+            year=state.key[0],
+            month=state.key[1],
+            max_demand=state.max_demand,
+            avg_demand=state.total / state.count,
+            demand_95th=float(np.percentile(state.values, 95)),
+            max_demand_time=state.max_time,
+            over_declared_times=state.over_times,
+            over_declared_max=state.over_max
+        )
+
+    # ---------- 内部 ----------
+
+    @staticmethod
+    def _slot_start(minute: datetime) -> datetime:
+        return minute.replace(minute=minute.minute - minute.minute % SLOT_MINUTES)
+
+    def _start_minute(self, minute: datetime) -> None:
+        self._minute = minute
+        self._minute_sum = 0.0
+        self._minute_count = 0
+        self._minute_max = float("-inf")
+        self._minute_min = float("inf")
+
+    def _finish_minute(self, closed: List[DemandSlot]) -> None:
+        value = self._minute_sum / self._minute_count if self._minute_count else None
+        if value is not None:
+            self._last_value = value
+        self._advance(self._minute, value, closed)
+        self._slot_max = max(self._slot_max, self._minute_max)
+        self._slot_min = min(self._slot_min, self._minute_min)
+
+    def _reset_window(self) -> None:
+        self._window.clear()
+        self._window_sum = 0.0
+        self._window_count = 0
+
+    def _advance(self, minute: datetime, value: Optional[float], closed: List[DemandSlot]) -> None:
+        """推进一分钟: 更新窗口运行和，跨时段时结算上一时段"""
+        slot = self._slot_start(minute)
+        if self._slot is not None and slot != self._slot:
+            self._close_slot(closed)
+        if self._slot is None:
+            self._slot = slot
+
+        if len(self._window) == self._window.maxlen:
+            dropped = self._window[0]
+            if dropped is not None:
+                self._window_sum -= dropped
+                self._window_count -= 1
+        self._window.append(value)
+        if value is not None:
+            self._window_sum += value
+            self._window_count += 1
+            self._slot_sum += value
+            self._slot_count += 1
+
+        minute_index = minute.hour * 60 + minute.minute
+        if self._window_count * 2 >= self.window_minutes and (minute_index + 1) % self.slide_minutes == 0:
+            self._slot_rolling = max(self._slot_rolling, self._window_sum / self._window_count)
+
+    def _close_slot(self, closed: List[DemandSlot]) -> None:
+        if self._slot is None:
+            return
+        slot = self._slot
+        if self._slot_count:
+            average = self._slot_sum / self._slot_count
+            rolling = self._slot_rolling if self._slot_rolling != float("-inf") else average
+            result = self._update_extremes(slot, rolling)
+            closed.append(DemandSlot(
+                timestamp=slot,
+                average_power=average,
+                max_power=self._slot_max if self._slot_max != float("-inf") else average,
+                min_power=self._slot_min if self._slot_min != float("inf") else average,
+                rolling_demand=rolling,
+                **result
+            ))
+
+        self._slot = None
+        self._slot_sum = 0.0
+        self._slot_count = 0
+        self._slot_max = float("-inf")
+        self._slot_min = float("inf")
+        self._slot_rolling = float("-inf")
+
+    def _update_extremes(self, slot: datetime, demand: float) -> Dict:
+        """更新当日/当月最大值和月度统计，返回该时段的标记"""
+        if self._day != slot.date():
+            self._day = slot.date()
+            self._day_max = float("-inf")
+            self._day_max_time = None
+        month_key = (slot.year, slot.month)
+        if self._month is None or self._month.key != month_key:
+            self._month = _MonthState(key=month_key)
+
+        result = {
+            "is_max_of_day": False,
+            "is_max_of_month": False,
+            "is_over_declared": bool(self.declared_demand and demand > self.declared_demand),
+            "replaced_day_max": None,
+            "replaced_month_max": None,
+        }
+        if demand > self._day_max:
+            result["is_max_of_day"] = True
+            result["replaced_day_max"] = self._day_max_time
+            self._day_max, self._day_max_time = demand, slot
+
+        state = self._month
+        if demand > state.max_demand:
+            result["is_max_of_month"] = True
+            result["replaced_month_max"] = state.max_time
+            state.max_demand, state.max_time = demand, slot
+        state.count += 1
+        state.total += demand
+        state.values.append(demand)
+        if result["is_over_declared"]:
+            over = demand - self.declared_demand
+            state.over_times += 1
+            state.over_max = over if state.over_max is None else max(state.over_max, over)
+        return result
+
+
+# ==================== 服务 ====================
+
+# 进程内每个计量点的增量计算状态
+_streams: Dict[int, DemandStream] = {}
+
+
+def _month_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """扩展到整月 [首月1日, 末月次月1日)，保证月度标记和汇总完整"""
+    first = datetime(start_date.year, start_date.month, 1)
+    if end_date.month == 12:
+        last = datetime(end_date.year + 1, 1, 1)
+    else:
+        last = datetime(end_date.year, end_date.month + 1, 1)
+    return first, last
+
+
+class DemandEngine:
+    """
+    需量计算服务
+
+    用法:
+        engine = DemandEngine(db)
+        await engine.recompute(meter_point_id, start_date, end_date)   # 从原始功率批量重算
+        await engine.reflag(meter_point_id, start_date, end_date)      # 仅按已有需量重算标记和月度汇总
+        await engine.ingest(meter_point_id, timestamp, power)          # 实时读数增量计算
+    以上方法均不提交事务。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._prices: Optional[Tuple[float, float]] = None
+
+    # ==================== 批量重算 ====================
+
+    async def recompute(
+        self,
+        meter_point_id: int,
+        start_date: date,
+        end_date: date
+    ) -> Dict:
+        """
+        从 PowerCurveData 中计量点级原始功率重算需量
+
+        范围扩展到整月后删除并重写 Demand15MinData，更新 DemandHistory 月度汇总。
+        无原始功率数据时回退为 reflag。
+        """
+        meter = await self._get_meter(meter_point_id)
+        start, end = _month_range(start_date, end_date)
+
+        result = await self.db.execute(
+            select(
+                PowerCurveData.timestamp,
+                PowerCurveData.active_power,
+                PowerCurveData.time_period
+            ).where(
+                and_(
+                    PowerCurveData.meter_point_id == meter_point_id,
+                    PowerCurveData.device_id.is_(None),
+                    PowerCurveData.timestamp >= start,
+                    PowerCurveData.timestamp < end,
+                    PowerCurveData.active_power.isnot(None)
+                )
+            )
+        )
+        rows = result.all()
+        if not rows:
+            summary = await self.reflag(meter_point_id, start_date, end_date)
+            summary["source"] = "demand_15min_data"
+            return summary
+
+        stamps = np.array([r[0] for r in rows], dtype='datetime64[s]')
+        series = compute_demand(stamps, np.array([r[1] for r in rows], dtype=np.float64))
+        declared = meter.declared_demand if meter else None
+        flags = flag_extremes(series.timestamps, series.rolling_demand, declared)
+
+        # 各时段的分时标识取该时段最后一条原始读数
+        periods: Dict[datetime, str] = {}
+        for ts, _, period in sorted(rows, key=lambda r: r[0]):
+            if period:
+                periods[ts.replace(minute=ts.minute - ts.minute % SLOT_MINUTES, second=0, microsecond=0)] = period
+
+        slot_times = series.timestamps.astype(datetime)
+        records = []
+        for i, ts in enumerate(slot_times):
+            period = periods.get(ts)
+            rolling = float(series.rolling_demand[i])
+            records.append({
+                "meter_point_id": meter_point_id,
+                "timestamp": ts,
+                "average_power": round(float(series.average_power[i]), 2),
+                "max_power": round(float(series.max_power[i]), 2),
+                "min_power": round(float(series.min_power[i]), 2),
+                "rolling_demand": round(rolling, 2),
+                "declared_demand": declared,
+                "demand_ratio": round(rolling / declared * 100, 2) if declared else None,
+                "is_peak_period": period in PEAK_PERIODS,
+                "time_period": period,
+                "is_max_of_day": bool(flags["is_max_of_day"][i]),
+                "is_max_of_month": bool(flags["is_max_of_month"][i]),
+                "is_over_declared": bool(flags["is_over_declared"][i]),
+            })
+
+        await self.db.execute(
+            delete(Demand15MinData).where(
+                and_(
+                    Demand15MinData.meter_point_id == meter_point_id,
+                    Demand15MinData.timestamp >= start,
+                    Demand15MinData.timestamp < end
+                )
+            )
+        )
+        if records:
+            await self.db.execute(insert(Demand15MinData), records)
+
+        months = monthly_aggregates(series.timestamps, series.rolling_demand, declared)
+        for summary in months:
+            await self._write_history(meter_point_id, declared, summary)
+        await self._invalidate_profiles(meter_point_id, start, end)
+        self.reset_streams(meter_point_id)
+
+        return {
+            "meter_point_id": meter_point_id,
+            "source": "power_curve_data",
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "raw_points": len(rows),
+            "slots": len(records),
+            "months": len(months),
+        }
+
+    async def reflag(
+        self,
+        meter_point_id: int,
+        start_date: date,
+        end_date: date
+    ) -> Dict:
+        """
+        按 Demand15MinData 已有滑差需量重算标记、需量占比和 DemandHistory
+
+        用于没有原始功率、直接导入15分钟需量的场景。
+        """
+        meter = await self._get_meter(meter_point_id)
+        start, end = _month_range(start_date, end_date)
+
+        result = await self.db.execute(
+            select(
+                Demand15MinData.id,
+                Demand15MinData.timestamp,
+                Demand15MinData.rolling_demand,
+                Demand15MinData.average_power,
+                Demand15MinData.declared_demand
+            ).where(
+                and_(
+                    Demand15MinData.meter_point_id == meter_point_id,
+                    Demand15MinData.timestamp >= start,
+                    Demand15MinData.timestamp < end
+                )
+            ).order_by(Demand15MinData.timestamp)
+        )
+        rows = result.all()
+        if not rows:
+            return {"meter_point_id": meter_point_id, "slots": 0, "months": 0}
+
+        demand = np.array([r[2] if r[2] is not None else r[3] for r in rows], dtype=np.float64)
+        stamps = np.array([r[1] for r in rows], dtype='datetime64[m]')
+        if meter and meter.declared_demand:
+            declared = np.full(len(rows), float(meter.declared_demand))
+        else:
+            declared = np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=np.float64)
+        flags = flag_extremes(stamps, demand, declared)
+
+        updates = []
+        for i, row in enumerate(rows):
+            has_declared = not np.isnan(declared[i]) and declared[i] > 0
+            updates.append({
+                "id": row[0],
+                "rolling_demand": float(demand[i]),
+                "declared_demand": float(declared[i]) if has_declared else None,
+                "demand_ratio": round(demand[i] / declared[i] * 100, 2) if has_declared else None,
+                "is_max_of_day": bool(flags["is_max_of_day"][i]),
+                "is_max_of_month": bool(flags["is_max_of_month"][i]),
+                "is_over_declared": bool(flags["is_over_declared"][i]),
+            })
+        await self.db.execute(update(Demand15MinData), updates)
+        await self._invalidate_profiles(meter_point_id, start, end)
+
+        months = monthly_aggregates(stamps, demand, declared)
+        for summary in months:
+            month_declared = meter.declared_demand if meter and meter.declared_demand else None
+            await self._write_history(meter_point_id, month_declared, summary)
+        self.reset_streams(meter_point_id)
+
+        return {
+            "meter_point_id": meter_point_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "slots": len(rows),
+            "months": len(months),
+        }
+
+    # ==================== 增量计算 ====================
+
+    async def ingest(
+        self,
+        meter_point_id: int,
+        timestamp: datetime,
+        power: float,
+        time_period: Optional[str] = None
+    ) -> List[DemandSlot]:
+        """
+        写入一条计量点实时功率读数
+
+        读数本身 O(1)；时段结束时写入 Demand15MinData、清除被取代的最大值标记、
+        更新当月 DemandHistory 和日负荷曲线。
+
+        Args:
+            time_period: 电价时段，默认按编译电价取各结束时段的时段类型
+        """
+        stream = await self._get_stream(meter_point_id)
+        closed = stream.push(timestamp, power)
+        if not closed:
+            return closed
+
+        from .load_profile_service import LoadProfileService, SUBJECT_METER
+        from .tariff_compiler import get_tariff
+        profiles = LoadProfileService(self.db)
+        declared = stream.declared_demand
+
+        for slot in closed:
+            period = time_period
+            if period is None:
+                period = (await get_tariff(self.db, slot.timestamp.date())).period_at(slot.timestamp)
+            for column, replaced in (
+                (Demand15MinData.is_max_of_day, slot.replaced_day_max),
+                (Demand15MinData.is_max_of_month, slot.replaced_month_max),
+            ):
+                if replaced is not None:
+                    await self.db.execute(
+                        update(Demand15MinData)
+                        .where(and_(
+                            Demand15MinData.meter_point_id == meter_point_id,
+                            Demand15MinData.timestamp == replaced
+                        ))
+                        .values({column.key: False})
+                    )
+
+            self.db.add(Demand15MinData(
+                meter_point_id=meter_point_id,
+                timestamp=slot.timestamp,
+                average_power=round(slot.average_power, 2),
+                max_power=round(slot.max_power, 2),
+                min_power=round(slot.min_power, 2),
+                rolling_demand=round(slot.rolling_demand, 2),
+                declared_demand=declared,
+                demand_ratio=round(slot.rolling_demand / declared * 100, 2) if declared else None,
+                is_peak_period=period in PEAK_PERIODS,
+                time_period=period,
+                is_max_of_day=slot.is_max_of_day,
+                is_max_of_month=slot.is_max_of_month,
+                is_over_declared=slot.is_over_declared
+            ))
+            # 下一时段可能需要清除本时段的最大值标记
+            await self.db.flush()
+            await profiles.ingest(
+                SUBJECT_METER, meter_point_id, slot.timestamp,
+                slot.rolling_demand, slot.max_power, slot.min_power
+            )
+
+        summary = stream.month_summary()
+        if summary is not None:
+            await self._write_history(meter_point_id, declared, summary)
+        return closed
+
+    @staticmethod
+    def reset_streams(meter_point_id: Optional[int] = None) -> None:
+        """丢弃增量计算状态 (申报需量变更或数据重算后调用)"""
+        if meter_point_id is None:
+            _streams.clear()
+        else:
+            _streams.pop(meter_point_id, None)
+
+    async def _get_stream(self, meter_point_id: int) -> DemandStream:
+        """获取计量点的增量状态，首次使用时从当月已落库数据恢复"""
+        stream = _streams.get(meter_point_id)
+        if stream is not None:
+            return stream
+
+        meter = await self._get_meter(meter_point_id)
+        stream = DemandStream(declared_demand=meter.declared_demand if meter else None)
+        today = date.today()
+        result = await self.db.execute(
+            select(Demand15MinData.timestamp, Demand15MinData.rolling_demand).where(
+                and_(
+                    Demand15MinData.meter_point_id == meter_point_id,
+                    Demand15MinData.timestamp >= datetime(today.year, today.month, 1)
+                )
+            ).order_by(Demand15MinData.timestamp)
+        )
+        stream.seed([(r[0], r[1]) for r in result.all()])
+        _streams[meter_point_id] = stream
+        return stream
+
+    # ==================== 内部工具 ====================
+
+    async def _get_meter(self, meter_point_id: int) -> Optional[MeterPoint]:
+        result = await self.db.execute(select(MeterPoint).where(MeterPoint.id == meter_point_id))
+        return result.scalar_one_or_none()
+
+    async def _get_prices(self) -> Tuple[float, float]:
+        if self._prices is None:
+            from .demand_analysis_service import DemandAnalysisService
+            service = DemandAnalysisService(self.db)
+            self._prices = (
+                await service.get_demand_price(),
+                await service.get_over_demand_multiplier()
+            )
+        return self._prices
+
+    async def _write_history(
+        self,
+        meter_point_id: int,
+        declared: Optional[float],
+        summary: MonthlyDemand
+    ) -> DemandHistory:
+        """写入或更新月度 DemandHistory"""
+        result = await self.db.execute(
+            select(DemandHistory).where(
+                and_(
+                    DemandHistory.meter_point_id == meter_point_id,
+                    DemandHistory.stat_year == summary.year,
+                    DemandHistory.stat_month == summary.month
+                )
+            )
+        )
+        history = result.scalars().first()
+        if history is None:
+            history = DemandHistory(
+                meter_point_id=meter_point_id,
+                stat_year=summary.year,
+                stat_month=summary.month
+            )
+            self.db.add(history)
+
+        demand_price, over_multiplier = await self._get_prices()
+        demand_cost, penalty = demand_charges(summary.max_demand, declared, demand_price, over_multiplier)
+
+        history.declared_demand = declared
+        history.max_demand = round(summary.max_demand, 2)
+        history.avg_demand = round(summary.avg_demand, 2)
+        history.demand_95th = round(summary.demand_95th, 2)
+        history.max_demand_time = summary.max_demand_time
+        history.over_declared_times = summary.over_declared_times
+        history.over_declared_max = round(summary.over_declared_max, 2) if summary.over_declared_max is not None else None
+        history.demand_cost = demand_cost
+        history.over_demand_penalty = penalty
+        return history
+
+    async def _invalidate_profiles(self, meter_point_id: int, start: datetime, end: datetime) -> None:
+        """重写需量后丢弃对应日期的物化日负荷曲线"""
+        from .load_profile_service import LoadProfileService, SUBJECT_METER
+        await LoadProfileService(self.db).invalidate(
+            SUBJECT_METER, meter_point_id, start.date(), (end - timedelta(days=1)).date()
+        )
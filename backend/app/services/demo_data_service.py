@@ -20,12 +20,13 @@ from ..models.energy import (
     MeasureExecutionLog, EnergyOpportunity, OpportunityMeasure, ExecutionPlan,
     ExecutionTask, ExecutionResult, DispatchableDevice, StorageSystemConfig,
     PVSystemConfig, DispatchSchedule, RealtimeMonitoring, MonthlyStatistics,
-    OptimizationResult
+    OptimizationResult, LoadProfileDay, TypicalDayProfile
 )
 from ..models.alarm import Alarm
 from ..data.building_points import get_all_points, get_threshold_for_point
 from .floor_map_generator import FloorMapGenerator, FLOOR_CONFIG
 from .point_device_matcher import PointDeviceMatcher
+from .tariff_compiler import invalidate_tariff_cache
 
 import logging
 logger = logging.getLogger(__name__)
@@ -485,6 +486,8 @@ class DemoDataService:
             await session.execute(delete(Demand15MinData))
             await session.execute(delete(OverDemandEvent))
             await session.execute(delete(DemandHistory))
+            await session.execute(delete(TypicalDayProfile))
+            await session.execute(delete(LoadProfileDay))
 
             # 6. 清理设备负荷/曲线表
             await session.execute(delete(DeviceShiftConfig))
@@ -519,6 +522,7 @@ class DemoDataService:
             await session.execute(delete(FloorMap))
 
             await session.commit()
+            invalidate_tariff_cache()
 
     async def _create_points(self, progress_callback) -> int:
         """创建点位"""
@@ -696,6 +700,7 @@ class DemoDataService:
             self._update_progress(45, f"创建 {len(ELECTRICITY_PRICING)} 条电价配置", progress_callback)
 
             await session.commit()
+            invalidate_tariff_cache()
 
             # 保存计量点映射供后续使用
             self._meter_point_map = meter_point_map
@@ -845,6 +850,14 @@ class DemoDataService:
                             records.append(record)
 
             session.add_all(records)
+            await session.flush()
+
+            # 按生成的需量重算当日/当月最大值标记和月度需量历史
+            from .demand_engine import DemandEngine
+            engine = DemandEngine(session)
+            for meter_point_id in self._meter_point_map.values():
+                await engine.reflag(meter_point_id, (now - timedelta(days=6)).date(), now.date())
+
             await session.commit()
             self._update_progress(88, f"生成 {len(records)} 条需量数据", progress_callback)
 
@@ -438,21 +438,6 @@ class DeviceRegulationService:
 
     # ========== 设备典型日功率 Profile ==========
 
-    # 默认时段配置（可被电价配置覆盖）
-    DEFAULT_HOUR_PERIODS = {
-        11: "sharp", 18: "sharp",
-        9: "peak", 10: "peak", 17: "peak", 19: "peak", 20: "peak",
-        8: "flat", 13: "flat", 14: "flat", 15: "flat", 16: "flat", 21: "flat",
-        22: "valley", 23: "valley", 6: "valley", 7: "valley",
-        0: "deep_valley", 1: "deep_valley", 2: "deep_valley",
-        3: "deep_valley", 4: "deep_valley", 5: "deep_valley",
-        12: "flat",
-    }
-
-    def _get_hour_period(self, hour: int) -> str:
-        """根据小时返回时段类型"""
-        return self.DEFAULT_HOUR_PERIODS.get(hour, "flat")
-
     async def get_device_typical_profile(
         self, device_id: int, days: int = 30
     ) -> Optional[Dict[str, Any]]:
@@ -466,7 +451,9 @@ class DeviceRegulationService:
         Returns:
             Dict: 典型日功率数据，包含24小时的avg/max/min功率和时段标识
         """
-        from sqlalchemy import extract
+        import numpy as np
+        from .load_profile_service import LoadProfileService, SUBJECT_DEVICE
+        from .tariff_compiler import get_tariff
 
         # 查找设备
         device_result = await self.db.execute(
@@ -478,42 +465,31 @@ class DeviceRegulationService:
 
         rated_power = device.rated_power or 0
         cutoff_date = datetime.now() - timedelta(days=days)
+        tariff = await get_tariff(self.db)
 
-        # 按小时分组聚合
-        result = await self.db.execute(
-            select(
-                extract("hour", EnergyHourly.stat_time).label("hour"),
-                func.avg(EnergyHourly.avg_power).label("avg_power"),
-                func.max(EnergyHourly.max_power).label("max_power"),
-                func.min(EnergyHourly.min_power).label("min_power"),
-                func.count(EnergyHourly.id).label("record_count"),
-            ).where(
-                and_(
-                    EnergyHourly.device_id == device_id,
-                    EnergyHourly.stat_time >= cutoff_date,
-                )
-            ).group_by(
-                extract("hour", EnergyHourly.stat_time)
-            ).order_by(
-                extract("hour", EnergyHourly.stat_time)
-            )
+        # 读取物化的日负荷矩阵 (天数 × 96)，按小时聚合
+        matrix = await LoadProfileService(self.db).get_day_matrix(
+            SUBJECT_DEVICE, device_id, cutoff_date.date(), datetime.now().date()
         )
-
-        rows = result.all()
-        data_days = 0
+        n_days = len(matrix.dates)
+        valid = ~np.isnan(matrix.avg).reshape(n_days, 24, 4)
+        hour_counts = valid.sum(axis=(0, 2))
+        hour_sums = np.where(valid, matrix.avg.reshape(n_days, 24, 4), 0).sum(axis=(0, 2))
+        hour_max = np.where(valid, matrix.max.reshape(n_days, 24, 4), -np.inf).max(axis=(0, 2))
+        hour_min = np.where(valid, matrix.min.reshape(n_days, 24, 4), np.inf).min(axis=(0, 2))
 
         # 构建24小时profile
         hourly_map = {}
-        for row in rows:
-            h = int(row.hour)
-            hourly_map[h] = {
-                "hour": h,
-                "avg_power": round(float(row.avg_power or 0), 2),
-                "max_power": round(float(row.max_power or 0), 2),
-                "min_power": round(float(row.min_power or 0), 2),
-                "period_type": self._get_hour_period(h),
-            }
-            data_days = max(data_days, (row.record_count or 0))
+        for h in range(24):
+            if hour_counts[h]:
+                hourly_map[h] = {
+                    "hour": h,
+                    "avg_power": round(float(hour_sums[h] / hour_counts[h]), 2),
+                    "max_power": round(float(hour_max[h]), 2),
+                    "min_power": round(float(hour_min[h]), 2),
+                    "period_type": tariff.hour_period(h),
+                }
+        data_days = matrix.days_with_data
 
         # 估算数据天数（每小时最多有 days 条记录）
         data_days = min(data_days, days)
@@ -534,7 +510,7 @@ class DeviceRegulationService:
                     "avg_power": round(base * (0.8 + 0.4 * (0.5 - abs(h - 14) / 24)), 2),
                     "max_power": round(base * (1.0 + 0.3 * (0.5 - abs(h - 14) / 24)), 2),
                     "min_power": round(base * (0.5 + 0.2 * (0.5 - abs(h - 14) / 24)), 2),
-                    "period_type": self._get_hour_period(h),
+                    "period_type": tariff.hour_period(h),
                 })
 
         # 汇总指标
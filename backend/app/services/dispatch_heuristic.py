@@ -0,0 +1,366 @@
+"""
+启发式调度求解器
+Heuristic Dispatch Solver
+
+MILP 规模过大或时间预算不足时使用的快速求解器，单日96时段、数百台设备在毫秒级完成:
+- 调节型: 在允许时段内把用电从高价时段转移到低价时段 (日电量不变，受爬坡速率约束)
+- 时移型: 按 "电价 + 抬高需量的代价" 逐时段贪心选取运行时段，再做逐设备重排的局部搜索
+- 削减型: 按削减预算对负荷尖峰做水位削峰
+- 储能: 在离散SOC网格上动态规划求最小电量成本，外层搜索需量上限以平衡需量电费
+
+设备语义与 MILPOptimizer 一致: 时移型不含在基础负荷中，削减型和调节型 (按额定功率) 含在基础负荷中。
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 储能单时段最大功率对应的SOC网格步数
+SOC_STEPS_PER_SLOT = 8
+# 需量上限搜索: 粗扫描点数和黄金分割细化次数
+PEAK_SCAN_POINTS = 7
+PEAK_REFINE_ITERATIONS = 8
+# 时移型设备局部搜索轮数
+LOCAL_SEARCH_ROUNDS = 2
+
+_GOLDEN = (np.sqrt(5) - 1) / 2
+
+
+@dataclass
+class HeuristicPlan:
+    """启发式调度结果 (数组长度均为时段数)"""
+    net_load: np.ndarray                                   # 电网侧净负荷 kW
+    charge: np.ndarray                                     # 储能充电功率 kW
+    discharge: np.ndarray                                  # 储能放电功率 kW
+    soc: Optional[np.ndarray] = None                       # 各时段末SOC
+    shift_on: Dict[int, np.ndarray] = field(default_factory=dict)    # 时移型: 设备序号 -> 是否运行
+    curtail: Dict[int, np.ndarray] = field(default_factory=dict)     # 削减型: 设备序号 -> 削减比例
+    modulate: Dict[int, np.ndarray] = field(default_factory=dict)    # 调节型: 设备序号 -> 运行功率 kW
+    solve_time: float = 0.0
+
+
+class HeuristicDispatcher:
+    """
+    启发式调度求解器
+
+    用法:
+        plan = HeuristicDispatcher(slot_prices, demand_price, storage, devices).solve(base_load)
+    """
+
+    def __init__(
+        self,
+        slot_prices: Sequence[float],
+        demand_price: float,
+        storage=None,
+        devices: Optional[List] = None,
+        slot_duration: float = 0.25
+    ):
+        """
+        Args:
+            slot_prices: 各时段电价 元/kWh
+            demand_price: 需量电价 元/kW·月
+            storage: StorageConfig (可选)
+            devices: DispatchableDevice 列表 (可选)
+            slot_duration: 时段时长 h
+        """
+        self.prices = np.asarray(slot_prices, dtype=float)
+        self.demand_price = demand_price
+        self.storage = storage
+        self.devices = devices or []
+        self.dt = slot_duration
+        T = len(self.prices)
+        slots_per_hour = max(1, int(round(1 / slot_duration)))
+        self.slot_hour = (np.arange(T) // slots_per_hour) % 24
+
+    def solve(self, base_load: Sequence[float]) -> HeuristicPlan:
+        """执行启发式调度"""
+        started = time.perf_counter()
+        net = np.asarray(base_load, dtype=float).copy()
+        T = len(net)
+        plan = HeuristicPlan(net_load=net, charge=np.zeros(T), discharge=np.zeros(T))
+
+        by_type: Dict[str, List[int]] = {}
+        for d_idx, device in enumerate(self.devices):
+            by_type.setdefault(device.device_type.value, []).append(d_idx)
+
+        # 先转移调节型负荷，再安排时移型设备，最后用削减和储能削峰
+        for d_idx in by_type.get('modulating', []):
+            self._modulate(d_idx, net, plan)
+        self._shift(by_type.get('shiftable', []), net, plan)
+        for d_idx in sorted(by_type.get('curtailable', []),
+                            key=lambda i: -self.devices[i].rated_power):
+            self._curtail(d_idx, net, plan)
+        if self.storage:
+            self._dispatch_storage(net, plan)
+
+        plan.net_load = net + plan.charge - plan.discharge
+        plan.solve_time = time.perf_counter() - started
+        return plan
+
+    def _allowed(self, device) -> np.ndarray:
+        """设备允许动作的时段掩码 (允许时段且不在禁止时段)"""
+        allowed = np.isin(self.slot_hour, device.allowed_periods)
+        if device.forbidden_periods:
+            allowed &= ~np.isin(self.slot_hour, device.forbidden_periods)
+        return allowed
+
+    # ==================== 调节型 ====================
+
+    def _modulate(self, d_idx: int, net: np.ndarray, plan: HeuristicPlan) -> None:
+        """按电价高低成对转移功率: 高价时段降到下限、低价时段升到上限，不抬高当前峰值"""
+        device = self.devices[d_idx]
+        rated = device.rated_power
+        allowed = self._allowed(device)
+        lo = np.where(allowed, device.min_power, rated)
+        hi = np.minimum(np.where(allowed, device.max_power, rated), rated + net.max() - net)
+        ramp = device.ramp_rate * 60 * self.dt
+        if ramp >= device.max_power - device.min_power:
+            # 爬坡速率不构成约束时按电价排序一次性匹配
+            power = self._transfer(rated, lo, hi)
+        else:
+            power = self._transfer_ramped(rated, lo, hi, ramp, net)
+        net += power - rated
+        plan.modulate[d_idx] = power
+
+    def _transfer(self, rated: float, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """
+        无爬坡约束的功率转移
+
+        低价时段按电价升序、高价时段按电价降序排列，累计可升/可降功率后
+        只保留低价电价 < 高价电价的转移量。
+        """
+        up = np.maximum(hi - rated, 0)
+        down = np.maximum(rated - lo, 0)
+        cheap = np.argsort(self.prices, kind='stable')
+        dear = cheap[::-1]
+        up_cum = np.cumsum(up[cheap])
+        down_cum = np.cumsum(down[dear])
+        edges = np.unique(np.concatenate([[0.0], up_cum, down_cum]))
+        edges = edges[edges <= min(up_cum[-1], down_cum[-1]) + 1e-9]
+        if len(edges) < 2:
+            return np.full(len(lo), float(rated))
+        mid = (edges[:-1] + edges[1:]) / 2
+        cheap_price = self.prices[cheap[np.searchsorted(up_cum, mid)]]
+        dear_price = self.prices[dear[np.searchsorted(down_cum, mid)]]
+        profitable = cheap_price < dear_price - 1e-9
+        total = edges[1:][profitable].max() if profitable.any() else 0.0
+
+        power = np.full(len(lo), float(rated))
+        power[cheap] += np.clip(total - (up_cum - up[cheap]), 0, up[cheap])
+        power[dear] -= np.clip(total - (down_cum - down[dear]), 0, down[dear])
+        return power
+
+    def _transfer_ramped(
+        self,
+        rated: float,
+        lo: np.ndarray,
+        hi: np.ndarray,
+        ramp: float,
+        net: np.ndarray
+    ) -> np.ndarray:
+        """受爬坡速率约束的功率转移 (逐对转移，多轮放宽)"""
+        power = np.full(len(net), float(rated))
+        T = len(net)
+
+        def room_up(t):
+            room = hi[t] - power[t]
+            for n in (t - 1, t + 1):
+                if 0 <= n < T:
+                    room = min(room, power[n] + ramp - power[t])
+            return room
+
+        def room_down(t):
+            room = power[t] - lo[t]
+            for n in (t - 1, t + 1):
+                if 0 <= n < T:
+                    room = min(room, power[t] - (power[n] - ramp))
+            return room
+
+        # 同价时段中低负荷优先升功率，高负荷优先降功率
+        order = np.lexsort((net, self.prices))
+        for _ in range(3):
+            moved = 0.0
+            i, j = 0, T - 1
+            while i < j and self.prices[order[i]] < self.prices[order[j]] - 1e-9:
+                cheap, dear = order[i], order[j]
+                up = room_up(cheap)
+                down = room_down(dear)
+                amount = min(up, down)
+                if abs(cheap - dear) == 1:
+                    amount = min(amount, (ramp + power[dear] - power[cheap]) / 2)
+                if amount <= 1e-6:
+                    if up <= down:
+                        i += 1
+                    else:
+                        j -= 1
+                    continue
+                power[cheap] += amount
+                power[dear] -= amount
+                moved += amount
+            if moved <= 1e-6:
+                break
+        return power
+
+    # ==================== 时移型 ====================
+
+    def _shift(self, indices: List[int], net: np.ndarray, plan: HeuristicPlan) -> None:
+        """按大功率优先贪心安排运行时段，然后逐设备移出重排做局部搜索"""
+        if not indices:
+            return
+        order = sorted(indices, key=lambda i: -self.devices[i].rated_power)
+        for d_idx in order:
+            plan.shift_on[d_idx] = self._place(self.devices[d_idx], net)
+            net += plan.shift_on[d_idx] * self.devices[d_idx].rated_power
+
+        for _ in range(LOCAL_SEARCH_ROUNDS):
+            changed = False
+            for d_idx in order:
+                rated = self.devices[d_idx].rated_power
+                previous = plan.shift_on[d_idx]
+                net -= previous * rated
+                placed = self._place(self.devices[d_idx], net)
+                net += placed * rated
+                if not np.array_equal(placed, previous):
+                    plan.shift_on[d_idx] = placed
+                    changed = True
+            if not changed:
+                break
+
+    def _place(self, device, net: np.ndarray) -> np.ndarray:
+        """为单台时移设备逐个选取边际成本最低的时段"""
+        allowed = self._allowed(device)
+        run_slots = min(int(device.run_duration * 4 * device.daily_runs), int(allowed.sum()))
+        rated = device.rated_power
+        energy_cost = self.prices * rated * self.dt
+        chosen = np.zeros(len(net), dtype=bool)
+        load = net.copy()
+        peak = load.max()
+        for _ in range(run_slots):
+            score = energy_cost + self.demand_price * np.maximum(load + rated - peak, 0)
+            score[chosen | ~allowed] = np.inf
+            t = int(np.argmin(score))
+            chosen[t] = True
+            load[t] += rated
+            peak = max(peak, load[t])
+        return chosen
+
+    # ==================== 削减型 ====================
+
+    def _curtail(self, d_idx: int, net: np.ndarray, plan: HeuristicPlan) -> None:
+        """在削减预算内把负荷削到尽量低的水位"""
+        device = self.devices[d_idx]
+        rated = device.rated_power
+        if rated <= 0 or device.curtail_ratio <= 0:
+            return
+        cap = np.where(self._allowed(device), rated * device.curtail_ratio, 0.0)
+        budget = rated * device.curtail_ratio * device.max_curtail_duration * 4
+
+        def need(level):
+            return np.minimum(np.maximum(net - level, 0), cap)
+
+        hi = net.max()
+        lo = max((net - cap).max(), 0.0)
+        if need(lo).sum() > budget:
+            for _ in range(40):
+                mid = (lo + hi) / 2
+                if need(mid).sum() > budget:
+                    lo = mid
+                else:
+                    hi = mid
+            level = hi
+        else:
+            level = lo
+        reduction = need(level)
+        if reduction.sum() <= 1e-6:
+            return
+        net -= reduction
+        plan.curtail[d_idx] = reduction / rated
+
+    # ==================== 储能 ====================
+
+    def _dispatch_storage(self, net: np.ndarray, plan: HeuristicPlan) -> None:
+        """搜索需量上限，每个上限下用动态规划求电量成本最低的充放电计划"""
+        s = self.storage
+        dt = self.dt
+        step = min(s.max_charge_power * s.charge_efficiency, s.max_discharge_power / s.discharge_efficiency) \
+            * dt / SOC_STEPS_PER_SLOT
+        if step <= 0 or s.capacity <= 0:
+            return
+        k_charge = int(np.floor(s.max_charge_power * s.charge_efficiency * dt / step + 1e-9))
+        k_discharge = int(np.floor(s.max_discharge_power * dt / (s.discharge_efficiency * step) + 1e-9))
+        offsets = np.arange(-k_discharge, k_charge + 1)
+        # 每个SOC步长变化对应的电网侧功率
+        grid = np.where(
+            offsets > 0,
+            offsets * step / (s.charge_efficiency * dt),
+            offsets * step * s.discharge_efficiency / dt,
+        )
+        m_low = int(np.floor((s.initial_soc - s.min_soc) * s.capacity / step + 1e-9))
+        m_high = int(np.floor((s.max_soc - s.initial_soc) * s.capacity / step + 1e-9))
+        n_states = m_low + m_high + 1
+        source = np.arange(n_states)[np.newaxis, :] - offsets[:, np.newaxis]
+        valid = (source >= 0) & (source < n_states)
+        source = np.clip(source, 0, n_states - 1)
+        stage_cost = (self.prices[:, np.newaxis] * grid + s.cycle_cost * np.abs(grid)) * dt   # (T, K)
+        loads = net[:, np.newaxis] + grid                                                       # (T, K)
+        cols = np.arange(n_states)
+
+        def run(level: float):
+            value = np.full(n_states, np.inf)
+            value[m_low] = 0.0
+            choice = np.empty((len(net), n_states), dtype=np.int16)
+            for t in range(len(net)):
+                ok = (loads[t] <= level + 1e-9) & (loads[t] >= 0)
+                cand = value[source] + np.where(ok, stage_cost[t], np.inf)[:, np.newaxis]
+                cand[~valid] = np.inf
+                best = np.argmin(cand, axis=0)
+                value = cand[best, cols]
+                choice[t] = best
+            if not np.isfinite(value).any():
+                return np.inf, None
+            state = int(np.argmin(value))
+            path = np.empty(len(net), dtype=int)
+            for t in range(len(net) - 1, -1, -1):
+                path[t] = choice[t, state]
+                state -= offsets[path[t]]
+            g = grid[path]
+            total = value.min() + self.demand_price * (net + g).max()
+            return total, g
+
+        results = {}
+
+        def evaluate(level: float):
+            if level not in results:
+                results[level] = run(level)
+            return results[level]
+
+        peak = net.max()
+        candidates = np.linspace(max(peak - s.max_discharge_power, 0.0), peak, PEAK_SCAN_POINTS)
+        for level in candidates:
+            evaluate(float(level))
+        evaluate(np.inf)
+
+        # 在粗扫描最优点附近黄金分割细化
+        best = min(results, key=lambda k: results[k][0])
+        if np.isfinite(best):
+            width = candidates[1] - candidates[0] if len(candidates) > 1 else 0.0
+            a, b = max(best - width, candidates[0]), min(best + width, peak)
+            for _ in range(PEAK_REFINE_ITERATIONS):
+                c = b - _GOLDEN * (b - a)
+                d = a + _GOLDEN * (b - a)
+                if evaluate(float(c))[0] <= evaluate(float(d))[0]:
+                    b = d
+                else:
+                    a = c
+            best = min(results, key=lambda k: results[k][0])
+
+        g = results[best][1]
+        if g is None:
+            return
+        plan.charge = np.maximum(g, 0.0)
+        plan.discharge = np.maximum(-g, 0.0)
+        energy = s.initial_soc * s.capacity + np.cumsum(
+            plan.charge * s.charge_efficiency - plan.discharge / s.discharge_efficiency
+        ) * dt
+        plan.soc = energy / s.capacity
@@ -649,16 +649,11 @@ class ExecutionService:
             分时电价字典，如果没有配置返回None
         """
         try:
-            from ..models.energy import PricingConfig
-            result = await self.db.execute(
-                select(PricingConfig)
-                .where(PricingConfig.is_active == True)
-                .order_by(PricingConfig.id.desc())
-                .limit(1)
-            )
-            config = result.scalar_one_or_none()
-            if config and config.period_prices:
-                return config.period_prices
+            from .tariff_compiler import get_tariff
+            tariff = await get_tariff(self.db)
+            prices = tariff.configured_period_prices
+            if prices:
+                return prices
         except Exception as e:
             logger.warning(f"Failed to get period prices: {e}")
         return None
@@ -9,6 +9,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 import random
 
+from .tariff_compiler import get_cached_tariff
+
 
 class LoadForecaster:
     """负荷预测器"""
@@ -95,97 +97,32 @@ class LoadForecaster:
             expected_avg = (self.base_load + self.peak_load) / 2
             adjustment_factor = hist_avg / expected_avg if expected_avg > 0 else 1.0
 
-        # 生成96个15分钟时段的预测
-        forecasts = []
-        forecast_96 = []
-
-        for hour in range(24):
-            base_ratio = base_pattern[hour]
-
-            # 每小时4个15分钟时段
-            for quarter in range(4):
-                # 计算基础预测值
-                predicted_power = (
-                    self.base_load +
-                    (self.peak_load - self.base_load) * base_ratio *
-                    seasonal_factor * adjustment_factor
-                )
-
-                # 添加随机噪声
-                noise = np.random.normal(0, predicted_power * noise_level)
-                predicted_power = max(0, predicted_power + noise)
-
-                # 计算置信区间
-                confidence_margin = predicted_power * 0.1  # 10%置信区间
-
-                time_slot = hour * 4 + quarter
-                time_str = f"{hour:02d}:{quarter * 15:02d}"
-
-                forecast_96.append({
-                    'time_slot': time_slot,
-                    'time': time_str,
-                    'hour': hour,
-                    'quarter': quarter,
-                    'predicted_power': round(predicted_power, 2),
-                    'lower_bound': round(predicted_power - confidence_margin, 2),
-                    'upper_bound': round(predicted_power + confidence_margin, 2),
-                    'period': self._get_period(hour)
-                })
-
-        # 计算统计信息
-        powers = [f['predicted_power'] for f in forecast_96]
+        # 生成96个15分钟时段的预测 (每小时4个15分钟时段)
+        tariff = get_cached_tariff(target_date.date() if isinstance(target_date, datetime) else target_date)
+        rng = np.random.default_rng(int(target_date.strftime('%Y%m%d')))
+        ratios = np.repeat(np.asarray(base_pattern), 4)
+        predicted = (
+            self.base_load +
+            (self.peak_load - self.base_load) * ratios *
+            seasonal_factor * adjustment_factor
+        )
+
+        # 添加随机噪声（按日期固定种子，同一日期的预测可复现）
+        predicted = np.maximum(0, predicted + rng.normal(0, predicted * noise_level))
+
+        # 计算置信区间（10%）
+        margin = predicted * 0.1
 
         return {
-            'date': target_date.strftime('%Y-%m-%d'),
+            **build_forecast_result(target_date, predicted, predicted - margin, predicted + margin, tariff),
             'is_weekend': is_weekend,
             'seasonal_factor': seasonal_factor,
             'adjustment_factor': round(adjustment_factor, 3),
-            'forecasts': forecast_96,
-            'statistics': {
-                'max_power': round(max(powers), 2),
-                'min_power': round(min(powers), 2),
-                'avg_power': round(np.mean(powers), 2),
-                'total_energy': round(sum(powers) * 0.25, 2),  # kWh (15分钟=0.25小时)
-            },
-            'period_summary': self._calculate_period_summary(forecast_96)
         }
 
-    def _get_period(self, hour: int) -> str:
-        """根据小时获取时段类型"""
-        if hour in [11, 18]:
-            return 'sharp'  # 尖峰
-        elif hour in [9, 10, 12, 13, 17, 19, 20]:
-            return 'peak'  # 峰
-        elif hour in [8, 14, 15, 16, 21]:
-            return 'flat'  # 平
-        elif hour in [4, 5, 6, 7, 22, 23]:
-            return 'valley'  # 谷
-        else:
-            return 'deep_valley'  # 深谷 (0-3)
-
     def _calculate_period_summary(self, forecasts: List[Dict]) -> Dict:
         """计算各时段汇总"""
-        period_data = {
-            'sharp': {'energy': 0, 'max_power': 0, 'hours': 0},
-            'peak': {'energy': 0, 'max_power': 0, 'hours': 0},
-            'flat': {'energy': 0, 'max_power': 0, 'hours': 0},
-            'valley': {'energy': 0, 'max_power': 0, 'hours': 0},
-            'deep_valley': {'energy': 0, 'max_power': 0, 'hours': 0},
-        }
-
-        for f in forecasts:
-            period = f['period']
-            power = f['predicted_power']
-            period_data[period]['energy'] += power * 0.25  # 15分钟的电量
-            period_data[period]['max_power'] = max(period_data[period]['max_power'], power)
-            period_data[period]['hours'] += 0.25
-
-        # 四舍五入
-        for period in period_data:
-            period_data[period]['energy'] = round(period_data[period]['energy'], 2)
-            period_data[period]['max_power'] = round(period_data[period]['max_power'], 2)
-
-        return period_data
+        return calculate_period_summary(forecasts)
 
     def forecast_with_devices(
         self,
@@ -245,34 +182,118 @@ class LoadForecaster:
         }
 
 
+
+def build_forecast_result(
+    target_date: datetime,
+    predicted: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    tariff
+) -> Dict:
+    """
+    由96时段预测值构建预测结果字典 (时段明细、统计信息、分时汇总)
+
+    Args:
+        target_date: 目标日期
+        predicted: 预测功率 kW
+        lower: 置信区间下限 kW
+        upper: 置信区间上限 kW
+        tariff: 编译后的分时电价 (提供时段划分)
+    """
+    predicted = np.round(np.asarray(predicted, dtype=float), 2)
+    lower = np.round(np.asarray(lower, dtype=float), 2)
+    upper = np.round(np.asarray(upper, dtype=float), 2)
+    forecast_96 = [
+        {
+            'time_slot': slot,
+            'time': f"{slot // 4:02d}:{(slot % 4) * 15:02d}",
+            'hour': slot // 4,
+            'quarter': slot % 4,
+            'predicted_power': float(predicted[slot]),
+            'lower_bound': float(lower[slot]),
+            'upper_bound': float(upper[slot]),
+            'period': tariff.slot_period(slot),
+        }
+        for slot in range(len(predicted))
+    ]
+
+    return {
+        'date': target_date.strftime('%Y-%m-%d'),
+        'is_weekend': target_date.weekday() >= 5,
+        'forecasts': forecast_96,
+        'statistics': {
+            'max_power': round(float(predicted.max()), 2),
+            'min_power': round(float(predicted.min()), 2),
+            'avg_power': round(float(predicted.mean()), 2),
+            'total_energy': round(float(predicted.sum()) * 0.25, 2),  # kWh (15分钟=0.25小时)
+        },
+        'period_summary': calculate_period_summary(forecast_96)
+    }
+
+
+def calculate_period_summary(forecasts: List[Dict]) -> Dict:
+    """计算各时段汇总"""
+    period_data = {
+        'sharp': {'energy': 0, 'max_power': 0, 'hours': 0},
+        'peak': {'energy': 0, 'max_power': 0, 'hours': 0},
+        'flat': {'energy': 0, 'max_power': 0, 'hours': 0},
+        'valley': {'energy': 0, 'max_power': 0, 'hours': 0},
+        'deep_valley': {'energy': 0, 'max_power': 0, 'hours': 0},
+    }
+
+    for f in forecasts:
+        period = f['period']
+        power = f['predicted_power']
+        period_data[period]['energy'] += power * 0.25  # 15分钟的电量
+        period_data[period]['max_power'] = max(period_data[period]['max_power'], power)
+        period_data[period]['hours'] += 0.25
+
+    # 四舍五入
+    for period in period_data:
+        period_data[period]['energy'] = round(period_data[period]['energy'], 2)
+        period_data[period]['max_power'] = round(period_data[period]['max_power'], 2)
+
+    return period_data
+
+
 async def get_load_forecast(
     db: AsyncSession,
     target_date: datetime,
-    meter_point_id: Optional[int] = None
+    meter_point_id: Optional[int] = None,
+    base_load: float = 300.0,
+    peak_load: float = 800.0,
+    noise_level: float = 0.05
 ) -> Dict:
     """
     获取负荷预测（API服务入口）
 
+    有计量点历史数据时使用数据驱动预测 (见 load_forecast_engine)，
+    否则按典型负荷模式生成。
+
     Args:
         db: 数据库会话
         target_date: 目标日期
-        meter_point_id: 计量点ID（可选）
+        meter_point_id: 计量点ID（可选，默认为总进线计量点合计）
+        base_load: 无历史数据时的基础负荷 kW
+        peak_load: 无历史数据时的峰值负荷 kW
+        noise_level: 无历史数据时的随机波动水平
 
     Returns:
-        预测结果
+        预测结果，method 字段标识预测方法
     """
-    # 尝试从历史数据获取基准负荷
-    # 这里简化处理，使用默认值
-    base_load = 300.0
-    peak_load = 800.0
+    from .load_forecast_engine import LoadForecastEngine
 
-    # TODO: 从数据库查询历史数据来调整基准
-    # 可以查询过去30天的同类型日期数据
+    engine = LoadForecastEngine(db)
+    if meter_point_id is not None:
+        forecasts = await engine.forecast(target_date.date(), [meter_point_id])
+        forecast = forecasts.get(meter_point_id)
+    else:
+        forecast = await engine.forecast_total(target_date.date())
+    if forecast is not None:
+        return forecast
 
     forecaster = LoadForecaster(base_load=base_load, peak_load=peak_load)
-    forecast = forecaster.forecast_day(target_date)
-
-    return forecast
+    return {**forecaster.forecast_day(target_date, noise_level=noise_level), 'method': 'pattern'}
 
 
 def generate_demo_forecast(target_date: Optional[datetime] = None) -> Dict:
@@ -5,9 +5,14 @@
 这是节能方案模板系统的核心服务，提供15+个计算方法用于6种模板类型
 
 V2.0: 改为异步实现，使用 AsyncSession + select() 语法
+V2.1: 数据访问层按请求记忆化 —— 同一数据库会话内相同的子查询只执行一次，
+      多个时段/等级的统计合并为单条聚合查询，prefetch() 批量预取常用指标
+V2.2: prefetch_templates() 一次读取全部模板所需数据，供多模板并发生成共享
 """
+import asyncio
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select
+from sqlalchemy import case, func, select
 from datetime import datetime, timedelta, date
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
@@ -28,11 +33,294 @@ from ..models.energy import (
 )
 
 
+# 记忆化缓存在 AsyncSession.info 中的键 (缓存与会话同生命周期，即请求级)
+MEMO_KEY = "formula_calculator_memo"
+# 会话级查询锁的键 (AsyncSession 不支持并发查询，并发生成时串行化未命中缓存的查询)
+LOCK_KEY = "formula_calculator_lock"
+
+# 未匹配到设备类型时的聚合结果 (与空集上的 AVG/SUM/COUNT 一致)
+EMPTY_DEVICE_STATS = (None, None, 0, None, None)
+
+
 class FormulaCalculator:
-    """公式计算器 - 将所有 *** 占位符映射到数据源 (异步版本)"""
+    """
+    公式计算器 - 将所有 *** 占位符映射到数据源 (异步版本)
+
+    数据读取经 _memoized() 缓存原始聚合值，计算步骤不变:
+    同一会话内的其他 FormulaCalculator 实例 (如追溯计算器) 共享缓存，
+    各方法返回值与逐条查询时完全一致。
+    """
 
     def __init__(self, db: AsyncSession):
         self.db = db
+        self._local_memo: Dict[tuple, Any] = {}
+
+    # ==================== 记忆化数据访问 ====================
+
+    def _memo(self) -> Dict[tuple, Any]:
+        """当前请求的记忆化缓存 (无会话时退回实例级缓存)"""
+        if self.db is None:
+            return self._local_memo
+        return self.db.info.setdefault(MEMO_KEY, {})
+
+    def _lock(self) -> asyncio.Lock:
+        """当前会话的查询锁"""
+        if self.db is None:
+            return asyncio.Lock()
+        return self.db.info.setdefault(LOCK_KEY, asyncio.Lock())
+
+    async def _memoized(self, key: tuple, loader):
+        """
+        按 key 缓存 loader() 的查询结果，同一请求内相同子查询只执行一次
+
+        缓存命中直接返回；未命中时在会话锁内查询，并发协程请求同一 key 时只查询一次。
+        """
+        memo = self._memo()
+        if key in memo:
+            return memo[key]
+        async with self._lock():
+            if key not in memo:
+                memo[key] = await loader()
+        return memo[key]
+
+    def clear_cache(self) -> None:
+        """清空当前请求的记忆化缓存 (源数据变更后调用)"""
+        self._memo().clear()
+
+    async def prefetch(self, year: int, start_date: date, end_date: date) -> None:
+        """
+        批量预取常用指标: 年用电量、全年及各月最大需量、峰谷电量、电价
+
+        各项合并为少量聚合查询写入缓存，已缓存的项不再重复查询。
+
+        参数:
+            year: 统计年份
+            start_date: 峰谷分析起始日期
+            end_date: 峰谷分析结束日期
+        """
+        await self._annual_energy(year)
+        await self._prefetch_max_demand(year)
+        await self._energy_daily_sums(start_date, end_date)
+        await self._price_table()
+
+    async def prefetch_templates(self, start_date: date, end_date: date, analysis_date: date) -> None:
+        """
+        预取 A1-A5/B1 全部模板所需数据，形成一次读取的数据快照
+
+        快照写入后各模板计算只读缓存，可在同一会话上并发执行。
+
+        参数:
+            start_date: 分析起始日期
+            end_date: 分析结束日期
+            analysis_date: 负荷曲线分析日期
+        """
+        now = datetime.now()
+        await self.prefetch(end_date.year, start_date, end_date)
+        await self._demand_source(None, now.year, now.month)
+        await self._shift_capacity()
+        await self._device_stats("")  # 分组查询一次覆盖全部设备类型
+        await self._equipment_load_rates(start_date, end_date)
+        await self._load_curve_stats(analysis_date)
+
+    async def _annual_energy(self, year: int) -> Optional[float]:
+        """年度 SUM(EnergyMonthly.total_energy)"""
+        async def load():
+            stmt = select(func.sum(EnergyMonthly.total_energy)).where(
+                EnergyMonthly.stat_year == year
+            )
+            return (await self.db.execute(stmt)).scalar()
+
+        return await self._memoized(("annual_energy", year), load)
+
+    async def _max_demand(self, year: int, month: Optional[int]) -> Optional[float]:
+        """年度或月度 MAX(DemandHistory.max_demand)"""
+        async def load():
+            stmt = select(func.max(DemandHistory.max_demand)).where(
+                DemandHistory.stat_year == year
+            )
+            if month is not None:
+                stmt = stmt.where(DemandHistory.stat_month == month)
+            return (await self.db.execute(stmt)).scalar()
+
+        return await self._memoized(("max_demand", year, month), load)
+
+    async def _prefetch_max_demand(self, year: int) -> None:
+        """一次分组查询填充全年及 1-12 月最大需量缓存"""
+        memo = self._memo()
+        keys = [("max_demand", year, m) for m in [None] + list(range(1, 13))]
+        if all(key in memo for key in keys):
+            return
+
+        stmt = select(
+            DemandHistory.stat_month,
+            func.max(DemandHistory.max_demand)
+        ).where(
+            DemandHistory.stat_year == year
+        ).group_by(DemandHistory.stat_month)
+        async with self._lock():
+            monthly = {month: value for month, value in (await self.db.execute(stmt)).all()}
+
+        values = [v for v in monthly.values() if v is not None]
+        memo.setdefault(("max_demand", year, None), max(values) if values else None)
+        for month in range(1, 13):
+            memo.setdefault(("max_demand", year, month), monthly.get(month))
+
+    async def _energy_daily_sums(self, start_date: date, end_date: date) -> tuple:
+        """期间 总/峰/平/谷 电量合计 (单条聚合查询)"""
+        async def load():
+            stmt = select(
+                func.sum(EnergyDaily.total_energy),
+                func.sum(EnergyDaily.peak_energy),
+                func.sum(EnergyDaily.normal_energy),
+                func.sum(EnergyDaily.valley_energy)
+            ).where(
+                EnergyDaily.stat_date >= start_date,
+                EnergyDaily.stat_date <= end_date
+            )
+            return tuple((await self.db.execute(stmt)).one())
+
+        return await self._memoized(("energy_daily", start_date, end_date), load)
+
+    async def _shift_capacity(self) -> tuple:
+        """
+        可转移负荷合计及按通知时间分级的容量 (单条聚合查询)
+
+        返回: (全部, ≤5分钟, 5-15分钟, >240分钟)
+        """
+        async def load():
+            shiftable = PowerDevice.rated_power * DeviceShiftConfig.shiftable_power_ratio
+            notice = DeviceShiftConfig.shift_notice_time
+
+            def level(condition):
+                return func.sum(case((condition, shiftable)))
+
+            stmt = select(
+                func.sum(shiftable),
+                level(notice <= 5),
+                level((notice > 5) & (notice <= 15)),
+                level(notice > 240)
+            ).select_from(PowerDevice).join(
+                DeviceShiftConfig,
+                PowerDevice.id == DeviceShiftConfig.device_id
+            ).where(
+                DeviceShiftConfig.is_shiftable == True,
+                PowerDevice.is_enabled == True
+            )
+            return tuple((await self.db.execute(stmt)).one())
+
+        return await self._memoized(("shift_capacity",), load)
+
+    async def _device_stats(self, equipment_type: str) -> tuple:
+        """
+        按设备类型分组的启用设备统计 (一次查询覆盖全部类型)
+
+        返回: (平均额定功率, 平均负荷率, 设备数, 额定功率合计, 平均效率)
+        """
+        async def load():
+            stmt = select(
+                PowerDevice.device_type,
+                func.avg(PowerDevice.rated_power),
+                func.avg(PowerDevice.avg_load_rate),
+                func.count(PowerDevice.id),
+                func.sum(PowerDevice.rated_power),
+                func.avg(PowerDevice.efficiency)
+            ).where(
+                PowerDevice.is_enabled == True
+            ).group_by(PowerDevice.device_type)
+            return {row[0]: tuple(row[1:]) for row in (await self.db.execute(stmt)).all()}
+
+        stats = await self._memoized(("device_stats",), load)
+        return stats.get(equipment_type, EMPTY_DEVICE_STATS)
+
+    async def _equipment_load_rates(self, start_date: date, end_date: date) -> Dict[str, Optional[float]]:
+        """期间各设备类型平均负荷率 (一次分组查询覆盖全部类型)"""
+        async def load():
+            stmt = select(
+                PowerDevice.device_type,
+                func.avg(EnergyHourly.avg_power / PowerDevice.rated_power * 100)
+            ).select_from(EnergyHourly).join(
+                PowerDevice,
+                EnergyHourly.device_id == PowerDevice.id
+            ).where(
+                PowerDevice.is_enabled == True,
+                EnergyHourly.stat_time >= start_date,
+                EnergyHourly.stat_time <= end_date,
+                PowerDevice.rated_power > 0  # 避免除零
+            ).group_by(PowerDevice.device_type)
+            return dict((await self.db.execute(stmt)).all())
+
+        return await self._memoized(("equipment_load_rate", start_date, end_date), load)
+
+    async def _load_curve_stats(self, analysis_date: date) -> tuple:
+        """指定日期负荷曲线 最大/最小/平均 功率"""
+        async def load():
+            stmt = select(
+                func.max(PowerCurveData.active_power),
+                func.min(PowerCurveData.active_power),
+                func.avg(PowerCurveData.active_power)
+            ).where(
+                func.date(PowerCurveData.timestamp) == analysis_date
+            )
+            return tuple((await self.db.execute(stmt)).one())
+
+        return await self._memoized(("load_curve", analysis_date), load)
+
+    async def _demand_source(self, meter_point_id: Optional[int], year: int, month: int) -> Optional[tuple]:
+        """
+        计量点申报需量及历史95分位 (当月无数据时取上月)
+
+        返回: (申报需量, 95分位) ，计量点不存在时返回 None
+        """
+        async def load():
+            if meter_point_id is None:
+                stmt = select(MeterPoint).where(MeterPoint.is_enabled == True).limit(1)
+            else:
+                stmt = select(MeterPoint).where(MeterPoint.id == meter_point_id)
+            meter_point = (await self.db.execute(stmt)).scalar_one_or_none()
+            if not meter_point:
+                return None
+
+            stmt = select(DemandHistory).where(
+                DemandHistory.meter_point_id == meter_point.id,
+                DemandHistory.stat_year == year,
+                DemandHistory.stat_month == month
+            ).limit(1)
+            demand_history = (await self.db.execute(stmt)).scalar_one_or_none()
+
+            if not demand_history or not demand_history.demand_95th:
+                # 如果没有当月数据，查询上个月
+                prev_month = month - 1 if month > 1 else 12
+                prev_year = year if month > 1 else year - 1
+
+                stmt = select(DemandHistory).where(
+                    DemandHistory.meter_point_id == meter_point.id,
+                    DemandHistory.stat_year == prev_year,
+                    DemandHistory.stat_month == prev_month
+                ).limit(1)
+                demand_history = (await self.db.execute(stmt)).scalar_one_or_none()
+
+            return (
+                meter_point.declared_demand,
+                demand_history.demand_95th if demand_history else None
+            )
+
+        return await self._memoized(("demand_source", meter_point_id, year, month), load)
+
+    async def _price_table(self) -> Dict[str, float]:
+        """全部启用电价，按时段类型取第一条 (单条查询)"""
+        async def load():
+            stmt = select(
+                ElectricityPricing.period_type,
+                ElectricityPricing.price
+            ).where(
+                ElectricityPricing.is_enabled == True
+            ).order_by(ElectricityPricing.id)
+            prices: Dict[str, float] = {}
+            for period_type, price in (await self.db.execute(stmt)).all():
+                prices.setdefault(period_type, price)
+            return prices
+
+        return await self._memoized(("prices",), load)
 
     # ==================== 通用数据方法 ====================
 
@@ -49,11 +337,7 @@ class FormulaCalculator:
         返回:
             年用电量 (kWh)
         """
-        stmt = select(func.sum(EnergyMonthly.total_energy)).where(
-            EnergyMonthly.stat_year == year
-        )
-        result = await self.db.execute(stmt)
-        value = result.scalar()
+        value = await self._annual_energy(year)
 
         return Decimal(str(value)) if value else Decimal('0')
 
@@ -71,15 +355,7 @@ class FormulaCalculator:
         返回:
             最大需量 (kW)
         """
-        stmt = select(func.max(DemandHistory.max_demand)).where(
-            DemandHistory.stat_year == year
-        )
-
-        if month is not None:
-            stmt = stmt.where(DemandHistory.stat_month == month)
-
-        result = await self.db.execute(stmt)
-        value = result.scalar()
+        value = await self._max_demand(year, month)
         return Decimal(str(value)) if value else Decimal('0')
 
     async def calc_average_load(self, year: int) -> Decimal:
@@ -148,39 +424,11 @@ class FormulaCalculator:
             "总电量": Decimal
         }
         """
-        # 统计总电量
-        stmt = select(func.sum(EnergyDaily.total_energy)).where(
-            EnergyDaily.stat_date >= start_date,
-            EnergyDaily.stat_date <= end_date
-        )
-        result = await self.db.execute(stmt)
-        total_energy_result = result.scalar()
-        total_energy = Decimal(str(total_energy_result)) if total_energy_result else Decimal('0')
-
-        # 统计各时段电量
-        stmt = select(func.sum(EnergyDaily.peak_energy)).where(
-            EnergyDaily.stat_date >= start_date,
-            EnergyDaily.stat_date <= end_date
+        # 总电量及各时段电量 (单条聚合查询)
+        sums = await self._energy_daily_sums(start_date, end_date)
+        total_energy, peak_energy, normal_energy, valley_energy = (
+            Decimal(str(value)) if value else Decimal('0') for value in sums
         )
-        result = await self.db.execute(stmt)
-        peak_energy_result = result.scalar()
-        peak_energy = Decimal(str(peak_energy_result)) if peak_energy_result else Decimal('0')
-
-        stmt = select(func.sum(EnergyDaily.normal_energy)).where(
-            EnergyDaily.stat_date >= start_date,
-            EnergyDaily.stat_date <= end_date
-        )
-        result = await self.db.execute(stmt)
-        normal_energy_result = result.scalar()
-        normal_energy = Decimal(str(normal_energy_result)) if normal_energy_result else Decimal('0')
-
-        stmt = select(func.sum(EnergyDaily.valley_energy)).where(
-            EnergyDaily.stat_date >= start_date,
-            EnergyDaily.stat_date <= end_date
-        )
-        result = await self.db.execute(stmt)
-        valley_energy_result = result.scalar()
-        valley_energy = Decimal(str(valley_energy_result)) if valley_energy_result else Decimal('0')
 
         # 计算占比
         def calc_ratio(energy: Decimal, total: Decimal) -> Decimal:
@@ -228,18 +476,7 @@ class FormulaCalculator:
         返回:
             可转移负荷 (kW)
         """
-        stmt = select(
-            func.sum(PowerDevice.rated_power * DeviceShiftConfig.shiftable_power_ratio)
-        ).select_from(PowerDevice).join(
-            DeviceShiftConfig,
-            PowerDevice.id == DeviceShiftConfig.device_id
-        ).where(
-            DeviceShiftConfig.is_shiftable == True,
-            PowerDevice.is_enabled == True
-        )
-
-        result = await self.db.execute(stmt)
-        value = result.scalar()
+        value = (await self._shift_capacity())[0]
         return Decimal(str(value)) if value else Decimal('0')
 
     def calc_peak_shift_benefit(
@@ -306,17 +543,12 @@ class FormulaCalculator:
             "年节省": Decimal         # 万元
         }
         """
-        # 获取计量点
-        if meter_point_id is None:
-            stmt = select(MeterPoint).where(MeterPoint.is_enabled == True).limit(1)
-            result = await self.db.execute(stmt)
-            meter_point = result.scalar_one_or_none()
-        else:
-            stmt = select(MeterPoint).where(MeterPoint.id == meter_point_id)
-            result = await self.db.execute(stmt)
-            meter_point = result.scalar_one_or_none()
+        # 获取计量点及最近一个月的需量历史
+        current_year = datetime.now().year
+        current_month = datetime.now().month
+        source = await self._demand_source(meter_point_id, current_year, current_month)
 
-        if not meter_point:
+        if not source:
             return {
                 "当前申报需量": Decimal('0'),
                 "历史95分位": Decimal('0'),
@@ -326,34 +558,9 @@ class FormulaCalculator:
                 "年节省": Decimal('0')
             }
 
-        current_declared = Decimal(str(meter_point.declared_demand)) if meter_point.declared_demand else Decimal('0')
-
-        # 获取最近一个月的需量历史
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-
-        stmt = select(DemandHistory).where(
-            DemandHistory.meter_point_id == meter_point.id,
-            DemandHistory.stat_year == current_year,
-            DemandHistory.stat_month == current_month
-        ).limit(1)
-        result = await self.db.execute(stmt)
-        demand_history = result.scalar_one_or_none()
-
-        if not demand_history or not demand_history.demand_95th:
-            # 如果没有当月数据，查询上个月
-            prev_month = current_month - 1 if current_month > 1 else 12
-            prev_year = current_year if current_month > 1 else current_year - 1
-
-            stmt = select(DemandHistory).where(
-                DemandHistory.meter_point_id == meter_point.id,
-                DemandHistory.stat_year == prev_year,
-                DemandHistory.stat_month == prev_month
-            ).limit(1)
-            result = await self.db.execute(stmt)
-            demand_history = result.scalar_one_or_none()
-
-        demand_95th = Decimal(str(demand_history.demand_95th)) if demand_history and demand_history.demand_95th else Decimal('0')
+        declared_demand, demand_95th_value = source
+        current_declared = Decimal(str(declared_demand)) if declared_demand else Decimal('0')
+        demand_95th = Decimal(str(demand_95th_value)) if demand_95th_value else Decimal('0')
 
         # 建议申报需量 = 95分位 × 1.05
         recommended_demand = (demand_95th * Decimal('1.05')).quantize(Decimal('0.1'))
@@ -394,21 +601,7 @@ class FormulaCalculator:
 
         返回: 负荷率 (%)
         """
-        stmt = select(
-            func.avg(EnergyHourly.avg_power / PowerDevice.rated_power * 100)
-        ).select_from(EnergyHourly).join(
-            PowerDevice,
-            EnergyHourly.device_id == PowerDevice.id
-        ).where(
-            PowerDevice.device_type == equipment_type,
-            PowerDevice.is_enabled == True,
-            EnergyHourly.stat_time >= start_date,
-            EnergyHourly.stat_time <= end_date,
-            PowerDevice.rated_power > 0  # 避免除零
-        )
-
-        result = await self.db.execute(stmt)
-        value = result.scalar()
+        value = (await self._equipment_load_rates(start_date, end_date)).get(equipment_type)
         return Decimal(str(value)).quantize(Decimal('0.01')) if value else Decimal('0')
 
     async def calc_equipment_optimization_potential(self, equipment_type: str) -> Dict[str, Decimal]:
@@ -430,19 +623,9 @@ class FormulaCalculator:
             "年节省金额": Decimal    # 万元
         }
         """
-        stmt = select(
-            func.avg(PowerDevice.rated_power).label('avg_rated_power'),
-            func.avg(PowerDevice.avg_load_rate).label('avg_load_rate'),
-            func.count(PowerDevice.id).label('device_count')
-        ).where(
-            PowerDevice.device_type == equipment_type,
-            PowerDevice.is_enabled == True
-        )
+        avg_rated_power_value, avg_load_rate, device_count, _, _ = await self._device_stats(equipment_type)
 
-        result = await self.db.execute(stmt)
-        device_stats = result.first()
-
-        if not device_stats or not device_stats.avg_rated_power:
+        if not avg_rated_power_value:
             return {
                 "当前功率": Decimal('0'),
                 "优化后功率": Decimal('0'),
@@ -452,9 +635,8 @@ class FormulaCalculator:
                 "年节省金额": Decimal('0')
             }
 
-        avg_rated_power = Decimal(str(device_stats.avg_rated_power))
-        current_load_rate = Decimal(str(device_stats.avg_load_rate)) if device_stats.avg_load_rate else Decimal('70')
-        device_count = device_stats.device_count
+        avg_rated_power = Decimal(str(avg_rated_power_value))
+        current_load_rate = Decimal(str(avg_load_rate)) if avg_load_rate else Decimal('70')
 
         # 当前功率
         current_power = (avg_rated_power * current_load_rate / Decimal('100')).quantize(Decimal('0.01'))
@@ -511,51 +693,12 @@ class FormulaCalculator:
             "总年收益": Decimal
         }
         """
-        # Ⅰ级快速响应 (响应时间 ≤ 5 分钟)
-        stmt = select(
-            func.sum(PowerDevice.rated_power * DeviceShiftConfig.shiftable_power_ratio)
-        ).select_from(PowerDevice).join(
-            DeviceShiftConfig,
-            PowerDevice.id == DeviceShiftConfig.device_id
-        ).where(
-            DeviceShiftConfig.is_shiftable == True,
-            DeviceShiftConfig.shift_notice_time <= 5,
-            PowerDevice.is_enabled == True
-        )
-        result = await self.db.execute(stmt)
-        level1_capacity_result = result.scalar()
-        level1_capacity = Decimal(str(level1_capacity_result)) if level1_capacity_result else Decimal('0')
-
-        # Ⅱ级常规响应 (响应时间 ≤ 15 分钟)
-        stmt = select(
-            func.sum(PowerDevice.rated_power * DeviceShiftConfig.shiftable_power_ratio)
-        ).select_from(PowerDevice).join(
-            DeviceShiftConfig,
-            PowerDevice.id == DeviceShiftConfig.device_id
-        ).where(
-            DeviceShiftConfig.is_shiftable == True,
-            DeviceShiftConfig.shift_notice_time > 5,
-            DeviceShiftConfig.shift_notice_time <= 15,
-            PowerDevice.is_enabled == True
-        )
-        result = await self.db.execute(stmt)
-        level2_capacity_result = result.scalar()
-        level2_capacity = Decimal(str(level2_capacity_result)) if level2_capacity_result else Decimal('0')
-
-        # Ⅲ级计划响应 (响应时间 > 240 分钟)
-        stmt = select(
-            func.sum(PowerDevice.rated_power * DeviceShiftConfig.shiftable_power_ratio)
-        ).select_from(PowerDevice).join(
-            DeviceShiftConfig,
-            PowerDevice.id == DeviceShiftConfig.device_id
-        ).where(
-            DeviceShiftConfig.is_shiftable == True,
-            DeviceShiftConfig.shift_notice_time > 240,
-            PowerDevice.is_enabled == True
+        # Ⅰ级快速响应 (响应时间 ≤ 5 分钟)、Ⅱ级常规响应 (响应时间 ≤ 15 分钟)、
+        # Ⅲ级计划响应 (响应时间 > 240 分钟) 由单条聚合查询统计
+        _, *levels = await self._shift_capacity()
+        level1_capacity, level2_capacity, level3_capacity = (
+            Decimal(str(value)) if value else Decimal('0') for value in levels
         )
-        result = await self.db.execute(stmt)
-        level3_capacity_result = result.scalar()
-        level3_capacity = Decimal(str(level3_capacity_result)) if level3_capacity_result else Decimal('0')
 
         # 响应次数和补偿标准 (基于市场数据)
         level1_response_count = 50  # 次/年
@@ -616,18 +759,9 @@ class FormulaCalculator:
             "峰谷比": Decimal
         }
         """
-        stmt = select(
-            func.max(PowerCurveData.active_power).label('max_power'),
-            func.min(PowerCurveData.active_power).label('min_power'),
-            func.avg(PowerCurveData.active_power).label('avg_power')
-        ).where(
-            func.date(PowerCurveData.timestamp) == analysis_date
-        )
-
-        result = await self.db.execute(stmt)
-        stats = result.first()
+        max_power, min_power, avg_power = await self._load_curve_stats(analysis_date)
 
-        if not stats or not stats.max_power:
+        if not max_power:
             return {
                 "最大负荷": Decimal('0'),
                 "最小负荷": Decimal('0'),
@@ -637,9 +771,9 @@ class FormulaCalculator:
                 "峰谷比": Decimal('0')
             }
 
-        max_load = Decimal(str(stats.max_power))
-        min_load = Decimal(str(stats.min_power)) if stats.min_power else Decimal('0')
-        avg_load = Decimal(str(stats.avg_power)) if stats.avg_power else Decimal('0')
+        max_load = Decimal(str(max_power))
+        min_load = Decimal(str(min_power)) if min_power else Decimal('0')
+        avg_load = Decimal(str(avg_power)) if avg_power else Decimal('0')
 
         # 峰谷差
         peak_valley_diff = max_load - min_load
@@ -680,13 +814,8 @@ class FormulaCalculator:
             "投资回收期": Decimal
         }
         """
-        # 获取设备当前能效
-        stmt = select(func.avg(PowerDevice.efficiency)).where(
-            PowerDevice.device_type == equipment_type,
-            PowerDevice.is_enabled == True
-        )
-        result = await self.db.execute(stmt)
-        current_efficiency_result = result.scalar()
+        # 获取设备当前能效、额定功率合计 (与优化潜力共用同一分组查询)
+        _, _, _, total_rated_power_value, current_efficiency_result = await self._device_stats(equipment_type)
         current_efficiency = Decimal(str(current_efficiency_result)) if current_efficiency_result else Decimal('90')
 
         # 行业先进能效水平 (基于设备类型)
@@ -702,23 +831,11 @@ class FormulaCalculator:
         # 能效差距
         efficiency_gap = industry_efficiency - current_efficiency
 
-        # 获取设备额定功率和年运行时间
-        stmt = select(
-            func.sum(PowerDevice.rated_power).label('total_rated_power'),
-            func.count(PowerDevice.id).label('device_count')
-        ).where(
-            PowerDevice.device_type == equipment_type,
-            PowerDevice.is_enabled == True
-        )
-        result = await self.db.execute(stmt)
-        device_stats = result.first()
-
-        if not device_stats or not device_stats.total_rated_power:
+        # 设备额定功率
+        if not total_rated_power_value:
             total_rated_power = Decimal('0')
-            device_count = 0
         else:
-            total_rated_power = Decimal(str(device_stats.total_rated_power))
-            device_count = device_stats.device_count
+            total_rated_power = Decimal(str(total_rated_power_value))
 
         # 年运行时间 (假设 6000 小时)
         annual_hours = Decimal('6000')
@@ -767,16 +884,10 @@ class FormulaCalculator:
         返回:
             电价 (元/kWh)
         """
-        stmt = select(ElectricityPricing).where(
-            ElectricityPricing.period_type == time_slot,
-            ElectricityPricing.is_enabled == True
-        ).limit(1)
-
-        result = await self.db.execute(stmt)
-        pricing = result.scalar_one_or_none()
+        price = (await self._price_table()).get(time_slot)
 
-        if pricing:
-            return Decimal(str(pricing.price))
+        if price is not None:
+            return Decimal(str(price))
 
         # 默认电价
         default_prices = {
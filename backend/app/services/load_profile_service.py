@@ -0,0 +1,514 @@
+"""
+典型日负荷曲线物化服务
+Materialized 96-slot daily and typical-day load profiles
+
+- 每个计量点/设备每天物化一行 96 时段统计 (LoadProfileDay)，新数据到达时 O(1) 增量更新
+- 已结束的日期只物化一次，之后查询直接读取；当天及缺失日期按需从原始表补齐
+- 按 日类型(工作日/周末) × 季节 汇总典型日曲线 (TypicalDayProfile)，含均值/最大/最小/P95
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select, and_, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from ..models.energy import (
+    LoadProfileDay, TypicalDayProfile, Demand15MinData, EnergyHourly
+)
+
+logger = logging.getLogger(__name__)
+
+SLOTS_PER_DAY = 96
+SLOT_MINUTES = 15
+
+SUBJECT_METER = "meter"
+SUBJECT_DEVICE = "device"
+
+DAY_TYPES = ("weekday", "weekend")
+SEASONS = ("spring", "summer", "autumn", "winter")
+ALL = "all"
+
+# 典型日曲线汇总的历史天数
+PROFILE_HISTORY_DAYS = 365
+
+
+def slot_of(ts: datetime) -> int:
+    """时间戳对应的15分钟时段 (0-95)"""
+    return ts.hour * 4 + ts.minute // SLOT_MINUTES
+
+
+def slot_label(slot: int) -> str:
+    """时段标签 HH:MM"""
+    return f"{slot // 4:02d}:{(slot % 4) * SLOT_MINUTES:02d}"
+
+
+def day_type_of(d: date) -> str:
+    """日类型: weekday/weekend"""
+    return "weekend" if d.weekday() >= 5 else "weekday"
+
+
+def season_of(d: date) -> str:
+    """季节: 3-5春 6-8夏 9-11秋 12-2冬"""
+    if d.month in (3, 4, 5):
+        return "spring"
+    if d.month in (6, 7, 8):
+        return "summer"
+    if d.month in (9, 10, 11):
+        return "autumn"
+    return "winter"
+
+
+def _to_json(values: np.ndarray, digits: int = 4) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def _from_json(values: Optional[List[Optional[float]]]) -> np.ndarray:
+    if not values:
+        return np.full(SLOTS_PER_DAY, np.nan)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+@dataclass
+class DayMatrix:
+    """
+    多日负荷矩阵 (天数 × 96)
+
+    缺失数据为 NaN
+    """
+    dates: List[date]
+    avg: np.ndarray
+    max: np.ndarray
+    min: np.ndarray
+
+    @property
+    def days_with_data(self) -> int:
+        """有数据的天数"""
+        if not len(self.dates):
+            return 0
+        return int((~np.isnan(self.avg)).any(axis=1).sum())
+
+    def filter(self, day_type: Optional[str] = None, season: Optional[str] = None) -> 'DayMatrix':
+        """按日类型/季节筛选"""
+        keep = [
+            i for i, d in enumerate(self.dates)
+            if (not day_type or day_type == ALL or day_type_of(d) == day_type)
+            and (not season or season == ALL or season_of(d) == season)
+        ]
+        return DayMatrix(
+            dates=[self.dates[i] for i in keep],
+            avg=self.avg[keep],
+            max=self.max[keep],
+            min=self.min[keep]
+        )
+
+    def slot_stats(self) -> Dict[str, np.ndarray]:
+        """
+        各时段跨天统计 (无数据时段为 NaN)
+
+        Returns:
+            {count, mean, max, min, p95}
+        """
+        valid = ~np.isnan(self.avg)
+        count = valid.sum(axis=0)
+        has = count > 0
+        total = np.where(valid, self.avg, 0).sum(axis=0)
+
+        mean = np.full(SLOTS_PER_DAY, np.nan)
+        mean[has] = total[has] / count[has]
+
+        slot_max = np.full(SLOTS_PER_DAY, np.nan)
+        slot_min = np.full(SLOTS_PER_DAY, np.nan)
+        p95 = np.full(SLOTS_PER_DAY, np.nan)
+        if has.any():
+            slot_max[has] = np.nanmax(np.where(np.isnan(self.max), self.avg, self.max)[:, has], axis=0)
+            slot_min[has] = np.nanmin(np.where(np.isnan(self.min), self.avg, self.min)[:, has], axis=0)
+            p95[has] = np.nanpercentile(self.avg[:, has], 95, axis=0)
+
+        return {"count": count, "mean": mean, "max": slot_max, "min": slot_min, "p95": p95}
+
+
+class LoadProfileService:
+    """典型日负荷曲线物化服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # ==================== 增量写入 ====================
+
+    async def ingest(
+        self,
+        subject_type: str,
+        subject_id: int,
+        timestamp: datetime,
+        value: float,
+        max_value: Optional[float] = None,
+        min_value: Optional[float] = None
+    ) -> LoadProfileDay:
+        """
+        写入一个新的15分钟数据点 (不提交事务)
+
+        只更新当天行对应时段的均值/最大/最小/计数。
+        """
+        day = timestamp.date()
+        row = await self._get_day_row(subject_type, subject_id, day)
+        if row is None:
+            row = self._new_day_row(subject_type, subject_id, day)
+            self.db.add(row)
+            await self.db.flush()
+
+        slot = slot_of(timestamp)
+        counts = list(row.slot_count or [0] * SLOTS_PER_DAY)
+        avgs = list(row.slot_avg or [None] * SLOTS_PER_DAY)
+        maxs = list(row.slot_max or [None] * SLOTS_PER_DAY)
+        mins = list(row.slot_min or [None] * SLOTS_PER_DAY)
+
+        n = counts[slot] + 1
+        prev = avgs[slot] or 0.0
+        avgs[slot] = round(prev + (value - prev) / n, 4)
+        hi = value if max_value is None else max_value
+        lo = value if min_value is None else min_value
+        maxs[slot] = hi if maxs[slot] is None else max(maxs[slot], hi)
+        mins[slot] = lo if mins[slot] is None else min(mins[slot], lo)
+        counts[slot] = n
+
+        row.slot_count, row.slot_avg, row.slot_max, row.slot_min = counts, avgs, maxs, mins
+        for attr in ("slot_count", "slot_avg", "slot_max", "slot_min"):
+            flag_modified(row, attr)
+        return row
+
+    async def invalidate(
+        self,
+        subject_type: str,
+        subject_id: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> None:
+        """删除物化数据 (原始数据被回填或重写后调用，不提交事务)"""
+        conditions = [LoadProfileDay.subject_type == subject_type]
+        if subject_id is not None:
+            conditions.append(LoadProfileDay.subject_id == subject_id)
+        if start_date is not None:
+            conditions.append(LoadProfileDay.profile_date >= start_date)
+        if end_date is not None:
+            conditions.append(LoadProfileDay.profile_date <= end_date)
+        await self.db.execute(delete(LoadProfileDay).where(and_(*conditions)))
+
+        profile_conditions = [TypicalDayProfile.subject_type == subject_type]
+        if subject_id is not None:
+            profile_conditions.append(TypicalDayProfile.subject_id == subject_id)
+        await self.db.execute(delete(TypicalDayProfile).where(and_(*profile_conditions)))
+
+    # ==================== 查询 ====================
+
+    async def get_day_matrix(
+        self,
+        subject_type: str,
+        subject_id: int,
+        start_date: date,
+        end_date: date
+    ) -> DayMatrix:
+        """
+        获取日期范围内的负荷矩阵 (不提交事务)
+
+        已结束且已物化的日期直接读取；缺失日期和当天从原始表补齐。
+        """
+        rows = await self._load_day_rows(subject_type, subject_id, start_date, end_date)
+        by_date = {row.profile_date: row for row in rows}
+
+        all_dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        stale = [d for d in all_dates if d not in by_date or not by_date[d].is_complete]
+
+        if stale:
+            refreshed = await self._materialize_days(subject_type, subject_id, stale, by_date)
+            by_date.update(refreshed)
+
+            newly_complete = {(day_type_of(d), season_of(d)) for d, row in refreshed.items() if row.is_complete}
+            if newly_complete:
+                await self.refresh_typical_profiles(subject_type, subject_id, newly_complete)
+            await self.db.flush()
+
+        avg = np.full((len(all_dates), SLOTS_PER_DAY), np.nan)
+        slot_max = np.full_like(avg, np.nan)
+        slot_min = np.full_like(avg, np.nan)
+        for i, d in enumerate(all_dates):
+            row = by_date.get(d)
+            if row is not None:
+                avg[i] = _from_json(row.slot_avg)
+                slot_max[i] = _from_json(row.slot_max)
+                slot_min[i] = _from_json(row.slot_min)
+
+        return DayMatrix(dates=all_dates, avg=avg, max=slot_max, min=slot_min)
+
+    async def get_typical_profile(
+        self,
+        subject_type: str,
+        subject_id: int,
+        day_type: str = ALL,
+        season: str = ALL
+    ) -> Optional[Dict]:
+        """
+        获取典型日曲线 (96时段均值/最大/最小/P95，不提交事务)
+
+        尚未物化时先补齐最近 PROFILE_HISTORY_DAYS 天。
+        """
+        profile = await self._get_typical_row(subject_type, subject_id, day_type, season)
+        if profile is None:
+            today = date.today()
+            await self.get_day_matrix(
+                subject_type, subject_id, today - timedelta(days=PROFILE_HISTORY_DAYS), today
+            )
+            await self.refresh_typical_profiles(subject_type, subject_id, {(day_type, season)})
+            await self.db.flush()
+            profile = await self._get_typical_row(subject_type, subject_id, day_type, season)
+        if profile is None:
+            return None
+
+        return {
+            "subject_type": subject_type,
+            "subject_id": subject_id,
+            "day_type": profile.day_type,
+            "season": profile.season,
+            "sample_days": profile.sample_days or 0,
+            "last_profile_date": profile.last_profile_date.isoformat() if profile.last_profile_date else None,
+            "slots": [slot_label(i) for i in range(SLOTS_PER_DAY)],
+            "mean": profile.mean_values,
+            "max": profile.max_values,
+            "min": profile.min_values,
+            "p95": profile.p95_values,
+        }
+
+    async def refresh_typical_profiles(
+        self,
+        subject_type: str,
+        subject_id: int,
+        combos: Optional[Iterable[Tuple[str, str]]] = None
+    ) -> None:
+        """
+        重新汇总典型日曲线 (不提交事务)
+
+        Args:
+            combos: 受影响的 (日类型, 季节)，其对应的 all 汇总也会一并刷新；None 表示全部
+        """
+        targets: Set[Tuple[str, str]] = set()
+        if combos is None:
+            targets = {(dt, s) for dt in DAY_TYPES + (ALL,) for s in SEASONS + (ALL,)}
+        else:
+            for day_type, season in combos:
+                for dt in {day_type, ALL}:
+                    for s in {season, ALL}:
+                        targets.add((dt, s))
+
+        await self.db.flush()
+        since = date.today() - timedelta(days=PROFILE_HISTORY_DAYS)
+        result = await self.db.execute(
+            select(LoadProfileDay).where(
+                and_(
+                    LoadProfileDay.subject_type == subject_type,
+                    LoadProfileDay.subject_id == subject_id,
+                    LoadProfileDay.profile_date >= since,
+                    LoadProfileDay.is_complete == True
+                )
+            ).order_by(LoadProfileDay.profile_date)
+        )
+        rows = result.scalars().all()
+        matrix = DayMatrix(
+            dates=[r.profile_date for r in rows],
+            avg=np.array([_from_json(r.slot_avg) for r in rows]).reshape(-1, SLOTS_PER_DAY),
+            max=np.array([_from_json(r.slot_max) for r in rows]).reshape(-1, SLOTS_PER_DAY),
+            min=np.array([_from_json(r.slot_min) for r in rows]).reshape(-1, SLOTS_PER_DAY),
+        )
+
+        for day_type, season in targets:
+            subset = matrix.filter(day_type, season)
+            stats = subset.slot_stats()
+            profile = await self._get_typical_row(subject_type, subject_id, day_type, season)
+            if profile is None:
+                profile = TypicalDayProfile(
+                    subject_type=subject_type, subject_id=subject_id,
+                    day_type=day_type, season=season
+                )
+                self.db.add(profile)
+            profile.sample_days = subset.days_with_data
+            profile.mean_values = _to_json(stats["mean"])
+            profile.max_values = _to_json(stats["max"])
+            profile.min_values = _to_json(stats["min"])
+            profile.p95_values = _to_json(stats["p95"])
+            profile.last_profile_date = subset.dates[-1] if subset.dates else None
+            profile.updated_at = datetime.now()
+
+    # ==================== 物化 ====================
+
+    async def _materialize_days(
+        self,
+        subject_type: str,
+        subject_id: int,
+        days: List[date],
+        existing: Dict[date, LoadProfileDay]
+    ) -> Dict[date, LoadProfileDay]:
+        """从原始表重建指定日期的日负荷曲线 (不提交事务)"""
+        first, last = min(days), max(days)
+        avg, slot_max, slot_min, count = await self._bucket_raw(subject_type, subject_id, first, last)
+
+        today = date.today()
+        refreshed = {}
+        for d in days:
+            i = (d - first).days
+            row = existing.get(d)
+            if row is None:
+                row = self._new_day_row(subject_type, subject_id, d)
+                self.db.add(row)
+            row.slot_avg = _to_json(avg[i])
+            row.slot_max = _to_json(slot_max[i])
+            row.slot_min = _to_json(slot_min[i])
+            row.slot_count = count[i].astype(int).tolist()
+            # 没有任何数据的日期不标记完成，回填或迟到的数据在下次查询时补齐
+            row.is_complete = d < today and bool(count[i].any())
+            row.updated_at = datetime.now()
+            refreshed[d] = row
+        return refreshed
+
+    async def _bucket_raw(
+        self,
+        subject_type: str,
+        subject_id: int,
+        first: date,
+        last: date
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """读取原始数据并按 (天, 时段) 聚合"""
+        start = datetime.combine(first, datetime.min.time())
+        end = datetime.combine(last + timedelta(days=1), datetime.min.time())
+
+        if subject_type == SUBJECT_METER:
+            result = await self.db.execute(
+                select(
+                    Demand15MinData.timestamp,
+                    Demand15MinData.rolling_demand,
+                    Demand15MinData.rolling_demand,
+                    Demand15MinData.rolling_demand
+                ).where(
+                    and_(
+                        Demand15MinData.meter_point_id == subject_id,
+                        Demand15MinData.timestamp >= start,
+                        Demand15MinData.timestamp < end,
+                        Demand15MinData.rolling_demand.isnot(None)
+                    )
+                )
+            )
+            slots_per_record = 1
+        elif subject_type == SUBJECT_DEVICE:
+            result = await self.db.execute(
+                select(
+                    EnergyHourly.stat_time,
+                    EnergyHourly.avg_power,
+                    EnergyHourly.max_power,
+                    EnergyHourly.min_power
+                ).where(
+                    and_(
+                        EnergyHourly.device_id == subject_id,
+                        EnergyHourly.stat_time >= start,
+                        EnergyHourly.stat_time < end
+                    )
+                )
+            )
+            # 小时数据覆盖4个15分钟时段
+            slots_per_record = 4
+        else:
+            raise ValueError(f"未知的对象类型: {subject_type}")
+
+        rows = result.all()
+        n_days = (last - first).days + 1
+        shape = (n_days, SLOTS_PER_DAY)
+        total = np.zeros(shape)
+        count = np.zeros(shape)
+        slot_max = np.full(shape, -np.inf)
+        slot_min = np.full(shape, np.inf)
+
+        if rows:
+            stamps = np.array([r[0] for r in rows], dtype='datetime64[m]')
+            values = np.array([r[1] or 0 for r in rows], dtype=np.float64)
+            highs = np.array([values[i] if r[2] is None else r[2] for i, r in enumerate(rows)], dtype=np.float64)
+            lows = np.array([values[i] if r[3] is None else r[3] for i, r in enumerate(rows)], dtype=np.float64)
+
+            minutes = (stamps - np.datetime64(start, 'm')).astype(np.int64)
+            day_idx = minutes // 1440
+            slot_idx = (minutes % 1440) // SLOT_MINUTES
+            if slots_per_record > 1:
+                slot_idx = slot_idx - slot_idx % slots_per_record
+                day_idx = np.repeat(day_idx, slots_per_record)
+                slot_idx = (slot_idx[:, None] + np.arange(slots_per_record)).ravel()
+                values, highs, lows = (np.repeat(a, slots_per_record) for a in (values, highs, lows))
+
+            np.add.at(total, (day_idx, slot_idx), values)
+            np.add.at(count, (day_idx, slot_idx), 1)
+            np.maximum.at(slot_max, (day_idx, slot_idx), highs)
+            np.minimum.at(slot_min, (day_idx, slot_idx), lows)
+
+        has = count > 0
+        avg = np.full(shape, np.nan)
+        avg[has] = total[has] / count[has]
+        slot_max[~has] = np.nan
+        slot_min[~has] = np.nan
+        return avg, slot_max, slot_min, count
+
+    # ==================== 内部工具 ====================
+
+    @staticmethod
+    def _new_day_row(subject_type: str, subject_id: int, day: date) -> LoadProfileDay:
+        return LoadProfileDay(
+            subject_type=subject_type,
+            subject_id=subject_id,
+            profile_date=day,
+            day_type=day_type_of(day),
+            season=season_of(day),
+            slot_avg=[None] * SLOTS_PER_DAY,
+            slot_max=[None] * SLOTS_PER_DAY,
+            slot_min=[None] * SLOTS_PER_DAY,
+            slot_count=[0] * SLOTS_PER_DAY,
+            is_complete=False
+        )
+
+    async def _get_day_row(self, subject_type: str, subject_id: int, day: date) -> Optional[LoadProfileDay]:
+        result = await self.db.execute(
+            select(LoadProfileDay).where(
+                and_(
+                    LoadProfileDay.subject_type == subject_type,
+                    LoadProfileDay.subject_id == subject_id,
+                    LoadProfileDay.profile_date == day
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def _load_day_rows(
+        self, subject_type: str, subject_id: int, start_date: date, end_date: date
+    ) -> List[LoadProfileDay]:
+        result = await self.db.execute(
+            select(LoadProfileDay).where(
+                and_(
+                    LoadProfileDay.subject_type == subject_type,
+                    LoadProfileDay.subject_id == subject_id,
+                    LoadProfileDay.profile_date >= start_date,
+                    LoadProfileDay.profile_date <= end_date
+                )
+            )
+        )
+        return list(result.scalars().all())
+
+    async def _get_typical_row(
+        self, subject_type: str, subject_id: int, day_type: str, season: str
+    ) -> Optional[TypicalDayProfile]:
+        result = await self.db.execute(
+            select(TypicalDayProfile).where(
+                and_(
+                    TypicalDayProfile.subject_type == subject_type,
+                    TypicalDayProfile.subject_id == subject_id,
+                    TypicalDayProfile.day_type == day_type,
+                    TypicalDayProfile.season == season
+                )
+            )
+        )
+        return result.scalar_one_or_none()
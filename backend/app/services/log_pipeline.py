@@ -0,0 +1,248 @@
+"""
+日志写入管道
+Log Pipeline
+
+操作/系统/通讯日志不再在请求处理中逐条同步 INSERT:
+- 记录日志只追加到内存环形缓冲区，缓冲区满时丢弃最旧的记录并计数
+- 后台写入协程定期 (或缓冲达到批量大小时) 取出缓冲区，按表批量 INSERT
+- 按天分段清理超过保留期的日志，每段一次 DELETE 并单独提交
+- 导出按游标分批读取并流式输出 CSV
+"""
+import asyncio
+import csv
+import io
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..core.database import Base, async_session
+from ..models.log import CommunicationLog, OperationLog, SystemLog
+
+LOG_MODELS: Dict[str, Type[Base]] = {
+    "operation": OperationLog,
+    "system": SystemLog,
+    "communication": CommunicationLog,
+}
+# 缓冲区容量
+BUFFER_SIZE = 10000
+# 缓冲达到该数量时立即写入
+BATCH_SIZE = 500
+# 定期写入间隔 (秒)
+FLUSH_INTERVAL = 2.0
+# 导出每批读取行数
+EXPORT_CHUNK = 1000
+
+# 导出列: 日志类型 → [(表头, 字段)]
+EXPORT_COLUMNS = {
+    "operation": [("时间", "created_at"), ("用户", "username"), ("模块", "module"), ("操作", "action"),
+                  ("目标", "target_name"), ("IP地址", "ip_address"), ("备注", "remark")],
+    "system": [("时间", "created_at"), ("级别", "log_level"), ("模块", "module"),
+               ("消息", "message"), ("异常信息", "exception")],
+    "communication": [("时间", "created_at"), ("设备ID", "device_id"), ("类型", "comm_type"), ("协议", "protocol"),
+                      ("状态", "status"), ("耗时(ms)", "duration_ms"), ("错误信息", "error_message")],
+}
+
+
+class LogPipeline:
+    """
+    日志缓冲与批量写入
+
+    用法:
+        log_pipeline.record_operation(user_id=user.id, username=user.username,
+                                      module="realtime", action="control", ...)
+        await log_pipeline.flush()      # 查询前写入缓冲中的日志
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = BUFFER_SIZE,
+        batch_size: int = BATCH_SIZE,
+        session_factory: Callable[[], AsyncSession] = async_session
+    ):
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self._buffer: Deque[Tuple[Type[Base], Dict[str, Any]]] = deque(maxlen=buffer_size)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.running = False
+        self.written = 0
+        self.dropped = 0
+        self.last_purge: Optional[datetime] = None
+
+    # ==================== 记录 ====================
+
+    def record(self, model: Type[Base], **values) -> None:
+        """追加一条日志到缓冲区 (不访问数据库)"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        values.setdefault("created_at", datetime.now())
+        self._buffer.append((model, values))
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def record_operation(self, **values) -> None:
+        self.record(OperationLog, **values)
+
+    def record_system(self, log_level: str, message: str, **values) -> None:
+        self.record(SystemLog, log_level=log_level, message=message, **values)
+
+    def record_communication(self, **values) -> None:
+        self.record(CommunicationLog, **values)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    # ==================== 写入 ====================
+
+    def _drain(self) -> Dict[Type[Base], List[Dict[str, Any]]]:
+        batches: Dict[Type[Base], List[Dict[str, Any]]] = {}
+        while self._buffer:
+            model, values = self._buffer.popleft()
+            batches.setdefault(model, []).append(values)
+        return batches
+
+    async def flush(self, db: Optional[AsyncSession] = None) -> int:
+        """
+        将缓冲区中的日志按表批量写入
+
+        Returns:
+            写入的日志数
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            batches = self._drain()
+            if not batches:
+                return 0
+            try:
+                if db is not None:
+                    count = await self._write(db, batches)
+                else:
+                    async with self.session_factory() as session:
+                        count = await self._write(session, batches)
+            except Exception:
+                # 写入失败的日志放回缓冲区头部，下次重试
+                rows = [(model, values) for model, batch in batches.items() for values in batch]
+                keep = rows[:self._buffer.maxlen - len(self._buffer)]
+                self.dropped += len(rows) - len(keep)
+                self._buffer.extendleft(reversed(keep))
+                raise
+            self.written += count
+            return count
+
+    async def _write(self, db: AsyncSession, batches: Dict[Type[Base], List[Dict[str, Any]]]) -> int:
+        count = 0
+        for model, rows in batches.items():
+            # 不同字段组合的日志分开插入，保证每批的列一致
+            by_columns: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+            for values in rows:
+                by_columns.setdefault(tuple(sorted(values)), []).append(values)
+            for same_columns in by_columns.values():
+                await db.execute(insert(model), same_columns)
+            count += len(rows)
+        await db.commit()
+        return count
+
+    async def run(self, interval: float = FLUSH_INTERVAL) -> None:
+        """后台写入循环，每天清理一次过期日志"""
+        self.running = True
+        self._wakeup = asyncio.Event()
+        try:
+            while self.running:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                try:
+                    await self.flush()
+                    if self.last_purge is None or datetime.now() - self.last_purge >= timedelta(days=1):
+                        async with self.session_factory() as db:
+                            await purge_logs(db, get_settings().log_retention_days)
+                        self.last_purge = datetime.now()
+                except Exception as e:
+                    print(f"日志写入失败: {e}")
+        finally:
+            self._wakeup = None
+
+    async def stop(self) -> None:
+        """停止后台写入并写入剩余日志"""
+        self.running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+        await self.flush()
+
+
+log_pipeline = LogPipeline()
+
+
+# ==================== 保留期清理 ====================
+
+async def purge_logs(db: AsyncSession, retention_days: int, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    删除超过保留期的日志
+
+    从最早的日志开始按天分段删除，每段一条按 created_at 索引范围的 DELETE 并单独提交，
+    避免一次删除大量数据长时间锁表
+
+    Returns:
+        各日志类型删除的行数
+    """
+    cutoff = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=retention_days)
+    deleted = {}
+    for log_type, model in LOG_MODELS.items():
+        oldest = (await db.execute(select(func.min(model.created_at)))).scalar()
+        deleted[log_type] = 0
+        if oldest is None or oldest >= cutoff:
+            continue
+        day = oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < cutoff:
+            day = min(day + timedelta(days=1), cutoff)
+            result = await db.execute(delete(model).where(model.created_at < day))
+            await db.commit()
+            deleted[log_type] += result.rowcount
+    return deleted
+
+
+# ==================== 导出 ====================
+
+async def stream_logs_csv(
+    log_type: str,
+    start_time: datetime,
+    end_time: datetime,
+    session_factory: Callable[[], AsyncSession] = async_session
+) -> AsyncIterator[bytes]:
+    """
+    按时间倒序分批读取日志并逐块输出 CSV (UTF-8 BOM)
+
+    使用独立会话，响应发送期间不依赖请求的数据库会话；调用前应先写入缓冲中的日志
+    """
+    model = LOG_MODELS[log_type]
+    columns = EXPORT_COLUMNS[log_type]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def take() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow([header for header, _ in columns])
+    yield "\ufeff".encode("utf-8") + take()
+
+    query = select(*[getattr(model, name) for _, name in columns]).where(
+        model.created_at >= start_time,
+        model.created_at <= end_time
+    ).order_by(model.created_at.desc()).execution_options(yield_per=EXPORT_CHUNK)
+
+    async with session_factory() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            writer.writerows(rows)
+            yield take()
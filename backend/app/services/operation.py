@@ -21,6 +21,7 @@ from ..schemas.operation import (
     KnowledgeCreate, KnowledgeUpdate,
     OperationStatistics
 )
+from .statistics import build_operation_statistics, operation_statistics_query
 
 
 class OperationService:
@@ -754,34 +755,7 @@ class OperationService:
         Returns:
             运维统计对象
         """
-        # 工单统计
-        total_orders = db.query(func.count(WorkOrder.id)).scalar() or 0
-        pending_orders = db.query(func.count(WorkOrder.id)).filter(
-            WorkOrder.status == WorkOrderStatus.pending
-        ).scalar() or 0
-        processing_orders = db.query(func.count(WorkOrder.id)).filter(
-            WorkOrder.status == WorkOrderStatus.processing
-        ).scalar() or 0
-        completed_orders = db.query(func.count(WorkOrder.id)).filter(
-            WorkOrder.status == WorkOrderStatus.completed
-        ).scalar() or 0
-
-        # 逾期巡检统计
-        overdue_inspections = db.query(func.count(InspectionTask.id)).filter(
-            InspectionTask.status == InspectionStatus.overdue
-        ).scalar() or 0
-
-        # 知识库统计
-        knowledge_count = db.query(func.count(KnowledgeBase.id)).scalar() or 0
-
-        return OperationStatistics(
-            total_orders=total_orders,
-            pending_orders=pending_orders,
-            processing_orders=processing_orders,
-            completed_orders=completed_orders,
-            overdue_inspections=overdue_inspections,
-            knowledge_count=knowledge_count
-        )
+        return build_operation_statistics(db.execute(operation_statistics_query()).one())
 
 
 # 单例实例
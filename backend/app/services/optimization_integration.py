@@ -327,7 +327,7 @@ async def auto_generate_opportunities(
         创建的机会列表
     """
     from ..services.forecasting import generate_demo_forecast
-    from ..services.optimizer import run_day_ahead_optimization
+    from ..services.optimization_service import optimization_service
 
     service = OptimizationIntegrationService(db)
     opportunities = []
@@ -359,7 +359,7 @@ async def auto_generate_opportunities(
             'initial_soc': 0.50,
         }
 
-        result = run_day_ahead_optimization(
+        result = await optimization_service.run_day_ahead(
             forecast_data=forecast,
             pricing_config=pricing_config,
             storage_config=storage_config,
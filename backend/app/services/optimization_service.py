@@ -0,0 +1,246 @@
+"""
+日前优化求解服务
+Day-ahead Optimization Service
+
+在进程池中执行 MILP 日前优化，不阻塞事件循环:
+- 结果按输入哈希缓存，相同日期/参数的重复请求直接返回
+- 相同输入的并发请求共享同一次求解
+- 同一储能/设备配置以上一次求解 (通常为前一天) 的调度结果作为热启动初值
+- 工作进程内按设备集合缓存模型结构，每次只更新负荷和电价系数 (见 optimizer._get_model)
+- 结果附带 solve_stats: 求解耗时、MIP间隙、是否热启动/复用模型
+- 多日滚动时域优化同样在求解池中执行
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from .optimizer import run_day_ahead_optimization, run_rolling_horizon_optimization
+from .tariff_compiler import CompiledTariff, get_cached_tariff
+
+logger = logging.getLogger(__name__)
+
+# 结果缓存条数
+RESULT_CACHE_SIZE = 128
+# 求解进程数
+MAX_WORKERS = 2
+
+
+def input_hash(payload: Dict[str, Any]) -> str:
+    """输入参数的稳定哈希 (键排序的JSON摘要)"""
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class OptimizationService:
+    """
+    日前优化求解服务
+
+    用法:
+        result = await optimization_service.run_day_ahead(
+            forecast_data, pricing_config, storage_config, devices
+        )
+        result['solve_stats']   # 求解耗时、MIP间隙、热启动
+        result['cached']        # 是否命中结果缓存
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        cache_size: int = RESULT_CACHE_SIZE,
+        use_processes: bool = True
+    ):
+        """
+        Args:
+            max_workers: 求解进程 (或线程) 数
+            cache_size: 结果缓存条数
+            use_processes: 是否使用进程池，False 时使用线程池
+        """
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._warm_starts: Dict[str, Dict[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                # spawn 避免在已有事件循环/线程的进程中 fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="milp-solver"
+                )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """关闭求解进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def clear_cache(self) -> None:
+        """清空结果缓存和热启动解"""
+        self._results.clear()
+        self._warm_starts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        return {
+            'cached_results': len(self._results),
+            'warm_start_models': len(self._warm_starts),
+            'hits': self.hits,
+            'misses': self.misses,
+            'in_flight': len(self._inflight),
+        }
+
+    async def run_day_ahead(
+        self,
+        forecast_data: Dict,
+        pricing_config: Dict,
+        storage_config: Optional[Dict] = None,
+        devices: Optional[List[Dict]] = None,
+        demand_target: Optional[float] = None,
+        tariff: Optional[CompiledTariff] = None,
+        time_limit: int = 30,
+        gap_rel: Optional[float] = None,
+        solver: str = 'auto',
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        执行日前调度优化 (参数同 run_day_ahead_optimization)
+
+        Args:
+            time_limit: 求解时间上限（秒）
+            gap_rel: 相对MIP间隙，达到即停止求解
+            solver: 求解器 'auto'（按规模和时间预算选择）/ 'milp' / 'heuristic'
+            use_cache: 是否使用结果缓存
+
+        Returns:
+            优化结果，附加 input_hash 和 cached 字段
+        """
+        tariff = tariff or get_cached_tariff()
+        key = input_hash({
+            'loads': [f.get('predicted_power') for f in forecast_data.get('forecasts', [])],
+            'date': forecast_data.get('date'),
+            'pricing': pricing_config,
+            'storage': storage_config,
+            'devices': devices or [],
+            'demand_target': demand_target,
+            'slot_periods': tariff.slot_periods,
+            'time_limit': time_limit,
+            'gap_rel': gap_rel,
+            'solver': solver,
+        })
+
+        if use_cache and key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return {**copy.deepcopy(self._results[key]), 'cached': True}
+
+        if key in self._inflight:
+            self.hits += 1
+            result = await asyncio.shield(self._inflight[key])
+            return {**copy.deepcopy(result), 'cached': True}
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # 储能/设备配置相同即模型结构相同，用其上一次的解热启动
+            warm_key = input_hash({'storage': storage_config, 'devices': devices or []})
+            job = partial(
+                run_day_ahead_optimization,
+                forecast_data=forecast_data,
+                pricing_config=pricing_config,
+                storage_config=storage_config,
+                devices=devices,
+                demand_target=demand_target,
+                tariff=tariff,
+                time_limit=time_limit,
+                gap_rel=gap_rel,
+                warm_start=self._warm_starts.get(warm_key),
+                keep_solution=True,
+                solver=solver,
+            )
+            result = await self._submit(job)
+
+            solution = result.pop('_solution', None)
+            if solution:
+                self._warm_starts[warm_key] = solution
+            result['input_hash'] = key
+
+            if result.get('status') == 'success':
+                self._results[key] = result
+                while len(self._results) > self.cache_size:
+                    self._results.popitem(last=False)
+            future.set_result(result)
+            return {**copy.deepcopy(result), 'cached': False}
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def run_rolling_horizon(
+        self,
+        forecasts: List[Dict],
+        pricing_config: Dict,
+        storage_config: Optional[Dict] = None,
+        devices: Optional[List[Dict]] = None,
+        demand_target: Optional[float] = None,
+        tariff: Optional[CompiledTariff] = None,
+        horizon_days: int = 3,
+        month_peak: float = 0.0,
+        time_limit: int = 30,
+        gap_rel: Optional[float] = None,
+        solver: str = 'auto'
+    ) -> Dict[str, Any]:
+        """执行多日滚动时域优化 (参数同 run_rolling_horizon_optimization)"""
+        job = partial(
+            run_rolling_horizon_optimization,
+            forecasts=forecasts,
+            pricing_config=pricing_config,
+            storage_config=storage_config,
+            devices=devices,
+            demand_target=demand_target,
+            tariff=tariff or get_cached_tariff(),
+            horizon_days=horizon_days,
+            month_peak=month_peak,
+            time_limit=time_limit,
+            gap_rel=gap_rel,
+            solver=solver,
+        )
+        return await self._submit(job)
+
+    async def _submit(self, job) -> Dict[str, Any]:
+        """提交到求解池，进程池不可用时退回线程执行"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), job)
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"求解进程池不可用，改为线程执行: {e}")
+            self.shutdown()
+            self.use_processes = False
+            return await loop.run_in_executor(self._get_executor(), job)
+
+
+# 全局实例
+optimization_service = OptimizationService()
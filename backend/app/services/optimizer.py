@@ -2,12 +2,19 @@
 MILP优化器模块
 使用混合整数线性规划优化电费成本
 """
+import os
+import tempfile
+import threading
+import time
 import numpy as np
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 
+from .tariff_compiler import CompiledTariff, get_cached_tariff
+
 try:
     import pulp
     PULP_AVAILABLE = True
@@ -107,254 +114,588 @@ class DispatchableDevice:
             self.forbidden_periods = []
 
 
-class MILPOptimizer:
-    """MILP优化器"""
+# ==================== 模型结构缓存 ====================
 
-    # 时段划分 (小时 -> 时段类型)
-    HOUR_TO_PERIOD = {
-        0: 'deep_valley', 1: 'deep_valley', 2: 'deep_valley', 3: 'deep_valley',
-        4: 'valley', 5: 'valley', 6: 'valley', 7: 'valley',
-        8: 'flat', 9: 'peak', 10: 'peak', 11: 'sharp',
-        12: 'peak', 13: 'flat', 14: 'flat', 15: 'flat',
-        16: 'flat', 17: 'peak', 18: 'sharp', 19: 'peak',
-        20: 'peak', 21: 'flat', 22: 'valley', 23: 'valley',
-    }
-
-    def __init__(
-        self,
-        pricing: PricingConfig,
-        storage: Optional[StorageConfig] = None,
-        devices: Optional[List[DispatchableDevice]] = None,
-        time_slots: int = 96,  # 96个15分钟时段
-        time_limit: int = 30   # 求解时间限制（秒）
-    ):
-        self.pricing = pricing
-        self.storage = storage
-        self.devices = devices or []
-        self.time_slots = time_slots
-        self.time_limit = time_limit
-        self.slot_duration = 0.25  # 15分钟 = 0.25小时
+# 每个进程缓存的模型结构数 (按时段数/储能参数/设备集合区分)
+MODEL_CACHE_SIZE = 8
 
-        # 构建时段到电价的映射
-        self.slot_prices = self._build_slot_prices()
+# 一天的15分钟时段数
+DAY_SLOTS = 96
 
-    def _build_slot_prices(self) -> List[float]:
-        """构建每个时段的电价"""
-        prices = []
-        for slot in range(self.time_slots):
-            hour = slot // 4
-            period = self.HOUR_TO_PERIOD.get(hour, 'flat')
-            price = self.pricing.period_prices.get(period, 0.65)
-            prices.append(price)
-        return prices
+# 自动选择求解器: CBC 每秒时间预算可处理的二进制变量数 (超过则改用启发式)
+MILP_BINARIES_PER_SECOND = 100
+SOLVERS = ('auto', 'milp', 'heuristic')
+# 未指定MIP间隙时的默认相对间隙 (CBC默认证明到零间隙，峰值目标下常在最优解附近耗尽时间)
+DEFAULT_MIP_GAP = 1e-4
 
-    def _get_slot_period(self, slot: int) -> str:
-        """获取时段类型"""
-        hour = slot // 4
-        return self.HOUR_TO_PERIOD.get(hour, 'flat')
+_model_cache: "OrderedDict[Tuple, _MILPModel]" = OrderedDict()
+_model_cache_lock = threading.Lock()
 
-    def optimize(
-        self,
-        base_load: List[float],
-        demand_target: Optional[float] = None
-    ) -> Dict[str, Any]:
-        """
-        执行优化
 
-        Args:
-            base_load: 基础负荷曲线 (96个时段的功率值，kW)
-            demand_target: 需量目标 (kW)，默认使用申报需量
+def _structure_key(
+    time_slots: int,
+    storage: Optional[StorageConfig],
+    devices: List[DispatchableDevice],
+    slot_hours: Optional[Tuple[float, ...]] = None
+) -> Tuple:
+    """模型结构键: 只包含决定变量和约束结构的参数"""
+    storage_key = None
+    if storage:
+        storage_key = (
+            storage.capacity, storage.max_charge_power, storage.max_discharge_power,
+            storage.charge_efficiency, storage.discharge_efficiency,
+            storage.min_soc, storage.max_soc, storage.cycle_cost,
+        )
+    device_key = tuple(
+        (
+            d.device_type.value, d.rated_power, d.min_power, d.max_power,
+            d.run_duration, d.daily_runs, d.curtail_ratio, d.max_curtail_duration, d.ramp_rate,
+            tuple(d.allowed_periods), tuple(d.forbidden_periods),
+        )
+        for d in devices
+    )
+    return (time_slots, storage_key, device_key, slot_hours)
+
+
+def _get_model(
+    time_slots: int,
+    slot_duration: float,
+    storage: Optional[StorageConfig],
+    devices: List[DispatchableDevice],
+    slot_hours: Optional[Tuple[float, ...]] = None
+) -> Tuple['_MILPModel', bool]:
+    """获取缓存的模型结构，未命中时构建并缓存 (返回模型及是否复用)"""
+    key = _structure_key(time_slots, storage, devices, slot_hours)
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is not None:
+            _model_cache.move_to_end(key)
+            return model, True
+        model = _MILPModel(time_slots, slot_duration, storage, devices, slot_hours)
+        _model_cache[key] = model
+        while len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+        return model, False
+
+
+def _parse_cbc_gap(log_path: str) -> Optional[float]:
+    """从CBC日志解析最终相对间隙 (最优解为0，无法解析时返回None)"""
+    try:
+        with open(log_path, encoding='utf-8', errors='ignore') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    objective = bound = None
+    for line in lines:
+        if line.startswith('Result - Optimal solution found'):
+            return 0.0
+        if line.startswith('Objective value:'):
+            objective = float(line.split(':', 1)[1])
+        elif line.startswith('Lower bound:'):
+            bound = float(line.split(':', 1)[1])
+        elif line.startswith('Gap:'):
+            return round(float(line.split(':', 1)[1]), 6)
+    if objective is not None and bound is not None and objective:
+        return round(abs(objective - bound) / abs(objective), 6)
+    return None
+
+
+def _shift_solution(solution: Dict[str, float], fine_slots: int, group: int) -> Dict[str, float]:
+    """
+    将上一个滚动窗口的解平移一天，作为下一个窗口的热启动初值
 
-        Returns:
-            优化结果字典
-        """
-        if not PULP_AVAILABLE:
-            return self._optimize_heuristic(base_load, demand_target)
+    新窗口首日的15分钟时段取上一窗口第二天对应小时的值，其余粗时段前移一天。
+    """
+    coarse_day = fine_slots // group
+    shifted: Dict[str, float] = {}
+    for name, value in solution.items():
+        prefix, _, index = name.rpartition('_')
+        if not prefix or not index.isdigit():
+            shifted[name] = value
+            continue
+        old = int(index)
+        if old < fine_slots:
+            continue
+        if old < fine_slots + coarse_day:
+            # 上一窗口第二天 → 新窗口首日 (每小时展开为 group 个时段)
+            for q in range(group):
+                shifted[f"{prefix}_{(old - fine_slots) * group + q}"] = value
+        else:
+            shifted[f"{prefix}_{old - coarse_day}"] = value
+    return shifted
+
+
+def net_load_from_result(base_load: List[float], result: Dict[str, Any]) -> List[float]:
+    """按调度结果计算电网侧净负荷 (基础负荷 + 充电 - 放电 + 时移设备 - 削减)"""
+    net = np.array(base_load, dtype=float)
+    for item in result.get('storage_schedule', []):
+        net[item['time_slot']] += item['charge_power'] - item['discharge_power']
+    for device in result.get('schedule', []):
+        for action in device.get('actions', []):
+            if action['action'] == 'on':
+                net[action['time_slot']] += action['power']
+            elif action['action'] == 'curtail':
+                net[action['time_slot']] -= action['power_reduction']
+            elif action['action'] == 'modulate':
+                net[action['time_slot']] += action['power_delta']
+    return net.tolist()
+
+
+class _MILPModel:
+    """
+    MILP模型结构
 
-        if demand_target is None:
-            demand_target = self.pricing.declared_demand
+    变量和结构性约束 (储能SOC演化、充放电互斥、设备运行时长等) 只构建一次；
+    负荷、电价、需量电价、需量目标和初始SOC作为系数在每次求解前更新。
 
-        try:
-            return self._optimize_milp(base_load, demand_target)
-        except Exception as e:
-            print(f"MILP优化失败，使用启发式方法: {e}")
-            return self._optimize_heuristic(base_load, demand_target)
+    slot_hours 给出每个时段的时长 (小时)，用于滚动优化中"首日15分钟 + 后续天按小时"的
+    变分辨率模型；粗时段内时移设备的开关变量松弛为运行比例。
+    """
 
-    def _optimize_milp(
+    def __init__(
         self,
-        base_load: List[float],
-        demand_target: float
-    ) -> Dict[str, Any]:
-        """MILP优化实现"""
-        T = self.time_slots
-        dt = self.slot_duration
+        time_slots: int,
+        slot_duration: float,
+        storage: Optional[StorageConfig],
+        devices: List[DispatchableDevice],
+        slot_hours: Optional[Tuple[float, ...]] = None
+    ):
+        T = time_slots
+        dt = slot_duration
+        self.time_slots = T
+        self.slot_duration = dt
+        self.slot_hours = list(slot_hours) if slot_hours else [dt] * T
+        self.storage = storage
+        self.devices = devices
+        self.lock = threading.Lock()
+        self._warm_start = False
+
+        # 各时段所在的天和小时
+        starts = np.concatenate([[0.0], np.cumsum(self.slot_hours)[:-1]])
+        self.slot_day = (starts // 24).astype(int).tolist()
+        self.slot_hour = (starts % 24).astype(int).tolist()
 
-        # 创建优化问题
         prob = pulp.LpProblem("Electricity_Cost_Optimization", pulp.LpMinimize)
+        self.prob = prob
 
         # ========== 决策变量 ==========
 
         # 最大需量变量
-        D_max = pulp.LpVariable("D_max", lowBound=0)
+        self.D_max = pulp.LpVariable("D_max", lowBound=0)
 
         # 储能变量
-        if self.storage:
-            P_charge = [pulp.LpVariable(f"P_charge_{t}", lowBound=0,
-                                        upBound=self.storage.max_charge_power)
-                       for t in range(T)]
-            P_discharge = [pulp.LpVariable(f"P_discharge_{t}", lowBound=0,
-                                           upBound=self.storage.max_discharge_power)
-                          for t in range(T)]
-            SOC = [pulp.LpVariable(f"SOC_{t}", lowBound=self.storage.min_soc,
-                                   upBound=self.storage.max_soc)
-                  for t in range(T + 1)]
+        if storage:
+            self.P_charge = [pulp.LpVariable(f"P_charge_{t}", lowBound=0,
+                                             upBound=storage.max_charge_power)
+                             for t in range(T)]
+            self.P_discharge = [pulp.LpVariable(f"P_discharge_{t}", lowBound=0,
+                                                upBound=storage.max_discharge_power)
+                                for t in range(T)]
+            self.SOC = [pulp.LpVariable(f"SOC_{t}", lowBound=storage.min_soc,
+                                        upBound=storage.max_soc)
+                        for t in range(T + 1)]
             # 充放电互斥二进制变量
             z_charge = [pulp.LpVariable(f"z_charge_{t}", cat='Binary') for t in range(T)]
         else:
-            P_charge = [0] * T
-            P_discharge = [0] * T
-            SOC = None
+            self.P_charge = [0] * T
+            self.P_discharge = [0] * T
+            self.SOC = None
 
         # 可调度设备变量
-        device_vars = {}
-        for d_idx, device in enumerate(self.devices):
+        self.device_vars: Dict[int, Dict[str, List]] = {}
+        for d_idx, device in enumerate(devices):
             if device.device_type == DeviceType.SHIFTABLE:
-                # 时移型：开关状态
-                device_vars[d_idx] = {
+                # 时移型：开关状态 (粗时段为运行比例)
+                self.device_vars[d_idx] = {
                     'on': [pulp.LpVariable(f"dev_{d_idx}_on_{t}", cat='Binary')
-                          for t in range(T)]
+                           if self.slot_hours[t] == dt else
+                           pulp.LpVariable(f"dev_{d_idx}_on_{t}", lowBound=0, upBound=1)
+                           for t in range(T)]
                 }
             elif device.device_type == DeviceType.CURTAILABLE:
-                # 削减型：削减比例
-                device_vars[d_idx] = {
-                    'curtail': [pulp.LpVariable(f"dev_{d_idx}_curtail_{t}",
-                                               lowBound=0, upBound=device.curtail_ratio)
-                               for t in range(T)]
+                # 削减型：削减比例 (非允许时段不可削减)
+                self.device_vars[d_idx] = {
+                    'curtail': [pulp.LpVariable(f"dev_{d_idx}_curtail_{t}", lowBound=0,
+                                                upBound=device.curtail_ratio
+                                                if self._slot_allowed(device, t) else 0)
+                                for t in range(T)]
                 }
             elif device.device_type == DeviceType.MODULATING:
-                # 调节型：功率输出
-                device_vars[d_idx] = {
+                # 调节型：功率输出 (非允许时段保持额定功率)
+                self.device_vars[d_idx] = {
                     'power': [pulp.LpVariable(f"dev_{d_idx}_power_{t}",
-                                             lowBound=device.min_power,
-                                             upBound=device.max_power)
-                             for t in range(T)]
+                                              lowBound=device.min_power,
+                                              upBound=device.max_power)
+                              if self._slot_allowed(device, t) else
+                              pulp.LpVariable(f"dev_{d_idx}_power_{t}",
+                                              lowBound=device.rated_power,
+                                              upBound=device.rated_power)
+                              for t in range(T)]
                 }
 
-        # ========== 目标函数 ==========
-
-        # 电量电费
-        energy_cost = pulp.lpSum([
-            self.slot_prices[t] * base_load[t] * dt
-            for t in range(T)
-        ])
-
-        # 储能相关成本
-        if self.storage:
-            # 储能放电收益（高价时段放电）
-            storage_benefit = pulp.lpSum([
-                self.slot_prices[t] * P_discharge[t] * dt * self.storage.discharge_efficiency
-                for t in range(T)
-            ])
-            # 储能充电成本（低价时段充电）
-            storage_cost = pulp.lpSum([
-                self.slot_prices[t] * P_charge[t] * dt / self.storage.charge_efficiency
-                for t in range(T)
-            ])
-            # 循环成本
-            cycle_cost = pulp.lpSum([
-                self.storage.cycle_cost * (P_charge[t] + P_discharge[t]) * dt
-                for t in range(T)
-            ])
-            storage_total = storage_cost - storage_benefit + cycle_cost
-        else:
-            storage_total = 0
-
-        # 需量电费
-        demand_cost = D_max * self.pricing.demand_price
-
-        # 总目标：最小化总电费
-        prob += energy_cost + storage_total + demand_cost
-
         # ========== 约束条件 ==========
 
-        # 1. 需量约束：任意时段净功率 <= D_max
+        # 1. 需量约束：任意时段净功率 <= D_max (基础负荷作为常数项每次更新)
         for t in range(T):
-            # 计算净功率
-            net_power = base_load[t]
-
-            # 加上储能影响
-            if self.storage:
-                net_power += P_charge[t] - P_discharge[t]
-
-            # 加上可调度设备影响
-            for d_idx, device in enumerate(self.devices):
-                if d_idx not in device_vars:
+            net_power = pulp.LpAffineExpression()
+            if storage:
+                net_power += self.P_charge[t] - self.P_discharge[t]
+            for d_idx, device in enumerate(devices):
+                if d_idx not in self.device_vars:
                     continue
-
                 if device.device_type == DeviceType.SHIFTABLE:
                     # 时移型：开启时增加功率
-                    net_power += device.rated_power * device_vars[d_idx]['on'][t]
+                    net_power += device.rated_power * self.device_vars[d_idx]['on'][t]
                 elif device.device_type == DeviceType.CURTAILABLE:
                     # 削减型：削减时减少功率
-                    net_power -= device.rated_power * device_vars[d_idx]['curtail'][t]
+                    net_power -= device.rated_power * self.device_vars[d_idx]['curtail'][t]
                 elif device.device_type == DeviceType.MODULATING:
-                    # 调节型：直接使用功率变量
-                    pass  # 已在base_load中
-
-            prob += D_max >= net_power, f"demand_constraint_{t}"
+                    # 调节型：基础负荷按额定功率计，偏离额定的部分计入 (额定功率在常数项扣除)
+                    net_power += self.device_vars[d_idx]['power'][t]
+            prob += self.D_max >= net_power, f"demand_constraint_{t}"
+        self.demand_constraints = [prob.constraints[f"demand_constraint_{t}"] for t in range(T)]
 
         # 2. 需量目标软约束（尽量不超过申报需量）
-        prob += D_max <= demand_target * 1.05, "demand_target_soft"
+        prob += self.D_max <= 0, "demand_target_soft"
+        self.target_constraint = prob.constraints["demand_target_soft"]
 
         # 3. 储能约束
-        if self.storage:
+        self.initial_soc_constraint = None
+        if storage:
             # 初始SOC
-            prob += SOC[0] == self.storage.initial_soc, "initial_soc"
+            prob += self.SOC[0] == 0, "initial_soc"
+            self.initial_soc_constraint = prob.constraints["initial_soc"]
 
             # SOC演化
             for t in range(T):
-                prob += SOC[t + 1] == (
-                    SOC[t] +
-                    (P_charge[t] * self.storage.charge_efficiency -
-                     P_discharge[t] / self.storage.discharge_efficiency) *
-                    dt / self.storage.capacity
+                prob += self.SOC[t + 1] == (
+                    self.SOC[t] +
+                    (self.P_charge[t] * storage.charge_efficiency -
+                     self.P_discharge[t] / storage.discharge_efficiency) *
+                    self.slot_hours[t] / storage.capacity
                 ), f"soc_evolution_{t}"
 
             # 充放电互斥
             for t in range(T):
-                prob += P_charge[t] <= self.storage.max_charge_power * z_charge[t]
-                prob += P_discharge[t] <= self.storage.max_discharge_power * (1 - z_charge[t])
+                prob += self.P_charge[t] <= storage.max_charge_power * z_charge[t]
+                prob += self.P_discharge[t] <= storage.max_discharge_power * (1 - z_charge[t])
 
         # 4. 时移型设备约束
-        for d_idx, device in enumerate(self.devices):
+        for d_idx, device in enumerate(devices):
             if device.device_type != DeviceType.SHIFTABLE:
                 continue
-            if d_idx not in device_vars:
-                continue
-
-            vars_on = device_vars[d_idx]['on']
+            vars_on = self.device_vars[d_idx]['on']
 
-            # 每日运行时长约束
+            # 每日运行时长约束 (按15分钟时段计)
             total_run_slots = int(device.run_duration * 4 * device.daily_runs)
-            prob += pulp.lpSum(vars_on) == total_run_slots, f"dev_{d_idx}_run_duration"
+            for day in sorted(set(self.slot_day)):
+                suffix = f"_{day}" if day else ""
+                prob += pulp.lpSum(
+                    vars_on[t] * (self.slot_hours[t] / dt)
+                    for t in range(T) if self.slot_day[t] == day
+                ) == total_run_slots, f"dev_{d_idx}_run_duration{suffix}"
 
             # 禁止时段约束
             for hour in device.forbidden_periods:
-                for q in range(4):
-                    slot = hour * 4 + q
-                    if slot < T:
+                for slot in range(T):
+                    if self.slot_hour[slot] == hour:
                         prob += vars_on[slot] == 0, f"dev_{d_idx}_forbidden_{slot}"
 
-        # ========== 求解 ==========
-        solver = pulp.PULP_CBC_CMD(timeLimit=self.time_limit, msg=0)
-        status = prob.solve(solver)
+            # 允许时段约束
+            if len(set(device.allowed_periods)) < 24:
+                for slot in range(T):
+                    if self.slot_hour[slot] not in device.allowed_periods:
+                        prob += vars_on[slot] == 0, f"dev_{d_idx}_not_allowed_{slot}"
+
+        # 5. 削减型设备约束：每日削减量不超过 削减比例 × 最大削减时长
+        for d_idx, device in enumerate(devices):
+            if device.device_type != DeviceType.CURTAILABLE:
+                continue
+            budget = device.curtail_ratio * device.max_curtail_duration * 4
+            for day in sorted(set(self.slot_day)):
+                suffix = f"_{day}" if day else ""
+                prob += pulp.lpSum(
+                    self.device_vars[d_idx]['curtail'][t] * (self.slot_hours[t] / dt)
+                    for t in range(T) if self.slot_day[t] == day
+                ) <= budget, f"dev_{d_idx}_curtail_budget{suffix}"
+
+        # 6. 调节型设备约束：每日用电量等于按额定功率运行，相邻时段受爬坡速率限制
+        for d_idx, device in enumerate(devices):
+            if device.device_type != DeviceType.MODULATING:
+                continue
+            power = self.device_vars[d_idx]['power']
+            for day in sorted(set(self.slot_day)):
+                suffix = f"_{day}" if day else ""
+                slots = [t for t in range(T) if self.slot_day[t] == day]
+                prob += pulp.lpSum(power[t] * self.slot_hours[t] for t in slots) == \
+                    device.rated_power * sum(self.slot_hours[t] for t in slots), f"dev_{d_idx}_energy{suffix}"
+            for t in range(1, T):
+                ramp = device.ramp_rate * 60 * self.slot_hours[t]
+                prob += power[t] - power[t - 1] <= ramp, f"dev_{d_idx}_ramp_up_{t}"
+                prob += power[t - 1] - power[t] <= ramp, f"dev_{d_idx}_ramp_down_{t}"
+
+    def _slot_allowed(self, device: DispatchableDevice, t: int) -> bool:
+        """时段是否在设备允许时段内且不在禁止时段"""
+        hour = self.slot_hour[t]
+        return hour in device.allowed_periods and hour not in device.forbidden_periods
+
+    def set_coefficients(
+        self,
+        base_load: List[float],
+        slot_prices: List[float],
+        demand_price: float,
+        demand_target: float,
+        initial_soc: Optional[float] = None,
+        demand_floor: float = 0.0
+    ) -> None:
+        """
+        更新负荷、电价和需量目标，重建目标函数
+
+        Args:
+            initial_soc: 初始SOC，默认取储能配置
+            demand_floor: 需量下限 (滚动优化中为本月已发生的最大需量)
+        """
+        T = self.time_slots
+        hours = self.slot_hours
+        storage = self.storage
+        self._warm_start = False
+
+        # 调节型设备按额定功率含在基础负荷中
+        modulating = [
+            (self.device_vars[d_idx]['power'], device.rated_power)
+            for d_idx, device in enumerate(self.devices)
+            if device.device_type == DeviceType.MODULATING
+        ]
+        modulating_rated = sum(rated for _, rated in modulating)
+
+        for t in range(T):
+            self.demand_constraints[t].constant = -(base_load[t] - modulating_rated)
+        self.D_max.lowBound = demand_floor
+        self.target_constraint.constant = -max(demand_target * 1.05, demand_floor)
+
+        # 目标函数：电量电费 (常数) + 储能充放电成本/收益 + 循环成本 + 需量电费
+        terms = [(self.D_max, demand_price)]
+        if storage:
+            if initial_soc is None:
+                initial_soc = storage.initial_soc
+            self.initial_soc_constraint.constant = -initial_soc
+            for t in range(T):
+                dt = hours[t]
+                terms.append((self.P_charge[t],
+                              slot_prices[t] * dt / storage.charge_efficiency + storage.cycle_cost * dt))
+                terms.append((self.P_discharge[t],
+                              -slot_prices[t] * dt * storage.discharge_efficiency + storage.cycle_cost * dt))
+        energy_cost = sum(slot_prices[t] * base_load[t] * hours[t] for t in range(T))
+        for power, rated in modulating:
+            for t in range(T):
+                terms.append((power[t], slot_prices[t] * hours[t]))
+                energy_cost -= slot_prices[t] * rated * hours[t]
+        self.prob.setObjective(pulp.LpAffineExpression(terms, constant=energy_cost))
+
+    def set_warm_start(self, values: Dict[str, float]) -> bool:
+        """设置热启动初值，返回是否有变量被赋初值"""
+        applied = False
+        for var in self.prob.variables():
+            value = values.get(var.name)
+            if value is None:
+                # 未给初值的变量清除上次求解残留的值
+                var.varValue = None
+                continue
+            # 上一次的解可能因本次边界 (如需量下限) 变化而越界，截断到边界内
+            if var.lowBound is not None:
+                value = max(value, var.lowBound)
+            if var.upBound is not None:
+                value = min(value, var.upBound)
+            var.setInitialValue(value)
+            applied = True
+        self._warm_start = applied
+        return applied
+
+    def solve(self, time_limit: int, gap_rel: Optional[float] = None) -> Tuple[int, float, Optional[float]]:
+        """求解，返回 (状态, 求解耗时秒, 相对间隙)"""
+        fd, log_path = tempfile.mkstemp(prefix='milp_', suffix='.log')
+        os.close(fd)
+        try:
+            solver = pulp.PULP_CBC_CMD(
+                timeLimit=time_limit,
+                gapRel=DEFAULT_MIP_GAP if gap_rel is None else gap_rel,
+                warmStart=self._warm_start,
+                logPath=log_path,
+                msg=0
+            )
+            started = time.perf_counter()
+            status = self.prob.solve(solver)
+            solve_time = time.perf_counter() - started
+            return status, solve_time, _parse_cbc_gap(log_path)
+        finally:
+            try:
+                os.remove(log_path)
+            except OSError:
+                pass
+
+    def solution(self) -> Dict[str, float]:
+        """当前解 (变量名 -> 值)，用于下一次求解的热启动"""
+        return {
+            var.name: var.varValue
+            for var in self.prob.variables()
+            if var.varValue is not None
+        }
+
+
+class MILPOptimizer:
+    """MILP优化器"""
+
+    def __init__(
+        self,
+        pricing: PricingConfig,
+        storage: Optional[StorageConfig] = None,
+        devices: Optional[List[DispatchableDevice]] = None,
+        time_slots: int = 96,  # 96个15分钟时段
+        time_limit: int = 30,  # 求解时间限制（秒）
+        tariff: Optional[CompiledTariff] = None,  # 分时时段划分，默认取编译缓存
+        gap_rel: Optional[float] = None,  # 相对MIP间隙，达到即停止求解
+        warm_start: Optional[Dict[str, float]] = None,  # 热启动初值 (变量名 -> 值)
+        solver: str = 'auto'  # 'auto' 按问题规模和时间预算选择 / 'milp' / 'heuristic'
+    ):
+        if solver not in SOLVERS:
+            raise ValueError(f"未知求解器: {solver}")
+        self.solver = solver
+        self.pricing = pricing
+        self.gap_rel = gap_rel
+        self.warm_start = warm_start
+        self.tariff = tariff or get_cached_tariff()
+        self.storage = storage
+        self.devices = devices or []
+        self.time_slots = time_slots
+        self.time_limit = time_limit
+        self.slot_duration = 0.25  # 15分钟 = 0.25小时
+
+        # 构建时段到电价的映射
+        self.slot_prices = self._build_slot_prices()
+
+    def _build_slot_prices(self) -> List[float]:
+        """构建每个时段的电价"""
+        return [
+            self.pricing.period_prices.get(self._get_slot_period(slot), 0.65)
+            for slot in range(self.time_slots)
+        ]
+
+    def _get_slot_period(self, slot: int) -> str:
+        """获取时段类型"""
+        return self.tariff.slot_period(slot)
+
+    def binary_count(self) -> int:
+        """MILP模型中的二进制变量数 (储能充放电互斥 + 时移型设备开关)"""
+        shiftable = sum(1 for d in self.devices if d.device_type == DeviceType.SHIFTABLE)
+        return self.time_slots * ((1 if self.storage else 0) + shiftable)
+
+    def select_solver(self) -> str:
+        """
+        选择求解器
+
+        auto 模式下二进制变量数超过 时间预算 × MILP_BINARIES_PER_SECOND 时使用启发式，
+        未安装 PuLP 时始终使用启发式。
+        """
+        if not PULP_AVAILABLE:
+            return 'heuristic'
+        if self.solver != 'auto':
+            return self.solver
+        if self.binary_count() > self.time_limit * MILP_BINARIES_PER_SECOND:
+            return 'heuristic'
+        return 'milp'
+
+    def optimize(
+        self,
+        base_load: List[float],
+        demand_target: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        执行优化
+
+        Args:
+            base_load: 基础负荷曲线 (96个时段的功率值，kW)
+            demand_target: 需量目标 (kW)，默认使用申报需量
+
+        Returns:
+            优化结果字典
+        """
+        started = time.perf_counter()
+        if demand_target is None:
+            demand_target = self.pricing.declared_demand
+
+        solver = self.select_solver()
+        if solver == 'heuristic':
+            result = self._optimize_heuristic(base_load, demand_target)
+        else:
+            try:
+                result = self._optimize_milp(base_load, demand_target)
+            except Exception as e:
+                print(f"MILP优化失败，使用启发式方法: {e}")
+                result = self._optimize_heuristic(base_load, demand_target)
+
+        # 启发式结果也记录耗时，MIP间隙不适用
+        result.setdefault('solve_stats', {
+            'solve_time': round(time.perf_counter() - started, 3),
+            'mip_gap': None,
+            'time_limit': self.time_limit,
+            'warm_started': False,
+            'model_reused': False,
+        })
+        result['solve_stats']['solver'] = 'heuristic' if result.get('solve_status') == 'Heuristic' else 'milp'
+        result['solve_stats']['binary_count'] = self.binary_count()
+        return result
+
+    def _optimize_milp(
+        self,
+        base_load: List[float],
+        demand_target: float
+    ) -> Dict[str, Any]:
+        """MILP优化实现 (复用缓存的模型结构，只更新负荷/电价/需量目标系数)"""
+        model, reused = _get_model(self.time_slots, self.slot_duration, self.storage, self.devices)
+        with model.lock:
+            model.set_coefficients(
+                base_load=base_load,
+                slot_prices=self.slot_prices,
+                demand_price=self.pricing.demand_price,
+                demand_target=demand_target,
+                initial_soc=self.storage.initial_soc if self.storage else None,
+            )
+            warm_started = model.set_warm_start(self.warm_start) if self.warm_start else False
+            status, solve_time, gap = model.solve(self.time_limit, self.gap_rel)
+            return self._extract_milp_result(
+                model, base_load, demand_target, status,
+                solve_stats={
+                    'solve_time': round(solve_time, 3),
+                    'mip_gap': gap,
+                    'time_limit': self.time_limit,
+                    'warm_started': warm_started,
+                    'model_reused': reused,
+                }
+            )
+
+    def _extract_milp_result(
+        self,
+        model: '_MILPModel',
+        base_load: List[float],
+        demand_target: float,
+        status: int,
+        solve_stats: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """从求解后的模型提取调度结果"""
+        T = self.time_slots
+        dt = self.slot_duration
+        prob, D_max = model.prob, model.D_max
+        P_charge, P_discharge, SOC = model.P_charge, model.P_discharge, model.SOC
+        device_vars = model.device_vars
 
         # ========== 结果解析 ==========
         if pulp.LpStatus[status] not in ['Optimal', 'Not Solved']:
             return {
                 'status': 'failed',
                 'message': f'Solver status: {pulp.LpStatus[status]}',
-                'optimal_value': None
+                'optimal_value': None,
+                'solve_stats': solve_stats,
             }
 
         # 提取结果
@@ -367,6 +708,8 @@ class MILPOptimizer:
             'schedule': [],
             'storage_schedule': [],
             'cost_breakdown': {},
+            'solve_stats': solve_stats,
+            '_solution': model.solution(),
         }
 
         # 计算各项成本
@@ -443,6 +786,19 @@ class MILPOptimizer:
                             'power_reduction': round(device.rated_power * curtail_val, 2),
                         })
 
+            elif device.device_type == DeviceType.MODULATING:
+                for t in range(T):
+                    power_val = pulp.value(device_vars[d_idx]['power'][t]) or 0
+                    if abs(power_val - device.rated_power) > 0.01:
+                        device_schedule['actions'].append({
+                            'time_slot': t,
+                            'hour': t // 4,
+                            'minute': (t % 4) * 15,
+                            'action': 'modulate',
+                            'power': round(power_val, 2),
+                            'power_delta': round(power_val - device.rated_power, 2),
+                        })
+
             result['schedule'].append(device_schedule)
 
         # 计算节省金额
@@ -456,6 +812,186 @@ class MILPOptimizer:
 
         return result
 
+    def optimize_rolling(
+        self,
+        daily_loads: List[List[float]],
+        horizon_days: int = 3,
+        month_peak: float = 0.0,
+        demand_target: Optional[float] = None,
+        tail_hours: float = 1.0
+    ) -> Dict[str, Any]:
+        """
+        多日滚动时域优化
+
+        每个窗口优化 horizon_days 天：首日按15分钟、后续天按 tail_hours 粗化，
+        只执行首日计划，然后将期末SOC和本月已发生最大需量带入下一窗口，
+        并以平移后的上一窗口解热启动。
+
+        Args:
+            daily_loads: 逐日基础负荷曲线 (每天96个时段，kW)，应在同一计费月内
+            horizon_days: 滚动窗口天数
+            month_peak: 本月此前已发生的最大需量 (kW)
+            demand_target: 需量目标 (kW)，默认使用申报需量
+            tail_hours: 粗化时段时长 (小时)
+
+        Returns:
+            逐日执行计划和整月成本汇总
+        """
+        if demand_target is None:
+            demand_target = self.pricing.declared_demand
+        dt = self.slot_duration
+        group = max(1, int(round(tail_hours / dt)))
+        tail_prices = np.asarray(self.slot_prices).reshape(-1, group).mean(axis=1).tolist()
+        tail_slot_hours = [dt * group] * (DAY_SLOTS // group)
+
+        days = [_fit_day(load) for load in daily_loads]
+        storage = replace(self.storage) if self.storage else None
+        soc = storage.initial_soc if storage else None
+        peak = month_peak
+        warm_start = self.warm_start
+        started = time.perf_counter()
+        day_results = []
+
+        for i, day_load in enumerate(days):
+            window = days[i:i + horizon_days]
+            load = list(day_load)
+            prices = list(self.slot_prices)
+            slot_hours = [dt] * DAY_SLOTS
+            for tail in window[1:]:
+                load += np.asarray(tail).reshape(-1, group).mean(axis=1).tolist()
+                prices += tail_prices
+                slot_hours += tail_slot_hours
+
+            result = None
+            if self.select_solver() == 'milp':
+                try:
+                    result, warm_start = self._solve_window(
+                        load, prices, tuple(slot_hours), day_load,
+                        demand_target, soc, peak, warm_start, group
+                    )
+                except Exception as e:
+                    print(f"滚动优化第{i + 1}天MILP失败，使用启发式方法: {e}")
+            if result is None or result['status'] != 'success':
+                # 当天求解失败时按启发式执行，保证SOC和需量可以继续传递
+                day_optimizer = MILPOptimizer(
+                    self.pricing, replace(storage, initial_soc=soc) if storage else None,
+                    self.devices, tariff=self.tariff
+                )
+                result = day_optimizer._optimize_heuristic(day_load, demand_target)
+                warm_start = None
+
+            net = net_load_from_result(day_load, result)
+            day_peak = max(net)
+            peak = max(peak, day_peak)
+            soc_end = result.pop('_soc_end', None)
+            if soc_end is None and result.get('storage_schedule'):
+                soc_end = result['storage_schedule'][-1]['soc']
+
+            energy_cost = sum(p * n * dt for p, n in zip(self.slot_prices, net))
+            cycle_cost = 0.0
+            if storage:
+                cycle_cost = sum(
+                    (s['charge_power'] + s['discharge_power']) * dt
+                    for s in result['storage_schedule']
+                ) * storage.cycle_cost
+            day_results.append({
+                'day_index': i,
+                'solve_status': result.get('solve_status'),
+                'window_days': len(window),
+                'soc_start': soc,
+                'soc_end': soc_end,
+                'max_demand': round(day_peak, 2),
+                'month_peak': round(peak, 2),
+                'energy_cost': round(energy_cost, 2),
+                'cycle_cost': round(cycle_cost, 2),
+                'net_load': [round(v, 2) for v in net],
+                'schedule': result.get('schedule', []),
+                'storage_schedule': result.get('storage_schedule', []),
+                'solve_stats': result.get('solve_stats'),
+            })
+            soc = soc_end
+
+        base = np.array(days, dtype=float)
+        baseline_cost = (
+            float((base * np.asarray(self.slot_prices)).sum()) * dt
+            + max(month_peak, float(base.max()) if base.size else 0.0) * self.pricing.demand_price
+        )
+        energy_cost = sum(d['energy_cost'] for d in day_results)
+        cycle_cost = sum(d['cycle_cost'] for d in day_results)
+        demand_cost = peak * self.pricing.demand_price
+        total_cost = energy_cost + cycle_cost + demand_cost
+        stats = [d['solve_stats'] or {} for d in day_results]
+        gaps = [s['mip_gap'] for s in stats if s.get('mip_gap') is not None]
+
+        return {
+            'status': 'success',
+            'mode': 'rolling_horizon',
+            'horizon_days': horizon_days,
+            'days': day_results,
+            'month_peak': round(peak, 2),
+            'final_soc': soc,
+            'demand_target': demand_target,
+            'cost_breakdown': {
+                'energy_cost': round(energy_cost, 2),
+                'cycle_cost': round(cycle_cost, 2),
+                'demand_cost': round(demand_cost, 2),
+                'total_cost': round(total_cost, 2),
+            },
+            'baseline_cost': round(baseline_cost, 2),
+            'expected_saving': round(baseline_cost - total_cost, 2),
+            'saving_ratio': round(
+                (baseline_cost - total_cost) / baseline_cost * 100 if baseline_cost > 0 else 0, 2
+            ),
+            'solve_stats': {
+                'solve_time': round(time.perf_counter() - started, 3),
+                'windows': len(day_results),
+                'max_mip_gap': max(gaps) if gaps else None,
+                'warm_starts': sum(1 for s in stats if s.get('warm_started')),
+            },
+        }
+
+    def _solve_window(
+        self,
+        load: List[float],
+        prices: List[float],
+        slot_hours: Tuple[float, ...],
+        day_load: List[float],
+        demand_target: float,
+        soc: Optional[float],
+        peak: float,
+        warm_start: Optional[Dict[str, float]],
+        group: int
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, float]]]:
+        """求解一个滚动窗口，返回首日结果和平移后的热启动解"""
+        model, reused = _get_model(len(load), self.slot_duration, self.storage, self.devices, slot_hours)
+        with model.lock:
+            model.set_coefficients(
+                base_load=load,
+                slot_prices=prices,
+                demand_price=self.pricing.demand_price,
+                demand_target=demand_target,
+                initial_soc=soc,
+                demand_floor=peak,
+            )
+            warm_started = model.set_warm_start(warm_start) if warm_start else False
+            status, solve_time, gap = model.solve(self.time_limit, self.gap_rel)
+            # 只提取首日 (前96个时段) 的执行计划
+            result = self._extract_milp_result(
+                model, day_load, demand_target, status,
+                solve_stats={
+                    'solve_time': round(solve_time, 3),
+                    'mip_gap': gap,
+                    'time_limit': self.time_limit,
+                    'warm_started': warm_started,
+                    'model_reused': reused,
+                }
+            )
+            if result['status'] != 'success':
+                return result, None
+            if self.storage:
+                result['_soc_end'] = round(pulp.value(model.SOC[DAY_SLOTS]), 4)
+            return result, _shift_solution(result.pop('_solution'), DAY_SLOTS, group)
+
     def _calculate_baseline_cost(
         self,
         base_load: List[float],
@@ -479,62 +1015,86 @@ class MILPOptimizer:
         demand_target: float
     ) -> Dict[str, Any]:
         """
-        启发式优化（当MILP不可用时使用）
+        启发式优化（MILP不可用或规模过大时使用）
 
-        简单策略：
-        1. 储能在谷时段充电，峰时段放电
-        2. 时移型设备移到谷时段运行
+        储能按动态规划、时移/削减/调节型设备按贪心加局部搜索调度，见 HeuristicDispatcher。
         """
+        from .dispatch_heuristic import HeuristicDispatcher
+
         T = len(base_load)
         dt = self.slot_duration
-
-        # 复制负荷曲线
-        optimized_load = list(base_load)
+        prices = np.asarray(self.slot_prices[:T])
+        plan = HeuristicDispatcher(
+            prices, self.pricing.demand_price, self.storage, self.devices, dt
+        ).solve(base_load)
 
         # 储能调度
         storage_schedule = []
+        cycle_cost = 0.0
         if self.storage:
-            soc = self.storage.initial_soc
-
+            soc = plan.soc if plan.soc is not None else np.full(T, self.storage.initial_soc)
             for t in range(T):
-                period = self._get_slot_period(t)
-                charge = 0
-                discharge = 0
-
-                # 谷时段充电
-                if period in ['valley', 'deep_valley'] and soc < self.storage.max_soc:
-                    charge = min(
-                        self.storage.max_charge_power,
-                        (self.storage.max_soc - soc) * self.storage.capacity / dt
-                    )
-                    soc += charge * dt * self.storage.charge_efficiency / self.storage.capacity
-                    optimized_load[t] += charge
-
-                # 峰时段放电
-                elif period in ['peak', 'sharp'] and soc > self.storage.min_soc:
-                    discharge = min(
-                        self.storage.max_discharge_power,
-                        (soc - self.storage.min_soc) * self.storage.capacity / dt,
-                        optimized_load[t]  # 不要放电超过负荷
-                    )
-                    soc -= discharge * dt / self.storage.discharge_efficiency / self.storage.capacity
-                    optimized_load[t] -= discharge
-
                 storage_schedule.append({
                     'time_slot': t,
                     'hour': t // 4,
                     'minute': (t % 4) * 15,
-                    'charge_power': round(charge, 2),
-                    'discharge_power': round(discharge, 2),
-                    'soc': round(soc, 3),
-                    'period': period,
+                    'charge_power': round(float(plan.charge[t]), 2),
+                    'discharge_power': round(float(plan.discharge[t]), 2),
+                    'soc': round(float(soc[t]), 3),
+                    'period': self._get_slot_period(t),
                 })
+            cycle_cost = float((plan.charge + plan.discharge).sum()) * dt * self.storage.cycle_cost
+
+        # 设备调度
+        schedule = []
+        for d_idx, device in enumerate(self.devices):
+            actions = []
+            if d_idx in plan.shift_on:
+                for t in np.flatnonzero(plan.shift_on[d_idx]):
+                    actions.append({
+                        'time_slot': int(t),
+                        'hour': int(t) // 4,
+                        'minute': (int(t) % 4) * 15,
+                        'action': 'on',
+                        'power': device.rated_power,
+                    })
+            elif d_idx in plan.curtail:
+                for t in np.flatnonzero(plan.curtail[d_idx] > 0.01):
+                    ratio = float(plan.curtail[d_idx][t])
+                    actions.append({
+                        'time_slot': int(t),
+                        'hour': int(t) // 4,
+                        'minute': (int(t) % 4) * 15,
+                        'action': 'curtail',
+                        'curtail_ratio': round(ratio, 2),
+                        'power_reduction': round(device.rated_power * ratio, 2),
+                    })
+            elif d_idx in plan.modulate:
+                power = plan.modulate[d_idx]
+                for t in np.flatnonzero(np.abs(power - device.rated_power) > 0.01):
+                    actions.append({
+                        'time_slot': int(t),
+                        'hour': int(t) // 4,
+                        'minute': (int(t) % 4) * 15,
+                        'action': 'modulate',
+                        'power': round(float(power[t]), 2),
+                        'power_delta': round(float(power[t]) - device.rated_power, 2),
+                    })
+            elif device.device_type not in (DeviceType.SHIFTABLE, DeviceType.CURTAILABLE,
+                                            DeviceType.MODULATING):
+                continue
+            schedule.append({
+                'device_id': device.id,
+                'device_name': device.name,
+                'device_type': device.device_type.value,
+                'actions': actions,
+            })
 
         # 计算成本
-        energy_cost = sum(self.slot_prices[t] * optimized_load[t] * dt for t in range(T))
-        max_demand = max(optimized_load)
+        energy_cost = float((prices * plan.net_load).sum()) * dt
+        max_demand = float(plan.net_load.max())
         demand_cost = max_demand * self.pricing.demand_price
-        total_cost = energy_cost + demand_cost
+        total_cost = energy_cost + cycle_cost + demand_cost
 
         # 基线成本
         baseline_cost = self._calculate_baseline_cost(base_load, demand_target)
@@ -545,16 +1105,24 @@ class MILPOptimizer:
             'optimal_value': total_cost,
             'max_demand': max_demand,
             'demand_target': demand_target,
-            'schedule': [],
+            'schedule': schedule,
             'storage_schedule': storage_schedule,
             'cost_breakdown': {
                 'energy_cost': round(energy_cost, 2),
+                'cycle_cost': round(cycle_cost, 2),
                 'demand_cost': round(demand_cost, 2),
                 'total_cost': round(total_cost, 2),
             },
             'baseline_cost': round(baseline_cost, 2),
             'expected_saving': round(baseline_cost - total_cost, 2),
             'saving_ratio': round((baseline_cost - total_cost) / baseline_cost * 100 if baseline_cost > 0 else 0, 2),
+            'solve_stats': {
+                'solve_time': round(plan.solve_time, 3),
+                'mip_gap': None,
+                'time_limit': self.time_limit,
+                'warm_started': False,
+                'model_reused': False,
+            },
         }
 
 
@@ -563,7 +1131,13 @@ def run_day_ahead_optimization(
     pricing_config: Dict,
     storage_config: Optional[Dict] = None,
     devices: Optional[List[Dict]] = None,
-    demand_target: Optional[float] = None
+    demand_target: Optional[float] = None,
+    tariff: Optional[CompiledTariff] = None,
+    time_limit: int = 30,
+    gap_rel: Optional[float] = None,
+    warm_start: Optional[Dict[str, float]] = None,
+    keep_solution: bool = False,
+    solver: str = 'auto'
 ) -> Dict:
     """
     执行日前调度优化
@@ -574,11 +1148,113 @@ def run_day_ahead_optimization(
         storage_config: 储能配置（可选）
         devices: 可调度设备列表（可选）
         demand_target: 需量目标（可选）
+        tariff: 编译后的分时电价（可选，提供时段划分）
+        time_limit: 求解时间上限（秒）
+        gap_rel: 相对MIP间隙，达到即停止求解（可选）
+        warm_start: 热启动初值，通常为前一天的解（可选）
+        keep_solution: 是否在结果中保留 '_solution'（变量名 -> 值）供下次热启动
+        solver: 求解器 'auto' / 'milp' / 'heuristic'
 
     Returns:
         优化结果
     """
-    # 构建配置对象
+    pricing, storage, device_list = _build_inputs(pricing_config, storage_config, devices)
+    base_load = _fit_day([f['predicted_power'] for f in forecast_data.get('forecasts', [])])
+
+    # 创建优化器并执行
+    optimizer = MILPOptimizer(
+        pricing=pricing,
+        storage=storage,
+        devices=device_list,
+        tariff=tariff,
+        time_limit=time_limit,
+        gap_rel=gap_rel,
+        warm_start=warm_start,
+        solver=solver,
+    )
+
+    result = optimizer.optimize(base_load, demand_target)
+    if not keep_solution:
+        result.pop('_solution', None)
+
+    # 添加预测信息
+    result['forecast_date'] = forecast_data.get('date')
+    result['base_load_summary'] = forecast_data.get('statistics', {})
+
+    return result
+
+
+def run_rolling_horizon_optimization(
+    forecasts: List[Dict],
+    pricing_config: Dict,
+    storage_config: Optional[Dict] = None,
+    devices: Optional[List[Dict]] = None,
+    demand_target: Optional[float] = None,
+    tariff: Optional[CompiledTariff] = None,
+    horizon_days: int = 3,
+    month_peak: float = 0.0,
+    time_limit: int = 30,
+    gap_rel: Optional[float] = None,
+    solver: str = 'auto'
+) -> Dict:
+    """
+    执行多日滚动时域优化
+
+    Args:
+        forecasts: 逐日负荷预测数据列表 (同一计费月内，按日期排序)
+        pricing_config: 电价配置
+        storage_config: 储能配置（可选），initial_soc 为首日初始SOC
+        devices: 可调度设备列表（可选）
+        demand_target: 需量目标（可选）
+        tariff: 编译后的分时电价（可选，提供时段划分）
+        horizon_days: 每个窗口优化的天数
+        month_peak: 本月此前已发生的最大需量 kW
+        time_limit: 单个窗口的求解时间上限（秒）
+        gap_rel: 相对MIP间隙（可选）
+        solver: 求解器 'auto' / 'milp' / 'heuristic'
+
+    Returns:
+        逐日执行计划和整月成本汇总
+    """
+    pricing, storage, device_list = _build_inputs(pricing_config, storage_config, devices)
+    optimizer = MILPOptimizer(
+        pricing=pricing,
+        storage=storage,
+        devices=device_list,
+        tariff=tariff,
+        time_limit=time_limit,
+        gap_rel=gap_rel,
+        solver=solver,
+    )
+    result = optimizer.optimize_rolling(
+        [[f['predicted_power'] for f in day.get('forecasts', [])] for day in forecasts],
+        horizon_days=horizon_days,
+        month_peak=month_peak,
+        demand_target=demand_target,
+    )
+    for day, forecast in zip(result['days'], forecasts):
+        day['forecast_date'] = forecast.get('date')
+    return result
+
+
+def _fit_day(base_load: List[float]) -> List[float]:
+    """负荷曲线补齐或截断为96个时段"""
+    base_load = list(base_load)
+    if len(base_load) != DAY_SLOTS:
+        # 如果数据点不是96个，进行插值或截断
+        if len(base_load) < DAY_SLOTS:
+            base_load = base_load + [base_load[-1]] * (DAY_SLOTS - len(base_load))
+        else:
+            base_load = base_load[:DAY_SLOTS]
+    return base_load
+
+
+def _build_inputs(
+    pricing_config: Dict,
+    storage_config: Optional[Dict] = None,
+    devices: Optional[List[Dict]] = None
+) -> Tuple[PricingConfig, Optional[StorageConfig], List[DispatchableDevice]]:
+    """由请求参数构建电价、储能和设备配置对象"""
     pricing = PricingConfig(
         demand_price=pricing_config.get('demand_price', 40.0),
         declared_demand=pricing_config.get('declared_demand', 800.0),
@@ -619,26 +1295,4 @@ def run_day_ahead_optimization(
                 priority=d.get('priority', 5),
             ))
 
-    # 提取基础负荷
-    base_load = [f['predicted_power'] for f in forecast_data.get('forecasts', [])]
-    if len(base_load) != 96:
-        # 如果数据点不是96个，进行插值或截断
-        if len(base_load) < 96:
-            base_load = base_load + [base_load[-1]] * (96 - len(base_load))
-        else:
-            base_load = base_load[:96]
-
-    # 创建优化器并执行
-    optimizer = MILPOptimizer(
-        pricing=pricing,
-        storage=storage,
-        devices=device_list,
-    )
-
-    result = optimizer.optimize(base_load, demand_target)
-
-    # 添加预测信息
-    result['forecast_date'] = forecast_data.get('date')
-    result['base_load_summary'] = forecast_data.get('statistics', {})
-
-    return result
+    return pricing, storage, device_list
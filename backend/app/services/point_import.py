@@ -0,0 +1,218 @@
+"""
+点位批量导入
+Point Bulk Import
+
+CSV 点位导入流水线:
+- 按块流式读取上传文件 (在线程池中解析)，不将整个文件读入内存
+- 逐块校验: 必填字段、点位类型、数值格式、量程、文件内重复及与已有编码重复 (预加载编码集合)
+- 授权点位数 (settings.max_points) 检查，超出部分逐行报告
+- 有效行按块批量 INSERT，同一块内由 INSERT ... SELECT 生成实时值记录，每块单独提交
+- 返回逐行诊断信息
+"""
+import asyncio
+import codecs
+import csv
+import io
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.point import Point, PointRealtime
+
+# 每块处理的行数
+CHUNK_SIZE = 2000
+# 返回的诊断信息条数上限
+MAX_DIAGNOSTICS = 1000
+# 编码探测读取的字节数
+SNIFF_BYTES = 64 * 1024
+
+POINT_TYPES = {"AI", "DI", "AO", "DO", "measurement", "control", "status", "alarm"}
+
+
+class ImportFileError(ValueError):
+    """导入文件无法解析"""
+
+
+def detect_encoding(stream: BinaryIO) -> str:
+    """按文件开头探测编码: UTF-8 (可带 BOM)，否则按 GBK"""
+    head = stream.read(SNIFF_BYTES)
+    stream.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "gbk"
+
+
+def iter_chunks(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    """按块读取 CSV，返回 [(行号, 行数据)]"""
+    text = io.TextIOWrapper(stream, encoding=detect_encoding(stream), newline="")
+    reader = csv.DictReader(text)
+    try:
+        chunk = []
+        for row in reader:
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFileError(f"第 {reader.line_num} 行附近无法解析: {e}") from e
+    finally:
+        text.detach()
+
+
+def _text(row: Dict[str, str], key: str, default: str = "") -> str:
+    value = row.get(key)
+    return value.strip() if value and value.strip() else default
+
+
+def parse_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """
+    将 CSV 行转换为点位字段 (列名与导出一致)
+
+    Raises:
+        ValueError: 字段缺失或格式错误
+    """
+    point_code = _text(row, "点位编码")
+    point_name = _text(row, "点位名称")
+    if not point_code:
+        raise ValueError("点位编码不能为空")
+    if len(point_code) > 50:
+        raise ValueError("点位编码超过50个字符")
+    if not point_name:
+        raise ValueError("点位名称不能为空")
+    if len(point_name) > 100:
+        raise ValueError("点位名称超过100个字符")
+
+    point_type = _text(row, "点位类型", "AI")
+    if point_type not in POINT_TYPES:
+        raise ValueError(f"无效的点位类型: {point_type}")
+
+    def number(key: str, cast, default=None):
+        value = _text(row, key)
+        if not value:
+            return default
+        try:
+            return cast(value)
+        except ValueError:
+            raise ValueError(f"{key}格式错误: {value}")
+
+    min_range = number("量程下限", float)
+    max_range = number("量程上限", float)
+    if min_range is not None and max_range is not None and min_range > max_range:
+        raise ValueError("量程下限大于量程上限")
+
+    return {
+        "point_code": point_code,
+        "point_name": point_name,
+        "point_type": point_type,
+        "device_type": _text(row, "设备类型"),
+        "area_code": _text(row, "区域", "A1"),
+        "unit": _text(row, "单位"),
+        "min_range": min_range,
+        "max_range": max_range,
+        "precision": number("精度", int, 2),
+        "collect_interval": number("采集周期", int, 10),
+        "is_enabled": _text(row, "启用", "是") == "是",
+    }
+
+
+class ImportResult:
+    """导入结果与逐行诊断"""
+
+    def __init__(self):
+        self.success_count = 0
+        self.error_count = 0
+        self.diagnostics: List[Dict[str, Any]] = []
+
+    def error(self, line: int, point_code: Optional[str], message: str) -> None:
+        self.error_count += 1
+        if len(self.diagnostics) < MAX_DIAGNOSTICS:
+            self.diagnostics.append({"row": line, "point_code": point_code or None, "error": message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "success_count": self.success_count,
+            "error_count": self.error_count,
+            "errors": [f"行 {d['row']}: {d['error']}" for d in self.diagnostics[:10]],
+            "diagnostics": self.diagnostics,
+            "diagnostics_truncated": self.error_count > len(self.diagnostics),
+        }
+
+
+async def _insert_chunk(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    codes = [row["point_code"] for row in rows]
+    await db.execute(insert(Point), rows)
+    await db.execute(
+        insert(PointRealtime).from_select(
+            ["point_id"], select(Point.id).where(Point.point_code.in_(codes))
+        )
+    )
+    await db.commit()
+
+
+async def import_points(
+    db: AsyncSession,
+    stream: BinaryIO,
+    max_points: int,
+    chunk_size: int = CHUNK_SIZE
+) -> ImportResult:
+    """
+    从 CSV 流批量导入点位
+
+    Args:
+        stream: 二进制文件流 (UTF-8/GBK)
+        max_points: 授权点位数上限
+
+    Raises:
+        ImportFileError: 文件无法解析 (已导入的块保留)
+    """
+    result = ImportResult()
+    existing: Set[str] = set((await db.execute(select(Point.point_code))).scalars().all())
+    remaining = max_points - len(existing)
+    # 文件内已接受的编码 → 行号
+    seen: Dict[str, int] = {}
+
+    loop = asyncio.get_running_loop()
+    chunks = iter_chunks(stream, chunk_size)
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            break
+
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+        for line, row in chunk:
+            try:
+                values = parse_row(row)
+            except ValueError as e:
+                result.error(line, _text(row, "点位编码"), str(e))
+                continue
+            code = values["point_code"]
+            if code in existing:
+                result.error(line, code, "点位编码已存在")
+                continue
+            if code in seen:
+                result.error(line, code, f"点位编码与第 {seen[code]} 行重复")
+                continue
+            if remaining <= 0:
+                result.error(line, code, f"超出授权点位数 {max_points}")
+                continue
+            seen[code] = line
+            remaining -= 1
+            valid.append((line, values))
+
+        if not valid:
+            continue
+        try:
+            await _insert_chunk(db, [values for _, values in valid])
+            result.success_count += len(valid)
+        except IntegrityError:
+            # 并发导入了相同编码，本块整体回滚
+            await db.rollback()
+            for line, values in valid:
+                result.error(line, values["point_code"], "写入冲突，点位编码可能已被并发创建")
+    return result
@@ -7,7 +7,9 @@ from typing import Dict, List, Optional, Any
 from sqlalchemy import select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models.energy import ElectricityPricing, PricingConfig
+from ..models.energy import PricingConfig
+from .bill_engine import BillBatch, BillEngine, energy_matrix
+from .tariff_compiler import PERIOD_CODES, get_tariff, invalidate_tariff_cache, normalize_period
 
 
 class PricingService:
@@ -39,22 +41,8 @@ class PricingService:
                 "deep_valley": [...]
             }
         """
-        today = date.today()
-
-        # 查询当前有效的电价配置
-        result = await self.db.execute(
-            select(ElectricityPricing).where(
-                and_(
-                    ElectricityPricing.is_enabled == True,
-                    ElectricityPricing.effective_date <= today,
-                    or_(
-                        ElectricityPricing.expire_date >= today,
-                        ElectricityPricing.expire_date == None
-                    )
-                )
-            ).order_by(ElectricityPricing.start_time)
-        )
-        pricing_records = result.scalars().all()
+        # 编译缓存按生效区间复用，电价配置写入时失效
+        tariff = await get_tariff(self.db)
 
         # 按时段类型分组
         pricing_map: Dict[str, List[Dict]] = {
@@ -65,8 +53,8 @@ class PricingService:
             "deep_valley": []
         }
 
-        for p in pricing_records:
-            period_type = p.period_type.lower()
+        for p in tariff.rows:
+            period_type = p["period_type"].lower()
             if period_type not in pricing_map:
                 # 处理可能的别名
                 if period_type in ["high", "high_peak"]:
@@ -79,11 +67,11 @@ class PricingService:
                     period_type = "normal"  # 默认归类
 
             pricing_map[period_type].append({
-                "id": p.id,
-                "start_time": p.start_time,
-                "end_time": p.end_time,
-                "price": float(p.price),
-                "name": p.pricing_name
+                "id": p["id"],
+                "start_time": p["start_time"],
+                "end_time": p["end_time"],
+                "price": p["price"],
+                "name": p["name"]
             })
 
         return pricing_map
@@ -220,22 +208,7 @@ class PricingService:
         Returns:
             Dict: 数据来源信息
         """
-        today = date.today()
-
-        # 查询有效配置数量
-        result = await self.db.execute(
-            select(ElectricityPricing).where(
-                and_(
-                    ElectricityPricing.is_enabled == True,
-                    ElectricityPricing.effective_date <= today,
-                    or_(
-                        ElectricityPricing.expire_date >= today,
-                        ElectricityPricing.expire_date == None
-                    )
-                )
-            )
-        )
-        records = result.scalars().all()
+        records = (await get_tariff(self.db)).rows
 
         if not records:
             return {
@@ -247,7 +220,7 @@ class PricingService:
             }
 
         # 获取最早生效日期
-        earliest_date = min(r.effective_date for r in records)
+        earliest_date = min(r["effective_date"] for r in records)
 
         return {
             "source": "electricity_pricing表",
@@ -255,7 +228,7 @@ class PricingService:
             "message": "数据来源：系统设置 → 电价配置",
             "config_count": len(records),
             "effective_date": earliest_date.isoformat(),
-            "period_types": list(set(r.period_type for r in records))
+            "period_types": list(set(r["period_type"] for r in records))
         }
 
     def _get_period_label(self, period_type: str) -> str:
@@ -426,14 +399,15 @@ class PricingService:
 
             await self.db.commit()
             await self.db.refresh(config)
-            return config
         else:
             # 创建新配置
             config = PricingConfig(**(config_data or {}))
             self.db.add(config)
             await self.db.commit()
             await self.db.refresh(config)
-            return config
+
+        invalidate_tariff_cache()
+        return config
 
     async def calculate_electricity_bill(
         self,
@@ -460,167 +434,126 @@ class PricingService:
                 "total": {...}                    # 汇总
             }
         """
-        # 1. 计算电度电费
-        prices = await self.get_all_prices()
-        energy_charge_detail = {}
-        total_energy = 0.0
-        total_energy_charge = 0.0
-
-        period_mapping = {
-            "sharp": "sharp_price",
-            "peak": "peak_price",
-            "normal": "normal_price",
-            "valley": "valley_price",
-            "deep_valley": "deep_valley_price"
-        }
+        engine = await self.get_bill_engine()
+        batch = engine.bill_energy(
+            energy_matrix([energy_by_period]), max_demand, avg_power_factor, include_fixed_fees
+        )
+        return self._format_bill(engine, batch, 0, energy_by_period, include_fixed_fees)
+
+    async def get_bill_engine(self) -> BillEngine:
+        """获取基于当前编译电价的批量计费引擎"""
+        return BillEngine(await get_tariff(self.db))
+
+    async def calculate_bills_batch(
+        self,
+        loads,
+        power_factor=0.9,
+        include_fixed_fees: bool = True
+    ) -> BillBatch:
+        """
+        按负荷曲线批量计算电费
 
+        Args:
+            loads: 15分钟平均功率 kW，形状为 (场景, 天数, 96) / (场景, 96×天数) / (96×天数,)
+            power_factor: 平均功率因数，标量或每场景一个值
+            include_fixed_fees: 是否包含固定费用
+
+        Returns:
+            BillBatch: 各场景的电度电费、基本电费、功率因数调整和合计数组
+        """
+        engine = await self.get_bill_engine()
+        return engine.bill_curves(loads, power_factor, include_fixed_fees)
+
+    def _format_bill(
+        self,
+        engine: BillEngine,
+        batch: BillBatch,
+        index: int,
+        energy_by_period: Dict[str, float],
+        include_fixed_fees: bool
+    ) -> Dict[str, Any]:
+        """将批量计费结果中的单个场景整理为账单明细"""
+        tariff = engine.tariff
+
+        # 1. 电度电费
+        energy_charge_detail = {}
         for period, energy in energy_by_period.items():
-            price_key = period_mapping.get(period, f"{period}_price")
-            price = prices.get(price_key, 0.0)
-            charge = energy * price
+            price = float(engine.period_prices[PERIOD_CODES[normalize_period(period)]])
             energy_charge_detail[period] = {
                 "energy_kwh": round(energy, 2),
                 "price": price,
-                "charge": round(charge, 2)
+                "charge": round(energy * price, 2)
             }
-            total_energy += energy
-            total_energy_charge += charge
-
+        total_energy = float(batch.energy_kwh[index])
+        total_energy_charge = float(batch.energy_charge[index])
         energy_charge = {
             "detail": energy_charge_detail,
             "total_energy_kwh": round(total_energy, 2),
             "total_charge": round(total_energy_charge, 2)
         }
 
-        # 2. 获取全局配置
-        global_config = await self.get_current_global_config()
-
-        # 3. 计算基本电费
+        # 2. 基本电费
+        has_config = tariff.config_id is not None
+        max_demand = float(batch.max_demand[index])
         basic_charge = {"charge": 0.0, "detail": {}}
-        if global_config and max_demand > 0:
-            if global_config.billing_mode == "demand":
-                # 按需量计费
-                declared = global_config.declared_demand or 0
-                demand_price = global_config.demand_price or 0
-                over_multiplier = global_config.over_demand_multiplier or 2.0
-
-                if max_demand <= declared:
-                    # 未超需量
-                    basic_charge_amount = declared * demand_price
-                    basic_charge["detail"] = {
-                        "mode": "demand",
-                        "declared_demand": declared,
-                        "actual_demand": round(max_demand, 2),
-                        "demand_price": demand_price,
-                        "over_demand": 0,
-                        "over_charge": 0
-                    }
-                else:
-                    # 超需量
-                    over_demand = max_demand - declared
-                    normal_charge = declared * demand_price
-                    over_charge = over_demand * demand_price * over_multiplier
-                    basic_charge_amount = normal_charge + over_charge
-                    basic_charge["detail"] = {
-                        "mode": "demand",
-                        "declared_demand": declared,
-                        "actual_demand": round(max_demand, 2),
-                        "demand_price": demand_price,
+        if has_config and max_demand > 0:
+            if tariff.billing_mode == "demand":
+                declared = tariff.declared_demand or 0
+                demand_price = tariff.demand_price or 0
+                over_demand = float(batch.over_demand[index])
+                detail = {
+                    "mode": "demand",
+                    "declared_demand": declared,
+                    "actual_demand": round(max_demand, 2),
+                    "demand_price": demand_price,
+                }
+                if over_demand > 0:
+                    detail.update({
                         "over_demand": round(over_demand, 2),
-                        "over_multiplier": over_multiplier,
-                        "normal_charge": round(normal_charge, 2),
-                        "over_charge": round(over_charge, 2)
-                    }
-                basic_charge["charge"] = round(basic_charge_amount, 2)
-
-            elif global_config.billing_mode == "capacity":
-                # 按容量计费
-                capacity = global_config.transformer_capacity or 0
-                capacity_price = global_config.capacity_price or 0
-                basic_charge_amount = capacity * capacity_price
-                basic_charge["charge"] = round(basic_charge_amount, 2)
+                        "over_multiplier": tariff.over_demand_multiplier or 2.0,
+                        "normal_charge": round(declared * demand_price, 2),
+                        "over_charge": round(float(batch.over_charge[index]), 2)
+                    })
+                else:
+                    detail.update({"over_demand": 0, "over_charge": 0})
+                basic_charge["detail"] = detail
+            elif tariff.billing_mode == "capacity":
                 basic_charge["detail"] = {
                     "mode": "capacity",
-                    "transformer_capacity": capacity,
-                    "capacity_price": capacity_price
+                    "transformer_capacity": tariff.transformer_capacity or 0,
+                    "capacity_price": tariff.capacity_price or 0
                 }
+            basic_charge["charge"] = round(float(batch.basic_charge[index]), 2)
 
-        # 4. 计算功率因数调整
+        # 3. 功率因数调整
         pf_adjustment = {"adjustment_rate": 0.0, "adjustment_amount": 0.0}
-        if global_config and global_config.power_factor_rules:
-            rules = global_config.power_factor_rules
-            adjustment_rate = 0.0
-
-            # 查找适用的功率因数规则
-            for rule in rules:
-                rule_min = rule.get("min", 0)
-                rule_max = rule.get("max", 1.0)
-                if rule_min <= avg_power_factor < rule_max:
-                    adjustment_rate = rule.get("adjustment", 0)
-                    break
-
-            # 功率因数调整基数 = 电度电费 + 基本电费
-            adjustment_base = total_energy_charge + basic_charge["charge"]
-            adjustment_amount = adjustment_base * (adjustment_rate / 100)
-
+        if has_config and tariff.power_factor_rules:
             pf_adjustment = {
-                "power_factor": round(avg_power_factor, 3),
-                "baseline": global_config.power_factor_baseline,
-                "adjustment_rate": adjustment_rate,
-                "adjustment_base": round(adjustment_base, 2),
-                "adjustment_amount": round(adjustment_amount, 2)
+                "power_factor": round(float(batch.power_factor[index]), 3),
+                "baseline": tariff.power_factor_baseline,
+                "adjustment_rate": float(batch.pf_adjustment_rate[index]),
+                "adjustment_base": round(total_energy_charge + float(batch.basic_charge[index]), 2),
+                "adjustment_amount": round(float(batch.pf_adjustment[index]), 2)
             }
 
-        # 5. 计算固定费用
+        # 4. 固定费用
         fixed_fees = {"total": 0.0, "detail": {}}
-        if include_fixed_fees and global_config:
-            transmission = total_energy * (global_config.transmission_fee or 0)
-            government = total_energy * (global_config.government_fund or 0)
-            auxiliary = total_energy * (global_config.auxiliary_fee or 0)
-            other = total_energy * (global_config.other_fee or 0)
-            fixed_total = transmission + government + auxiliary + other
-
+        if include_fixed_fees and has_config:
             fixed_fees = {
-                "total": round(fixed_total, 2),
+                "total": round(float(batch.fixed_fees[index]), 2),
                 "detail": {
-                    "transmission_fee": round(transmission, 2),
-                    "government_fund": round(government, 2),
-                    "auxiliary_fee": round(auxiliary, 2),
-                    "other_fee": round(other, 2)
-                },
-                "rates": {
-                    "transmission_fee": global_config.transmission_fee or 0,
-                    "government_fund": global_config.government_fund or 0,
-                    "auxiliary_fee": global_config.auxiliary_fee or 0,
-                    "other_fee": global_config.other_fee or 0
+                    key: round(total_energy * rate, 2) for key, rate in tariff.fixed_fees.items()
                 },
+                "rates": dict(tariff.fixed_fees),
                 "note": "固定费用不参与优化，仅用于成本统计"
             }
 
-        # 6. 汇总
-        optimizable_total = (
-            total_energy_charge +
-            basic_charge["charge"] +
-            pf_adjustment.get("adjustment_amount", 0)
-        )
-        grand_total = optimizable_total + fixed_fees["total"]
-
-        total = {
-            "energy_charge": round(total_energy_charge, 2),
-            "basic_charge": round(basic_charge["charge"], 2),
-            "power_factor_adjustment": round(pf_adjustment.get("adjustment_amount", 0), 2),
-            "fixed_fees": round(fixed_fees["total"], 2),
-            "optimizable_total": round(optimizable_total, 2),
-            "grand_total": round(grand_total, 2),
-            "unit_price": round(grand_total / total_energy, 4) if total_energy > 0 else 0
-        }
-
         return {
             "energy_charge": energy_charge,
             "basic_charge": basic_charge,
             "power_factor_adjustment": pf_adjustment,
             "fixed_fees": fixed_fees,
-            "total": total
+            "total": batch.totals(index)
         }
 
     async def estimate_savings(
@@ -644,21 +577,16 @@ class PricingService:
         Returns:
             节省金额详情
         """
-        # 计算当前电费（不含固定费用）
-        current_bill = await self.calculate_electricity_bill(
-            current_energy_by_period,
-            current_max_demand,
-            avg_power_factor,
-            include_fixed_fees=False
-        )
-
-        # 计算优化后电费
-        optimized_bill = await self.calculate_electricity_bill(
-            optimized_energy_by_period,
-            optimized_max_demand,
+        # 当前/优化后电费作为两个场景一次计算（不含固定费用）
+        engine = await self.get_bill_engine()
+        batch = engine.bill_energy(
+            energy_matrix([current_energy_by_period, optimized_energy_by_period]),
+            [current_max_demand, optimized_max_demand],
             avg_power_factor,
             include_fixed_fees=False
         )
+        current_bill = {"total": batch.totals(0)}
+        optimized_bill = {"total": batch.totals(1)}
 
         # 计算节省
         savings = {
@@ -0,0 +1,381 @@
+"""
+机柜U位占用索引
+Rack Occupancy Index
+
+在内存中为每个机柜维护 64 位 U 位位图以及功率、承重占用:
+- 位图第 u-1 位表示第 u 个 U 位被占用，连续空闲 U 位通过位运算查找
+- 资产 U 位范围重叠时记录冲突
+- 资产/机柜增删改时增量维护，其他进程修改数据后按数据版本整体重建
+- 一次调用在全部机柜中查找 "N 个连续空闲 U，功率余量 ≥ X kW，承重余量 ≥ Y kg"
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.asset import Asset, Cabinet
+
+# 位图支持的最大U数
+MAX_U = 64
+DEFAULT_TOTAL_U = 42
+
+
+def u_mask(u_position: int, u_height: int, total_u: int = MAX_U) -> int:
+    """U位范围 [u_position, u_position + u_height) 的位图 (超出机柜的部分截断)"""
+    start = max(u_position, 1)
+    end = min(u_position + u_height - 1, total_u, MAX_U)
+    if end < start:
+        return 0
+    return ((1 << (end - start + 1)) - 1) << (start - 1)
+
+
+def free_runs(bitmap: int, total_u: int, u_height: int) -> int:
+    """
+    可放置 u_height 个连续U位的起始位置位图
+
+    第 i 位为 1 表示从第 i+1 个U位开始的 u_height 个U位全部空闲。
+    """
+    if u_height <= 0 or u_height > total_u:
+        return 0
+    free = ~bitmap & ((1 << total_u) - 1)
+    runs = free
+    length = 1
+    # 倍增: runs 第 i 位表示从 i 起连续 length 个空闲
+    while length < u_height:
+        step = min(length, u_height - length)
+        runs &= runs >> step
+        length += step
+    return runs
+
+
+def _lowest_bit(value: int) -> int:
+    """最低置位的序号 (从0开始)"""
+    return (value & -value).bit_length() - 1
+
+
+@dataclass
+class PlacedAsset:
+    """已上架资产"""
+    asset_id: int
+    u_position: Optional[int]
+    u_height: int
+    mask: int
+    power_kw: float
+    weight_kg: float
+
+
+@dataclass
+class CabinetOccupancy:
+    """单个机柜的占用状态"""
+    cabinet_id: int
+    cabinet_name: str = ""
+    total_u: int = DEFAULT_TOTAL_U
+    max_power: Optional[float] = None
+    max_weight: Optional[float] = None
+    bitmap: int = 0
+    used_power: float = 0.0
+    used_weight: float = 0.0
+    assets: Dict[int, PlacedAsset] = field(default_factory=dict)
+
+    @classmethod
+    def from_cabinet(cls, cabinet: Cabinet) -> "CabinetOccupancy":
+        occupancy = cls(cabinet_id=cabinet.id)
+        occupancy.set_limits(cabinet)
+        return occupancy
+
+    def set_limits(self, cabinet: Cabinet) -> None:
+        """更新机柜名称、U数和功率/承重上限"""
+        self.cabinet_name = cabinet.cabinet_name
+        self.total_u = min(cabinet.total_u or DEFAULT_TOTAL_U, MAX_U)
+        self.max_power = cabinet.max_power
+        self.max_weight = cabinet.max_weight
+        self._rebuild()
+
+    # ==================== 维护 ====================
+
+    def place(self, asset: Asset) -> List[int]:
+        """
+        上架资产 (已存在则先移除)
+
+        Returns:
+            与该资产U位重叠的资产ID列表
+        """
+        self.assets.pop(asset.id, None)
+        u_height = asset.u_height or 0
+        mask = u_mask(asset.u_position, u_height, self.total_u) if asset.u_position and u_height else 0
+        overlaps = [a.asset_id for a in self.assets.values() if a.mask & mask]
+        self.assets[asset.id] = PlacedAsset(
+            asset_id=asset.id,
+            u_position=asset.u_position,
+            u_height=u_height,
+            mask=mask,
+            power_kw=asset.rated_power or 0.0,
+            weight_kg=asset.weight or 0.0,
+        )
+        self.bitmap |= mask
+        self.used_power += asset.rated_power or 0.0
+        self.used_weight += asset.weight or 0.0
+        return overlaps
+
+    def remove(self, asset_id: int) -> None:
+        """下架资产"""
+        if self.assets.pop(asset_id, None) is not None:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """按现有资产重算位图和功率/承重 (重叠资产下架后需要重算)"""
+        self.bitmap = 0
+        self.used_power = 0.0
+        self.used_weight = 0.0
+        for placed in self.assets.values():
+            if placed.u_position and placed.u_height:
+                placed.mask = u_mask(placed.u_position, placed.u_height, self.total_u)
+            self.bitmap |= placed.mask
+            self.used_power += placed.power_kw
+            self.used_weight += placed.weight_kg
+
+    # ==================== 查询 ====================
+
+    @property
+    def used_u(self) -> int:
+        """资产占用U数合计 (含未指定U位的资产)"""
+        return sum(a.u_height for a in self.assets.values())
+
+    @property
+    def occupied_u(self) -> int:
+        """位图中实际占用的U位数"""
+        return bin(self.bitmap).count("1")
+
+    @property
+    def free_u(self) -> int:
+        return self.total_u - self.occupied_u
+
+    @property
+    def power_headroom(self) -> Optional[float]:
+        """功率余量 kW (未配置上限时为 None)"""
+        return None if self.max_power is None else self.max_power - self.used_power
+
+    @property
+    def weight_headroom(self) -> Optional[float]:
+        """承重余量 kg (未配置上限时为 None)"""
+        return None if self.max_weight is None else self.max_weight - self.used_weight
+
+    def find_slot(self, u_height: int) -> Optional[int]:
+        """最低的可放置 u_height 个连续U位的起始位置"""
+        runs = free_runs(self.bitmap, self.total_u, u_height)
+        return _lowest_bit(runs) + 1 if runs else None
+
+    def fits(self, power_kw: float, weight_kg: float) -> bool:
+        """功率和承重余量是否满足"""
+        power, weight = self.power_headroom, self.weight_headroom
+        return (power is None or power >= power_kw) and (weight is None or weight >= weight_kg)
+
+    def conflicts(self) -> List[Tuple[int, int]]:
+        """U位重叠的资产对"""
+        placed = [a for a in self.assets.values() if a.mask]
+        return [
+            (a.asset_id, b.asset_id)
+            for i, a in enumerate(placed)
+            for b in placed[i + 1:]
+            if a.mask & b.mask
+        ]
+
+    def u_map(self) -> Dict[int, int]:
+        """U位 → 资产ID"""
+        result = {}
+        for placed in self.assets.values():
+            mask = placed.mask
+            while mask:
+                bit = _lowest_bit(mask)
+                result.setdefault(bit + 1, placed.asset_id)
+                mask &= mask - 1
+        return result
+
+
+class RackOccupancyIndex:
+    """
+    全部机柜的U位占用索引 (进程内单例)
+
+    用法:
+        index = await get_occupancy_index(db)
+        candidates = index.find_space(u_height=4, power_kw=3, weight_kg=50)
+
+    增删改资产/机柜并提交后调用 apply_asset / remove_asset / apply_cabinet / remove_cabinet
+    增量维护；数据版本 (资产/机柜的数量与最后更新时间) 与索引不一致时整体重建。
+    """
+
+    def __init__(self):
+        self.cabinets: Dict[int, CabinetOccupancy] = {}
+        self.asset_cabinet: Dict[int, int] = {}
+        self.version: Optional[tuple] = None
+
+    async def ensure_current(self, db: AsyncSession) -> "RackOccupancyIndex":
+        """数据版本变化时从数据库重建"""
+        version = await self._data_version(db)
+        if version != self.version:
+            await self.load(db)
+            self.version = version
+        return self
+
+    async def load(self, db: AsyncSession) -> None:
+        """两条查询加载全部机柜和已上架资产"""
+        cabinets = (await db.execute(select(Cabinet))).scalars().all()
+        self.cabinets = {c.id: CabinetOccupancy.from_cabinet(c) for c in cabinets}
+        self.asset_cabinet = {}
+        assets = (await db.execute(
+            select(Asset).where(Asset.cabinet_id.isnot(None))
+        )).scalars().all()
+        for asset in assets:
+            self._place(asset)
+
+    async def _data_version(self, db: AsyncSession) -> tuple:
+        """资产与机柜的数量和最后更新时间 (单条查询)"""
+        stmt = select(
+            select(func.count(Asset.id)).scalar_subquery(),
+            select(func.max(Asset.updated_at)).scalar_subquery(),
+            select(func.count(Cabinet.id)).scalar_subquery(),
+            select(func.max(Cabinet.updated_at)).scalar_subquery(),
+        )
+        return tuple((await db.execute(stmt)).one())
+
+    async def _refresh_version(self, db: AsyncSession) -> None:
+        """增量维护后记录当前数据版本 (索引未加载时不处理)"""
+        if self.version is not None:
+            self.version = await self._data_version(db)
+
+    # ==================== 增量维护 ====================
+
+    def _place(self, asset: Asset) -> List[int]:
+        """资产放入所在机柜，返回U位重叠的资产ID"""
+        self._unplace(asset.id)
+        occupancy = self.cabinets.get(asset.cabinet_id) if asset.cabinet_id else None
+        if occupancy is None:
+            return []
+        self.asset_cabinet[asset.id] = asset.cabinet_id
+        return occupancy.place(asset)
+
+    def _unplace(self, asset_id: int) -> None:
+        cabinet_id = self.asset_cabinet.pop(asset_id, None)
+        if cabinet_id in self.cabinets:
+            self.cabinets[cabinet_id].remove(asset_id)
+
+    async def apply_asset(self, db: AsyncSession, asset: Asset) -> List[int]:
+        """资产新增或修改后更新索引，返回U位重叠的资产ID"""
+        if self.version is None:
+            return []
+        overlaps = self._place(asset)
+        await self._refresh_version(db)
+        return overlaps
+
+    async def remove_asset(self, db: AsyncSession, asset_id: int) -> None:
+        """资产删除后更新索引"""
+        if self.version is None:
+            return
+        self._unplace(asset_id)
+        await self._refresh_version(db)
+
+    async def apply_cabinet(self, db: AsyncSession, cabinet: Cabinet) -> None:
+        """机柜新增或修改后更新索引"""
+        if self.version is None:
+            return
+        if cabinet.id in self.cabinets:
+            self.cabinets[cabinet.id].set_limits(cabinet)
+        else:
+            self.cabinets[cabinet.id] = CabinetOccupancy.from_cabinet(cabinet)
+        await self._refresh_version(db)
+
+    async def remove_cabinet(self, db: AsyncSession, cabinet_id: int) -> None:
+        """机柜删除后更新索引"""
+        if self.version is None:
+            return
+        self.cabinets.pop(cabinet_id, None)
+        await self._refresh_version(db)
+
+    # ==================== 查询 ====================
+
+    def find_space(
+        self,
+        u_height: int,
+        power_kw: float = 0.0,
+        weight_kg: float = 0.0,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        查找可放置设备的机柜
+
+        Args:
+            u_height: 所需连续U数
+            power_kw: 所需功率余量 kW
+            weight_kg: 所需承重余量 kg
+            limit: 最多返回数量
+
+        Returns:
+            候选机柜列表，按放置后剩余空闲U数升序 (优先填满已用机柜)
+        """
+        candidates = []
+        for occupancy in self.cabinets.values():
+            if not occupancy.fits(power_kw, weight_kg):
+                continue
+            position = occupancy.find_slot(u_height)
+            if position is None:
+                continue
+            candidates.append((occupancy.free_u - u_height, occupancy.cabinet_id, position, occupancy))
+
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        return [
+            {
+                "cabinet_id": occupancy.cabinet_id,
+                "cabinet_name": occupancy.cabinet_name,
+                "u_position": position,
+                "free_u": occupancy.free_u,
+                "power_headroom": occupancy.power_headroom,
+                "weight_headroom": occupancy.weight_headroom,
+            }
+            for _, _, position, occupancy in candidates[:limit]
+        ]
+
+    def overlapping(
+        self,
+        cabinet_id: int,
+        u_position: Optional[int],
+        u_height: Optional[int],
+        exclude_asset_id: Optional[int] = None
+    ) -> List[int]:
+        """与指定U位范围重叠的资产ID (用于上架前校验)"""
+        occupancy = self.cabinets.get(cabinet_id)
+        if occupancy is None or not u_position or not u_height:
+            return []
+        mask = u_mask(u_position, u_height, occupancy.total_u)
+        return [
+            a.asset_id for a in occupancy.assets.values()
+            if a.mask & mask and a.asset_id != exclude_asset_id
+        ]
+
+    def conflicts(self) -> List[Dict[str, Any]]:
+        """全部机柜中U位重叠的资产"""
+        return [
+            {"cabinet_id": occupancy.cabinet_id, "cabinet_name": occupancy.cabinet_name,
+             "asset_ids": list(pair)}
+            for occupancy in self.cabinets.values()
+            for pair in occupancy.conflicts()
+        ]
+
+
+_index = RackOccupancyIndex()
+
+
+async def get_occupancy_index(db: AsyncSession) -> RackOccupancyIndex:
+    """获取与数据库一致的占用索引"""
+    return await _index.ensure_current(db)
+
+
+def occupancy_index() -> RackOccupancyIndex:
+    """进程内占用索引 (用于增删改后的增量维护)"""
+    return _index
+
+
+def invalidate_occupancy_index() -> None:
+    """清空占用索引，下次查询时重建"""
+    global _index
+    _index = RackOccupancyIndex()
@@ -1,10 +1,16 @@
 """
 实时调度调整服务
 监控当前功率，预测需量超标风险，触发紧急调整
+
+- 每个控制器用环形缓冲保存15分钟窗口内的读数，维护运行和，每条读数 O(1)
+- 趋势由窗口内读数的最小二乘斜率给出
+- DispatchRegistry 为每个计量点维护一个控制器，由实时采集周期按计量点汇总功率后写入
 """
 import asyncio
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Callable, Any
+from typing import List, Dict, Optional, Callable, Any, Deque, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -69,6 +75,15 @@ class RealtimeDispatchController:
     # 15分钟窗口 = 900秒
     WINDOW_SIZE = 900
 
+    # 窗口内最多保留的读数 (超过4Hz采集时丢弃最早读数，限制内存)
+    MAX_READINGS = 3600
+
+    # 趋势判定: 拟合斜率在窗口跨度内的变化超过窗口均值的比例
+    TREND_THRESHOLD = 0.02
+
+    # 时间原点超过该秒数后重新计算运行和，避免 Σt² 精度损失
+    REBASE_SECONDS = 86400
+
     # 预警阈值
     THRESHOLDS = {
         AlertLevel.ATTENTION: 0.85,
@@ -95,8 +110,14 @@ class RealtimeDispatchController:
         self.on_alert = on_alert
         self.on_command = on_command
 
-        # 功率读数缓存 (最近15分钟)
-        self.power_readings: List[PowerReading] = []
+        # 功率读数环形缓冲 (最近15分钟): (相对时间秒, 功率, 时间戳)
+        self._readings: Deque[Tuple[float, float, datetime]] = deque()
+        self._origin: Optional[datetime] = None
+        # 运行和: Σp, Σt, Σt², Σtp
+        self._sum_p = 0.0
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_tp = 0.0
 
         # 可调度资源
         self.curtailable_devices: List[Dict] = []
@@ -125,8 +146,7 @@ class RealtimeDispatchController:
         if timestamp is None:
             timestamp = datetime.now()
 
-        reading = PowerReading(timestamp=timestamp, power=power)
-        self.power_readings.append(reading)
+        self._append_reading(timestamp, power)
 
         # 清理过期读数
         self._cleanup_old_readings(timestamp)
@@ -145,14 +165,68 @@ class RealtimeDispatchController:
 
         return prediction
 
+    @property
+    def power_readings(self) -> List[PowerReading]:
+        """窗口内的功率读数 (按时间顺序)"""
+        return [PowerReading(timestamp=ts, power=p) for _, p, ts in self._readings]
+
+    def _append_reading(self, timestamp: datetime, power: float):
+        """写入环形缓冲并更新运行和"""
+        if self._origin is None:
+            self._origin = timestamp
+        t = (timestamp - self._origin).total_seconds()
+        if t > self.REBASE_SECONDS:
+            self._rebase(timestamp)
+            t = 0.0
+
+        if len(self._readings) >= self.MAX_READINGS:
+            self._pop_oldest()
+        self._readings.append((t, power, timestamp))
+        self._sum_p += power
+        self._sum_t += t
+        self._sum_tt += t * t
+        self._sum_tp += t * power
+
+    def _pop_oldest(self):
+        t, power, _ = self._readings.popleft()
+        self._sum_p -= power
+        self._sum_t -= t
+        self._sum_tt -= t * t
+        self._sum_tp -= t * power
+
+    def _rebase(self, origin: datetime):
+        """移动时间原点并重算运行和 (每 REBASE_SECONDS 一次)"""
+        readings = [(p, ts) for _, p, ts in self._readings]
+        self._readings.clear()
+        self._origin = origin
+        self._sum_p = self._sum_t = self._sum_tt = self._sum_tp = 0.0
+        for p, ts in readings:
+            t = (ts - origin).total_seconds()
+            self._readings.append((t, p, ts))
+            self._sum_p += p
+            self._sum_t += t
+            self._sum_tt += t * t
+            self._sum_tp += t * p
+
     def _cleanup_old_readings(self, current_time: datetime):
-        """清理15分钟窗口外的读数"""
+        """清理15分钟窗口外的读数 (均摊 O(1))"""
         cutoff = current_time - timedelta(seconds=self.WINDOW_SIZE)
-        self.power_readings = [r for r in self.power_readings if r.timestamp >= cutoff]
+        while self._readings and self._readings[0][2] < cutoff:
+            self._pop_oldest()
+
+    def _trend_slope(self) -> Optional[float]:
+        """窗口内功率的最小二乘斜率 (kW/秒)，读数不足3条或时间无跨度时返回 None"""
+        n = len(self._readings)
+        if n < 3:
+            return None
+        denominator = n * self._sum_tt - self._sum_t * self._sum_t
+        if denominator <= 1e-9:
+            return None
+        return (n * self._sum_tp - self._sum_t * self._sum_p) / denominator
 
     def _calculate_prediction(self, current_time: datetime) -> DemandPrediction:
         """计算需量预测"""
-        if not self.power_readings:
+        if not self._readings:
             return DemandPrediction(
                 current_window_avg=0,
                 predicted_window_avg=0,
@@ -164,14 +238,8 @@ class RealtimeDispatchController:
                 risk_score=0
             )
 
-        # 计算当前窗口平均
-        window_start = current_time - timedelta(seconds=self.WINDOW_SIZE)
-        window_readings = [r for r in self.power_readings if r.timestamp >= window_start]
-
-        if window_readings:
-            current_avg = sum(r.power for r in window_readings) / len(window_readings)
-        else:
-            current_avg = self.power_readings[-1].power
+        # 当前窗口平均 (运行和)
+        current_avg = self._sum_p / len(self._readings)
 
         # 计算窗口剩余时间
         # 假设窗口从整点开始，每15分钟一个窗口
@@ -179,34 +247,32 @@ class RealtimeDispatchController:
         window_minute = minutes_in_day % 15
         time_remaining = (15 - window_minute) * 60 - current_time.second
 
-        # 预测窗口结束时的平均功率
-        # 简单线性外推：假设当前功率保持到窗口结束
-        current_power = self.power_readings[-1].power
+        current_power = self._readings[-1][1]
 
-        # 计算趋势
-        if len(self.power_readings) >= 3:
-            recent_powers = [r.power for r in self.power_readings[-3:]]
-            if recent_powers[-1] > recent_powers[0] * 1.02:
+        # 最小二乘趋势: 拟合斜率在窗口跨度内造成的变化与窗口均值比较
+        slope = self._trend_slope()
+        trend = 'stable'
+        if slope is not None and current_avg > 0:
+            span = self._readings[-1][0] - self._readings[0][0]
+            relative_change = slope * span / current_avg
+            if relative_change > self.TREND_THRESHOLD:
                 trend = 'up'
-            elif recent_powers[-1] < recent_powers[0] * 0.98:
+            elif relative_change < -self.TREND_THRESHOLD:
                 trend = 'down'
-            else:
-                trend = 'stable'
-        else:
-            trend = 'stable'
 
-        # 预测值：加权平均（已有数据 + 预测保持当前功率）
+        # 剩余时间内功率按趋势线性外推，取剩余时段的平均值
+        future_power = current_power
+        if slope is not None and trend != 'stable':
+            future_power = max(0.0, current_power + slope * max(0, time_remaining) / 2)
+
+        # 预测值：加权平均（已有数据 + 剩余时间的外推功率）
         elapsed_seconds = self.WINDOW_SIZE - time_remaining
         if elapsed_seconds > 0:
             predicted_avg = (
-                current_avg * elapsed_seconds + current_power * time_remaining
+                current_avg * elapsed_seconds + future_power * time_remaining
             ) / self.WINDOW_SIZE
         else:
-            predicted_avg = current_power
-
-        # 如果趋势上升，增加预测值
-        if trend == 'up':
-            predicted_avg *= 1.02
+            predicted_avg = future_power
 
         # 计算利用率
         utilization = predicted_avg / self.demand_target if self.demand_target > 0 else 0
@@ -366,16 +432,138 @@ class RealtimeDispatchController:
         }
 
 
-# 全局控制器实例（单例模式）
-_controller_instance: Optional[RealtimeDispatchController] = None
+class DispatchRegistry:
+    """
+    按计量点管理实时调度控制器
+
+    - key 为 MeterPoint.id，None 表示全站控制器 (兼容 get_dispatch_controller)
+    - ingest_point_values 由实时采集周期调用: 按 有功功率点位 → 设备 → 回路 → 配电柜 → 计量点
+      汇总功率后写入对应控制器，映射关系缓存 MAPPING_TTL 秒
+    """
+
+    DEFAULT_TARGET = 800.0
+    MAPPING_TTL = 300
+
+    def __init__(self):
+        self._controllers: Dict[Optional[int], RealtimeDispatchController] = {}
+        # 有功功率点位ID → 计量点ID
+        self._point_meter: Dict[int, int] = {}
+        self._meter_targets: Dict[int, float] = {}
+        self._mapping_loaded_at: Optional[float] = None
+
+    def get(
+        self,
+        meter_point_id: Optional[int] = None,
+        demand_target: Optional[float] = None
+    ) -> RealtimeDispatchController:
+        """获取 (必要时创建) 控制器；传入 demand_target 时同步更新需量目标"""
+        controller = self._controllers.get(meter_point_id)
+        if controller is None:
+            target = demand_target or self._meter_targets.get(meter_point_id) or self.DEFAULT_TARGET
+            controller = RealtimeDispatchController(demand_target=target)
+            self._controllers[meter_point_id] = controller
+        elif demand_target:
+            controller.demand_target = demand_target
+        return controller
+
+    def feed(
+        self,
+        meter_point_id: Optional[int],
+        power: float,
+        timestamp: Optional[datetime] = None
+    ) -> DemandPrediction:
+        """写入一条计量点功率读数"""
+        return self.get(meter_point_id).add_power_reading(power, timestamp)
+
+    def remove(self, meter_point_id: Optional[int]) -> None:
+        self._controllers.pop(meter_point_id, None)
+
+    def meter_ids(self) -> List[Optional[int]]:
+        return list(self._controllers.keys())
+
+    def get_statuses(self) -> Dict[Optional[int], Dict]:
+        """所有控制器状态"""
+        return {mid: controller.get_status() for mid, controller in self._controllers.items()}
+
+    def invalidate_mapping(self) -> None:
+        """配电拓扑或申报需量变更后调用"""
+        self._mapping_loaded_at = None
+
+    async def ingest_point_values(
+        self,
+        session,
+        point_values: Dict[int, float],
+        timestamp: Optional[datetime] = None
+    ) -> Dict[int, DemandPrediction]:
+        """
+        将一个采集周期的点位值按计量点汇总后写入控制器
+
+        Args:
+            session: 数据库会话 (仅在映射过期时查询)
+            point_values: 点位ID → 当前值
+            timestamp: 采集时间
+
+        Returns:
+            计量点ID → 预测结果
+        """
+        totals = await self.meter_totals(session, point_values)
+        timestamp = timestamp or datetime.now()
+        return {
+            meter_point_id: self.feed(meter_point_id, power, timestamp)
+            for meter_point_id, power in totals.items()
+        }
+
+    async def meter_totals(self, session, point_values: Dict[int, float]) -> Dict[int, float]:
+        """按计量点汇总一个采集周期的设备功率点位值 (计量点ID → 总功率)"""
+        await self._ensure_mapping(session)
+        totals: Dict[int, float] = {}
+        for point_id, value in point_values.items():
+            meter_point_id = self._point_meter.get(point_id)
+            if meter_point_id is not None and value is not None:
+                totals[meter_point_id] = totals.get(meter_point_id, 0.0) + float(value)
+        return totals
+
+    async def _ensure_mapping(self, session) -> None:
+        now = time.monotonic()
+        if self._mapping_loaded_at is not None and now - self._mapping_loaded_at < self.MAPPING_TTL:
+            return
+
+        from sqlalchemy import select
+        from ..models.energy import PowerDevice, DistributionCircuit, DistributionPanel, MeterPoint
+
+        result = await session.execute(
+            select(PowerDevice.power_point_id, DistributionPanel.meter_point_id)
+            .join(DistributionCircuit, PowerDevice.circuit_id == DistributionCircuit.id)
+            .join(DistributionPanel, DistributionCircuit.panel_id == DistributionPanel.id)
+            .where(
+                PowerDevice.is_enabled == True,
+                PowerDevice.power_point_id.isnot(None),
+                DistributionPanel.meter_point_id.isnot(None)
+            )
+        )
+        self._point_meter = {point_id: meter_point_id for point_id, meter_point_id in result.all()}
+
+        result = await session.execute(
+            select(MeterPoint.id, MeterPoint.declared_demand).where(MeterPoint.is_enabled == True)
+        )
+        self._meter_targets = {mid: float(declared) for mid, declared in result.all() if declared}
+        for meter_point_id, target in self._meter_targets.items():
+            if meter_point_id in self._controllers:
+                self._controllers[meter_point_id].demand_target = target
+
+        self._mapping_loaded_at = now
+
+
+# 全局控制器注册表
+dispatch_registry = DispatchRegistry()
 
 
-def get_dispatch_controller(demand_target: float = 800.0) -> RealtimeDispatchController:
-    """获取调度控制器实例"""
-    global _controller_instance
-    if _controller_instance is None:
-        _controller_instance = RealtimeDispatchController(demand_target=demand_target)
-    return _controller_instance
+def get_dispatch_controller(
+    demand_target: Optional[float] = None,
+    meter_point_id: Optional[int] = None
+) -> RealtimeDispatchController:
+    """获取调度控制器实例 (默认为全站控制器)"""
+    return dispatch_registry.get(meter_point_id, demand_target)
 
 
 def simulate_realtime_monitoring(duration_minutes: int = 5) -> List[Dict]:
@@ -0,0 +1,250 @@
+"""
+报表后台生成
+Background Report Jobs
+
+报表生成请求只创建记录并入队，由后台工作协程计算并落盘:
+- 点位统计由一条按点位分组的聚合查询完成，告警统计一条分组查询
+- 报表数据渲染为 JSON 和 XLSX (openpyxl 只写流式模式) 两种文件，保存在 report_dir 下
+- 记录状态 pending → generating → completed/failed，前端轮询记录状态
+- 下载直接返回已生成的文件，不再重复计算
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..core.database import async_session
+from ..models.alarm import Alarm
+from ..models.history import PointHistory
+from ..models.point import Point
+from ..models.report import ReportRecord
+
+REPORT_FORMATS = {
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+POINT_COLUMNS = [("code", "点位编码"), ("name", "点位名称"), ("unit", "单位"),
+                 ("min", "最小值"), ("max", "最大值"), ("avg", "平均值"), ("count", "采样数")]
+INTERRUPTED_MESSAGE = "服务重启，报表生成中断"
+
+
+# ==================== 报表数据 ====================
+
+def point_stats_query(point_ids: List[int], start_time: datetime, end_time: datetime):
+    """全部点位的最小/最大/平均值和采样数 (按点位分组一次聚合)"""
+    stats = select(
+        PointHistory.point_id,
+        func.min(PointHistory.value).label("min"),
+        func.max(PointHistory.value).label("max"),
+        func.avg(PointHistory.value).label("avg"),
+        func.count(PointHistory.id).label("count"),
+    ).where(
+        PointHistory.point_id.in_(point_ids),
+        PointHistory.recorded_at >= start_time,
+        PointHistory.recorded_at <= end_time
+    ).group_by(PointHistory.point_id).subquery()
+
+    return select(
+        Point.id, Point.point_code, Point.point_name, Point.unit,
+        stats.c.min, stats.c.max, stats.c.avg, func.coalesce(stats.c.count, 0)
+    ).outerjoin(stats, stats.c.point_id == Point.id).where(Point.id.in_(point_ids))
+
+
+async def build_report_data(
+    db: AsyncSession,
+    report_type: str,
+    point_ids: List[int],
+    start_time: datetime,
+    end_time: datetime
+) -> Dict[str, Any]:
+    """计算报表数据 (点位顺序与 point_ids 一致，不存在的点位忽略)"""
+    points = []
+    if point_ids:
+        rows = {row[0]: row for row in (await db.execute(point_stats_query(point_ids, start_time, end_time))).all()}
+        for point_id in dict.fromkeys(point_ids):
+            row = rows.get(point_id)
+            if row is None:
+                continue
+            _, code, name, unit, min_value, max_value, avg_value, count = row
+            points.append({
+                "code": code,
+                "name": name,
+                "unit": unit,
+                "min": min_value,
+                "max": max_value,
+                "avg": round(avg_value, 2) if avg_value else None,
+                "count": count
+            })
+
+    alarm_result = await db.execute(
+        select(Alarm.alarm_level, func.count(Alarm.id)).where(
+            and_(
+                Alarm.created_at >= start_time,
+                Alarm.created_at <= end_time
+            )
+        ).group_by(Alarm.alarm_level)
+    )
+
+    return {
+        "title": f"{report_type}报表",
+        "generated_at": datetime.now().isoformat(),
+        "period": {
+            "start": start_time.isoformat(),
+            "end": end_time.isoformat()
+        },
+        "summary": {},
+        "points": points,
+        "alarms": {row[0]: row[1] for row in alarm_result.all()}
+    }
+
+
+# ==================== 文件渲染 ====================
+
+def artifact_path(record: ReportRecord, fmt: str) -> str:
+    """报表文件路径 (file_path 记录 JSON 文件，其他格式同名不同扩展名)"""
+    base, _ = os.path.splitext(record.file_path)
+    return f"{base}.{fmt}"
+
+
+def render_json(data: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def render_xlsx(data: Dict[str, Any], path: str) -> None:
+    """只写模式逐行写入，内存占用与点位数无关"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    summary = workbook.create_sheet("概要")
+    summary.append(["报表", data["title"]])
+    summary.append(["开始时间", data["period"]["start"]])
+    summary.append(["结束时间", data["period"]["end"]])
+    summary.append(["生成时间", data["generated_at"]])
+    summary.append([])
+    summary.append(["告警级别", "告警数"])
+    for level, count in data["alarms"].items():
+        summary.append([level, count])
+
+    sheet = workbook.create_sheet("点位统计")
+    sheet.append([label for _, label in POINT_COLUMNS])
+    for point in data["points"]:
+        sheet.append([point[key] for key, _ in POINT_COLUMNS])
+    workbook.save(path)
+
+
+def render_artifacts(data: Dict[str, Any], json_path: str) -> int:
+    """生成全部格式的报表文件，返回 JSON 文件大小"""
+    os.makedirs(os.path.dirname(json_path), exist_ok=True)
+    base, _ = os.path.splitext(json_path)
+    render_xlsx(data, f"{base}.xlsx")
+    render_json(data, json_path)
+    return os.path.getsize(json_path)
+
+
+# ==================== 任务队列 ====================
+
+class ReportJobQueue:
+    """
+    报表生成任务队列
+
+    用法:
+        record = ReportRecord(status="pending", ...)   # 提交后
+        report_jobs.submit(record.id, point_ids)
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        report_dir: Optional[str] = None,
+        session_factory: Callable[[], AsyncSession] = async_session
+    ):
+        settings = get_settings()
+        self.max_workers = max_workers or settings.report_workers
+        self.report_dir = report_dir or settings.report_dir
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._workers = [
+                loop.create_task(self._worker(self._queue), name=f"report-worker-{i}")
+                for i in range(self.max_workers)
+            ]
+        return self._queue
+
+    def submit(self, record_id: int, point_ids: List[int]) -> None:
+        """报表记录入队 (记录须已提交，状态为 pending)"""
+        self._ensure_workers().put_nowait((record_id, list(point_ids)))
+
+    async def join(self) -> None:
+        """等待已入队的任务全部完成"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def shutdown(self) -> None:
+        """停止工作协程 (未完成的任务在下次启动时由 recover 标记失败)"""
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+        self._queue = None
+        self._loop = None
+
+    async def recover(self, db: AsyncSession) -> int:
+        """将上次运行遗留的未完成记录标记为失败"""
+        result = await db.execute(
+            select(ReportRecord).where(ReportRecord.status.in_(["pending", "generating"]))
+        )
+        records = result.scalars().all()
+        for record in records:
+            record.status = "failed"
+            record.error_message = INTERRUPTED_MESSAGE
+        await db.commit()
+        return len(records)
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            record_id, point_ids = await queue.get()
+            try:
+                await self.run(record_id, point_ids)
+            except Exception as e:
+                print(f"报表生成失败 (记录 {record_id}): {e}")
+            finally:
+                queue.task_done()
+
+    async def run(self, record_id: int, point_ids: List[int]) -> None:
+        """生成一个报表记录的数据和文件"""
+        async with self.session_factory() as db:
+            record = await db.get(ReportRecord, record_id)
+            if record is None or record.status != "pending":
+                return
+            record.status = "generating"
+            await db.commit()
+
+            try:
+                data = await build_report_data(
+                    db, record.report_type, point_ids, record.start_time, record.end_time
+                )
+                json_path = os.path.join(self.report_dir, f"report_{record.id}.json")
+                loop = asyncio.get_running_loop()
+                record.file_size = await loop.run_in_executor(None, render_artifacts, data, json_path)
+                record.file_path = json_path
+                record.status = "completed"
+            except Exception as e:
+                await db.rollback()
+                record.status = "failed"
+                record.error_message = str(e)
+            await db.commit()
+
+
+report_jobs = ReportJobQueue()
@@ -0,0 +1,289 @@
+"""
+周期报表快照
+Periodic Report Snapshots
+
+日报/周报/月报在周期结束后不再变化:
+- 已结束周期的报表生成一次后保存为快照 (紧凑 JSON)，重复查看和周期对比直接读取快照
+- 周报/月报的告警统计由各日快照汇总，未结束的周期只实时统计当天
+- 后台调度定期为刚结束的日/周/月生成快照
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import async_session
+from ..models.alarm import Alarm
+from ..models.history import PointHistory
+from ..models.point import Point
+from ..models.report import ReportSnapshot
+
+PERIOD_TYPES = ("daily", "weekly", "monthly")
+# 日报包含的点位数
+DAILY_POINT_LIMIT = 20
+WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+# 快照调度间隔 (秒)
+SNAPSHOT_INTERVAL = 3600
+
+
+# ==================== 周期 ====================
+
+def period_start(period_type: str, moment: datetime) -> datetime:
+    """moment 所在周期的开始时间 (周以周一开始)"""
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period_type == "daily":
+        return day
+    if period_type == "weekly":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def period_end(period_type: str, start: datetime) -> datetime:
+    if period_type == "daily":
+        return start + timedelta(days=1)
+    if period_type == "weekly":
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def previous_period(period_type: str, start: datetime) -> datetime:
+    return period_start(period_type, start - timedelta(days=1))
+
+
+# ==================== 报表计算 ====================
+
+def daily_points_query(start: datetime, end: datetime):
+    """前 DAILY_POINT_LIMIT 个启用点位中有数据点位的日统计 (一次分组聚合)"""
+    enabled = select(Point.id).where(Point.is_enabled == True).order_by(Point.id).limit(DAILY_POINT_LIMIT).subquery()
+    return select(
+        Point.point_code, Point.point_name, Point.unit,
+        func.min(PointHistory.value), func.max(PointHistory.value), func.avg(PointHistory.value)
+    ).join(enabled, enabled.c.id == Point.id).join(
+        PointHistory, PointHistory.point_id == Point.id
+    ).where(
+        PointHistory.recorded_at >= start,
+        PointHistory.recorded_at < end
+    ).group_by(Point.id, Point.point_code, Point.point_name, Point.unit).order_by(Point.id)
+
+
+async def alarm_counts(db: AsyncSession, start: datetime, end: datetime) -> Dict[str, int]:
+    """时间段内按级别的告警数"""
+    result = await db.execute(
+        select(Alarm.alarm_level, func.count(Alarm.id)).where(
+            and_(
+                Alarm.created_at >= start,
+                Alarm.created_at < end
+            )
+        ).group_by(Alarm.alarm_level)
+    )
+    return {row[0]: row[1] for row in result.all()}
+
+
+async def compute_daily(db: AsyncSession, start: datetime) -> Dict[str, Any]:
+    end = start + timedelta(days=1)
+    rows = (await db.execute(daily_points_query(start, end))).all()
+    alarms = await alarm_counts(db, start, end)
+    return {
+        "date": start.strftime("%Y-%m-%d"),
+        "title": f"{start.strftime('%Y-%m-%d')} 日报",
+        "points": [
+            {
+                "code": code,
+                "name": name,
+                "unit": unit,
+                "min": round(min_value, 2) if min_value else None,
+                "max": round(max_value, 2) if max_value else None,
+                "avg": round(avg_value, 2) if avg_value else None
+            }
+            for code, name, unit, min_value, max_value, avg_value in rows
+        ],
+        "alarms": alarms,
+        "alarm_total": sum(alarms.values())
+    }
+
+
+def _merge(day_alarms: List[Dict[str, int]]) -> Dict[str, int]:
+    merged: Dict[str, int] = {}
+    for alarms in day_alarms:
+        for level, count in alarms.items():
+            merged[level] = merged.get(level, 0) + count
+    return merged
+
+
+def compose_weekly(start: datetime, day_alarms: List[Dict[str, int]]) -> Dict[str, Any]:
+    """由各日告警统计汇总周报"""
+    last_day = start + timedelta(days=6)
+    daily_alarms = [
+        {
+            "date": (start + timedelta(days=i)).strftime("%Y-%m-%d"),
+            "weekday": WEEKDAYS[i],
+            "alarm_count": sum(alarms.values())
+        }
+        for i, alarms in enumerate(day_alarms)
+    ]
+    return {
+        "week_start": start.strftime("%Y-%m-%d"),
+        "week_end": last_day.strftime("%Y-%m-%d"),
+        "title": f"{start.strftime('%Y-%m-%d')} ~ {last_day.strftime('%Y-%m-%d')} 周报",
+        "daily_alarms": daily_alarms,
+        "alarm_by_level": _merge(day_alarms),
+        "total_alarms": sum(d["alarm_count"] for d in daily_alarms)
+    }
+
+
+def compose_monthly(start: datetime, day_alarms: List[Dict[str, int]]) -> Dict[str, Any]:
+    """由各日告警统计汇总月报"""
+    alarm_by_level = _merge(day_alarms)
+    return {
+        "year": start.year,
+        "month": start.month,
+        "title": f"{start.year}年{start.month}月 月报",
+        "alarm_by_level": alarm_by_level,
+        "total_alarms": sum(alarm_by_level.values())
+    }
+
+
+# ==================== 快照 ====================
+
+async def _load_snapshots(db: AsyncSession, period_type: str, starts: List[datetime]) -> Dict[datetime, Dict]:
+    if not starts:
+        return {}
+    result = await db.execute(
+        select(ReportSnapshot.period_start, ReportSnapshot.content).where(
+            ReportSnapshot.period_type == period_type,
+            ReportSnapshot.period_start.in_(starts)
+        )
+    )
+    return {start: json.loads(content) for start, content in result.all()}
+
+
+async def _closed_reports(
+    db: AsyncSession,
+    period_type: str,
+    starts: List[datetime],
+    now: datetime
+) -> Dict[datetime, Dict]:
+    """已结束周期的报表: 读取快照，缺失的计算后保存"""
+    reports = await _load_snapshots(db, period_type, starts)
+    missing = [start for start in starts if start not in reports]
+    if not missing:
+        return reports
+
+    for start in missing:
+        reports[start] = await _compute(db, period_type, start, now)
+    db.add_all([
+        ReportSnapshot(
+            period_type=period_type,
+            period_start=start,
+            period_end=period_end(period_type, start),
+            content=json.dumps(reports[start], ensure_ascii=False, separators=(",", ":"))
+        )
+        for start in missing
+    ])
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发请求已生成同一快照，以先提交者为准
+        await db.rollback()
+    return reports
+
+
+async def _day_alarms(db: AsyncSession, days: List[datetime], now: datetime) -> List[Dict[str, int]]:
+    """各日告警统计: 已结束的日取日快照，当天实时统计，未来为空"""
+    closed = await _closed_reports(db, "daily", [d for d in days if d + timedelta(days=1) <= now], now)
+    result = []
+    for day in days:
+        if day in closed:
+            result.append(closed[day]["alarms"])
+        elif day <= now:
+            result.append(await alarm_counts(db, day, day + timedelta(days=1)))
+        else:
+            result.append({})
+    return result
+
+
+async def _compute(db: AsyncSession, period_type: str, start: datetime, now: datetime) -> Dict[str, Any]:
+    if period_type == "daily":
+        return await compute_daily(db, start)
+    end = period_end(period_type, start)
+    days = [start + timedelta(days=i) for i in range((end - start).days)]
+    day_alarms = await _day_alarms(db, days, now)
+    if period_type == "weekly":
+        return compose_weekly(start, day_alarms)
+    return compose_monthly(start, day_alarms)
+
+
+async def get_period_report(
+    db: AsyncSession,
+    period_type: str,
+    moment: datetime,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    获取 moment 所在周期的报表
+
+    已结束的周期读取快照 (首次查看时生成)，未结束的周期由日快照加当天实时统计组成
+    """
+    now = now or datetime.now()
+    start = period_start(period_type, moment)
+    if period_end(period_type, start) <= now:
+        return (await _closed_reports(db, period_type, [start], now))[start]
+    return await _compute(db, period_type, start, now)
+
+
+async def compare_periods(
+    db: AsyncSession,
+    period_type: str,
+    moment: datetime,
+    count: int,
+    now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """截至 moment 所在周期的连续 count 个周期的告警对比，按时间先后排列"""
+    now = now or datetime.now()
+    starts = [period_start(period_type, moment)]
+    while len(starts) < count:
+        starts.append(previous_period(period_type, starts[-1]))
+    starts.reverse()
+
+    closed = await _closed_reports(
+        db, period_type, [s for s in starts if period_end(period_type, s) <= now], now
+    )
+    comparison = []
+    for start in starts:
+        report = closed.get(start) or await _compute(db, period_type, start, now)
+        alarm_by_level = report["alarms"] if period_type == "daily" else report["alarm_by_level"]
+        comparison.append({
+            "period_start": start.strftime("%Y-%m-%d"),
+            "title": report["title"],
+            "alarm_by_level": alarm_by_level,
+            "alarm_total": sum(alarm_by_level.values()),
+            "is_closed": start in closed
+        })
+    return comparison
+
+
+# ==================== 调度 ====================
+
+async def build_closed_snapshots(db: AsyncSession, now: Optional[datetime] = None) -> None:
+    """为最近结束的日/周/月生成快照 (已存在的跳过)"""
+    now = now or datetime.now()
+    for period_type in PERIOD_TYPES:
+        last_closed = previous_period(period_type, period_start(period_type, now))
+        await _closed_reports(db, period_type, [last_closed], now)
+
+
+async def run_snapshot_scheduler(interval: int = SNAPSHOT_INTERVAL) -> None:
+    """后台定期生成快照"""
+    while True:
+        try:
+            async with async_session() as db:
+                await build_closed_snapshots(db)
+        except Exception as e:
+            print(f"报表快照生成失败: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,352 @@
+"""
+运维全文检索索引
+Operations Full-text Search Index
+
+进程内倒排索引，覆盖知识库、工单和告警消息:
+- 分词: 中文按相邻二字 (bigram) 切分，英文/数字按连续字母数字切分，统一 NFKC 归一化并小写
+- 检索: 查询词全部命中 (AND)，BM25 排序，标题等字段加权；单个汉字查询匹配包含该字的所有二字词，
+  英文/数字查询匹配包含该串的词 (如 UPS、01 匹配设备编码 UPS01)
+- 高亮: 返回命中字段的片段，命中词以 <em></em> 包裹
+- 增量更新: 会话 flush 时记录新增/修改/删除的文档，提交后写入索引；
+  批量 UPDATE/DELETE 或超过 REBUILD_TTL 时按文档类型整体重建
+- 告警表持续增长，只索引最近 ALARM_INDEX_DAYS 天内最新的 ALARM_INDEX_LIMIT 条
+"""
+import math
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.alarm import Alarm
+from ..models.operation import KnowledgeBase, WorkOrder
+
+# 文档类型 → (模型, {字段: 权重}, 标题字段)
+SOURCES = {
+    "knowledge": (KnowledgeBase, {"title": 3.0, "tags": 2.0, "category": 1.0, "content": 1.0}, "title"),
+    "work_order": (WorkOrder, {
+        "title": 3.0, "order_no": 2.0, "device_name": 1.5, "location": 1.0,
+        "description": 1.0, "solution": 1.0, "root_cause": 1.0,
+    }, "title"),
+    "alarm": (Alarm, {"alarm_message": 2.0, "alarm_no": 2.0, "ack_remark": 1.0, "resolve_remark": 1.0}, "alarm_no"),
+}
+MODEL_TYPES = {model: doc_type for doc_type, (model, _, _) in SOURCES.items()}
+
+ALARM_INDEX_DAYS = 30
+ALARM_INDEX_LIMIT = 20000
+# 只索引近期文档的类型 → (时间字段, 保留天数, 最大文档数)
+RECENT_WINDOWS = {"alarm": ("created_at", ALARM_INDEX_DAYS, ALARM_INDEX_LIMIT)}
+
+REBUILD_TTL = 600
+PENDING_KEY = "search_index_pending"
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 高亮片段长度
+SNIPPET_WIDTH = 80
+
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[0-9a-z]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+DocKey = Tuple[str, int]
+
+
+def _runs(text: Optional[str]) -> List[str]:
+    """归一化后的中文连续段和字母数字段"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower())
+
+
+def _window_start(doc_type: str) -> Optional[datetime]:
+    """近期窗口的起始时间，不限制的文档类型返回 None"""
+    window = RECENT_WINDOWS.get(doc_type)
+    return datetime.now() - timedelta(days=window[1]) if window else None
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """中文二字切分，英文/数字按词切分"""
+    tokens = []
+    for run in _runs(text):
+        if _CJK_RE.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def highlight(text: Optional[str], terms: List[str], width: int = SNIPPET_WIDTH) -> Optional[str]:
+    """截取第一个命中词附近的片段并标记全部命中词，未命中返回 None"""
+    if not text or not terms:
+        return None
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    normalized = unicodedata.normalize("NFKC", text)
+    first = pattern.search(normalized)
+    if not first:
+        return None
+    start = max(0, first.start() - width // 4)
+    end = min(len(normalized), start + width)
+    snippet = pattern.sub(lambda m: f"<em>{m.group(0)}</em>", normalized[start:end]).replace("</em><em>", "")
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(normalized) else "")
+
+
+@dataclass
+class Document:
+    """索引文档"""
+    doc_type: str
+    doc_id: int
+    fields: Dict[str, Optional[str]]
+    terms: Dict[str, float]
+    length: float
+
+
+class SearchIndex:
+    """
+    倒排索引
+
+    用法:
+        index = await get_search_index(db)
+        total, hits = index.search("冷机 高压", doc_types=["knowledge"])
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[DocKey, float]] = defaultdict(dict)
+        self.docs: Dict[DocKey, Document] = {}
+        self.total_length = 0.0
+        self.loaded_at: Dict[str, float] = {}
+        self.stale: Set[str] = set()
+
+    # ==================== 写入 ====================
+
+    def add(self, doc_type: str, doc_id: int, fields: Dict[str, Optional[str]]) -> None:
+        """新增或替换文档"""
+        self.remove(doc_type, doc_id)
+        weights = SOURCES[doc_type][1]
+        terms: Dict[str, float] = defaultdict(float)
+        for field_name, weight in weights.items():
+            for token in tokenize(fields.get(field_name)):
+                terms[token] += weight
+        key = (doc_type, doc_id)
+        length = sum(terms.values())
+        self.docs[key] = Document(doc_type, doc_id, fields, dict(terms), length)
+        self.total_length += length
+        for token, tf in terms.items():
+            self.postings[token][key] = tf
+
+    def remove(self, doc_type: str, doc_id: int) -> None:
+        doc = self.docs.pop((doc_type, doc_id), None)
+        if doc is None:
+            return
+        self.total_length -= doc.length
+        for token in doc.terms:
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop((doc_type, doc_id), None)
+                if not posting:
+                    del self.postings[token]
+
+    def clear_type(self, doc_type: str) -> None:
+        for key in [k for k in self.docs if k[0] == doc_type]:
+            self.remove(*key)
+
+    # ==================== 加载 ====================
+
+    async def ensure_current(self, db: AsyncSession, doc_types: Iterable[str]) -> "SearchIndex":
+        """未加载、已过期或被批量修改的文档类型整体重建"""
+        now = time.monotonic()
+        for doc_type in doc_types:
+            loaded_at = self.loaded_at.get(doc_type)
+            if loaded_at is None or doc_type in self.stale or now - loaded_at > REBUILD_TTL:
+                await self.load(db, doc_type)
+        return self
+
+    async def load(self, db: AsyncSession, doc_type: str) -> None:
+        model, weights, title_field = SOURCES[doc_type]
+        names = list(dict.fromkeys([title_field, *weights]))
+        query = select(model.id, *[getattr(model, name) for name in names])
+        window = RECENT_WINDOWS.get(doc_type)
+        if window:
+            column = getattr(model, window[0])
+            query = query.where(column >= _window_start(doc_type)).order_by(column.desc()).limit(window[2])
+        result = await db.execute(query)
+        self.clear_type(doc_type)
+        self.stale.discard(doc_type)
+        for row in result.all():
+            self.add(doc_type, row[0], dict(zip(names, row[1:])))
+        self.loaded_at[doc_type] = time.monotonic()
+
+    def is_loaded(self, doc_type: str) -> bool:
+        return doc_type in self.loaded_at
+
+    # ==================== 检索 ====================
+
+    def _term_postings(self, token: str) -> Dict[DocKey, float]:
+        """中文二字词精确匹配；单个汉字或英文/数字匹配所有包含它的词"""
+        if len(token) > 1 and _CJK_RE.match(token):
+            return self.postings.get(token, {})
+        merged: Dict[DocKey, float] = defaultdict(float)
+        for term, posting in self.postings.items():
+            if token in term:
+                for key, tf in posting.items():
+                    merged[key] += tf
+        return merged
+
+    def search(
+        self,
+        query: str,
+        doc_types: Optional[Iterable[str]] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        检索文档
+
+        Returns:
+            (命中总数, 按相关度排序的结果页)
+        """
+        ranked = self.rank(query, doc_types)
+        terms = list(dict.fromkeys(_runs(query) + tokenize(query)))
+        return len(ranked), [self._hit(key, score, terms) for key, score in ranked[offset:offset + limit]]
+
+    def rank(self, query: str, doc_types: Optional[Iterable[str]] = None) -> List[Tuple[DocKey, float]]:
+        """全部命中文档及 BM25 得分，按得分降序"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        types = set(doc_types) if doc_types else set(SOURCES)
+        postings = sorted((self._term_postings(t) for t in tokens), key=len)
+
+        candidates = {key for key in postings[0] if key[0] in types}
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        count = len(self.docs) or 1
+        avg_length = self.total_length / count or 1.0
+        scores = {}
+        for key in candidates:
+            length = self.docs[key].length
+            score = 0.0
+            for posting in postings:
+                tf = posting[key]
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+            scores[key] = score
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+    def ranked_ids(self, query: str, doc_type: str) -> List[int]:
+        """单一文档类型的命中ID，按相关度排序"""
+        return [key[1] for key, _ in self.rank(query, [doc_type])]
+
+    def _hit(self, key: DocKey, score: float, terms: List[str]) -> Dict[str, Any]:
+        doc = self.docs[key]
+        _, weights, title_field = SOURCES[doc.doc_type]
+        highlights = {}
+        for field_name in weights:
+            snippet = highlight(doc.fields.get(field_name), terms)
+            if snippet:
+                highlights[field_name] = snippet
+        return {
+            "type": doc.doc_type,
+            "id": doc.doc_id,
+            "title": doc.fields.get(title_field),
+            "score": round(score, 4),
+            "highlights": highlights,
+        }
+
+    # ==================== 增量更新 ====================
+
+    def apply(self, changes: Iterable[Tuple]) -> None:
+        """应用会话提交的变更 (未加载的文档类型忽略，加载时读取数据库)"""
+        for change in changes:
+            action, doc_type = change[0], change[1]
+            if not self.is_loaded(doc_type):
+                continue
+            if action == "stale":
+                self.stale.add(doc_type)
+            elif action == "remove":
+                self.remove(doc_type, change[2])
+            else:
+                self.add(doc_type, change[2], change[3])
+
+
+_index = SearchIndex()
+
+
+async def get_search_index(db: AsyncSession, doc_types: Optional[Iterable[str]] = None) -> SearchIndex:
+    """获取全局索引 (按需加载或重建指定文档类型)"""
+    return await _index.ensure_current(db, doc_types or SOURCES)
+
+
+def search_index() -> SearchIndex:
+    return _index
+
+
+def invalidate_search_index() -> None:
+    """丢弃全局索引，下次检索时重新加载"""
+    global _index
+    _index = SearchIndex()
+
+
+# ==================== 会话事件 ====================
+
+def _pending(session: Session) -> list:
+    return session.info.setdefault(PENDING_KEY, [])
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    for obj in chain(session.new, session.dirty):
+        doc_type = MODEL_TYPES.get(type(obj))
+        if doc_type is None:
+            continue
+        _, weights, title_field = SOURCES[doc_type]
+        values = inspect(obj).dict
+        names = [title_field, *weights]
+        # 超出近期窗口的文档 (如处理旧告警) 不再索引
+        cutoff = _window_start(doc_type)
+        if cutoff is not None:
+            timestamp = values.get(RECENT_WINDOWS[doc_type][0])
+            if timestamp is not None and timestamp < cutoff:
+                _pending(session).append(("remove", doc_type, obj.id))
+                continue
+        # 新增对象未赋值的文本字段插入为 NULL；已有对象的字段可能已过期，无法取值时整体重建
+        if obj in session.new:
+            _pending(session).append(("add", doc_type, obj.id, {name: values.get(name) for name in names}))
+        elif all(name in values for name in names):
+            _pending(session).append(("add", doc_type, obj.id, {name: values[name] for name in names}))
+        else:
+            _pending(session).append(("stale", doc_type))
+    for obj in session.deleted:
+        doc_type = MODEL_TYPES.get(type(obj))
+        if doc_type is not None:
+            _pending(session).append(("remove", doc_type, obj.id))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_write(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper:
+        doc_type = MODEL_TYPES.get(orm_execute_state.bind_mapper.class_)
+        if doc_type is not None:
+            _pending(orm_execute_state.session).append(("stale", doc_type))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_on_commit(session):
+    changes = session.info.pop(PENDING_KEY, None)
+    if changes:
+        _index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING_KEY, None)
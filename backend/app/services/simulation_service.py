@@ -4,15 +4,23 @@ Simulation Service
 
 提供What-if模拟计算功能，支持参数调整实时计算收益
 用于节能建议详情页的交互式模拟器
+
+组合模拟先一次性读取各场景所需的数据 (SimulationContext)，再逐场景纯计算；
+收益区间由向量化蒙特卡洛抽样给出 (见 benefit_monte_carlo)，在线程池中执行不阻塞事件循环。
 """
+import asyncio
 import logging
+from functools import partial
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, date, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
+
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
 
+from .benefit_monte_carlo import DEFAULT_DRAWS, DEFAULT_SEED, MonteCarloEngine, summarize
 from .pricing_service import PricingService
 from ..models.energy import (
     PowerDevice, DeviceShiftConfig, LoadRegulationConfig,
@@ -43,6 +51,44 @@ class SimulationResult:
     recommendations: List[str] = field(default_factory=list)
 
 
+# 峰谷转移/设备调节的默认运行参数
+WORKING_DAYS_PER_YEAR = 300
+REGULATION_HOURS_PER_DAY = 8
+REGULATION_AVG_PRICE = 0.5  # 假设平均电价
+
+
+@dataclass
+class SimulationContext:
+    """模拟所需的数据快照 (一次读取，供多个场景共用)"""
+    global_config: Dict[str, Any] = field(default_factory=dict)
+    prices: Dict[str, float] = field(default_factory=dict)
+    demand_times: np.ndarray = field(default_factory=lambda: np.array([], dtype='datetime64[s]'))
+    demand_powers: np.ndarray = field(default_factory=lambda: np.array([]))
+    shiftable_devices: List[Dict] = field(default_factory=list)
+    devices: Dict[int, PowerDevice] = field(default_factory=dict)
+    regulation_configs: Dict[Tuple[int, str], LoadRegulationConfig] = field(default_factory=dict)
+
+    def demand_history(self, days: int) -> np.ndarray:
+        """最近 days 天的需量记录"""
+        if not len(self.demand_powers):
+            return self.demand_powers
+        since = np.datetime64(datetime.now() - timedelta(days=days), 's')
+        return self.demand_powers[self.demand_times >= since]
+
+    def daily_peaks(self, days: int) -> np.ndarray:
+        """最近 days 天的日最大需量"""
+        since = np.datetime64(datetime.now() - timedelta(days=days), 's')
+        mask = self.demand_times >= since
+        if not mask.any():
+            return np.array([])
+        day_index = self.demand_times[mask].astype('datetime64[D]')
+        powers = self.demand_powers[mask]
+        unique_days, inverse = np.unique(day_index, return_inverse=True)
+        peaks = np.full(len(unique_days), -np.inf)
+        np.maximum.at(peaks, inverse, powers)
+        return peaks
+
+
 class SimulationService:
     """
     模拟计算服务
@@ -73,16 +119,26 @@ class SimulationService:
         Returns:
             SimulationResult: 模拟结果
         """
-        # 获取当前电价配置
-        full_pricing = await self.pricing_service.get_full_pricing_config()
-        global_config = full_pricing.get("global_config") or {}
+        context = await self._load_context([
+            {"type": "demand_adjustment", "params": {"historical_days": historical_days}}
+        ])
+        return self._evaluate_demand_adjustment(context, new_declared_demand, historical_days)
+
+    def _evaluate_demand_adjustment(
+        self,
+        context: SimulationContext,
+        new_declared_demand: float,
+        historical_days: int = 30
+    ) -> SimulationResult:
+        """需量调整模拟计算 (基于数据快照，不访问数据库)"""
+        global_config = context.global_config
 
         current_declared = global_config.get("declared_demand", 0)
         demand_price = global_config.get("demand_price", 38)
         over_multiplier = global_config.get("over_demand_multiplier", 2)
 
-        # 获取历史需量数据
-        demand_history = await self._get_demand_history(historical_days)
+        # 历史需量数据
+        demand_history = context.demand_history(historical_days).tolist()
 
         if not demand_history:
             return SimulationResult(
@@ -172,7 +228,7 @@ class SimulationService:
         shift_hours: float,
         source_period: str = "peak",
         target_period: str = "valley",
-        working_days_per_year: int = 300
+        working_days_per_year: int = WORKING_DAYS_PER_YEAR
     ) -> SimulationResult:
         """
         模拟峰谷负荷转移
@@ -187,8 +243,22 @@ class SimulationService:
         Returns:
             SimulationResult: 模拟结果
         """
-        # 获取电价
-        prices = await self.pricing_service.get_all_prices()
+        context = await self._load_context([{"type": "peak_shift", "params": {}}])
+        return self._evaluate_peak_shift(
+            context, shift_power, shift_hours, source_period, target_period, working_days_per_year
+        )
+
+    def _evaluate_peak_shift(
+        self,
+        context: SimulationContext,
+        shift_power: float,
+        shift_hours: float,
+        source_period: str = "peak",
+        target_period: str = "valley",
+        working_days_per_year: int = WORKING_DAYS_PER_YEAR
+    ) -> SimulationResult:
+        """峰谷转移模拟计算 (基于数据快照，不访问数据库)"""
+        prices = context.prices
         source_price = prices.get(f"{source_period}_price", 0)
         target_price = prices.get(f"{target_period}_price", 0)
         price_diff = source_price - target_price
@@ -204,8 +274,8 @@ class SimulationService:
                 warnings=["无法获得峰谷价差收益"]
             )
 
-        # 获取可转移设备信息
-        shiftable_devices = await self._get_shiftable_devices()
+        # 可转移设备信息
+        shiftable_devices = context.shiftable_devices
         max_shiftable_power = sum(d.get("shiftable_power", 0) for d in shiftable_devices)
 
         # 验证可行性
@@ -277,8 +347,21 @@ class SimulationService:
         Returns:
             SimulationResult: 模拟结果
         """
-        # 获取设备和调节配置
-        device = await self._get_device(device_id)
+        context = await self._load_context([{
+            "type": "device_regulation",
+            "params": {"device_id": device_id, "regulation_type": regulation_type}
+        }])
+        return self._evaluate_device_regulation(context, device_id, target_value, regulation_type)
+
+    def _evaluate_device_regulation(
+        self,
+        context: SimulationContext,
+        device_id: int,
+        target_value: float,
+        regulation_type: str = "temperature"
+    ) -> SimulationResult:
+        """设备调节模拟计算 (基于数据快照，不访问数据库)"""
+        device = context.devices.get(device_id)
         if not device:
             return SimulationResult(
                 simulation_type=SimulationType.DEVICE_REGULATION,
@@ -290,8 +373,8 @@ class SimulationService:
                 warnings=["设备不存在"]
             )
 
-        # 获取调节配置
-        reg_config = await self._get_regulation_config(device_id, regulation_type)
+        # 调节配置
+        reg_config = context.regulation_configs.get((device_id, regulation_type))
         if not reg_config:
             return SimulationResult(
                 simulation_type=SimulationType.DEVICE_REGULATION,
@@ -324,9 +407,9 @@ class SimulationService:
         power_change = value_change * power_factor * base_power / 10
 
         # 计算节省
-        hours_per_day = 8
-        working_days = 300
-        avg_price = 0.5  # 假设平均电价
+        hours_per_day = REGULATION_HOURS_PER_DAY
+        working_days = WORKING_DAYS_PER_YEAR
+        avg_price = REGULATION_AVG_PRICE
 
         daily_saving = power_change * hours_per_day * avg_price
         annual_saving = daily_saving * working_days
@@ -373,11 +456,15 @@ class SimulationService:
     async def calculate_benefit_with_confidence(
         self,
         base_benefit: float,
-        uncertainty_factors: Dict[str, float]
+        uncertainty_factors: Dict[str, float],
+        draws: int = DEFAULT_DRAWS,
+        seed: Optional[int] = DEFAULT_SEED
     ) -> Dict[str, Any]:
         """
         计算带置信区间的收益
 
+        区间为蒙特卡洛抽样的经验分位数 (low_estimate=P10, most_likely=P50, high_estimate=P90)
+
         Args:
             base_benefit: 基础收益值
             uncertainty_factors: 不确定性因素
@@ -386,6 +473,8 @@ class SimulationService:
                     "assumption_risk": 0.8,  # 假设风险 0-1
                     "implementation_risk": 0.7  # 实施风险 0-1
                 }
+            draws: 抽样次数
+            seed: 随机种子
 
         Returns:
             带置信区间的收益估算
@@ -401,21 +490,22 @@ class SimulationService:
             implementation_risk * 0.4
         )
 
-        # 计算置信区间
-        uncertainty_range = 1 - overall_confidence
-        low_estimate = base_benefit * (1 - uncertainty_range)
-        high_estimate = base_benefit * (1 + uncertainty_range * 0.5)
+        def sample() -> Dict[str, float]:
+            engine = MonteCarloEngine(draws=draws, seed=seed)
+            return summarize(engine.scaled_benefit(
+                base_benefit, data_quality, assumption_risk, implementation_risk
+            ))
 
-        # 最可能值（略保守）
-        most_likely = base_benefit * (0.9 + overall_confidence * 0.1)
+        distribution = await self._run_blocking(sample)
 
         return {
             "base_benefit": round(base_benefit, 2),
-            "most_likely": round(most_likely, 2),
-            "low_estimate": round(low_estimate, 2),
-            "high_estimate": round(high_estimate, 2),
+            "most_likely": distribution["p50"],
+            "low_estimate": distribution["p10"],
+            "high_estimate": distribution["p90"],
             "confidence": round(overall_confidence, 2),
             "confidence_level": self._get_confidence_level(overall_confidence),
+            "distribution": distribution,
             "factors": {
                 "data_quality": data_quality,
                 "assumption_risk": assumption_risk,
@@ -425,11 +515,16 @@ class SimulationService:
 
     async def run_combined_simulation(
         self,
-        scenarios: List[Dict[str, Any]]
+        scenarios: List[Dict[str, Any]],
+        draws: int = DEFAULT_DRAWS,
+        seed: Optional[int] = DEFAULT_SEED
     ) -> Dict[str, Any]:
         """
         运行组合模拟
 
+        先一次读取全部场景所需数据，再逐场景计算；
+        收益分布由蒙特卡洛抽样得到，各场景共用电价/负荷抽样，组合收益按抽样逐次相加。
+
         Args:
             scenarios: 模拟场景列表
                 [
@@ -437,30 +532,33 @@ class SimulationService:
                     {"type": "peak_shift", "params": {...}},
                     ...
                 ]
+            draws: 抽样次数
+            seed: 随机种子
 
         Returns:
             组合模拟结果
         """
+        evaluators = {
+            "demand_adjustment": self._evaluate_demand_adjustment,
+            "peak_shift": self._evaluate_peak_shift,
+            "device_regulation": self._evaluate_device_regulation,
+        }
+        scenarios = [s for s in scenarios if s.get("type") in evaluators]
+        context = await self._load_context(scenarios)
+
         results = []
         total_annual_saving = 0
         overall_feasibility = True
         all_warnings = []
 
         for scenario in scenarios:
-            sim_type = scenario.get("type")
+            sim_type = scenario["type"]
             params = scenario.get("params", {})
-
-            if sim_type == "demand_adjustment":
-                result = await self.simulate_demand_adjustment(**params)
-            elif sim_type == "peak_shift":
-                result = await self.simulate_peak_shift(**params)
-            elif sim_type == "device_regulation":
-                result = await self.simulate_device_regulation(**params)
-            else:
-                continue
+            result = evaluators[sim_type](context, **params)
 
             results.append({
                 "type": sim_type,
+                "params": params,
                 "result": result
             })
 
@@ -477,34 +575,128 @@ class SimulationService:
         confidences = [r["result"].confidence for r in results]
         combined_confidence = min(confidences) if confidences else 0
 
+        distributions, combined_distribution = await self._run_blocking(
+            self._simulate_distribution, context, results, draws, seed
+        )
+        for entry, distribution in zip(results, distributions):
+            entry["benefit_distribution"] = distribution
+
         return {
             "scenarios_count": len(results),
             "results": results,
             "combined_benefit": {
                 "total_annual_saving": round(total_annual_saving, 2),
                 "overall_feasibility": overall_feasibility,
-                "combined_confidence": round(combined_confidence, 2)
+                "combined_confidence": round(combined_confidence, 2),
+                "distribution": combined_distribution
             },
             "all_warnings": list(set(all_warnings)),
             "simulation_time": datetime.now().isoformat()
         }
 
+    def _simulate_distribution(
+        self,
+        context: SimulationContext,
+        results: List[Dict[str, Any]],
+        draws: int,
+        seed: Optional[int]
+    ) -> Tuple[List[Optional[Dict[str, float]]], Optional[Dict[str, float]]]:
+        """
+        蒙特卡洛抽样各场景年收益 (CPU密集，在线程池中执行)
+
+        不可行的场景不参与抽样，与 total_annual_saving 的口径一致。
+
+        Returns:
+            (各场景收益分布, 组合收益分布)
+        """
+        engine = MonteCarloEngine(draws=draws, seed=seed)
+        global_config = context.global_config
+        total = np.zeros(draws)
+        distributions = []
+        sampled = False
+
+        for entry in results:
+            result, params = entry["result"], entry["params"]
+            if not result.is_feasible:
+                distributions.append(None)
+                continue
+
+            if entry["type"] == "demand_adjustment":
+                samples = engine.demand_adjustment(
+                    context.daily_peaks(params.get("historical_days", 30)),
+                    current_declared=result.current_state["declared_demand"] or 0,
+                    new_declared=result.simulated_state["declared_demand"],
+                    demand_price=global_config.get("demand_price", 38),
+                    over_multiplier=global_config.get("over_demand_multiplier", 2)
+                )
+            elif entry["type"] == "peak_shift":
+                samples = engine.peak_shift(
+                    shift_power=result.simulated_state["shift_power"],
+                    shift_hours=result.simulated_state["shift_hours"],
+                    price_diff=result.simulated_state["price_diff"],
+                    working_days=params.get("working_days_per_year", WORKING_DAYS_PER_YEAR)
+                )
+            else:
+                samples = engine.device_regulation(
+                    power_change=result.simulated_state["power_change"],
+                    hours_per_day=REGULATION_HOURS_PER_DAY,
+                    avg_price=REGULATION_AVG_PRICE,
+                    working_days=WORKING_DAYS_PER_YEAR
+                )
+
+            distributions.append(summarize(samples))
+            total += samples
+            sampled = True
+
+        return distributions, summarize(total) if sampled else None
+
+    async def _run_blocking(self, fn, *args, **kwargs):
+        """在默认线程池中执行CPU密集计算，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(fn, *args, **kwargs))
+
     # ========== 私有方法 ==========
 
-    async def _get_demand_history(self, days: int) -> List[float]:
-        """获取历史需量数据"""
+    async def _load_context(self, scenarios: List[Dict[str, Any]]) -> SimulationContext:
+        """一次读取各场景所需的数据"""
+        context = SimulationContext()
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for scenario in scenarios:
+            by_type.setdefault(scenario.get("type"), []).append(scenario.get("params", {}))
+
+        if "demand_adjustment" in by_type:
+            full_pricing = await self.pricing_service.get_full_pricing_config()
+            context.global_config = full_pricing.get("global_config") or {}
+            days = max(p.get("historical_days", 30) for p in by_type["demand_adjustment"])
+            context.demand_times, context.demand_powers = await self._get_demand_records(days)
+
+        if "peak_shift" in by_type:
+            context.prices = await self.pricing_service.get_all_prices()
+            context.shiftable_devices = await self._get_shiftable_devices()
+
+        if "device_regulation" in by_type:
+            device_ids = {p.get("device_id") for p in by_type["device_regulation"] if p.get("device_id") is not None}
+            context.devices, context.regulation_configs = await self._get_regulation_targets(device_ids)
+
+        return context
+
+    async def _get_demand_records(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """获取历史需量数据 (时间, 功率)"""
         try:
             start_time = datetime.now() - timedelta(days=days)
             result = await self.db.execute(
-                select(PUEHistory.total_power)
+                select(PUEHistory.record_time, PUEHistory.total_power)
                 .where(PUEHistory.record_time >= start_time)
                 .order_by(PUEHistory.record_time)
             )
-            powers = [row[0] for row in result.all() if row[0]]
-            return powers if powers else []
+            rows = [row for row in result.all() if row[1]]
+            return (
+                np.array([row[0] for row in rows], dtype='datetime64[s]'),
+                np.array([row[1] for row in rows], dtype=np.float64)
+            )
         except Exception as e:
             logger.warning(f"Failed to get power history: {e}")
-            return []
+            return np.array([], dtype='datetime64[s]'), np.array([])
 
     def _calculate_demand_cost(
         self,
@@ -604,29 +796,30 @@ class SimulationService:
 
         return selected
 
-    async def _get_device(self, device_id: int) -> Optional[PowerDevice]:
-        """获取设备"""
+    async def _get_regulation_targets(
+        self,
+        device_ids: set
+    ) -> Tuple[Dict[int, PowerDevice], Dict[Tuple[int, str], LoadRegulationConfig]]:
+        """批量获取设备及其启用的调节配置"""
+        if not device_ids:
+            return {}, {}
         result = await self.db.execute(
-            select(PowerDevice).where(PowerDevice.id == device_id)
+            select(PowerDevice).where(PowerDevice.id.in_(device_ids))
         )
-        return result.scalar_one_or_none()
+        devices = {device.id: device for device in result.scalars().all()}
 
-    async def _get_regulation_config(
-        self,
-        device_id: int,
-        regulation_type: str
-    ) -> Optional[LoadRegulationConfig]:
-        """获取调节配置"""
         result = await self.db.execute(
             select(LoadRegulationConfig).where(
                 and_(
-                    LoadRegulationConfig.device_id == device_id,
-                    LoadRegulationConfig.regulation_type == regulation_type,
+                    LoadRegulationConfig.device_id.in_(device_ids),
                     LoadRegulationConfig.is_enabled == True
                 )
-            )
+            ).order_by(LoadRegulationConfig.id)
         )
-        return result.scalar_one_or_none()
+        configs: Dict[Tuple[int, str], LoadRegulationConfig] = {}
+        for config in result.scalars().all():
+            configs.setdefault((config.device_id, config.regulation_type), config)
+        return devices, configs
 
     def _get_confidence_level(self, confidence: float) -> str:
         """获取置信度级别"""
@@ -12,6 +12,9 @@ from sqlalchemy import select
 from ..models import Point, PointRealtime, PointHistory, Alarm, AlarmThreshold
 from ..core.database import async_session
 from .websocket import ws_manager
+from .realtime_dispatch import dispatch_registry
+from .demand_engine import DemandEngine
+from .capacity_telemetry import capacity_telemetry
 
 
 class DataSimulator:
@@ -195,17 +198,50 @@ class DataSimulator:
                 select(Point).where(Point.is_enabled == True)
             )
             points = result.scalars().all()
+            collected: Dict[int, float] = {}
 
             for point in points:
                 try:
                     data = await self.collect_and_save(session, point)
+                    if point.point_type == "AI":
+                        collected[point.id] = data["value"]
                     # 广播实时数据
                     await ws_manager.broadcast_realtime(data)
                 except Exception as e:
                     print(f"采集点位 {point.point_code} 失败: {e}")
 
+            # 各汇总步骤在独立的保存点中执行，单步写入失败只回滚该步骤，不影响本周期的点位数据
+            # 按计量点汇总有功功率，驱动各计量点的实时需量调度控制器
+            timestamp = datetime.now()
+            try:
+                async with session.begin_nested():
+                    await dispatch_registry.ingest_point_values(session, collected, timestamp)
+            except Exception as e:
+                print(f"更新实时调度控制器失败: {e}")
+
+            # 计量点功率增量计算15分钟需量，时段结束时写入需量数据
+            try:
+                async with session.begin_nested():
+                    demand_engine = DemandEngine(session)
+                    for meter_point_id, power in (await dispatch_registry.meter_totals(session, collected)).items():
+                        await demand_engine.ingest(meter_point_id, timestamp, power)
+            except Exception as e:
+                print(f"更新15分钟需量失败: {e}")
+
+            # 汇总容量节点实时负荷，回写已用容量和容量状态
+            transitions = []
+            try:
+                async with session.begin_nested():
+                    await capacity_telemetry.ingest_point_values(session, collected)
+                    transitions = await capacity_telemetry.flush(session)
+            except Exception as e:
+                print(f"更新容量遥测失败: {e}")
+
             await session.commit()
 
+            for transition in transitions:
+                await ws_manager.broadcast({"type": "capacity_status", "data": transition})
+
     async def start(self, interval: int = None):
         """启动数据采集"""
         from ..core.config import get_settings
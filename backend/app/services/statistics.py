@@ -0,0 +1,243 @@
+"""
+资产/容量/运维统计
+Dashboard Statistics
+
+每个统计面板用一次分组查询 (条件聚合 + UNION ALL) 完成，查询语句同时供异步 API 和同步服务使用；
+异步结果按 STATISTICS_TTL 秒缓存，相关模型提交写入后自动失效
+"""
+import copy
+import time
+from datetime import date, timedelta
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Float, Integer, String, and_, case, cast, event, func, literal, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.asset import Asset, AssetStatus
+from ..models.capacity import (
+    CapacityStatus, CoolingCapacity, PowerCapacity, SpaceCapacity, WeightCapacity
+)
+from ..models.operation import (
+    InspectionStatus, InspectionTask, KnowledgeBase, WorkOrder, WorkOrderStatus
+)
+from ..schemas.asset import AssetStatistics
+from ..schemas.operation import OperationStatistics
+
+STATISTICS_TTL = 30
+# 保修即将到期的天数范围
+WARRANTY_EXPIRING_DAYS = 30
+
+# 模型 → 受影响的统计面板
+MODEL_GROUPS = {
+    Asset: "asset",
+    SpaceCapacity: "capacity",
+    PowerCapacity: "capacity",
+    CoolingCapacity: "capacity",
+    WeightCapacity: "capacity",
+    WorkOrder: "operation",
+    InspectionTask: "operation",
+    KnowledgeBase: "operation",
+}
+DIRTY_KEY = "statistics_dirty"
+
+_cache: Dict[str, Tuple[float, Any]] = {}
+
+
+def _count_when(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+# ==================== 资产统计 ====================
+
+def asset_statistics_query(today: Optional[date] = None):
+    """按状态、类型、部门分组的资产统计 (按状态分组时附带总价值和即将过保数量)"""
+    today = today or date.today()
+    expiring = _count_when(and_(
+        Asset.warranty_end.isnot(None),
+        Asset.warranty_end <= today + timedelta(days=WARRANTY_EXPIRING_DAYS),
+        Asset.warranty_end >= today,
+        Asset.status != AssetStatus.scrapped
+    ))
+    by_status = select(
+        literal("status"), cast(Asset.status, String), func.count(Asset.id),
+        func.sum(Asset.purchase_price), expiring
+    ).group_by(Asset.status)
+    by_type = select(
+        literal("type"), cast(Asset.asset_type, String), func.count(Asset.id),
+        cast(null(), Float), cast(null(), Integer)
+    ).group_by(Asset.asset_type)
+    by_department = select(
+        literal("department"), Asset.department, func.count(Asset.id),
+        cast(null(), Float), cast(null(), Integer)
+    ).where(Asset.department.isnot(None)).group_by(Asset.department)
+    return union_all(by_status, by_type, by_department)
+
+
+def build_asset_statistics(rows: Iterable[tuple]) -> AssetStatistics:
+    groups: Dict[str, Dict[str, int]] = {"status": {}, "type": {}, "department": {}}
+    total_count, total_value, expiring = 0, 0, 0
+    for dimension, key, count, value, expiring_count in rows:
+        groups[dimension][key or ("未分配" if dimension == "department" else "unknown")] = count
+        if dimension == "status":
+            total_count += count
+            total_value += value or 0
+            expiring += expiring_count or 0
+    return AssetStatistics(
+        total_count=total_count,
+        by_status=groups["status"],
+        by_type=groups["type"],
+        by_department=groups["department"],
+        total_value=float(total_value),
+        warranty_expiring_count=expiring
+    )
+
+
+# ==================== 容量统计 ====================
+
+# 面板名 → (模型, 总量字段, 已用字段, 输出字段后缀)
+CAPACITY_TABLES = {
+    "space": (SpaceCapacity, "total_u_positions", "used_u_positions", "u_positions"),
+    "power": (PowerCapacity, "total_capacity_kw", "used_capacity_kw", "capacity_kw"),
+    "cooling": (CoolingCapacity, "total_cooling_kw", "used_cooling_kw", "cooling_kw"),
+    "weight": (WeightCapacity, "total_weight_kg", "used_weight_kg", "weight_kg"),
+}
+STATUS_KEYS = [s.value for s in CapacityStatus]
+
+
+def capacity_statistics_query():
+    """四类容量表的总量、已用量和各状态数量"""
+    return union_all(*[
+        select(
+            literal(name), func.count(model.id),
+            func.sum(getattr(model, total_attr)), func.sum(getattr(model, used_attr)),
+            *[_count_when(model.status == CapacityStatus(status)) for status in STATUS_KEYS]
+        )
+        for name, (model, total_attr, used_attr, _) in CAPACITY_TABLES.items()
+    ])
+
+
+def build_capacity_statistics(rows: Iterable[tuple]) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {}
+    status_counts = {status: 0 for status in STATUS_KEYS}
+    total_records = 0
+    for name, count, total, used, *statuses in rows:
+        suffix = CAPACITY_TABLES[name][3]
+        total, used = total or 0, used or 0
+        stats[name] = {
+            f"total_{suffix}": total,
+            f"used_{suffix}": used,
+            f"available_{suffix}": total - used,
+            "usage_rate": round(used / total * 100, 2) if total > 0 else 0,
+            "count": count
+        }
+        for status, status_count in zip(STATUS_KEYS, statuses):
+            status_counts[status] += status_count or 0
+        total_records += count
+    return {
+        **{name: stats[name] for name in CAPACITY_TABLES},
+        "status_summary": status_counts,
+        "total_capacity_records": total_records
+    }
+
+
+# ==================== 运维统计 ====================
+
+def operation_statistics_query():
+    """工单状态计数、逾期巡检数和知识库条目数"""
+    orders = select(
+        func.count(WorkOrder.id).label("total"),
+        _count_when(WorkOrder.status == WorkOrderStatus.pending).label("pending"),
+        _count_when(WorkOrder.status == WorkOrderStatus.processing).label("processing"),
+        _count_when(WorkOrder.status == WorkOrderStatus.completed).label("completed"),
+    ).subquery()
+    return select(
+        orders.c.total, orders.c.pending, orders.c.processing, orders.c.completed,
+        select(func.count(InspectionTask.id))
+        .where(InspectionTask.status == InspectionStatus.overdue).scalar_subquery(),
+        select(func.count(KnowledgeBase.id)).scalar_subquery(),
+    )
+
+
+def build_operation_statistics(row: tuple) -> OperationStatistics:
+    total, pending, processing, completed, overdue, knowledge = (value or 0 for value in row)
+    return OperationStatistics(
+        total_orders=total,
+        pending_orders=pending,
+        processing_orders=processing,
+        completed_orders=completed,
+        overdue_inspections=overdue,
+        knowledge_count=knowledge
+    )
+
+
+# ==================== 缓存 ====================
+
+async def _cached(name: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+    entry = _cache.get(name)
+    if entry is not None and entry[0] > time.monotonic():
+        return copy.deepcopy(entry[1])
+    value = await loader()
+    _cache[name] = (time.monotonic() + STATISTICS_TTL, value)
+    return copy.deepcopy(value)
+
+
+async def get_asset_statistics(db: AsyncSession) -> AssetStatistics:
+    """资产统计 (一次查询，带缓存)"""
+    async def load():
+        return build_asset_statistics((await db.execute(asset_statistics_query())).all())
+    return await _cached("asset", load)
+
+
+async def get_capacity_statistics(db: AsyncSession) -> Dict[str, Any]:
+    """容量统计 (一次查询，带缓存)"""
+    async def load():
+        return build_capacity_statistics((await db.execute(capacity_statistics_query())).all())
+    return await _cached("capacity", load)
+
+
+async def get_operation_statistics(db: AsyncSession) -> OperationStatistics:
+    """运维统计 (一次查询，带缓存)"""
+    async def load():
+        return build_operation_statistics((await db.execute(operation_statistics_query())).one())
+    return await _cached("operation", load)
+
+
+def invalidate_statistics(*names: str) -> None:
+    """清除统计缓存 (不传参数时全部清除)"""
+    if not names:
+        _cache.clear()
+    for name in names:
+        _cache.pop(name, None)
+
+
+# ==================== 写入后失效 ====================
+
+def _mark_dirty(session: Session, classes: Iterable[type]) -> None:
+    groups = {MODEL_GROUPS[cls] for cls in classes if cls in MODEL_GROUPS}
+    if groups:
+        session.info.setdefault(DIRTY_KEY, set()).update(groups)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    _mark_dirty(session, {type(obj) for obj in chain(session.new, session.dirty, session.deleted)})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_write(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper:
+        _mark_dirty(orm_execute_state.session, [orm_execute_state.bind_mapper.class_])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    groups = session.info.pop(DIRTY_KEY, None)
+    if groups:
+        invalidate_statistics(*groups)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(DIRTY_KEY, None)
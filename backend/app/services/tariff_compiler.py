@@ -0,0 +1,388 @@
+"""
+分时电价编译服务
+Time-of-use Tariff Compiler
+
+将当前有效的 ElectricityPricing 时段电价和 PricingConfig 全局配置编译为
+1440分钟 (及96个15分钟时段) 的电价/时段数组，按生效日期区间缓存:
+- 任意时间戳的时段/电价查询为数组下标访问，整条功率曲线可一次向量化计费
+- 未配置的分钟按 DEFAULT_HOUR_PERIODS 归类，作为全系统唯一的默认时段划分
+- 电价配置写入后调用 invalidate_tariff_cache()/reload_tariff() 使缓存失效
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.energy import ElectricityPricing, PricingConfig
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 1440
+SLOTS_PER_DAY = 96
+SLOT_MINUTES = 15
+
+# 时段类型 (下标即时段编码)
+TIME_PERIODS = ('sharp', 'peak', 'flat', 'valley', 'deep_valley')
+PERIOD_CODES = {period: code for code, period in enumerate(TIME_PERIODS)}
+
+# 时段类型别名
+PERIOD_ALIASES = {
+    'normal': 'flat', 'mid': 'flat',
+    'high': 'peak', 'high_peak': 'peak',
+    'low': 'valley', 'off_peak': 'valley',
+}
+
+# 默认时段划分 (未配置电价或配置未覆盖的分钟)
+DEFAULT_HOUR_PERIODS = {
+    0: 'deep_valley', 1: 'deep_valley', 2: 'deep_valley', 3: 'deep_valley',
+    4: 'valley', 5: 'valley', 6: 'valley', 7: 'valley',
+    8: 'flat', 9: 'peak', 10: 'peak', 11: 'sharp',
+    12: 'peak', 13: 'flat', 14: 'flat', 15: 'flat',
+    16: 'flat', 17: 'peak', 18: 'sharp', 19: 'peak',
+    20: 'peak', 21: 'flat', 22: 'valley', 23: 'valley',
+}
+
+# 默认时段电价 元/kWh
+DEFAULT_PERIOD_PRICES = {
+    'sharp': 1.2,
+    'peak': 0.95,
+    'flat': 0.65,
+    'valley': 0.35,
+    'deep_valley': 0.25,
+}
+
+
+def normalize_period(period_type: Optional[str]) -> str:
+    """统一时段类型名称，未知类型归为 flat"""
+    period = (period_type or '').lower()
+    period = PERIOD_ALIASES.get(period, period)
+    return period if period in PERIOD_CODES else 'flat'
+
+
+def _parse_minute(value: str) -> int:
+    """HH:MM → 当日分钟数，24:00 记为1440"""
+    hour, minute = str(value).strip().split(':')[:2]
+    return min(int(hour) * 60 + int(minute), MINUTES_PER_DAY)
+
+
+@dataclass
+class CompiledTariff:
+    """编译后的分时电价 (一个生效日期区间内不变)"""
+    minute_period: np.ndarray                   # int8[1440] 时段编码
+    minute_price: np.ndarray                    # float64[1440] 元/kWh
+    period_prices: Dict[str, float]             # 各时段电价
+    effective_date: Optional[date] = None       # 区间起 (含)
+    expire_date: Optional[date] = None          # 区间止 (含)，None 表示未知/长期
+    source: str = 'default'                     # electricity_pricing / default
+    rows: List[Dict[str, Any]] = field(default_factory=list)   # 原始时段配置
+    # PricingConfig 全局配置 (config_id 为空表示未配置)
+    config_id: Optional[int] = None
+    billing_mode: str = 'demand'
+    demand_price: Optional[float] = None
+    declared_demand: Optional[float] = None
+    over_demand_multiplier: float = 2.0
+    capacity_price: Optional[float] = None
+    transformer_capacity: Optional[float] = None
+    power_factor_baseline: Optional[float] = None
+    power_factor_rules: List[Dict[str, Any]] = field(default_factory=list)
+    fixed_fees: Dict[str, float] = field(default_factory=dict)  # 各项固定费用 元/kWh
+
+    def __post_init__(self):
+        slots = self.minute_period.reshape(SLOTS_PER_DAY, SLOT_MINUTES)
+        hours = self.minute_period.reshape(24, 60)
+        # 时段/小时内占比最多的时段 (平局取编码较小即电价更高的时段)
+        self.slot_period_codes = np.array(
+            [np.bincount(row, minlength=len(TIME_PERIODS)).argmax() for row in slots], dtype=np.int8
+        )
+        self.hour_period_codes = np.array(
+            [np.bincount(row, minlength=len(TIME_PERIODS)).argmax() for row in hours], dtype=np.int8
+        )
+        self.slot_prices = self.minute_price.reshape(SLOTS_PER_DAY, SLOT_MINUTES).mean(axis=1)
+        self.hour_prices = self.minute_price.reshape(24, 60).mean(axis=1)
+
+    @property
+    def fixed_fee_per_kwh(self) -> float:
+        """固定费用合计 元/kWh"""
+        return sum(self.fixed_fees.values())
+
+    @property
+    def configured_period_prices(self) -> Dict[str, float]:
+        """已配置时段的电价 (各时段取首条配置，未配置时段不含)"""
+        prices: Dict[str, float] = {}
+        for row in self.rows:
+            prices.setdefault(normalize_period(row['period_type']), row['price'])
+        return prices
+
+    def covers(self, day: date) -> bool:
+        """该编译结果是否适用于指定日期"""
+        if self.effective_date is not None and day < self.effective_date:
+            return False
+        if self.expire_date is not None and day > self.expire_date:
+            return False
+        return True
+
+    # ---------- 标量查询 ----------
+
+    def period_at(self, ts: datetime) -> str:
+        return TIME_PERIODS[self.minute_period[ts.hour * 60 + ts.minute]]
+
+    def price_at(self, ts: datetime) -> float:
+        return float(self.minute_price[ts.hour * 60 + ts.minute])
+
+    def hour_period(self, hour: int) -> str:
+        """小时对应的时段 (按该小时内分钟数占比最多的时段)"""
+        return TIME_PERIODS[self.hour_period_codes[hour % 24]]
+
+    def slot_period(self, slot: int) -> str:
+        """15分钟时段 (0-95) 对应的时段"""
+        return TIME_PERIODS[self.slot_period_codes[slot % SLOTS_PER_DAY]]
+
+    @property
+    def slot_periods(self) -> List[str]:
+        return [TIME_PERIODS[c] for c in self.slot_period_codes]
+
+    @property
+    def hour_periods(self) -> List[str]:
+        return [TIME_PERIODS[c] for c in self.hour_period_codes]
+
+    # ---------- 向量化 ----------
+
+    @staticmethod
+    def minute_index(timestamps) -> np.ndarray:
+        """时间戳数组 → 当日分钟下标"""
+        ts = np.asarray(timestamps, dtype='datetime64[m]')
+        return (ts - ts.astype('datetime64[D]')).astype(np.int64)
+
+    def periods_for(self, timestamps) -> np.ndarray:
+        """时间戳数组 → 时段编码数组 (int8)"""
+        return self.minute_period[self.minute_index(timestamps)]
+
+    def prices_for(self, timestamps) -> np.ndarray:
+        """时间戳数组 → 电价数组"""
+        return self.minute_price[self.minute_index(timestamps)]
+
+    def cost(self, timestamps, power_kw, interval_hours: float = 0.25) -> float:
+        """功率曲线的电度电费 (Σ 功率 × 时长 × 电价)"""
+        power = np.nan_to_num(np.asarray(power_kw, dtype=np.float64))
+        return float(np.dot(power, self.prices_for(timestamps)) * interval_hours)
+
+    def energy_by_period(self, timestamps, power_kw, interval_hours: float = 0.25) -> Dict[str, float]:
+        """功率曲线按时段汇总电量 kWh"""
+        power = np.nan_to_num(np.asarray(power_kw, dtype=np.float64))
+        energy = np.bincount(
+            self.periods_for(timestamps), weights=power * interval_hours, minlength=len(TIME_PERIODS)
+        )
+        return {period: float(energy[code]) for code, period in enumerate(TIME_PERIODS)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """时段划分摘要 (连续相同时段合并)"""
+        segments = []
+        start = 0
+        for minute in range(1, MINUTES_PER_DAY + 1):
+            if minute == MINUTES_PER_DAY or self.minute_period[minute] != self.minute_period[start] \
+                    or self.minute_price[minute] != self.minute_price[start]:
+                segments.append({
+                    'start_time': f"{start // 60:02d}:{start % 60:02d}",
+                    'end_time': f"{minute // 60:02d}:{minute % 60:02d}",
+                    'period': TIME_PERIODS[self.minute_period[start]],
+                    'price': float(self.minute_price[start]),
+                })
+                start = minute
+        return {
+            'source': self.source,
+            'effective_date': self.effective_date.isoformat() if self.effective_date else None,
+            'expire_date': self.expire_date.isoformat() if self.expire_date else None,
+            'period_prices': self.period_prices,
+            'segments': segments,
+            'hour_periods': self.hour_periods,
+        }
+
+
+def compile_tariff(
+    segments: Iterable[Tuple[str, str, str, float]],
+    default_prices: Optional[Dict[str, float]] = None,
+    **kwargs
+) -> CompiledTariff:
+    """
+    将时段电价配置编译为分钟数组
+
+    Args:
+        segments: (时段类型, 开始 HH:MM, 结束 HH:MM, 电价)；开始晚于结束表示跨零点
+        default_prices: 未配置时段的电价，默认 DEFAULT_PERIOD_PRICES
+        **kwargs: 透传给 CompiledTariff (生效区间、全局配置等)
+    """
+    default_prices = {**DEFAULT_PERIOD_PRICES, **(default_prices or {})}
+    minute_period = np.repeat(
+        np.array([PERIOD_CODES[DEFAULT_HOUR_PERIODS[h]] for h in range(24)], dtype=np.int8), 60
+    )
+    minute_price = np.full(MINUTES_PER_DAY, np.nan)
+
+    period_prices: Dict[str, float] = {}
+    for period_type, start_time, end_time, price in segments:
+        period = normalize_period(period_type)
+        start, end = _parse_minute(start_time), _parse_minute(end_time)
+        ranges = [(start, end)] if start < end else [(start, MINUTES_PER_DAY), (0, end)]
+        for lo, hi in ranges:
+            minute_period[lo:hi] = PERIOD_CODES[period]
+            minute_price[lo:hi] = float(price)
+        period_prices.setdefault(period, float(price))
+
+    for period, price in default_prices.items():
+        period_prices.setdefault(period, price)
+    missing = np.isnan(minute_price)
+    if missing.any():
+        fallback = np.array([period_prices[p] for p in TIME_PERIODS])
+        minute_price[missing] = fallback[minute_period[missing]]
+
+    return CompiledTariff(
+        minute_period=minute_period,
+        minute_price=minute_price,
+        period_prices=period_prices,
+        **kwargs
+    )
+
+
+DEFAULT_TARIFF = compile_tariff([])
+
+
+# ==================== 缓存 ====================
+
+_cache: List[CompiledTariff] = []
+
+
+def invalidate_tariff_cache() -> None:
+    """清空编译缓存 (电价配置写入后调用)"""
+    _cache.clear()
+
+
+def get_cached_tariff(day: Optional[date] = None) -> CompiledTariff:
+    """
+    同步获取已编译电价 (供同步计算代码使用)
+
+    缓存中没有覆盖该日期的编译结果时返回默认时段划分。
+    """
+    day = day or date.today()
+    for tariff in _cache:
+        if tariff.covers(day):
+            return tariff
+    return DEFAULT_TARIFF
+
+
+async def get_tariff(db: AsyncSession, day: Optional[date] = None) -> CompiledTariff:
+    """获取指定日期有效的编译电价，未缓存时查询数据库并编译"""
+    day = day or date.today()
+    for tariff in _cache:
+        if tariff.covers(day):
+            return tariff
+
+    tariff = await _compile_from_db(db, day)
+    _cache.append(tariff)
+    return tariff
+
+
+async def reload_tariff(db: AsyncSession) -> CompiledTariff:
+    """清空缓存并重新编译当天电价"""
+    invalidate_tariff_cache()
+    return await get_tariff(db)
+
+
+def _effective_on(model, day: date):
+    return and_(
+        model.is_enabled == True,
+        model.effective_date <= day,
+        or_(model.expire_date == None, model.expire_date >= day)
+    )
+
+
+async def _compile_from_db(db: AsyncSession, day: date) -> CompiledTariff:
+    result = await db.execute(
+        select(ElectricityPricing)
+        .where(_effective_on(ElectricityPricing, day))
+        .order_by(ElectricityPricing.start_time)
+    )
+    records = result.scalars().all()
+
+    result = await db.execute(
+        select(PricingConfig)
+        .where(_effective_on(PricingConfig, day))
+        .order_by(PricingConfig.effective_date.desc())
+        .limit(1)
+    )
+    config = result.scalar_one_or_none()
+
+    # 生效区间: 起于最晚生效日期或上一份配置失效的后一天，止于最早失效日期或下一份配置生效的前一天
+    starts = [r.effective_date for r in records] + ([config.effective_date] if config else [])
+    expires = [r.expire_date for r in records if r.expire_date] + (
+        [config.expire_date] if config and config.expire_date else []
+    )
+    next_start = None
+    last_expire = None
+    for model in (ElectricityPricing, PricingConfig):
+        result = await db.execute(
+            select(func.min(model.effective_date)).where(
+                and_(model.is_enabled == True, model.effective_date > day)
+            )
+        )
+        upcoming = result.scalar()
+        if upcoming and (next_start is None or upcoming < next_start):
+            next_start = upcoming
+        result = await db.execute(
+            select(func.max(model.expire_date)).where(
+                and_(model.is_enabled == True, model.expire_date < day)
+            )
+        )
+        expired = result.scalar()
+        if expired and (last_expire is None or expired > last_expire):
+            last_expire = expired
+    if next_start:
+        expires.append(next_start - timedelta(days=1))
+    if last_expire:
+        starts.append(last_expire + timedelta(days=1))
+
+    global_kwargs: Dict[str, Any] = {}
+    if config:
+        global_kwargs = {
+            'config_id': config.id,
+            'billing_mode': config.billing_mode or 'demand',
+            'demand_price': config.demand_price,
+            'declared_demand': config.declared_demand,
+            'over_demand_multiplier': config.over_demand_multiplier or 2.0,
+            'capacity_price': config.capacity_price,
+            'transformer_capacity': config.transformer_capacity,
+            'power_factor_baseline': config.power_factor_baseline,
+            'power_factor_rules': list(config.power_factor_rules or []),
+            'fixed_fees': {
+                'transmission_fee': config.transmission_fee or 0,
+                'government_fund': config.government_fund or 0,
+                'auxiliary_fee': config.auxiliary_fee or 0,
+                'other_fee': config.other_fee or 0,
+            },
+        }
+
+    tariff = compile_tariff(
+        [(r.period_type, r.start_time, r.end_time, r.price) for r in records],
+        effective_date=max(starts) if starts else None,
+        expire_date=min(expires) if expires else None,
+        source='electricity_pricing' if records else 'default',
+        rows=[
+            {
+                'id': r.id,
+                'period_type': r.period_type,
+                'start_time': r.start_time,
+                'end_time': r.end_time,
+                'price': float(r.price),
+                'name': r.pricing_name,
+                'effective_date': r.effective_date,
+            }
+            for r in records
+        ],
+        **global_kwargs
+    )
+    logger.info(
+        f"编译分时电价: {len(records)} 条时段配置, 生效区间 {tariff.effective_date} ~ {tariff.expire_date}"
+    )
+    return tariff
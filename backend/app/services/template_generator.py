@@ -5,6 +5,9 @@
 V3.1: 集成数据追溯链支持 (专利S1)
 V3.2: 异步SQLAlchemy 2.0兼容版本
 """
+import asyncio
+import time
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from datetime import datetime, timedelta, date
@@ -58,6 +61,8 @@ class TemplateGenerator:
         self.enable_trace = enable_trace
         self.calculator = FormulaCalculator(db)
         self._traced_calculator = None
+        # 批量生成时预取的当日各模板方案数 (None 表示逐次查询)
+        self._code_counts: Optional[Dict[str, int]] = None
 
     def _get_traced_calculator(self, proposal_id: int = None, measure_id: int = None) -> TracedFormulaCalculator:
         """获取带追溯功能的计算器"""
@@ -87,6 +92,79 @@ class TemplateGenerator:
         if template_id not in self.TEMPLATE_CONFIGS:
             raise ValueError(f"无效的模板ID: {template_id}")
 
+        # 每次生成读取最新数据，并批量预取常用指标 (与追溯计算器共享会话级缓存)
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=analysis_days)
+        self.calculator.clear_cache()
+        await self.calculator.prefetch(end_date.year, start_date.date(), end_date.date())
+
+        proposal = await self._run_template(template_id, analysis_days)
+
+        if self.enable_trace and self._traced_calculator:
+            await self.db.flush()
+
+        return proposal
+
+    async def generate_batch(
+        self,
+        template_ids: Optional[List[str]] = None,
+        analysis_days: int = 30
+    ) -> List[Dict[str, Any]]:
+        """
+        批量并发生成多个模板的方案
+
+        流程:
+        1. 一次读取全部模板所需数据 (FormulaCalculator 会话级快照) 和当日方案编号
+        2. 各模板使用独立生成器并发计算，数据读取全部命中快照 (启用追溯时逐个生成)
+        3. 方案及措施统一加入会话并 flush，由调用方一次提交
+
+        参数:
+            template_ids: 模板ID列表 (默认全部6种)
+            analysis_days: 分析天数
+
+        返回:
+            [{"template_id", "proposal", "elapsed_ms", "error"}] ，按 template_ids 顺序，
+            单个模板失败时 proposal 为 None 并记录 error
+        """
+        template_ids = list(template_ids or self.TEMPLATE_CONFIGS.keys())
+        invalid = [t for t in template_ids if t not in self.TEMPLATE_CONFIGS]
+        if invalid:
+            raise ValueError(f"无效的模板ID: {', '.join(invalid)}")
+
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=analysis_days)
+        self.calculator.clear_cache()
+        await self.calculator.prefetch_templates(
+            start_date.date(), end_date.date(), (end_date - timedelta(days=1)).date()
+        )
+        code_counts = await self._count_proposal_codes(end_date.strftime("%Y%m%d"))
+
+        async def run(template_id: str) -> Dict[str, Any]:
+            worker = TemplateGenerator(self.db, enable_trace=self.enable_trace)
+            worker._code_counts = code_counts
+            started = time.perf_counter()
+            item = {"template_id": template_id, "proposal": None, "error": None}
+            try:
+                item["proposal"] = await worker._run_template(template_id, analysis_days)
+            except Exception as e:
+                item["error"] = str(e)
+            item["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return item
+
+        if self.enable_trace:
+            # 追溯计算器的数据读取不经过 FormulaCalculator 的会话级快照锁，共享会话时逐个生成
+            results = [await run(t) for t in template_ids]
+        else:
+            results = await asyncio.gather(*(run(t) for t in template_ids))
+
+        proposals = [r["proposal"] for r in results if r["proposal"] is not None]
+        if proposals:
+            self.db.add_all(proposals)
+            await self.db.flush()
+        return results
+
+    async def _run_template(self, template_id: str, analysis_days: int) -> EnergySavingProposal:
+        """调用模板对应的生成方法并写入追溯汇总"""
         # 根据模板ID调用对应的生成方法
         generator_map = {
             "A1": self.generate_peak_valley_proposal,
@@ -102,7 +180,6 @@ class TemplateGenerator:
         # V3.1: 写入追溯汇总信息
         if self.enable_trace and self._traced_calculator:
             proposal.trace_summary = self._traced_calculator.get_trace_summary()
-            await self.db.flush()
 
         return proposal
 
@@ -200,7 +277,7 @@ class TemplateGenerator:
             )
             measure_traces = benefit.get("_traces", {})
         else:
-            benefit = await self.calculator.calc_peak_shift_benefit(
+            benefit = self.calculator.calc_peak_shift_benefit(
                 shiftable_power, shift_hours, sharp_price, valley_price
             )
             measure_traces = {}
@@ -263,7 +340,7 @@ class TemplateGenerator:
             )
             measure_traces = benefit.get("_traces", {})
         else:
-            benefit = await self.calculator.calc_peak_shift_benefit(
+            benefit = self.calculator.calc_peak_shift_benefit(
                 shiftable_power, shift_hours, peak_price, flat_price
             )
             measure_traces = {}
@@ -324,7 +401,7 @@ class TemplateGenerator:
             )
             measure_traces = benefit.get("_traces", {})
         else:
-            benefit = await self.calculator.calc_peak_shift_benefit(
+            benefit = self.calculator.calc_peak_shift_benefit(
                 shiftable_power, shift_hours, sharp_price, valley_price
             )
             measure_traces = {}
@@ -1554,12 +1631,29 @@ class TemplateGenerator:
         """
         date_str = datetime.now().strftime("%Y%m%d")
 
-        # 查询今天已有的同类型方案数量 (异步查询)
-        stmt = select(func.count(EnergySavingProposal.id)).where(
-            EnergySavingProposal.proposal_code.like(f"{template_id}-{date_str}-%")
-        )
-        result = await self.db.execute(stmt)
-        count = result.scalar() or 0
+        if self._code_counts is not None:
+            # 批量生成: 使用预取的当日方案数，并占用该序号 (同一批次重复模板不重号)
+            count = self._code_counts.get(template_id, 0)
+            self._code_counts[template_id] = count + 1
+        else:
+            # 查询今天已有的同类型方案数量 (异步查询)
+            stmt = select(func.count(EnergySavingProposal.id)).where(
+                EnergySavingProposal.proposal_code.like(f"{template_id}-{date_str}-%")
+            )
+            result = await self.db.execute(stmt)
+            count = result.scalar() or 0
 
         seq = str(count + 1).zfill(3)
         return f"{template_id}-{date_str}-{seq}"
+
+    async def _count_proposal_codes(self, date_str: str) -> Dict[str, int]:
+        """一次查询统计当日各模板已有方案数量"""
+        stmt = select(EnergySavingProposal.proposal_code).where(
+            EnergySavingProposal.proposal_code.like(f"%-{date_str}-%")
+        )
+        result = await self.db.execute(stmt)
+        counts: Dict[str, int] = {}
+        for code in result.scalars():
+            template_id = code.split("-", 1)[0]
+            counts[template_id] = counts.get(template_id, 0) + 1
+        return counts
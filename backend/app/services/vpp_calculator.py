@@ -7,11 +7,20 @@ This service implements all VPP calculation methods with:
 - Data source tracking
 - Proper async/await patterns
 - Comprehensive docstrings
+
+完整分析报告 (generate_full_analysis) 每张表只读取一次 (VPPDataSnapshot)，
+负荷特性用 SQL 聚合计算，各指标由快照纯计算得出；
+报告按 (月份, 日期范围, 数据版本) 缓存，数据有增删改时自动失效。
 """
-from typing import List, Dict, Optional
+import copy
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
 from datetime import date, datetime
 from decimal import Decimal
-import statistics
+import math
+
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.models.vpp_data import (
@@ -24,12 +33,150 @@ from app.models.vpp_data import (
 )
 
 
+# 分析报告缓存条数
+ANALYSIS_CACHE_SIZE = 32
+
+# (月份, 开始日期, 结束日期, 数据版本) -> 分析报告
+_analysis_cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+
+
+def invalidate_analysis_cache() -> None:
+    """清空分析报告缓存 (绕过 ORM 直接修改数据后调用)"""
+    _analysis_cache.clear()
+
+
+@dataclass
+class VPPDataSnapshot:
+    """VPP分析数据快照 (每张表读取一次)"""
+    bills: List[ElectricityBill] = field(default_factory=list)
+    load_stats: Optional[Dict[str, float]] = None
+    adjustable_power: np.ndarray = field(default_factory=lambda: np.array([]))
+    prices: Dict[str, float] = field(default_factory=dict)
+    configs: Dict[str, float] = field(default_factory=dict)
+
+    def bill(self, month: str) -> Optional[ElectricityBill]:
+        """指定月份的账单"""
+        for bill in self.bills:
+            if bill.month == month:
+                return bill
+        return None
+
+    def consumptions(self, months: List[str]) -> np.ndarray:
+        """指定月份的月度用电量数组"""
+        wanted = set(months)
+        return np.array([b.total_consumption for b in self.bills if b.month in wanted], dtype=np.float64)
+
+
 class VPPCalculator:
     """VPP方案计算器 - 所有指标均有明确数据来源和计算公式"""
 
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    # ==================== 数据读取 ====================
+
+    async def load_snapshot(
+        self,
+        months: List[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> VPPDataSnapshot:
+        """一次读取分析所需的全部数据
+
+        Args:
+            months: 账单月份列表
+            start_date: 负荷数据开始日期 (为空时不计算负荷特性)
+            end_date: 负荷数据结束日期
+
+        Returns:
+            数据快照
+        """
+        snapshot = VPPDataSnapshot()
+        snapshot.bills = await self._load_bills(months)
+        if start_date is not None and end_date is not None:
+            snapshot.load_stats = await self._load_stats(start_date, end_date)
+        snapshot.adjustable_power = await self._load_adjustable_power()
+        snapshot.prices = await self._load_prices()
+        snapshot.configs = await self._load_configs()
+        return snapshot
+
+    async def _load_bills(self, months: List[str]) -> List[ElectricityBill]:
+        if not months:
+            return []
+        result = await self.db.execute(
+            select(ElectricityBill)
+            .where(ElectricityBill.month.in_(months))
+            .order_by(ElectricityBill.id)
+        )
+        return list(result.scalars().all())
+
+    async def _load_stats(self, start_date: date, end_date: date) -> Optional[Dict[str, float]]:
+        """负荷统计 (SQL聚合，不读取明细)"""
+        value = LoadCurve.load_value
+        result = await self.db.execute(
+            select(
+                func.count(value), func.max(value), func.min(value),
+                func.avg(value), func.avg(value * value)
+            )
+            .where(LoadCurve.date >= start_date)
+            .where(LoadCurve.date <= end_date)
+            .where(value.isnot(None))
+        )
+        count, p_max, p_min, p_avg, mean_sq = result.one()
+        if not count:
+            return None
+        # 样本标准差: sqrt((Σx² - n·x̄²) / (n - 1))
+        variance = (mean_sq - p_avg * p_avg) * count / (count - 1) if count > 1 else 0.0
+        return {
+            "count": count,
+            "max": p_max,
+            "min": p_min,
+            "avg": p_avg,
+            "std": math.sqrt(max(variance, 0.0)),
+        }
+
+    async def _load_adjustable_power(self) -> np.ndarray:
+        """启用的可调节负荷的可转移功率数组 (rated_power * adjustable_ratio / 100)"""
+        result = await self.db.execute(
+            select(AdjustableLoad.rated_power, AdjustableLoad.adjustable_ratio)
+            .where(AdjustableLoad.is_active == True)
+        )
+        rows = result.all()
+        if not rows:
+            return np.array([])
+        arr = np.array(rows, dtype=np.float64)
+        return arr[:, 0] * arr[:, 1] / 100
+
+    async def _load_prices(self) -> Dict[str, float]:
+        result = await self.db.execute(select(ElectricityPrice.period_type, ElectricityPrice.price))
+        return {period.value: price for period, price in result.all()}
+
+    async def _load_configs(self, keys: Optional[List[str]] = None) -> Dict[str, float]:
+        query = select(VPPConfig.config_key, VPPConfig.config_value)
+        if keys is not None:
+            query = query.where(VPPConfig.config_key.in_(keys))
+        result = await self.db.execute(query)
+        return {key: value for key, value in result.all()}
+
+    async def _data_version(self) -> Tuple:
+        """数据版本: 各表的行数、最大ID和最近修改时间 (一次查询)"""
+        def stamp(model, time_column):
+            return (
+                select(func.count(model.id)).scalar_subquery(),
+                select(func.max(model.id)).scalar_subquery(),
+                select(func.max(time_column)).scalar_subquery(),
+            )
+
+        columns = (
+            *stamp(ElectricityBill, ElectricityBill.updated_at),
+            *stamp(LoadCurve, LoadCurve.updated_at),
+            *stamp(ElectricityPrice, ElectricityPrice.updated_at),
+            *stamp(AdjustableLoad, AdjustableLoad.updated_at),
+            *stamp(VPPConfig, VPPConfig.updated_at),
+        )
+        result = await self.db.execute(select(*columns))
+        return tuple(result.one())
+
     # ==================== A. 用电规模指标 ====================
 
     async def calc_average_price(self, month: str) -> Dict:
@@ -49,10 +196,9 @@ class VPPCalculator:
                 "data_source": {源数据字典}
             }
         """
-        result = await self.db.execute(
-            select(ElectricityBill).where(ElectricityBill.month == month)
-        )
-        bill = result.scalar_one_or_none()
+        return self._average_price(self._single(await self._load_bills([month])), month)
+
+    def _average_price(self, bill: Optional[ElectricityBill], month: str) -> Dict:
         if not bill:
             return {
                 "value": 0,
@@ -85,12 +231,10 @@ class VPPCalculator:
         Returns:
             波动率指标字典
         """
-        result = await self.db.execute(
-            select(ElectricityBill.total_consumption)
-            .where(ElectricityBill.month.in_(months))
-        )
-        consumptions = [r[0] for r in result.fetchall()]
+        snapshot = VPPDataSnapshot(bills=await self._load_bills(months))
+        return self._fluctuation_rate(snapshot.consumptions(months), months)
 
+    def _fluctuation_rate(self, consumptions: np.ndarray, months: List[str]) -> Dict:
         if len(consumptions) < 2:
             return {
                 "value": 0,
@@ -99,9 +243,9 @@ class VPPCalculator:
                 "data_source": {"error": "数据不足", "months_count": len(consumptions)}
             }
 
-        max_val = max(consumptions)
-        min_val = min(consumptions)
-        avg_val = statistics.mean(consumptions)
+        max_val = float(consumptions.max())
+        min_val = float(consumptions.min())
+        avg_val = float(consumptions.mean())
         rate = (max_val - min_val) / avg_val * 100 if avg_val > 0 else 0
 
         return {
@@ -129,10 +273,9 @@ class VPPCalculator:
         Returns:
             峰段占比指标字典
         """
-        result = await self.db.execute(
-            select(ElectricityBill).where(ElectricityBill.month == month)
-        )
-        bill = result.scalar_one_or_none()
+        return self._peak_ratio(self._single(await self._load_bills([month])), month)
+
+    def _peak_ratio(self, bill: Optional[ElectricityBill], month: str) -> Dict:
         if not bill:
             return {
                 "value": 0,
@@ -165,10 +308,9 @@ class VPPCalculator:
         Returns:
             谷段占比指标字典
         """
-        result = await self.db.execute(
-            select(ElectricityBill).where(ElectricityBill.month == month)
-        )
-        bill = result.scalar_one_or_none()
+        return self._valley_ratio(self._single(await self._load_bills([month])), month)
+
+    def _valley_ratio(self, bill: Optional[ElectricityBill], month: str) -> Dict:
         if not bill:
             return {
                 "value": 0,
@@ -211,14 +353,10 @@ class VPPCalculator:
         Returns:
             负荷特性指标字典
         """
-        result = await self.db.execute(
-            select(LoadCurve.load_value)
-            .where(LoadCurve.date >= start_date)
-            .where(LoadCurve.date <= end_date)
-        )
-        loads = [r[0] for r in result.fetchall() if r[0] is not None]
+        return self._load_metrics(await self._load_stats(start_date, end_date), start_date, end_date)
 
-        if not loads:
+    def _load_metrics(self, stats: Optional[Dict[str, float]], start_date: date, end_date: date) -> Dict:
+        if not stats:
             return {
                 "error": "无负荷数据",
                 "data_source": {
@@ -227,12 +365,12 @@ class VPPCalculator:
                 }
             }
 
-        P_max = max(loads)
-        P_min = min(loads)
-        P_avg = statistics.mean(loads)
+        P_max = stats["max"]
+        P_min = stats["min"]
+        P_avg = stats["avg"]
         load_rate = P_avg / P_max if P_max > 0 else 0
         peak_valley_diff = P_max - P_min
-        load_std = statistics.stdev(loads) if len(loads) > 1 else 0
+        load_std = stats["std"]
 
         return {
             "P_max": {
@@ -275,7 +413,7 @@ class VPPCalculator:
             "data_source": {
                 "table": "load_curves",
                 "date_range": f"{start_date} to {end_date}",
-                "data_points": len(loads)
+                "data_points": stats["count"]
             }
         }
 
@@ -299,10 +437,9 @@ class VPPCalculator:
         Returns:
             电费结构指标字典
         """
-        result = await self.db.execute(
-            select(ElectricityBill).where(ElectricityBill.month == month)
-        )
-        bill = result.scalar_one_or_none()
+        return self._cost_structure(self._single(await self._load_bills([month])), month)
+
+    def _cost_structure(self, bill: Optional[ElectricityBill], month: str) -> Dict:
         if not bill:
             return {
                 "error": "无电费数据",
@@ -362,31 +499,28 @@ class VPPCalculator:
         Returns:
             峰谷转移潜力指标字典
         """
-        # D1. 获取可调节负荷
-        result = await self.db.execute(
-            select(AdjustableLoad).where(AdjustableLoad.is_active == True)
-        )
-        loads = result.scalars().all()
-
-        transferable_load = sum(
-            load.rated_power * load.adjustable_ratio / 100
-            for load in loads
+        return self._transfer_potential(
+            await self._load_adjustable_power(),
+            await self._load_prices(),
+            await self._load_configs(["daily_shift_hours"])
         )
 
-        # D2. 获取峰谷电价差
-        price_result = await self.db.execute(select(ElectricityPrice))
-        prices = {p.period_type.value: p.price for p in price_result.scalars().all()}
+    def _transfer_potential(
+        self,
+        adjustable_power: np.ndarray,
+        prices: Dict[str, float],
+        configs: Dict[str, float]
+    ) -> Dict:
+        # D1. 可调节负荷
+        transferable_load = float(adjustable_power.sum())
 
+        # D2. 峰谷电价差
         peak_price = prices.get("peak", 0.85)  # 默认值
         valley_price = prices.get("valley", 0.35)  # 默认值
         price_spread = peak_price - valley_price
 
-        # 获取配置参数
-        config_result = await self.db.execute(
-            select(VPPConfig).where(VPPConfig.config_key == "daily_shift_hours")
-        )
-        config = config_result.scalar_one_or_none()
-        daily_shift_hours = config.config_value if config else 4  # 默认4小时
+        # 配置参数
+        daily_shift_hours = configs.get("daily_shift_hours", 4)  # 默认4小时
 
         # D3. 计算年收益潜力
         annual_benefit = transferable_load * daily_shift_hours * 365 * price_spread
@@ -416,7 +550,7 @@ class VPPCalculator:
                 }
             },
             "data_source": {
-                "adjustable_loads_count": len(loads),
+                "adjustable_loads_count": len(adjustable_power),
                 "price_table": "electricity_prices"
             }
         }
@@ -438,12 +572,10 @@ class VPPCalculator:
         Returns:
             需量优化指标字典
         """
-        # 获取配置参数
-        config_result = await self.db.execute(
-            select(VPPConfig).where(VPPConfig.config_key.in_(["target_demand_ratio", "demand_price"]))
-        )
-        configs = {c.config_key: c.config_value for c in config_result.scalars().all()}
+        configs = await self._load_configs(["target_demand_ratio", "demand_price"])
+        return self._demand_optimization(P_max, configs)
 
+    def _demand_optimization(self, P_max: float, configs: Dict[str, float]) -> Dict:
         target_ratio = configs.get("target_demand_ratio", 0.9)  # 默认削减10%
         demand_price = configs.get("demand_price", 40)  # 默认40元/kW/月
 
@@ -491,10 +623,9 @@ class VPPCalculator:
         Returns:
             VPP收益指标字典
         """
-        # 获取配置参数
-        config_result = await self.db.execute(select(VPPConfig))
-        configs = {c.config_key: c.config_value for c in config_result.scalars().all()}
+        return self._vpp_revenue(adjustable_capacity, await self._load_configs())
 
+    def _vpp_revenue(self, adjustable_capacity: float, configs: Dict[str, float]) -> Dict:
         # F1. 需求响应收益
         response_count = configs.get("response_count", 20)  # 年响应次数
         response_price = configs.get("response_price", 4)  # 响应补贴 元/kW
@@ -568,14 +699,13 @@ class VPPCalculator:
         Returns:
             投资回报指标字典
         """
-        config_result = await self.db.execute(
-            select(VPPConfig).where(VPPConfig.config_key.in_([
-                "monitoring_system_cost", "control_system_cost",
-                "platform_cost", "other_cost"
-            ]))
-        )
-        configs = {c.config_key: c.config_value for c in config_result.scalars().all()}
+        configs = await self._load_configs([
+            "monitoring_system_cost", "control_system_cost",
+            "platform_cost", "other_cost"
+        ])
+        return self._roi(annual_benefit, configs)
 
+    def _roi(self, annual_benefit: float, configs: Dict[str, float]) -> Dict:
         monitoring_cost = configs.get("monitoring_system_cost", 500000)
         control_cost = configs.get("control_system_cost", 800000)
         platform_cost = configs.get("platform_cost", 200000)
@@ -633,19 +763,43 @@ class VPPCalculator:
         Returns:
             完整分析报告字典
         """
-        # 获取负荷指标
-        load_metrics = await self.calc_load_metrics(start_date, end_date)
+        key = (tuple(months), start_date, end_date, await self._data_version())
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+            return copy.deepcopy(cached)
+
+        snapshot = await self.load_snapshot(months, start_date, end_date)
+        report = self.build_report(snapshot, months, start_date, end_date)
+
+        _analysis_cache[key] = report
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+        return copy.deepcopy(report)
+
+    def build_report(
+        self,
+        snapshot: VPPDataSnapshot,
+        months: List[str],
+        start_date: date,
+        end_date: date
+    ) -> Dict:
+        """由数据快照计算完整分析报告 (纯计算，不访问数据库)"""
+        latest_bill = snapshot.bill(months[-1]) if months else None
+
+        # 负荷指标
+        load_metrics = self._load_metrics(snapshot.load_stats, start_date, end_date)
         P_max = load_metrics.get("P_max", {}).get("value", 0)
 
-        # 获取峰谷转移潜力
-        transfer = await self.calc_transfer_potential()
+        # 峰谷转移潜力
+        transfer = self._transfer_potential(snapshot.adjustable_power, snapshot.prices, snapshot.configs)
         transferable_load = transfer.get("transferable_load", {}).get("value", 0)
 
-        # 获取需量优化
-        demand_opt = await self.calc_demand_optimization(P_max)
+        # 需量优化
+        demand_opt = self._demand_optimization(P_max, snapshot.configs)
 
-        # 获取VPP收益
-        vpp_revenue = await self.calc_vpp_revenue(transferable_load)
+        # VPP收益
+        vpp_revenue = self._vpp_revenue(transferable_load, snapshot.configs)
 
         # 计算年总收益
         annual_transfer_benefit = transfer.get("annual_transfer_benefit", {}).get("value", 0)
@@ -654,10 +808,10 @@ class VPPCalculator:
         annual_total_benefit = annual_transfer_benefit + demand_benefit + total_vpp
 
         # 计算ROI
-        roi = await self.calc_roi(annual_total_benefit)
+        roi = self._roi(annual_total_benefit, snapshot.configs)
 
         # 电费结构 (使用最近月份)
-        cost_structure = await self.calc_cost_structure(months[-1]) if months else {}
+        cost_structure = self._cost_structure(latest_bill, months[-1]) if months else {}
 
         return {
             "analysis_period": {
@@ -665,10 +819,10 @@ class VPPCalculator:
                 "load_data_range": f"{start_date} to {end_date}"
             },
             "electricity_usage": {
-                "average_price": await self.calc_average_price(months[-1]) if months else {},
-                "fluctuation_rate": await self.calc_fluctuation_rate(months),
-                "peak_ratio": await self.calc_peak_ratio(months[-1]) if months else {},
-                "valley_ratio": await self.calc_valley_ratio(months[-1]) if months else {}
+                "average_price": self._average_price(latest_bill, months[-1]) if months else {},
+                "fluctuation_rate": self._fluctuation_rate(snapshot.consumptions(months), months),
+                "peak_ratio": self._peak_ratio(latest_bill, months[-1]) if months else {},
+                "valley_ratio": self._valley_ratio(latest_bill, months[-1]) if months else {}
             },
             "load_characteristics": load_metrics,
             "cost_structure": cost_structure,
@@ -691,3 +845,10 @@ class VPPCalculator:
                 "roi": roi.get("roi")
             }
         }
+
+    @staticmethod
+    def _single(bills: List[ElectricityBill]) -> Optional[ElectricityBill]:
+        """单月账单 (同一月份有多条时与 scalar_one_or_none 一致地报错)"""
+        if len(bills) > 1:
+            raise ValueError(f"月份 {bills[0].month} 存在多条电费账单")
+        return bills[0] if bills else None
@@ -23,6 +23,8 @@ from datetime import datetime, timedelta, date
 from typing import List, Dict, Any
 import math
 
+from ..services.tariff_compiler import compile_tariff
+
 # 典型中小型算力中心配置
 DATACENTER_CONFIG = {
     "name": "智算中心机房",
@@ -91,22 +93,20 @@ DATACENTER_CONFIG = {
 }
 
 
+# 演示电价编译结果 (与写入 electricity_pricing 的配置一致)
+DEMO_TARIFF = compile_tariff(
+    [(p["type"], p["start"], p["end"], p["price"]) for p in DATACENTER_CONFIG["pricing"]]
+)
+
+
 def get_time_period(hour: int) -> str:
     """根据小时获取电价时段"""
-    if 10 <= hour < 12 or 14 <= hour < 17:
-        return "sharp"
-    elif 8 <= hour < 10 or 12 <= hour < 14 or 17 <= hour < 21:
-        return "peak"
-    elif 7 <= hour < 8 or 21 <= hour < 23:
-        return "flat"
-    else:
-        return "valley"
+    return DEMO_TARIFF.hour_period(hour)
 
 
 def get_price_by_period(period: str) -> float:
     """根据时段获取电价"""
-    prices = {"sharp": 1.2, "peak": 1.0, "flat": 0.7, "valley": 0.4}
-    return prices.get(period, 0.7)
+    return DEMO_TARIFF.period_prices.get(period, 0.7)
 
 
 def generate_load_curve(hour: int, device_type: str, base_power: float) -> float:
@@ -256,6 +256,7 @@ class DemoDataGenerator:
     ALLOWED_TABLES = frozenset([
         'energy_suggestions', 'pue_history', 'energy_monthly', 'energy_daily',
         'energy_hourly', 'demand_15min_data', 'power_curve_data',
+        'load_profile_days', 'typical_day_profiles',
         'regulation_history', 'load_regulation_configs',
         'device_shift_configs', 'device_load_profiles',
         'power_devices', 'distribution_circuits', 'distribution_panels',
@@ -269,6 +270,7 @@ class DemoDataGenerator:
         tables = [
             'energy_suggestions', 'pue_history', 'energy_monthly', 'energy_daily',
             'energy_hourly', 'demand_15min_data', 'power_curve_data',
+            'load_profile_days', 'typical_day_profiles',
             'regulation_history', 'load_regulation_configs',
             'device_shift_configs', 'device_load_profiles',
             'power_devices', 'distribution_circuits', 'distribution_panels',
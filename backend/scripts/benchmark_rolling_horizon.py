@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+滚动时域优化基准测试
+对比逐日独立优化 (单日模式) 与多日滚动优化的整月电费和求解耗时
+
+用法:
+    python scripts/benchmark_rolling_horizon.py --days 30 --horizons 2 3
+"""
+import argparse
+import os
+import sys
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.forecasting import generate_demo_forecast  # noqa: E402
+from app.services.optimizer import (  # noqa: E402
+    MILPOptimizer,
+    PricingConfig,
+    StorageConfig,
+    net_load_from_result,
+)
+
+
+def month_cost(optimizer: MILPOptimizer, net_loads, cycle_energy: float) -> dict:
+    """按整月净负荷计算电费: 电量电费 + 循环成本 + 月最大需量 × 需量电价"""
+    net = np.asarray(net_loads, dtype=float)
+    energy = float((net * np.asarray(optimizer.slot_prices)).sum()) * optimizer.slot_duration
+    cycle = cycle_energy * optimizer.storage.cycle_cost
+    peak = float(net.max())
+    demand = peak * optimizer.pricing.demand_price
+    return {
+        'energy_cost': energy,
+        'cycle_cost': cycle,
+        'demand_cost': demand,
+        'month_peak': peak,
+        'total_cost': energy + cycle + demand,
+    }
+
+
+def run_single_day(optimizer: MILPOptimizer, daily_loads, demand_target: float) -> dict:
+    """单日模式: 每天独立优化，只传递SOC和上一天的解"""
+    started = time.perf_counter()
+    storage = optimizer.storage
+    soc, warm_start = storage.initial_soc, None
+    nets, cycle_energy = [], 0.0
+    for load in daily_loads:
+        day = MILPOptimizer(
+            optimizer.pricing, replace(storage, initial_soc=soc), tariff=optimizer.tariff,
+            time_limit=optimizer.time_limit, warm_start=warm_start,
+        )
+        result = day.optimize(load, demand_target)
+        warm_start = result.pop('_solution', None)
+        nets.append(net_load_from_result(load, result))
+        cycle_energy += sum(
+            (s['charge_power'] + s['discharge_power']) * day.slot_duration
+            for s in result['storage_schedule']
+        )
+        soc = result['storage_schedule'][-1]['soc']
+    cost = month_cost(optimizer, nets, cycle_energy)
+    cost['solve_time'] = time.perf_counter() - started
+    return cost
+
+
+def run_rolling(optimizer: MILPOptimizer, daily_loads, demand_target: float, horizon: int) -> dict:
+    """滚动模式"""
+    started = time.perf_counter()
+    result = optimizer.optimize_rolling(daily_loads, horizon_days=horizon, demand_target=demand_target)
+    cycle_energy = sum(
+        (s['charge_power'] + s['discharge_power']) * optimizer.slot_duration
+        for d in result['days'] for s in d['storage_schedule']
+    )
+    cost = month_cost(optimizer, [d['net_load'] for d in result['days']], cycle_energy)
+    cost['solve_time'] = time.perf_counter() - started
+    return cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description="滚动时域优化基准测试")
+    parser.add_argument('--days', type=int, default=30, help="天数")
+    parser.add_argument('--horizons', type=int, nargs='+', default=[2, 3], help="滚动窗口天数")
+    parser.add_argument('--start', default='2026-03-01', help="起始日期 YYYY-MM-DD")
+    parser.add_argument('--demand-target', type=float, default=1000.0, help="需量目标 kW")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    daily_loads = [
+        [f['predicted_power'] for f in generate_demo_forecast(start + timedelta(days=i))['forecasts']]
+        for i in range(args.days)
+    ]
+    optimizer = MILPOptimizer(
+        PricingConfig(),
+        StorageConfig(capacity=800.0, max_charge_power=200.0, max_discharge_power=200.0),
+    )
+
+    rows = [('单日模式', run_single_day(optimizer, daily_loads, args.demand_target))]
+    for horizon in args.horizons:
+        rows.append((f'滚动 {horizon} 天', run_rolling(optimizer, daily_loads, args.demand_target, horizon)))
+
+    baseline = rows[0][1]['total_cost']
+    print(f"{'模式':<10}{'总电费':>14}{'需量电费':>12}{'月最大需量':>12}{'相对单日':>12}{'耗时(s)':>10}")
+    for name, cost in rows:
+        print(
+            f"{name:<10}{cost['total_cost']:>14.2f}{cost['demand_cost']:>12.2f}"
+            f"{cost['month_peak']:>12.2f}{baseline - cost['total_cost']:>12.2f}{cost['solve_time']:>10.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+容量管理 API 端点测试
+"""
+from app.api.v1.capacity import router
+from app.models.capacity import CapacityStatus, PowerCapacity, SpaceCapacity
+from app.services.statistics import invalidate_statistics
+
+
+class TestCapacityStatisticsAPI:
+    """容量统计端点测试"""
+
+    def setup_method(self):
+        invalidate_statistics()
+
+    def teardown_method(self):
+        invalidate_statistics()
+
+    def test_statistics_endpoint(self, async_db):
+        """测试 GET /capacity/statistics 返回汇总统计"""
+
+        async def run(session):
+            session.add_all([
+                SpaceCapacity(name="S1", total_u_positions=42, used_u_positions=10, status=CapacityStatus.normal),
+                PowerCapacity(name="P1", total_capacity_kw=100, used_capacity_kw=90, status=CapacityStatus.critical),
+            ])
+            await session.commit()
+            async with async_db.client(session, router) as client:
+                return await client.get("/api/v1/capacity/statistics")
+
+        response = async_db.run(run)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["power"]["usage_rate"] == 90.0
+        assert data["space"]["available_u_positions"] == 32
+        assert data["status_summary"] == {"normal": 1, "warning": 0, "critical": 1, "full": 0}
+        assert data["total_capacity_records"] == 2
@@ -0,0 +1,59 @@
+"""
+日前调度优化 API 端点测试
+"""
+from datetime import date, timedelta
+
+from app.api.v1.optimization import router
+from app.services.load_forecast_engine import SLOTS_PER_DAY, reset_models
+from app.services.tariff_compiler import invalidate_tariff_cache
+from tests.services.test_load_forecast_engine import _seed
+
+
+class TestForecastAPI:
+    """负荷预测端点测试"""
+
+    def setup_method(self):
+        reset_models()
+        invalidate_tariff_cache()
+
+    def teardown_method(self):
+        reset_models()
+        invalidate_tariff_cache()
+
+    def test_refit_backtest_and_forecast(self, async_db):
+        """测试拟合端点返回回测误差，增量重拟合不重复回测，预测端点使用拟合的模型"""
+        end = date.today() - timedelta(days=1)
+        target = (end + timedelta(days=2)).isoformat()
+
+        async def run(session):
+            await _seed(session, end - timedelta(days=44), end)
+            async with async_db.client(session, router, "/api/v1/optimization") as client:
+                fitted = await client.post("/api/v1/optimization/forecast/refit")
+                refit = await client.post("/api/v1/optimization/forecast/refit", params={"meter_ids": "1"})
+                invalid = await client.post("/api/v1/optimization/forecast/refit", params={"meter_ids": "a"})
+                meters = await client.get("/api/v1/optimization/forecast/meters",
+                                          params={"target_date": target})
+                total = await client.get("/api/v1/optimization/forecast",
+                                         params={"target_date": target, "method": "data"})
+            return fitted, refit, invalid, meters, total
+
+        fitted, refit, invalid, meters, total = async_db.run(run)
+
+        assert fitted.status_code == 200
+        models = {m["meter_point_id"]: m for m in fitted.json()["data"]}
+        assert set(models) == {1, 2}
+        assert models[1]["method"] == "regression"
+        assert models[1]["trained_until"] == end.isoformat()
+        assert models[1]["backtest_days"] > 0
+        assert models[1]["mape"] < models[1]["baseline_mape"]
+
+        # 没有新数据，增量拟合不改变模型
+        assert refit.json()["data"] == [models[1]]
+        assert invalid.status_code == 400
+
+        data = meters.json()["data"]
+        assert data["count"] == 2
+        assert all(len(f["forecasts"]) == SLOTS_PER_DAY for f in data["forecasts"])
+
+        assert total.status_code == 200
+        assert total.json()["data"]["method"] == "data_driven"
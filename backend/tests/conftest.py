@@ -1,8 +1,13 @@
 """
 Pytest configuration and fixtures
 """
+import asyncio
+
+import httpx
 import pytest
-from sqlalchemy import create_engine
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from app.core.database import Base
 
@@ -29,6 +34,70 @@ def db_session(engine):
     session.close()
 
 
+class AsyncTestDatabase:
+    """
+    Async in-memory SQLite database for service tests
+
+    Each run() creates a fresh database with all tables and disposes it afterwards.
+    `statements` collects the SQL executed during the current run.
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    async def _run(self, fn, with_session: bool):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+        self.statements.clear()
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+        try:
+            if not with_session:
+                return await fn(session_factory)
+            async with session_factory() as session:
+                return await fn(session)
+        finally:
+            await engine.dispose()
+
+    def run(self, fn):
+        """Run `await fn(session)` against a fresh database and return its result"""
+        return asyncio.run(self._run(fn, True))
+
+    def run_with_factory(self, fn):
+        """Run `await fn(session_factory)` against a fresh database and return its result"""
+        return asyncio.run(self._run(fn, False))
+
+    @staticmethod
+    def client(session, router, prefix: str = "/api/v1") -> httpx.AsyncClient:
+        """
+        HTTP client for `router` mounted under `prefix`
+
+        get_db yields `session`; the current user and role checks resolve to an admin user.
+        """
+        from app.api.deps import get_current_user, get_db, require_admin, require_operator, require_viewer
+        from app.models.user import User
+
+        app = FastAPI()
+        app.include_router(router, prefix=prefix)
+        user = User(id=1, username="admin", role="admin", is_active=True)
+
+        async def override_db():
+            yield session
+
+        app.dependency_overrides[get_db] = override_db
+        for dependency in (get_current_user, require_admin, require_operator, require_viewer):
+            app.dependency_overrides[dependency] = lambda: user
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.fixture
+def async_db():
+    """Async in-memory database runner"""
+    return AsyncTestDatabase()
+
+
 @pytest.fixture
 def auth_token():
     """Mock authentication token for API tests"""
@@ -0,0 +1,112 @@
+"""
+测试分析上下文列式数据帧
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.analysis_plugins.base import AnalysisContext, EnergyData, PowerCurvePoint
+from app.services.analysis_plugins.frames import PowerCurveFrame, EnergyFrame
+
+
+def _make_points(days: int = 3, meters=(1, 2, None), devices=(10, 11)):
+    """生成乱序的15分钟功率曲线点"""
+    start = datetime(2026, 1, 1)
+    points = []
+    for slot in range(days * 96):
+        ts = start + timedelta(minutes=15 * slot)
+        for i, mp in enumerate(meters):
+            for device in devices:
+                points.append(PowerCurvePoint(
+                    timestamp=ts,
+                    meter_point_id=mp,
+                    device_id=device,
+                    active_power=100 + slot % 96 + i * 10 + device,
+                    reactive_power=20,
+                    power_factor=0.92,
+                    demand_15min=100 + slot % 96 + i,
+                    time_period='peak' if 8 <= ts.hour < 12 else 'valley'
+                ))
+    points.reverse()
+    return points
+
+
+def _scan(points, start, end, meter_point_id=None, device_id=None):
+    """原列表扫描实现，作为对照"""
+    result = []
+    for p in points:
+        if start <= p.timestamp <= end:
+            if meter_point_id is not None and p.meter_point_id != meter_point_id:
+                continue
+            if device_id is not None and p.device_id != device_id:
+                continue
+            result.append(p)
+    return sorted(result, key=lambda p: p.timestamp)
+
+
+class TestPowerCurveFrame:
+    """PowerCurveFrame 测试类"""
+
+    @pytest.mark.parametrize("meter_point_id,device_id", [
+        (None, None), (1, None), (None, 11), (2, 10), (3, None)
+    ])
+    def test_select_matches_list_scan(self, meter_point_id, device_id):
+        """测试二分查询结果与列表扫描一致"""
+        points = _make_points()
+        context = AnalysisContext(power_curve_data=points)
+        start, end = datetime(2026, 1, 1, 6), datetime(2026, 1, 2, 9, 30)
+
+        actual = context.get_power_curve_for_period(start, end, meter_point_id, device_id)
+        expected = _scan(points, start, end, meter_point_id, device_id)
+
+        assert [(p.timestamp, p.meter_point_id, p.device_id, p.active_power) for p in actual] == \
+               [(p.timestamp, p.meter_point_id, p.device_id, p.active_power) for p in expected]
+
+    def test_frame_rebuilds_when_list_changes(self):
+        """测试列表变化后数据帧重建"""
+        points = _make_points(days=1)
+        context = AnalysisContext(power_curve_data=points)
+        assert len(context.get_power_curve_frame()) == len(points)
+
+        context.power_curve_data = points[:10]
+        assert len(context.get_power_curve_frame()) == 10
+
+    def test_from_rows_and_period_energy(self):
+        """测试从查询行构建与按时段汇总电量"""
+        t0 = datetime(2026, 1, 1, 9)
+        frame = PowerCurveFrame.from_rows([
+            (t0 + timedelta(minutes=15), 1, None, 200.0, 0, 0.9, 210.0, 'peak'),
+            (t0, 1, None, 100.0, 0, 0.9, 120.0, 'peak'),
+            (t0 + timedelta(minutes=30), 1, None, 40.0, None, None, None, 'valley'),
+        ])
+
+        assert frame.timestamps[0] == t0
+        energy = frame.energy_by_period()
+        assert energy['peak'] == pytest.approx(75.0)
+        assert energy['valley'] == pytest.approx(10.0)
+        assert frame.max_demand() == 210.0
+        assert frame.to_points()[0].device_id is None
+
+
+class TestEnergyFrame:
+    """EnergyFrame 测试类"""
+
+    def test_peak_valley_ratio(self):
+        """测试峰谷比例向量化计算与原实现一致"""
+        records = [
+            EnergyData(date=datetime(2026, 1, d), total_energy=100, peak_energy=40,
+                       valley_energy=30, flat_energy=25, sharp_energy=5)
+            for d in range(1, 11)
+        ]
+        context = AnalysisContext(energy_data=records, device_energy_data={7: records[:2]})
+
+        ratio = context.calculate_peak_valley_ratio()
+        assert ratio == pytest.approx({'peak': 0.4, 'flat': 0.25, 'valley': 0.3, 'sharp': 0.05})
+        assert context.get_energy_frame(7).totals()['total_energy'] == 200
+        assert len(EnergyFrame.from_records(records).select(datetime(2026, 1, 3), datetime(2026, 1, 5))) == 3
+
+    def test_empty_context(self):
+        """测试空数据"""
+        context = AnalysisContext()
+        assert context.calculate_peak_valley_ratio() == {'peak': 0, 'flat': 0, 'valley': 0, 'sharp': 0}
+        assert context.get_power_curve_for_period(datetime(2026, 1, 1), datetime(2026, 1, 2)) == []
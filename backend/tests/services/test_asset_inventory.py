@@ -0,0 +1,100 @@
+"""
+测试资产盘点批量生成与扫码对账
+"""
+from datetime import date
+
+from sqlalchemy import select
+
+from app.models.asset import Asset, AssetInventory, AssetInventoryItem, AssetStatus, AssetType, Cabinet
+from app.services.asset_inventory import generate_inventory_items, reconcile_scans
+
+
+async def _seed(session, count=2000):
+    cabinet = Cabinet(cabinet_code="C1", cabinet_name="机柜1", total_u=42)
+    session.add(cabinet)
+    await session.flush()
+    session.add_all([
+        Asset(asset_code=f"A{i:05d}", asset_name=f"A{i}", asset_type=AssetType.server,
+              serial_number=f"SN{i:05d}",
+              status=AssetStatus.scrapped if i % 10 == 0 else (AssetStatus.borrowed if i % 7 == 0 else AssetStatus.in_use),
+              cabinet_id=cabinet.id if i % 2 else None, u_position=(i % 40) + 1 if i % 4 == 1 else None)
+        for i in range(count)
+    ])
+    inventory = AssetInventory(inventory_code="INV-1", inventory_date=date(2026, 10, 1))
+    session.add(inventory)
+    await session.commit()
+    return inventory
+
+
+class TestAssetInventory:
+    """资产盘点测试"""
+
+    def test_generate_items_in_one_statement(self, async_db):
+        """测试盘点明细一次生成，预期位置与逐条生成一致"""
+
+        async def run(session):
+            inventory = await _seed(session)
+            async_db.statements.clear()
+            created = await generate_inventory_items(session, inventory)
+            await session.commit()
+            queries = len(async_db.statements)
+            items = (await session.execute(
+                select(AssetInventoryItem, Asset).join(Asset, AssetInventoryItem.asset_id == Asset.id)
+            )).all()
+            assets = (await session.execute(select(Asset))).scalars().all()
+            return inventory, created, queries, items, assets
+
+        inventory, created, queries, items, assets = async_db.run(run)
+
+        expected_assets = [a for a in assets if a.status in (AssetStatus.in_use, AssetStatus.borrowed)]
+        assert created == len(expected_assets) == len(items) == inventory.total_count
+        # 插入明细、统计、更新盘点记录
+        assert queries == 3
+        assert inventory.status == "pending"
+        for item, asset in items:
+            if asset.cabinet_id is None:
+                assert item.expected_location is None
+            elif asset.u_position:
+                assert item.expected_location == f"机柜1 U{asset.u_position}"
+            else:
+                assert item.expected_location == "机柜1"
+            assert item.is_matched is False
+
+    def test_reconcile_scans(self, async_db):
+        """测试批量扫码按编码/序列号匹配，区分位置不符、重复、范围外和未知编码"""
+
+        async def run(session):
+            inventory = await _seed(session, count=20)
+            await generate_inventory_items(session, inventory)
+            await session.commit()
+
+            scans = [{"code": f"A{i:05d}"} for i in range(1, 19) if i % 10]
+            scans += [
+                {"code": "SN00003", "location": "机柜9"},     # 序列号匹配，位置不符
+                {"code": "A00001"},                           # 重复扫码
+                {"code": "A00010"},                           # 已报废，不在盘点范围
+                {"code": "X-1"},                              # 未知
+                {"code": "  "},
+            ]
+            result = await reconcile_scans(session, inventory, scans)
+            await session.commit()
+            item = (await session.execute(
+                select(AssetInventoryItem).join(Asset, AssetInventoryItem.asset_id == Asset.id)
+                .where(Asset.asset_code == "A00003")
+            )).scalar_one()
+            return inventory, result, item
+
+        inventory, result, item = async_db.run(run)
+
+        # 盘点范围为 A00001-A00019 (去掉已报废的 A00010) 共 18 条，A00019 未扫描
+        assert result["checked"] == 17
+        assert result["mismatched"] == 1
+        assert result["matched"] == 16
+        assert result["duplicates"] == 2
+        assert result["not_in_inventory"] == ["A00010"]
+        assert result["unknown_codes"] == ["X-1"]
+        assert (item.actual_location, item.is_matched) == ("机柜9", False)
+
+        assert (inventory.total_count, inventory.checked_count) == (18, 17)
+        assert (inventory.matched_count, inventory.unmatched_count) == (16, 1)
+        assert inventory.status == "in_progress"
@@ -0,0 +1,128 @@
+"""
+测试批量电费计算引擎
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.models.energy import ElectricityPricing, PricingConfig
+from app.services.bill_engine import BillEngine, as_scenarios, energy_matrix
+from app.services.pricing_service import PricingService
+from app.services.tariff_compiler import TIME_PERIODS, compile_tariff, invalidate_tariff_cache
+
+
+def _tariff(**kwargs):
+    return compile_tariff(
+        [
+            ("valley", "22:00", "08:00", 0.35),
+            ("peak", "08:00", "12:00", 0.95),
+            ("normal", "12:00", "22:00", 0.65),
+        ],
+        rows=[
+            {"period_type": "valley", "price": 0.35},
+            {"period_type": "peak", "price": 0.95},
+            {"period_type": "normal", "price": 0.65},
+        ],
+        **kwargs
+    )
+
+
+class TestBillEngine:
+    """BillEngine 测试类"""
+
+    def test_curves_match_energy_by_period(self):
+        """测试负荷曲线计费与按时段电量计费一致"""
+        engine = BillEngine(_tariff())
+        rng = np.random.default_rng(3)
+        loads = rng.uniform(200, 800, size=(50, 30, 96))
+
+        by_curve = engine.bill_curves(loads)
+        energy = np.stack([
+            [engine.tariff.energy_by_period(
+                np.arange('2026-03-01', '2026-03-31', np.timedelta64(15, 'm'), dtype='datetime64[m]'),
+                curve.ravel()
+            )[p] for p in TIME_PERIODS]
+            for curve in loads
+        ])
+        by_energy = engine.bill_energy(energy, loads.max(axis=(1, 2)))
+
+        assert len(by_curve) == 50
+        assert np.allclose(by_curve.energy_by_period, energy)
+        assert np.allclose(by_curve.grand_total, by_energy.grand_total)
+        assert np.allclose(by_curve.max_demand, loads.max(axis=(1, 2)))
+
+    def test_demand_power_factor_and_fixed_fees(self):
+        """测试超需量加价、功率因数调整和固定费用"""
+        engine = BillEngine(_tariff(
+            config_id=1, demand_price=40.0, declared_demand=500.0, over_demand_multiplier=2.0,
+            power_factor_rules=[{"min": 0.0, "max": 0.85, "adjustment": 5}, {"min": 0.9, "max": 1.01, "adjustment": -1}],
+            fixed_fees={"transmission_fee": 0.1, "government_fund": 0.05},
+        ))
+        batch = engine.bill_energy(
+            energy_matrix([{"peak": 1000}, {"normal": 1000}, {"flat": 1000}]),
+            max_demand=[600.0, 400.0, 0.0],
+            power_factor=[0.8, 0.95, 0.87],
+        )
+
+        assert batch.energy_charge.tolist() == [950.0, 650.0, 650.0]
+        assert batch.basic_charge.tolist() == [500 * 40 + 100 * 40 * 2, 500 * 40, 0.0]
+        assert batch.pf_adjustment_rate.tolist() == [5, -1, 0]
+        assert np.isclose(batch.pf_adjustment[0], (950 + 28000) * 0.05)
+        assert np.allclose(batch.fixed_fees, 150.0)
+        assert batch.savings()[1] > 0
+        assert batch.summary()["best_scenario"] == 2
+
+    def test_scenario_shapes(self):
+        """测试曲线形状归一和长度校验"""
+        assert as_scenarios(np.ones(96 * 2)).shape == (1, 2, 96)
+        assert as_scenarios(np.ones((3, 96 * 2))).shape == (3, 2, 96)
+        try:
+            as_scenarios(np.ones(100))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("长度不是96整数倍时应报错")
+
+
+class TestPricingServiceBill:
+    """PricingService 账单测试"""
+
+    def test_single_bill_and_savings(self, async_db):
+        """测试单场景账单明细和节省估算走批量引擎"""
+        today = date.today()
+
+        async def scenario(session):
+            session.add_all([
+                ElectricityPricing(pricing_name="高峰", period_type="peak", start_time="08:00",
+                                   end_time="22:00", price=1.0, effective_date=today - timedelta(days=1)),
+                ElectricityPricing(pricing_name="低谷", period_type="valley", start_time="22:00",
+                                   end_time="08:00", price=0.3, effective_date=today - timedelta(days=1)),
+                PricingConfig(billing_mode="demand", demand_price=40.0, declared_demand=500.0,
+                              over_demand_multiplier=2.0, power_factor_rules=[],
+                              transmission_fee=0.1, government_fund=0.0, auxiliary_fee=0.0,
+                              other_fee=0.0, effective_date=today - timedelta(days=1)),
+            ])
+            await session.commit()
+
+            service = PricingService(session)
+            bill = await service.calculate_electricity_bill({"peak": 1000, "valley": 500}, 600.0)
+            savings = await service.estimate_savings(
+                {"peak": 1000, "valley": 500}, 600.0, {"peak": 500, "valley": 1000}, 500.0
+            )
+            batch = await service.calculate_bills_batch(np.full((2, 96), 100.0))
+            return bill, savings, batch
+
+        invalidate_tariff_cache()
+        try:
+            bill, savings, batch = async_db.run(scenario)
+        finally:
+            invalidate_tariff_cache()
+
+        assert bill["energy_charge"]["total_charge"] == 1150.0
+        assert bill["basic_charge"]["detail"]["over_demand"] == 100.0
+        assert bill["basic_charge"]["charge"] == 28000.0
+        assert bill["fixed_fees"]["total"] == 150.0
+        assert bill["total"]["grand_total"] == 1150.0 + 28000.0 + 150.0
+        assert savings["savings"]["energy_charge"] == 350.0
+        assert savings["savings"]["basic_charge"] == 8000.0
+        assert batch.energy_kwh.tolist() == [2400.0, 2400.0]
@@ -0,0 +1,108 @@
+"""
+测试容量规划布局引擎
+"""
+import time
+
+
+from app.models.asset import Asset, AssetType, Cabinet
+from app.models.capacity import CapacityPlan, CoolingCapacity, PowerCapacity, WeightCapacity
+from app.services.capacity_placement import DeviceSpec, evaluate_plan, load_placement_engine
+
+
+async def _seed(session, rows=2, per_row=20):
+    """两列机柜: A列挂在容量较小的配电柜下，整个机房共用一个UPS和制冷区域"""
+    ups = PowerCapacity(name="UPS", location="机房1", total_capacity_kw=400, used_capacity_kw=0)
+    session.add(ups)
+    await session.flush()
+    session.add_all([
+        PowerCapacity(name="PDU-A", location="机房1-A", total_capacity_kw=30, used_capacity_kw=10, parent_id=ups.id),
+        PowerCapacity(name="PDU-B", location="机房1-B", total_capacity_kw=300, used_capacity_kw=0, parent_id=ups.id),
+        CoolingCapacity(name="空调区", location="机房1", total_cooling_kw=500, used_cooling_kw=100),
+        WeightCapacity(name="楼板", location="机房1", total_weight_kg=50000, used_weight_kg=0),
+    ])
+    cabinets = [
+        Cabinet(cabinet_code=f"{row}{i:02d}", cabinet_name=f"机柜{row}{i:02d}", location=f"机房1-{row}",
+                total_u=42, max_power=8, max_weight=1000)
+        for row in "AB"[:rows] for i in range(per_row)
+    ]
+    session.add_all(cabinets)
+    await session.flush()
+    # 每个机柜底部已有一台4U设备
+    session.add_all([
+        Asset(asset_code=f"E{c.id}", asset_name="存量", asset_type=AssetType.server, cabinet_id=c.id,
+              u_position=1, u_height=4, rated_power=1, weight=50)
+        for c in cabinets
+    ])
+    await session.commit()
+    return cabinets
+
+
+class TestPlacementEngine:
+    """布局引擎测试"""
+
+    def test_respects_power_tree_and_returns_slots(self, async_db):
+        """测试放置结果不重叠，且不超过机柜、配电柜和UPS的余量"""
+
+        async def run(session):
+            await _seed(session)
+            engine = await load_placement_engine(session)
+            result = engine.place([
+                DeviceSpec(u_height=2, power_kw=0.5, weight_kg=20, count=300, name="服务器"),
+                DeviceSpec(u_height=4, power_kw=1.2, weight_kg=60, count=20, name="存储"),
+            ])
+            return engine, result
+
+        engine, result = async_db.run(run)
+
+        assert result.feasible is False
+        assert all(v >= -1e-9 for v in engine.power_headroom.values())
+        assert all(b.power_headroom >= -1e-9 and b.weight_headroom >= 0 for b in engine.bins)
+
+        # PDU-A 余量 20kW 限制 A 列
+        bins = {b.cabinet_id: b for b in engine.bins}
+        a_power = sum(p["power_kw"] for p in result.placements if bins[p["cabinet_id"]].cabinet_name.startswith("机柜A"))
+        assert a_power <= 20 + 1e-9
+        assert "上级配电容量不足" in result.to_dict()["reasons"]
+
+        # 同一机柜内U位互不重叠，且避开存量设备
+        used = {}
+        for p in result.placements:
+            span = set(range(p["u_position"], p["u_position"] + p["u_height"]))
+            assert not span & used.setdefault(p["cabinet_id"], {1, 2, 3, 4})
+            used[p["cabinet_id"]] |= span
+
+    def test_bulk_plan_is_fast(self, async_db):
+        """测试数百台设备、数百个机柜的批量布局在1秒内完成"""
+
+        async def run(session):
+            await _seed(session, rows=2, per_row=200)
+            engine = await load_placement_engine(session)
+            started = time.perf_counter()
+            result = engine.place([
+                DeviceSpec(u_height=1, power_kw=0.1, weight_kg=15, count=600),
+                DeviceSpec(u_height=2, power_kw=0.2, weight_kg=25, count=300),
+            ])
+            return result, time.perf_counter() - started
+
+        result, elapsed = async_db.run(run)
+
+        assert result.feasible
+        assert len(result.placements) == 900
+        assert elapsed < 1.0
+
+    def test_evaluate_plan(self, async_db):
+        """测试容量规划按台均分需求，目标机柜放不下时给出原因"""
+
+        async def run(session):
+            cabinets = await _seed(session, rows=1, per_row=3)
+            ok = CapacityPlan(name="扩容", device_count=6, required_u=12, required_power_kw=3, required_weight_kg=120)
+            target = CapacityPlan(name="单柜", device_count=10, required_u=40, required_power_kw=5,
+                                  target_cabinet_id=cabinets[0].id)
+            return await evaluate_plan(session, ok), await evaluate_plan(session, target)
+
+        (ok_feasible, ok_notes, ok_result), (feasible, notes, _) = async_db.run(run)
+
+        assert ok_feasible and len(ok_result.placements) == 6
+        assert ok_notes.startswith("布局检查通过: 6 台设备")
+        assert feasible is False
+        assert "连续U位不足" in notes
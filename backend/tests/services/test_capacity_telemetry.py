@@ -0,0 +1,88 @@
+"""
+测试容量实时遥测汇总
+"""
+
+from sqlalchemy import select
+
+from app.models.capacity import (
+    CapacityHistory, CapacityPointBinding, CapacityStatus, CapacityType, CoolingCapacity, PowerCapacity
+)
+from app.models.energy import PowerDevice
+from app.models.point import Point, PointRealtime
+from app.services.capacity_telemetry import CapacityTelemetry
+
+
+async def _seed(session):
+    """UPS 下挂两个 PDU: PDU-1 绑定点位 P1，PDU-2 通过用电设备绑定点位 P2；空调区绑定温度点位 T1/T2"""
+    points = [Point(point_code=code, point_name=code, point_type="AI") for code in ("P1", "P2", "T1", "T2")]
+    session.add_all(points)
+    ups = PowerCapacity(name="UPS", total_capacity_kw=100, used_capacity_kw=0)
+    session.add(ups)
+    await session.flush()
+    p1, p2, t1, t2 = (p.id for p in points)
+    pdu1 = PowerCapacity(name="PDU-1", total_capacity_kw=40, used_capacity_kw=0, parent_id=ups.id)
+    pdu2 = PowerCapacity(name="PDU-2", total_capacity_kw=60, used_capacity_kw=0, parent_id=ups.id)
+    manual = PowerCapacity(name="人工维护", total_capacity_kw=10, used_capacity_kw=5)
+    zone = CoolingCapacity(name="空调区", total_cooling_kw=80, used_cooling_kw=0)
+    device = PowerDevice(device_code="D1", device_name="服务器", device_type="IT_SERVER", power_point_id=p2)
+    session.add_all([pdu1, pdu2, manual, zone, device])
+    await session.flush()
+    session.add_all([
+        CapacityPointBinding(capacity_type=CapacityType.power, capacity_id=pdu1.id, metric="load_kw", point_id=p1),
+        CapacityPointBinding(capacity_type=CapacityType.power, capacity_id=pdu2.id, metric="load_kw",
+                             power_device_id=device.id),
+        CapacityPointBinding(capacity_type=CapacityType.cooling, capacity_id=zone.id, metric="temperature", point_id=t1),
+        CapacityPointBinding(capacity_type=CapacityType.cooling, capacity_id=zone.id, metric="temperature", point_id=t2),
+        PointRealtime(point_id=p1, value=20),
+        PointRealtime(point_id=p2, value=30),
+        PointRealtime(point_id=t1, value=24),
+    ])
+    await session.commit()
+    return {"ups": ups.id, "pdu1": pdu1.id, "pdu2": pdu2.id, "manual": manual.id, "zone": zone.id,
+            "p1": p1, "p2": p2, "t2": t2}
+
+
+class TestCapacityTelemetry:
+    """容量遥测汇总测试"""
+
+    def test_rollup_and_status_transitions(self, async_db):
+        """测试点位值沿配电树累加、温度取平均、状态变化写入历史"""
+
+        async def run(session):
+            ids = await _seed(session)
+            telemetry = CapacityTelemetry()
+
+            await telemetry.ingest_point_values(session, {})
+            initial = await telemetry.flush(session)
+            await session.commit()
+            first = {c.id: c for c in (await session.execute(select(PowerCapacity))).scalars().all()}
+            first = {k: (c.used_capacity_kw, c.status) for k, c in first.items()}
+
+            await telemetry.ingest_point_values(session, {ids["p1"]: 38, ids["p2"]: 30, ids["t2"]: 26})
+            changed = await telemetry.flush(session)
+            await session.commit()
+            session.expire_all()
+            second = {c.id: (c.used_capacity_kw, c.status)
+                      for c in (await session.execute(select(PowerCapacity))).scalars().all()}
+            zone = (await session.execute(select(CoolingCapacity))).scalar_one()
+            history = (await session.execute(select(CapacityHistory))).scalars().all()
+            return ids, initial, first, changed, second, zone, history, telemetry.snapshot()
+
+        ids, initial, first, changed, second, zone, history, snapshot = async_db.run(run)
+
+        assert first[ids["pdu1"]] == (20, CapacityStatus.normal)
+        assert first[ids["pdu2"]] == (30, CapacityStatus.normal)
+        assert first[ids["ups"]] == (50, CapacityStatus.normal)
+        assert first[ids["manual"]] == (5, CapacityStatus.normal)
+        assert initial == []
+
+        # PDU-1 38/40 = 95% 进入严重状态，UPS 68% 仍正常；P2 未变化
+        assert second[ids["pdu1"]] == (38, CapacityStatus.critical)
+        assert second[ids["ups"]] == (68, CapacityStatus.normal)
+        assert changed == [{"capacity_type": "power", "capacity_id": ids["pdu1"], "name": "PDU-1",
+                            "from": "normal", "to": "critical"}]
+        assert [(h.reference_id, h.used_value) for h in history] == [(ids["pdu1"], 38)]
+
+        assert zone.current_temperature == 25
+        assert snapshot["cooling"][0]["temperature"] == 25
+        assert [n["load_kw"] for n in snapshot["power"]] == [68, 38, 30, None]
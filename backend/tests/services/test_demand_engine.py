@@ -0,0 +1,208 @@
+"""
+测试15分钟需量计算引擎
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.energy import (
+    MeterPoint, Demand15MinData, DemandHistory, DistributionCircuit, DistributionPanel, PowerCurveData, PowerDevice
+)
+from app.services.demand_engine import (
+    DemandEngine,
+    DemandStream,
+    compute_demand,
+    demand_charges,
+    flag_extremes,
+    monthly_aggregates,
+)
+from app.services.realtime_dispatch import DispatchRegistry
+from app.services.tariff_compiler import get_cached_tariff, invalidate_tariff_cache
+
+
+def _readings(count: int = 2000, seed: int = 7):
+    """生成不等间隔的原始功率读数 (含一次长时间断档)"""
+    rng = random.Random(seed)
+    ts, power = [], []
+    t = datetime(2026, 1, 31, 21, 2, 30)
+    for i in range(count):
+        t += timedelta(seconds=4000 if i == count // 2 else rng.choice([20, 60, 90, 300]))
+        ts.append(t)
+        power.append(400 + rng.random() * 300)
+    return ts, power
+
+
+class TestDemandComputation:
+    """批量需量计算测试"""
+
+    def test_constant_power(self):
+        """测试恒定功率下固定窗口与滑差需量相等"""
+        start = datetime(2026, 3, 1)
+        ts = [start + timedelta(minutes=i) for i in range(60)]
+        series = compute_demand(ts, [100.0] * 60)
+
+        assert len(series) == 4
+        assert np.allclose(series.average_power, 100.0)
+        assert np.allclose(series.rolling_demand, 100.0)
+
+    def test_rolling_demand_catches_straddling_peak(self):
+        """测试跨时段的尖峰由滑差需量捕获，固定窗口会被摊薄"""
+        start = datetime(2026, 3, 1)
+        power = [100.0] * 60
+        for minute in range(8, 23):
+            power[minute] = 400.0
+        ts = [start + timedelta(minutes=i) for i in range(60)]
+        series = compute_demand(ts, power)
+
+        assert series.average_power.max() < 400.0
+        assert series.rolling_demand.max() == 400.0
+
+    def test_flags_and_monthly_aggregates(self):
+        """测试当日/当月最大标记只标记首个最大值，月度汇总含超申报"""
+        stamps = np.array(['2026-01-31T10:00', '2026-01-31T10:15', '2026-02-01T09:00',
+                           '2026-02-01T09:15', '2026-02-02T09:00'], dtype='datetime64[m]')
+        demand = np.array([500.0, 500.0, 300.0, 900.0, 850.0])
+        flags = flag_extremes(stamps, demand, 800.0)
+
+        assert flags["is_max_of_day"].tolist() == [True, False, False, True, True]
+        assert flags["is_max_of_month"].tolist() == [True, False, False, True, False]
+        assert flags["is_over_declared"].tolist() == [False, False, False, True, True]
+
+        months = monthly_aggregates(stamps, demand, 800.0)
+        assert [(m.year, m.month) for m in months] == [(2026, 1), (2026, 2)]
+        assert months[1].max_demand == 900.0
+        assert months[1].max_demand_time == datetime(2026, 2, 1, 9, 15)
+        assert months[1].over_declared_times == 2
+        assert months[1].over_declared_max == 100.0
+
+    def test_demand_charges(self):
+        """测试申报需量105%以上部分按加价倍数计费"""
+        cost, penalty = demand_charges(1100.0, 1000.0, 40.0, 2.0)
+        assert cost == 1050.0 * 40.0
+        assert penalty == 50.0 * 40.0 * 2.0
+        assert demand_charges(900.0, None, 40.0, 2.0) == (36000.0, 0.0)
+
+
+class TestDemandStream:
+    """增量需量计算测试"""
+
+    def test_stream_matches_batch(self):
+        """测试逐条增量计算与批量计算结果一致 (含最大值标记替换)"""
+        ts, power = _readings()
+        series = compute_demand(ts, power)
+        flags = flag_extremes(series.timestamps, series.rolling_demand, 600.0)
+
+        stream = DemandStream(declared_demand=600.0)
+        slots = []
+        for t, p in zip(ts, power):
+            slots.extend(stream.push(t, p))
+
+        # 最后一个时段尚未结束
+        n = len(slots)
+        assert n == len(series) - 1
+        assert [s.timestamp for s in slots] == series.timestamps[:n].astype(datetime).tolist()
+        assert np.allclose([s.rolling_demand for s in slots], series.rolling_demand[:n])
+        assert np.allclose([s.average_power for s in slots], series.average_power[:n])
+        assert np.allclose([s.max_power for s in slots], series.max_power[:n])
+
+        day_max = {s.timestamp: s.is_max_of_day for s in slots}
+        for s in slots:
+            if s.replaced_day_max:
+                day_max[s.replaced_day_max] = False
+        batch_flags = flag_extremes(series.timestamps[:n], series.rolling_demand[:n], 600.0)
+        assert [day_max[s.timestamp] for s in slots] == batch_flags["is_max_of_day"].tolist()
+        assert [s.is_over_declared for s in slots] == flags["is_over_declared"][:n].tolist()
+
+        summary = stream.month_summary()
+        expected = monthly_aggregates(series.timestamps[:n], series.rolling_demand[:n], 600.0)[-1]
+        assert summary.over_declared_times == expected.over_declared_times
+        assert abs(summary.demand_95th - expected.demand_95th) < 1e-6
+
+
+class TestDemandEngine:
+    """DemandEngine 落库测试"""
+
+    def test_recompute_writes_rows_and_history(self, async_db):
+        """测试从原始功率重算15分钟需量和月度需量历史"""
+        ts, power = _readings(count=600)
+
+        async def scenario(session):
+            meter = MeterPoint(meter_code="M001", meter_name="总进线", declared_demand=600.0)
+            session.add(meter)
+            await session.flush()
+            session.add_all([
+                PowerCurveData(meter_point_id=meter.id, timestamp=t, active_power=p)
+                for t, p in zip(ts, power)
+            ])
+            await session.commit()
+
+            engine = DemandEngine(session)
+            summary = await engine.recompute(meter.id, ts[0].date(), ts[-1].date())
+            await session.commit()
+
+            rows = (await session.execute(
+                select(Demand15MinData).order_by(Demand15MinData.timestamp)
+            )).scalars().all()
+            history = (await session.execute(
+                select(DemandHistory).order_by(DemandHistory.stat_month)
+            )).scalars().all()
+            return summary, rows, history
+
+        summary, rows, history = async_db.run(scenario)
+
+        series = compute_demand(ts, power)
+        assert summary["slots"] == len(rows) == len(series)
+        assert sum(r.is_max_of_month for r in rows) == len(history) == 2
+        assert history[-1].max_demand == round(float(series.rolling_demand[
+            series.timestamps >= np.datetime64('2026-02-01')].max()), 2)
+        assert history[-1].over_declared_times == sum(
+            r.is_over_declared for r in rows if r.timestamp.month == 2
+        )
+
+    def test_ingest_collection_cycles(self, async_db):
+        """测试采集周期按计量点汇总的功率增量写入15分钟需量，电价时段按各时段取值"""
+        start = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=7, minutes=45)
+
+        async def scenario(session):
+            meter = MeterPoint(meter_code="M001", meter_name="总进线", declared_demand=600.0)
+            session.add(meter)
+            await session.flush()
+            panel = DistributionPanel(panel_code="P1", panel_name="主柜", panel_type="main", meter_point_id=meter.id)
+            session.add(panel)
+            await session.flush()
+            circuit = DistributionCircuit(circuit_code="C1", circuit_name="回路1", panel_id=panel.id)
+            session.add(circuit)
+            await session.flush()
+            session.add_all([
+                PowerDevice(device_code="D1", device_name="空调", device_type="HVAC",
+                            circuit_id=circuit.id, power_point_id=11),
+                PowerDevice(device_code="D2", device_name="服务器", device_type="IT_SERVER",
+                            circuit_id=circuit.id, power_point_id=12),
+            ])
+            await session.commit()
+
+            registry = DispatchRegistry()
+            engine = DemandEngine(session)
+            for minute in range(31):
+                totals = await registry.meter_totals(session, {11: 120.0, 12: 80.0, 99: 1000.0})
+                for meter_point_id, power in totals.items():
+                    await engine.ingest(meter_point_id, start + timedelta(minutes=minute), power)
+            await session.commit()
+            return (await session.execute(
+                select(Demand15MinData).order_by(Demand15MinData.timestamp)
+            )).scalars().all()
+
+        DemandEngine.reset_streams()
+        invalidate_tariff_cache()
+        try:
+            rows = async_db.run(scenario)
+        finally:
+            DemandEngine.reset_streams()
+            invalidate_tariff_cache()
+
+        assert [r.timestamp for r in rows] == [start, start + timedelta(minutes=15)]
+        assert all(r.average_power == 200.0 for r in rows)
+        assert [r.time_period for r in rows] == [get_cached_tariff().period_at(r.timestamp) for r in rows]
+        assert rows[0].time_period != rows[1].time_period
@@ -0,0 +1,92 @@
+"""
+测试启发式调度求解器
+"""
+from datetime import datetime
+
+import numpy as np
+
+from app.services.dispatch_heuristic import HeuristicDispatcher
+from app.services.forecasting import generate_demo_forecast
+from app.services.optimizer import (
+    DeviceType,
+    DispatchableDevice,
+    MILPOptimizer,
+    PricingConfig,
+    StorageConfig,
+    net_load_from_result,
+)
+
+LOAD = [f['predicted_power'] for f in generate_demo_forecast(datetime(2026, 3, 1))['forecasts']]
+STORAGE = StorageConfig(capacity=800.0, max_charge_power=200.0, max_discharge_power=200.0)
+
+
+def _devices():
+    return [
+        DispatchableDevice(1, '空压机', DeviceType.SHIFTABLE, rated_power=30.0, run_duration=1.5,
+                           allowed_periods=list(range(0, 20)), forbidden_periods=[2, 3]),
+        DispatchableDevice(2, '照明', DeviceType.CURTAILABLE, rated_power=40.0,
+                           curtail_ratio=0.5, max_curtail_duration=2.0, forbidden_periods=[12]),
+        DispatchableDevice(3, '空调', DeviceType.MODULATING, rated_power=60.0,
+                           min_power=30.0, max_power=90.0, allowed_periods=list(range(6, 24))),
+    ]
+
+
+def _month_cost(optimizer, result):
+    net = np.asarray(net_load_from_result(LOAD, result))
+    energy = (net * np.asarray(optimizer.slot_prices)).sum() * optimizer.slot_duration
+    cycle = sum(s['charge_power'] + s['discharge_power'] for s in result['storage_schedule']) \
+        * optimizer.slot_duration * STORAGE.cycle_cost
+    return energy + cycle + net.max() * optimizer.pricing.demand_price
+
+
+class TestHeuristicDispatcher:
+    """HeuristicDispatcher 测试类"""
+
+    def test_device_constraints(self):
+        """测试各类设备的允许/禁止时段、运行时长、削减预算和调节电量守恒"""
+        optimizer = MILPOptimizer(PricingConfig(), STORAGE, _devices(), solver='heuristic')
+        result = optimizer.optimize(LOAD, 2000.0)
+
+        assert result['solve_status'] == 'Heuristic'
+        assert result['solve_stats']['solver'] == 'heuristic'
+        shift, curtail, modulate = result['schedule']
+        hours = {a['hour'] for a in shift['actions']}
+        assert len(shift['actions']) == 6
+        assert hours <= set(range(0, 20)) - {2, 3}
+        assert 12 not in {a['hour'] for a in curtail['actions']}
+        assert sum(a['curtail_ratio'] for a in curtail['actions']) <= 0.5 * 2.0 * 4 + 1e-6
+        assert {a['hour'] for a in modulate['actions']} <= set(range(6, 24))
+        assert abs(sum(a['power_delta'] for a in modulate['actions'])) < 0.1
+        assert all(30.0 <= a['power'] <= 90.0 for a in modulate['actions'])
+
+        socs = [s['soc'] for s in result['storage_schedule']]
+        assert min(socs) >= STORAGE.min_soc - 1e-6 and max(socs) <= STORAGE.max_soc + 1e-6
+        assert all(s['charge_power'] <= 200.0 + 1e-6 and s['discharge_power'] <= 200.0 + 1e-6
+                   for s in result['storage_schedule'])
+        assert not any(s['charge_power'] > 0 and s['discharge_power'] > 0 for s in result['storage_schedule'])
+
+    def test_close_to_milp(self):
+        """测试启发式结果与MILP最优解的差距在5%以内"""
+        heuristic = MILPOptimizer(PricingConfig(), STORAGE, _devices(), solver='heuristic')
+        milp = MILPOptimizer(PricingConfig(), STORAGE, _devices(), solver='milp')
+
+        h_cost = _month_cost(heuristic, heuristic.optimize(LOAD, 2000.0))
+        m_cost = _month_cost(milp, milp.optimize(LOAD, 2000.0))
+        baseline = milp._calculate_baseline_cost(LOAD, 2000.0)
+
+        assert m_cost <= h_cost <= m_cost * 1.05
+        assert h_cost < baseline
+
+    def test_large_fleet_selects_heuristic(self):
+        """测试大规模设备按时间预算自动选择启发式，且毫秒级完成"""
+        devices = [
+            DispatchableDevice(i, f'设备{i}', DeviceType.SHIFTABLE, rated_power=5.0 + i % 7, run_duration=1.0)
+            for i in range(300)
+        ]
+        optimizer = MILPOptimizer(PricingConfig(), STORAGE, devices, time_limit=10)
+
+        assert optimizer.select_solver() == 'heuristic'
+        plan = HeuristicDispatcher(optimizer.slot_prices, 40.0, STORAGE, devices).solve(LOAD)
+        assert all(on.sum() == 4 for on in plan.shift_on.values())
+        assert plan.solve_time < 1.0
+        assert MILPOptimizer(PricingConfig(), STORAGE, devices[:5], time_limit=10).select_solver() == 'milp'
@@ -4,9 +4,39 @@
 import pytest
 from decimal import Decimal
 from datetime import date, datetime, timedelta
+
+from app.models.energy import (
+    DemandHistory, DeviceShiftConfig, ElectricityPricing, EnergyDaily, EnergyMonthly, MeterPoint, PowerDevice
+)
 from app.services.formula_calculator import FormulaCalculator
 
 
+async def _seed(session):
+    devices = [
+        PowerDevice(device_code="AC-01", device_name="空调1", device_type="HVAC", rated_power=200, efficiency=88),
+        PowerDevice(device_code="AC-02", device_name="空调2", device_type="HVAC", rated_power=100, efficiency=90),
+        PowerDevice(device_code="P-01", device_name="水泵1", device_type="PUMP", rated_power=50),
+    ]
+    meter = MeterPoint(meter_code="M001", meter_name="总进线", declared_demand=1000)
+    session.add_all(devices + [meter])
+    await session.flush()
+    session.add_all([
+        DeviceShiftConfig(device_id=devices[0].id, is_shiftable=True, shiftable_power_ratio=0.5, shift_notice_time=3),
+        DeviceShiftConfig(device_id=devices[1].id, is_shiftable=True, shiftable_power_ratio=0.4, shift_notice_time=10),
+        DeviceShiftConfig(device_id=devices[2].id, is_shiftable=True, shiftable_power_ratio=0.2, shift_notice_time=60),
+        EnergyMonthly(device_id=devices[0].id, stat_year=2026, stat_month=1, total_energy=40000),
+        EnergyMonthly(device_id=devices[1].id, stat_year=2026, stat_month=2, total_energy=47600),
+        DemandHistory(meter_point_id=meter.id, stat_year=2026, stat_month=1, max_demand=900),
+        DemandHistory(meter_point_id=meter.id, stat_year=2026, stat_month=2, max_demand=950),
+        ElectricityPricing(pricing_name="峰", period_type="peak", start_time="08:00", end_time="11:00",
+                           price=0.95, effective_date=date(2026, 1, 1)),
+    ])
+    for offset in range(10):
+        session.add(EnergyDaily(device_id=devices[0].id, stat_date=date(2026, 3, 1) + timedelta(days=offset),
+                                total_energy=1000, peak_energy=400, normal_energy=350, valley_energy=250))
+    await session.commit()
+
+
 class TestFormulaCalculator:
     """FormulaCalculator 测试类"""
 
@@ -235,3 +265,73 @@ class TestFormulaCalculatorIntegration:
         # 验证数据类型
         assert isinstance(result["当前能效"], Decimal)
         assert isinstance(result["投资回收期"], Decimal)
+
+
+class TestFormulaCalculatorMemo:
+    """FormulaCalculator 请求级记忆化测试"""
+
+    def test_prefetch_and_memo_dedupe_queries(self, async_db):
+        """测试预取后常用指标不再查询，同一会话内的计算器共享缓存"""
+
+        async def run(session):
+            await _seed(session)
+            calc = FormulaCalculator(session)
+            async_db.statements.clear()
+            await calc.prefetch(2026, date(2026, 3, 1), date(2026, 3, 10))
+            prefetch_queries = len(async_db.statements)
+
+            async_db.statements.clear()
+            results = {
+                "annual": await calc.calc_annual_energy(2026),
+                "average": await calc.calc_average_load(2026),
+                "max": await calc.calc_max_demand(2026),
+                "max_feb": await calc.calc_max_demand(2026, 2),
+                "max_mar": await calc.calc_max_demand(2026, 3),
+                "peak_valley": await calc.calc_peak_valley_data(date(2026, 3, 1), date(2026, 3, 10)),
+                "peak_price": await calc._get_electricity_price("peak"),
+                "valley_price": await calc._get_electricity_price("valley"),
+            }
+            after_prefetch = len(async_db.statements)
+
+            async_db.statements.clear()
+            other = FormulaCalculator(session)
+            results["shiftable"] = await other.calc_shiftable_load()
+            results["vpp"] = await other.calc_vpp_response_potential()
+            results["potential"] = await other.calc_equipment_optimization_potential("HVAC")
+            results["benchmark"] = await calc.calc_equipment_efficiency_benchmark("HVAC")
+            results["missing"] = await calc.calc_equipment_efficiency_benchmark("UPS")
+            shared_queries = len(async_db.statements)
+
+            calc.clear_cache()
+            async_db.statements.clear()
+            await other.calc_annual_energy(2026)
+            return prefetch_queries, after_prefetch, shared_queries, len(async_db.statements), results
+
+        prefetch_queries, after_prefetch, shared_queries, after_clear, results = async_db.run(run)
+
+        assert prefetch_queries == 4
+        assert after_prefetch == 0
+        # 可转移/VPP分级共用一条查询，设备类型统计共用一条查询
+        assert shared_queries == 2
+        assert after_clear == 1
+
+        assert results["annual"] == Decimal("87600.0")
+        assert results["average"] == Decimal("10.00")
+        assert results["max"] == Decimal("950.0")
+        assert results["max_feb"] == Decimal("950.0")
+        assert results["max_mar"] == Decimal("0")
+        assert results["peak_valley"]["总电量"] == Decimal("10000.0")
+        assert results["peak_valley"]["尖峰电量"] == Decimal("1200.00")
+        assert results["peak_valley"]["平段占比"] == Decimal("35.00")
+        assert results["peak_price"] == Decimal("0.95")
+        assert results["valley_price"] == Decimal("0.111")
+
+        assert results["shiftable"] == Decimal("150.0")
+        assert results["vpp"]["Ⅰ级资源"]["容量"] == Decimal("100.00")
+        assert results["vpp"]["Ⅱ级资源"]["容量"] == Decimal("40.00")
+        assert results["vpp"]["Ⅲ级资源"]["容量"] == Decimal("0.00")
+        assert results["potential"]["当前功率"] == Decimal("105.00")
+        assert results["benchmark"]["当前能效"] == Decimal("89.00")
+        assert results["benchmark"]["改造投资"] == Decimal("9.00")
+        assert results["missing"]["当前能效"] == Decimal("90.00")
+        assert results["missing"]["改造投资"] == Decimal("0.00")
@@ -0,0 +1,141 @@
+"""
+测试数据驱动负荷预测引擎
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.energy import Demand15MinData, LoadForecastModel, MeterPoint
+from app.services import load_forecast_engine
+from app.services.load_forecast_engine import LoadForecastEngine, SLOTS_PER_DAY, reset_models
+
+
+def _actual_load(day: date, scale: float) -> np.ndarray:
+    """合成负荷: 日内双峰、周末降低、周一上午偏低、随日期缓慢增长，叠加固定种子噪声"""
+    hours = np.arange(SLOTS_PER_DAY) / 4
+    shape = 0.5 + 0.3 * np.exp(-((hours - 10) / 2.5) ** 2) + 0.3 * np.exp(-((hours - 16) / 2.5) ** 2)
+    weekday = np.full(SLOTS_PER_DAY, 0.6 if day.weekday() >= 5 else 1.0)
+    if day.weekday() == 0:
+        weekday[24:48] = 0.8
+    trend = 1 + 0.002 * (day - date(2026, 1, 1)).days
+    rng = np.random.default_rng(day.toordinal())
+    return scale * shape * weekday * trend * (1 + rng.normal(0, 0.02, SLOTS_PER_DAY))
+
+
+async def _seed(session, first: date, last: date, scales=(800.0, 200.0)) -> list:
+    meters = [
+        MeterPoint(meter_code=f"M{i + 1:03d}", meter_name=f"计量点{i + 1}",
+                   meter_type="main" if i == 0 else "sub")
+        for i in range(len(scales))
+    ]
+    session.add_all(meters)
+    await session.flush()
+
+    day = first
+    while day <= last:
+        start = datetime.combine(day, datetime.min.time())
+        for meter, scale in zip(meters, scales):
+            loads = _actual_load(day, scale)
+            session.add_all([
+                Demand15MinData(meter_point_id=meter.id, timestamp=start + timedelta(minutes=15 * s),
+                                average_power=float(loads[s]))
+                for s in range(SLOTS_PER_DAY)
+            ])
+        day += timedelta(days=1)
+    await session.commit()
+    return [m.id for m in meters]
+
+
+class TestLoadForecastEngine:
+    """负荷预测引擎测试"""
+
+    def setup_method(self):
+        reset_models()
+
+    def test_forecast_tracks_history_and_records_backtest(self, async_db):
+        """测试回归预测贴合历史并记录回测误差 (优于同类日基线)"""
+        end = date(2026, 3, 31)
+
+        async def run(session):
+            ids = await _seed(session, end - timedelta(days=59), end)
+            engine = LoadForecastEngine(session)
+            models = await engine.fit(end_date=end)
+            target = end + timedelta(days=1)
+            forecasts = await engine.forecast(target)
+            rows = (await session.execute(select(LoadForecastModel))).scalars().all()
+            return ids, models, forecasts, rows, target
+
+        ids, models, forecasts, rows, target = async_db.run(run)
+
+        model = models[ids[0]]
+        assert model.method == 'regression'
+        metrics = model.metrics()
+        assert metrics['backtest_days'] > 0
+        assert metrics['mape'] < 5
+        assert metrics['mape'] < metrics['baseline_mape']
+
+        assert set(forecasts) == set(ids)
+        predicted = np.array([f['predicted_power'] for f in forecasts[ids[0]]['forecasts']])
+        actual = _actual_load(target, 800.0)
+        assert np.mean(np.abs(predicted - actual) / actual) < 0.06
+        assert all(f['lower_bound'] <= f['predicted_power'] <= f['upper_bound']
+                   for f in forecasts[ids[0]]['forecasts'])
+
+        assert {row.meter_point_id for row in rows} == set(ids)
+        assert all(row.mape is not None and len(row.coefficients) == SLOTS_PER_DAY for row in rows)
+
+    def test_incremental_refit_only_reads_new_days(self, async_db):
+        """测试增量更新只处理上次拟合之后的新数据"""
+        end = date(2026, 3, 31)
+
+        async def run(session):
+            await _seed(session, end - timedelta(days=29), end)
+            engine = LoadForecastEngine(session)
+            await engine.fit(end_date=end - timedelta(days=5))
+            first = {k: m.trained_days for k, m in load_forecast_engine._models.items()}
+
+            calls = []
+            original = engine._load_history
+
+            async def spy(meter_ids, start, last):
+                calls.append((start, last))
+                return await original(meter_ids, start, last)
+
+            engine._load_history = spy
+            models = await engine.fit(end_date=end)
+            await engine.fit(end_date=end)
+            return first, models, calls
+
+        first, models, calls = async_db.run(run)
+
+        assert calls == [(end - timedelta(days=4), end)]
+        for meter_id, model in models.items():
+            assert model.trained_until == end
+            assert model.trained_days == first[meter_id] + 5
+
+    def test_forecast_total_and_pattern_fallback(self, async_db):
+        """测试总进线合计预测，无历史数据时退回典型负荷模式"""
+        from app.services.forecasting import get_load_forecast
+
+        end = date.today() - timedelta(days=1)
+
+        async def empty(session):
+            return await get_load_forecast(session, datetime.now() + timedelta(days=1))
+
+        fallback = async_db.run(empty)
+        assert fallback['method'] == 'pattern'
+        assert len(fallback['forecasts']) == SLOTS_PER_DAY
+
+        reset_models()
+
+        async def seeded(session):
+            await _seed(session, end - timedelta(days=29), end)
+            return await get_load_forecast(session, datetime.combine(end + timedelta(days=2), datetime.min.time()))
+
+        total = async_db.run(seeded)
+        assert total['method'] == 'data_driven'
+        # 只合计总进线计量点
+        assert [m['meter_point_id'] for m in total['meters']] == [1]
+        actual_peak = _actual_load(end + timedelta(days=2), 800.0).max()
+        assert abs(total['statistics']['max_power'] - actual_peak) / actual_peak < 0.1
@@ -0,0 +1,141 @@
+"""
+测试典型日负荷曲线物化服务
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from app.models.energy import Demand15MinData, LoadProfileDay
+from app.services.load_profile_service import (
+    LoadProfileService,
+    DayMatrix,
+    SLOTS_PER_DAY,
+    SUBJECT_METER,
+    slot_of,
+    season_of,
+    day_type_of,
+)
+
+
+class TestProfileHelpers:
+    """时段/日类型/季节工具函数测试"""
+
+    def test_slot_day_type_and_season(self):
+        """测试时段、日类型与季节划分"""
+        assert slot_of(datetime(2026, 1, 5, 0, 0)) == 0
+        assert slot_of(datetime(2026, 1, 5, 23, 59)) == 95
+        assert day_type_of(date(2026, 1, 3)) == "weekend"
+        assert day_type_of(date(2026, 1, 5)) == "weekday"
+        assert season_of(date(2026, 4, 1)) == "spring"
+        assert season_of(date(2026, 7, 1)) == "summer"
+        assert season_of(date(2026, 10, 1)) == "autumn"
+        assert season_of(date(2026, 12, 1)) == "winter"
+
+    def test_slot_stats_ignores_missing_days(self):
+        """测试跨天统计忽略缺失数据"""
+        avg = np.full((3, SLOTS_PER_DAY), np.nan)
+        avg[0, :] = 100.0
+        avg[1, :] = 200.0
+        matrix = DayMatrix(
+            dates=[date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 10)],
+            avg=avg, max=avg.copy(), min=avg.copy()
+        )
+
+        assert matrix.days_with_data == 2
+        stats = matrix.slot_stats()
+        assert stats["count"][0] == 2
+        assert stats["mean"][0] == 150.0
+        assert stats["max"][0] == 200.0
+        assert stats["min"][0] == 100.0
+        assert matrix.filter(day_type="weekend").days_with_data == 0
+
+
+class TestLoadProfileService:
+    """LoadProfileService 物化测试"""
+
+    def test_materialize_and_typical_profile(self, async_db):
+        """测试从15分钟需量数据物化日曲线并汇总典型日"""
+        day = date.today() - timedelta(days=2)
+        start = datetime.combine(day, datetime.min.time())
+
+        async def scenario(session):
+            for slot in range(SLOTS_PER_DAY):
+                session.add(Demand15MinData(
+                    meter_point_id=1,
+                    timestamp=start + timedelta(minutes=15 * slot),
+                    average_power=float(slot),
+                    rolling_demand=float(slot)
+                ))
+            await session.commit()
+
+            service = LoadProfileService(session)
+            matrix = await service.get_day_matrix(SUBJECT_METER, 1, day, day)
+            profile = await service.get_typical_profile(SUBJECT_METER, 1)
+            rows = (await session.execute(LoadProfileDay.__table__.select())).all()
+            return matrix, profile, rows
+
+        matrix, profile, rows = async_db.run(scenario)
+
+        assert matrix.days_with_data == 1
+        assert matrix.avg[0, 10] == 10.0
+        assert len(rows) == 1 and rows[0].is_complete
+        assert profile["sample_days"] == 1
+        assert profile["mean"][95] == 95.0
+
+    def test_ingest_updates_single_slot(self, async_db):
+        """测试增量写入只更新对应时段"""
+        ts = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=8)
+
+        async def scenario(session):
+            service = LoadProfileService(session)
+            await service.ingest(SUBJECT_METER, 7, ts, 100.0)
+            row = await service.ingest(SUBJECT_METER, 7, ts + timedelta(minutes=5), 300.0)
+            await session.commit()
+            return row
+
+        row = async_db.run(scenario)
+
+        slot = slot_of(ts)
+        assert row.slot_count[slot] == 2
+        assert row.slot_avg[slot] == 200.0
+        assert row.slot_max[slot] == 300.0
+        assert row.slot_min[slot] == 100.0
+        assert row.slot_avg[slot + 1] is None
+
+    def test_empty_days_stay_incomplete_and_caller_owns_commit(self, async_db):
+        """测试无数据的已结束日期不标记完成，回填后重新补齐；查询不提交调用方事务"""
+        day = date.today() - timedelta(days=3)
+        empty = day + timedelta(days=1)
+
+        def demand(d: date, slot: int, value: float) -> Demand15MinData:
+            return Demand15MinData(
+                meter_point_id=1,
+                timestamp=datetime.combine(d, datetime.min.time()) + timedelta(minutes=15 * slot),
+                average_power=value,
+                rolling_demand=value
+            )
+
+        async def scenario(session):
+            session.add(demand(day, 0, 100.0))
+            await session.commit()
+            service = LoadProfileService(session)
+
+            await service.get_day_matrix(SUBJECT_METER, 1, day, empty)
+            await session.rollback()
+            discarded = (await session.execute(LoadProfileDay.__table__.select())).all()
+
+            await service.get_day_matrix(SUBJECT_METER, 1, day, empty)
+            await session.commit()
+            rows = (await session.execute(LoadProfileDay.__table__.select())).all()
+
+            session.add(demand(empty, 4, 50.0))
+            await session.commit()
+            matrix = await service.get_day_matrix(SUBJECT_METER, 1, day, empty)
+            return discarded, {r.profile_date: r.is_complete for r in rows}, matrix
+
+        discarded, complete, matrix = async_db.run(scenario)
+
+        assert discarded == []
+        assert complete == {day: True, empty: False}
+        assert matrix.days_with_data == 2
+        assert matrix.avg[1, 4] == 50.0
@@ -0,0 +1,79 @@
+"""
+测试日志写入管道
+"""
+import csv
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.models.log import OperationLog, SystemLog
+from app.services.log_pipeline import LogPipeline, purge_logs, stream_logs_csv
+
+
+class TestLogPipeline:
+    """日志管道测试"""
+
+    def test_batched_write_and_ring_buffer(self, async_db):
+        """测试日志批量写入，每张表一条 INSERT；缓冲区满时丢弃最旧的日志"""
+
+        async def run(session_factory):
+            pipeline = LogPipeline(buffer_size=1000, session_factory=session_factory)
+            for i in range(1200):
+                pipeline.record_operation(user_id=1, username="admin", module="realtime",
+                                          action="control", target_id=i)
+            pipeline.record_system("ERROR", "采集超时", module="collector")
+            pending = pipeline.pending
+
+            async_db.statements.clear()
+            written = await pipeline.flush()
+            inserts = [s for s in async_db.statements if s.lstrip().upper().startswith("INSERT")]
+            async with session_factory() as db:
+                first_target = (await db.execute(select(func.min(OperationLog.target_id)))).scalar()
+                system_count = (await db.execute(select(func.count(SystemLog.id)))).scalar()
+            return pipeline, pending, written, inserts, first_target, system_count
+
+        pipeline, pending, written, inserts, first_target, system_count = async_db.run_with_factory(run)
+
+        assert pending == 1000
+        assert pipeline.dropped == 201
+        assert written == pipeline.written == 1000
+        assert len(inserts) == 2
+        # 保留最新的日志
+        assert first_target == 201
+        assert system_count == 1
+        assert pipeline.pending == 0
+
+    def test_purge_and_streaming_export(self, async_db):
+        """测试按天分段清理过期日志，导出按批流式输出"""
+        now = datetime(2026, 10, 19, 10)
+
+        async def run(session_factory):
+            pipeline = LogPipeline(session_factory=session_factory)
+            for day in range(10):
+                for i in range(3):
+                    pipeline.record_operation(module="point", action="import", target_name=f"d{day}-{i}",
+                                              created_at=now - timedelta(days=day, hours=i))
+            await pipeline.flush()
+
+            async with session_factory() as db:
+                deleted = await purge_logs(db, retention_days=5, now=now)
+                remaining = (await db.execute(select(func.count(OperationLog.id)))).scalar()
+
+            chunks = [chunk async for chunk in stream_logs_csv(
+                "operation", now - timedelta(days=30), now, session_factory=session_factory
+            )]
+            return deleted, remaining, chunks
+
+        deleted, remaining, chunks = async_db.run_with_factory(run)
+
+        # 保留 10月14日 0点之后的日志 (第0-5天，其中第5天的3条均在0点之后)
+        assert deleted == {"operation": 12, "system": 0, "communication": 0}
+        assert remaining == 18
+
+        content = b"".join(chunks)
+        assert content.startswith(b"\xef\xbb\xbf")
+        rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+        assert rows[0] == ["时间", "用户", "模块", "操作", "目标", "IP地址", "备注"]
+        assert len(rows) == 19
+        assert rows[1][4] == "d0-0"
@@ -0,0 +1,84 @@
+"""
+测试日前优化求解服务
+"""
+import asyncio
+from datetime import datetime
+
+from app.services import optimizer
+from app.services.forecasting import generate_demo_forecast
+from app.services.optimization_service import OptimizationService
+
+PRICING = {'demand_price': 40.0, 'declared_demand': 800.0}
+STORAGE = {
+    'capacity': 500.0,
+    'max_charge_power': 100.0,
+    'max_discharge_power': 100.0,
+    'initial_soc': 0.5,
+}
+
+
+class TestOptimizationService:
+    """OptimizationService 测试类"""
+
+    def test_memo_warm_start_and_model_reuse(self):
+        """测试结果缓存、热启动和模型结构复用"""
+        optimizer._model_cache.clear()
+        service = OptimizationService(use_processes=False)
+        day1 = generate_demo_forecast(datetime(2026, 3, 1))
+        day2 = generate_demo_forecast(datetime(2026, 3, 2))
+
+        async def scenario():
+            try:
+                first = await service.run_day_ahead(day1, PRICING, STORAGE)
+                again = await service.run_day_ahead(day1, PRICING, STORAGE)
+                second = await service.run_day_ahead(day2, PRICING, STORAGE)
+                return first, again, second
+            finally:
+                service.shutdown()
+
+        first, again, second = asyncio.run(scenario())
+
+        assert first['status'] == 'success' and first['cached'] is False
+        assert first['solve_stats']['warm_started'] is False
+        assert again['cached'] is True
+        assert again['input_hash'] == first['input_hash']
+        assert again['schedule'] == first['schedule']
+        # 第二天复用同一模型结构，并以前一天的解热启动
+        assert second['cached'] is False
+        assert second['solve_stats']['model_reused'] is True
+        assert second['solve_stats']['warm_started'] is True
+        assert '_solution' not in second
+        assert service.stats()['hits'] == 1
+        assert service.stats()['misses'] == 2
+
+    def test_rolling_horizon_carries_soc_and_peak(self):
+        """测试滚动优化传递SOC和月最大需量，且时移设备在粗时段可行"""
+        forecasts = [generate_demo_forecast(datetime(2026, 3, d)) for d in (1, 2, 3)]
+        devices = [{'id': 1, 'name': '冷水机组', 'device_type': 'shiftable',
+                    'rated_power': 50.0, 'run_duration': 1.5, 'forbidden_periods': [10, 11]}]
+
+        result = optimizer.run_rolling_horizon_optimization(
+            forecasts, PRICING, STORAGE, devices=devices,
+            demand_target=1000.0, horizon_days=2, month_peak=500.0
+        )
+
+        days = result['days']
+        assert [d['window_days'] for d in days] == [2, 2, 1]
+        assert all(d['solve_status'] == 'Optimal' for d in days)
+        assert days[0]['soc_start'] == STORAGE['initial_soc']
+        for prev, cur in zip(days, days[1:]):
+            assert cur['soc_start'] == prev['soc_end']
+            assert cur['month_peak'] >= prev['month_peak'] >= 500.0
+        assert result['month_peak'] == max(d['max_demand'] for d in days)
+        assert days[1]['solve_stats']['warm_started'] is True
+        for day in days:
+            actions = day['schedule'][0]['actions']
+            assert len(actions) == 6
+            assert not {a['hour'] for a in actions} & {10, 11}
+        assert days[0]['forecast_date'] == forecasts[0]['date']
+
+    def test_forecast_is_repeatable(self):
+        """测试同一日期的演示预测可复现，保证输入哈希命中"""
+        a = generate_demo_forecast(datetime(2026, 3, 1))
+        b = generate_demo_forecast(datetime(2026, 3, 1))
+        assert [f['predicted_power'] for f in a['forecasts']] == [f['predicted_power'] for f in b['forecasts']]
@@ -0,0 +1,155 @@
+"""
+测试分析插件调度器
+"""
+import asyncio
+import time
+from typing import List
+
+import pytest
+
+from app.services.analysis_plugins.base import (
+    AnalysisPlugin,
+    AnalysisContext,
+    SuggestionResult,
+    PluginConfig,
+    SuggestionType
+)
+from app.services.analysis_plugins.manager import PluginManager
+from app.services.analysis_plugins.scheduler import PluginScheduler, PluginRunStatus
+
+
+class _SleepPlugin(AnalysisPlugin):
+    """按配置休眠后返回一条建议的测试插件"""
+
+    def __init__(self, plugin_id: str, delay: float = 0.0, order: int = 100,
+                 depends_on: List[str] = None, timeout: float = 30.0,
+                 cpu_bound: bool = False, fail: bool = False,
+                 needs_power_curve: bool = False):
+        self._id = plugin_id
+        self._delay = delay
+        self._fail = fail
+        super().__init__(PluginConfig(
+            plugin_id=plugin_id,
+            name=plugin_id,
+            execution_order=order,
+            min_data_days=0,
+            depends_on=depends_on or [],
+            timeout_seconds=timeout,
+            cpu_bound=cpu_bound,
+            needs_power_curve=needs_power_curve
+        ))
+
+    @property
+    def plugin_id(self) -> str:
+        return self._id
+
+    @property
+    def plugin_name(self) -> str:
+        return self._id
+
+    @property
+    def plugin_description(self) -> str:
+        return "test"
+
+    @property
+    def suggestion_type(self) -> SuggestionType:
+        return SuggestionType.PEAK_VALLEY
+
+    def get_default_config(self) -> PluginConfig:
+        return PluginConfig(plugin_id=self._id, name=self._id)
+
+    async def analyze(self, context: AnalysisContext) -> List[SuggestionResult]:
+        if self.config.cpu_bound:
+            time.sleep(self._delay)
+        else:
+            await asyncio.sleep(self._delay)
+        if self._fail:
+            raise RuntimeError("boom")
+        return [self.create_suggestion(self._id, "", "", 0, 0, 1)]
+
+
+class TestPluginScheduler:
+    """PluginScheduler 测试类"""
+
+    def test_independent_plugins_run_concurrently(self):
+        """测试独立插件并发执行"""
+        plugins = [_SleepPlugin(f"p{i}", delay=0.2, order=i) for i in range(4)]
+        report = asyncio.run(PluginScheduler().run(plugins, AnalysisContext()))
+
+        assert report.is_complete
+        assert [r.title for r in report.results] == ["p0", "p1", "p2", "p3"]
+        assert report.total_elapsed_ms < 600
+
+    def test_dependency_order_and_results_shared(self):
+        """测试依赖插件在上游完成后执行，并可读取上游结果"""
+        context = AnalysisContext()
+        upstream = _SleepPlugin("up", delay=0.05, order=10)
+        downstream = _SleepPlugin("down", order=20, depends_on=["up"])
+        report = asyncio.run(PluginScheduler().run([downstream, upstream], context))
+
+        up, down = report.executions["up"], report.executions["down"]
+        assert down.started_at >= up.started_at
+        assert "up" in context.extra_params["plugin_results"]
+        assert down.status == PluginRunStatus.SUCCESS
+
+    def test_timeout_returns_partial_results(self):
+        """测试单插件超时返回部分结果，下游被跳过"""
+        plugins = [
+            _SleepPlugin("fast", order=10),
+            _SleepPlugin("slow", delay=1.0, order=20, timeout=0.1),
+            _SleepPlugin("after_slow", order=30, depends_on=["slow"]),
+            _SleepPlugin("broken", order=40, fail=True),
+        ]
+        report = asyncio.run(PluginScheduler().run(plugins, AnalysisContext()))
+
+        assert report.executions["fast"].status == PluginRunStatus.SUCCESS
+        assert report.executions["slow"].status == PluginRunStatus.TIMEOUT
+        assert report.executions["after_slow"].status == PluginRunStatus.SKIPPED
+        assert report.executions["broken"].status == PluginRunStatus.FAILED
+        assert [r.title for r in report.results] == ["fast"]
+        assert not report.is_complete
+
+    def test_cpu_bound_plugins_use_thread_pool(self):
+        """测试CPU密集型插件在线程池中执行且受总时限约束"""
+        plugins = [
+            _SleepPlugin("cpu", delay=0.05, cpu_bound=True),
+            _SleepPlugin("long", delay=5.0, timeout=0),
+        ]
+        scheduler = PluginScheduler(max_workers=2)
+        report = asyncio.run(scheduler.run(plugins, AnalysisContext(), total_timeout=0.3))
+        scheduler.shutdown()
+
+        assert report.executions["cpu"].status == PluginRunStatus.SUCCESS
+        assert report.executions["long"].status == PluginRunStatus.CANCELLED
+
+    def test_cycle_detection(self):
+        """测试循环依赖检测"""
+        plugins = [
+            _SleepPlugin("a", depends_on=["b"]),
+            _SleepPlugin("b", depends_on=["a"]),
+        ]
+        with pytest.raises(ValueError):
+            PluginScheduler.build_graph(plugins)
+
+    def test_power_curve_loaded_only_when_declared(self, async_db):
+        """测试仅在所选插件声明 needs_power_curve 时查询功率曲线"""
+        manager = PluginManager()
+        plugins = [_SleepPlugin("plain"), _SleepPlugin("curve", needs_power_curve=True)]
+
+        async def run(session):
+            queried = {}
+            for plugin_id in ("plain", "curve"):
+                async_db.statements.clear()
+                await manager.run_analysis_with_report(session, [plugin_id], save_results=False)
+                queried[plugin_id] = any("power_curve_data" in s for s in async_db.statements)
+            return queried
+
+        for plugin in plugins:
+            manager.register_plugin(plugin)
+        try:
+            queried = async_db.run(run)
+        finally:
+            for plugin in plugins:
+                manager._plugins.pop(plugin.plugin_id, None)
+
+        assert queried == {"plain": False, "curve": True}
@@ -0,0 +1,85 @@
+"""
+测试点位批量导入
+"""
+import io
+import time
+
+from sqlalchemy import func, select
+
+from app.models.point import Point, PointRealtime
+from app.services.point_import import ImportFileError, import_points
+
+HEADER = "点位编码,点位名称,点位类型,设备类型,区域,单位,量程下限,量程上限,精度,采集周期,启用\n"
+
+
+async def _counts(session):
+    points = (await session.execute(select(func.count(Point.id)))).scalar()
+    realtime = (await session.execute(select(func.count(PointRealtime.point_id)))).scalar()
+    return points, realtime
+
+
+class TestPointImport:
+    """点位导入测试"""
+
+    def test_row_diagnostics_and_license(self, async_db):
+        """测试逐行校验诊断、重复编码、授权上限，有效行与实时值记录一并写入"""
+        content = HEADER + "\n".join([
+            "P1,温度1,AI,TH,A1,℃,0,100,1,10,是",
+            "P2,,AI,TH,A1,℃,,,,,",                  # 名称为空
+            "P3,湿度,XX,TH,A1,%,,,,,",               # 无效类型
+            "P4,电压,AI,UPS,A1,V,abc,,,,",           # 数值格式错误
+            "P5,电流,AI,UPS,A1,A,10,5,,,",           # 量程倒置
+            "OLD,旧点位,AI,TH,A1,,,,,,",             # 已存在
+            "P1,温度1重复,AI,TH,A1,,,,,,",           # 文件内重复
+            "P6,门禁,DI,DOOR,,,,,,,否",
+            "P7,烟感,DI,SMOKE,B1,,,,,,",             # 超出授权
+        ]) + "\n"
+
+        async def run(session):
+            session.add(Point(point_code="OLD", point_name="旧点位", point_type="AI"))
+            await session.commit()
+            result = await import_points(session, io.BytesIO(content.encode("gbk")), max_points=3, chunk_size=4)
+            imported = (await session.execute(select(Point).where(Point.point_code == "P6"))).scalar_one()
+            return result.to_dict(), await _counts(session), imported
+
+        result, counts, imported = async_db.run(run)
+
+        assert (result["success_count"], result["error_count"]) == (2, 7)
+        assert [(d["row"], d["point_code"]) for d in result["diagnostics"]] == [
+            (3, "P2"), (4, "P3"), (5, "P4"), (6, "P5"), (7, "OLD"), (8, "P1"), (10, "P7")
+        ]
+        assert result["diagnostics"][1]["error"] == "无效的点位类型: XX"
+        assert result["diagnostics"][5]["error"] == "点位编码与第 2 行重复"
+        assert result["diagnostics"][6]["error"] == "超出授权点位数 3"
+        assert result["errors"][0] == "行 3: 点位名称不能为空"
+        assert counts == (3, 2)
+        assert (imported.area_code, imported.is_enabled, imported.precision) == ("A1", False, 2)
+
+    def test_large_import(self, async_db):
+        """测试 10 万点位导入在数秒内完成"""
+        content = HEADER + "".join(f"P{i:06d},点位{i},AI,TH,A1,℃,0,100,1,10,是\n" for i in range(100000))
+
+        async def run(session):
+            started = time.perf_counter()
+            result = await import_points(session, io.BytesIO(("\ufeff" + content).encode("utf-8")),
+                                         max_points=200000)
+            elapsed = time.perf_counter() - started
+            return result, elapsed, await _counts(session)
+
+        result, elapsed, counts = async_db.run(run)
+
+        assert result.success_count == 100000
+        assert counts == (100000, 100000)
+        assert elapsed < 15
+
+    def test_undecodable_file(self, async_db):
+        """测试文件中途出现无法解码的内容时报告文件错误"""
+        content = (HEADER + "P1,温度,AI,TH,A1,,,,,,\n").encode("utf-8") + b"P2,\xff\xfe,AI\n" * 40000
+
+        async def run(session):
+            try:
+                await import_points(session, io.BytesIO(content), max_points=100)
+            except ImportFileError as e:
+                return str(e)
+
+        assert "无法解析" in async_db.run(run)
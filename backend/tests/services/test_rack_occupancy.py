@@ -0,0 +1,104 @@
+"""
+测试机柜U位占用索引
+"""
+import random
+
+
+from app.models.asset import Asset, AssetType, Cabinet
+from app.services.rack_occupancy import (
+    free_runs, get_occupancy_index, invalidate_occupancy_index, occupancy_index, u_mask
+)
+
+
+def _asset(code, cabinet_id, u_position, u_height, power=None, weight=None):
+    return Asset(asset_code=code, asset_name=code, asset_type=AssetType.server, cabinet_id=cabinet_id,
+                 u_position=u_position, u_height=u_height, rated_power=power, weight=weight)
+
+
+class TestBitmap:
+    """位图运算测试"""
+
+    def test_free_runs_matches_brute_force(self):
+        """测试连续空闲U位查找与逐位检查一致"""
+        rng = random.Random(3)
+        for _ in range(300):
+            total_u = rng.randint(1, 64)
+            bitmap = 0
+            for _ in range(rng.randint(0, 6)):
+                bitmap |= u_mask(rng.randint(1, total_u), rng.randint(1, 8), total_u)
+            u_height = rng.randint(1, 12)
+
+            runs = free_runs(bitmap, total_u, u_height)
+            expected = [
+                start for start in range(1, total_u - u_height + 2)
+                if not bitmap & u_mask(start, u_height, total_u)
+            ]
+            assert [i + 1 for i in range(64) if runs >> i & 1] == expected
+
+
+class TestRackOccupancyIndex:
+    """占用索引测试"""
+
+    def setup_method(self):
+        invalidate_occupancy_index()
+
+    def test_find_space_and_incremental_updates(self, async_db):
+        """测试按U位/功率/承重查找机柜，增删资产后索引同步"""
+
+        async def run(session):
+            cabinets = [
+                Cabinet(cabinet_code="C1", cabinet_name="机柜1", total_u=42, max_power=10, max_weight=800),
+                Cabinet(cabinet_code="C2", cabinet_name="机柜2", total_u=42, max_power=3.5, max_weight=800),
+                Cabinet(cabinet_code="C3", cabinet_name="机柜3", total_u=42),
+            ]
+            session.add_all(cabinets)
+            await session.flush()
+            c1, c2, c3 = (c.id for c in cabinets)
+            session.add_all([
+                _asset("S1", c1, 1, 20, power=4, weight=300),
+                _asset("S2", c1, 25, 18, power=2, weight=200),
+                _asset("S3", c2, 1, 10, power=1, weight=100),
+                _asset("S4", c3, 1, 2),
+                _asset("S5", c3, 2, 4),           # 与 S4 在 U2 重叠
+            ])
+            await session.commit()
+
+            index = await get_occupancy_index(session)
+            first = index.find_space(4, power_kw=3, weight_kg=100)
+            too_big = index.find_space(5, power_kw=3)
+            conflicts = index.conflicts()
+
+            loads = []
+            original = index.load
+
+            async def spy(db):
+                loads.append(1)
+                await original(db)
+
+            index.load = spy
+
+            # 新增资产后增量更新，机柜1的 U21-24 被占满
+            filler = _asset("S6", c1, 21, 4, power=1, weight=10)
+            session.add(filler)
+            await session.commit()
+            await occupancy_index().apply_asset(session, filler)
+            after = (await get_occupancy_index(session)).find_space(4, power_kw=3, weight_kg=100)
+
+            await session.delete(filler)
+            await session.commit()
+            await occupancy_index().remove_asset(session, filler.id)
+            restored = (await get_occupancy_index(session)).find_space(4, power_kw=3, weight_kg=100)
+            return (c1, c2, c3), first, too_big, conflicts, after, restored, len(loads)
+
+        (c1, c2, c3), first, too_big, conflicts, after, restored, loads = async_db.run(run)
+
+        # 机柜1的 U21-24 恰好放下4U (填满优先)，机柜2功率余量不足
+        assert [(c["cabinet_id"], c["u_position"]) for c in first] == [(c1, 21), (c3, 6)]
+        assert first[0]["power_headroom"] == 4
+        assert [c["cabinet_id"] for c in too_big] == [c3]
+        assert conflicts == [{"cabinet_id": c3, "cabinet_name": "机柜3", "asset_ids": [4, 5]}]
+
+        # 增量维护后数据版本一致，不重新加载
+        assert loads == 0
+        assert [c["cabinet_id"] for c in after] == [c3]
+        assert restored == first
@@ -0,0 +1,104 @@
+"""
+测试实时调度控制器与计量点注册表
+"""
+from datetime import datetime, timedelta
+
+from app.models.energy import MeterPoint, DistributionPanel, DistributionCircuit, PowerDevice
+from app.services.realtime_dispatch import (
+    RealtimeDispatchController,
+    DispatchRegistry,
+    AlertLevel,
+)
+
+
+class TestRealtimeDispatchController:
+    """RealtimeDispatchController 测试类"""
+
+    def test_window_average_evicts_old_readings(self):
+        """测试窗口平均只包含最近15分钟读数"""
+        controller = RealtimeDispatchController(demand_target=1000)
+        start = datetime(2026, 3, 1, 10, 0, 0)
+        for i in range(1200):
+            power = 900.0 if i < 600 else 300.0
+            prediction = controller.add_power_reading(power, start + timedelta(seconds=i))
+
+        readings = controller.power_readings
+        assert len(readings) == 901
+        expected = sum(r.power for r in readings) / len(readings)
+        assert abs(prediction.current_window_avg - round(expected, 2)) < 1e-6
+
+    def test_least_squares_trend(self):
+        """测试最小二乘趋势判断和外推"""
+        start = datetime(2026, 3, 1, 10, 0, 0)
+        rising = RealtimeDispatchController(demand_target=1000)
+        flat = RealtimeDispatchController(demand_target=1000)
+        for i in range(300):
+            ts = start + timedelta(seconds=i)
+            up = rising.add_power_reading(500 + i, ts)
+            steady = flat.add_power_reading(600 + (5 if i % 2 else -5), ts)
+
+        assert up.trend == 'up'
+        assert steady.trend == 'stable'
+        # 上升趋势的预测高于保持当前功率的预测
+        assert up.predicted_window_avg > steady.predicted_window_avg
+
+    def test_alert_level_and_automatic_adjustment(self):
+        """测试超过临界阈值时触发储能放电指令"""
+        commands = []
+        controller = RealtimeDispatchController(demand_target=500, on_command=commands.append)
+        controller.set_storage_status(available_power=100, soc=0.8)
+        start = datetime(2026, 3, 1, 10, 0, 0)
+        for i in range(60):
+            prediction = controller.add_power_reading(520, start + timedelta(seconds=i))
+
+        assert prediction.alert_level == AlertLevel.EXCEEDED
+        assert commands and commands[0].device_name == "储能系统"
+
+
+class TestDispatchRegistry:
+    """DispatchRegistry 测试类"""
+
+    def test_controllers_are_per_meter(self):
+        """测试每个计量点独立维护窗口"""
+        registry = DispatchRegistry()
+        ts = datetime(2026, 3, 1, 10, 0, 0)
+        registry.feed(1, 100.0, ts)
+        registry.feed(2, 900.0, ts)
+
+        assert registry.get(1).last_prediction.current_window_avg == 100.0
+        assert registry.get(2).last_prediction.current_window_avg == 900.0
+        assert set(registry.meter_ids()) == {1, 2}
+
+    def test_ingest_point_values_aggregates_by_meter(self, async_db):
+        """测试采集周期的点位功率按计量点汇总"""
+
+        async def scenario(session):
+            meter = MeterPoint(meter_code="M001", meter_name="总进线", declared_demand=600.0)
+            session.add(meter)
+            await session.flush()
+            panel = DistributionPanel(panel_code="P1", panel_name="主柜", panel_type="main",
+                                      meter_point_id=meter.id)
+            session.add(panel)
+            await session.flush()
+            circuit = DistributionCircuit(circuit_code="C1", circuit_name="回路1", panel_id=panel.id)
+            session.add(circuit)
+            await session.flush()
+            session.add_all([
+                PowerDevice(device_code="D1", device_name="空调", device_type="HVAC",
+                            circuit_id=circuit.id, power_point_id=11),
+                PowerDevice(device_code="D2", device_name="服务器", device_type="IT_SERVER",
+                            circuit_id=circuit.id, power_point_id=12),
+            ])
+            await session.commit()
+
+            registry = DispatchRegistry()
+            result = await registry.ingest_point_values(
+                session, {11: 120.0, 12: 80.0, 99: 1000.0}, datetime(2026, 3, 1, 10, 0)
+            )
+            return meter.id, result, registry
+
+        meter_id, result, registry = async_db.run(scenario)
+
+        assert list(result.keys()) == [meter_id]
+        assert result[meter_id].current_window_avg == 200.0
+        assert registry.get(meter_id).demand_target == 600.0
@@ -0,0 +1,95 @@
+"""
+测试报表后台生成
+"""
+import json
+from datetime import datetime, timedelta
+
+from openpyxl import load_workbook
+
+from app.models.alarm import Alarm
+from app.models.history import PointHistory
+from app.models.point import Point
+from app.models.report import ReportRecord
+from app.services.report_jobs import ReportJobQueue, artifact_path
+
+
+def _with_queue(async_db, fn, report_dir):
+    async def run(session_factory):
+        queue = ReportJobQueue(max_workers=2, report_dir=str(report_dir), session_factory=session_factory)
+        try:
+            async with session_factory() as session:
+                return await fn(session, queue)
+        finally:
+            queue.shutdown()
+
+    return async_db.run_with_factory(run)
+
+
+class TestReportJobs:
+    """报表任务测试"""
+
+    def test_generate_and_render(self, async_db, tmp_path):
+        """测试后台生成报表: 点位统计一次聚合，文件落盘，记录状态完成"""
+        start = datetime(2026, 10, 1)
+
+        async def run(session, queue):
+            points = [Point(point_code=f"P{i}", point_name=f"点位{i}", point_type="AI", unit="kW") for i in range(50)]
+            session.add_all(points)
+            await session.flush()
+            session.add_all([
+                PointHistory(point_id=point.id, value=float(i + j), recorded_at=start + timedelta(hours=j))
+                for i, point in enumerate(points[:40]) for j in range(3)
+            ])
+            session.add(PointHistory(point_id=points[0].id, value=999.0, recorded_at=start - timedelta(days=1)))
+            session.add(Alarm(alarm_no="AL1", point_id=points[0].id, alarm_level="major",
+                              alarm_message="m", created_at=start + timedelta(hours=1)))
+            record = ReportRecord(report_name="custom_20261001_20261002", report_type="custom",
+                                  start_time=start, end_time=start + timedelta(days=1), status="pending")
+            session.add(record)
+            await session.commit()
+
+            async_db.statements.clear()
+            # 倒序并包含不存在的点位
+            queue.submit(record.id, [p.id for p in reversed(points)] + [9999])
+            await queue.join()
+            selects = [s for s in async_db.statements if s.lstrip().upper().startswith("SELECT")]
+            await session.refresh(record)
+            return record, selects
+
+        record, selects = _with_queue(async_db, run, tmp_path)
+
+        assert record.status == "completed"
+        # 读取记录、点位统计、告警统计
+        assert len(selects) == 3
+        with open(artifact_path(record, "json"), encoding="utf-8") as f:
+            data = json.load(f)
+        assert record.file_size > 0
+        assert len(data["points"]) == 50
+        assert data["points"][0]["code"] == "P49"
+        assert data["points"][-1] == {"code": "P0", "name": "点位0", "unit": "kW",
+                                      "min": 0.0, "max": 2.0, "avg": 1.0, "count": 3}
+        assert data["points"][5]["count"] == 0
+        assert data["alarms"] == {"major": 1}
+
+        rows = list(load_workbook(artifact_path(record, "xlsx"), read_only=True)["点位统计"].values)
+        assert rows[0][0] == "点位编码"
+        assert rows[-1] == ("P0", "点位0", "kW", 0, 2, 1, 3)
+
+    def test_recover_interrupted(self, async_db, tmp_path):
+        """测试启动时将遗留的未完成记录标记为失败，已完成记录不受影响"""
+
+        async def run(session, queue):
+            session.add_all([
+                ReportRecord(report_name="a", status="pending"),
+                ReportRecord(report_name="b", status="generating"),
+                ReportRecord(report_name="c", status="completed"),
+            ])
+            await session.commit()
+            count = await queue.recover(session)
+            records = (await session.execute(ReportRecord.__table__.select())).all()
+            return count, {r.report_name: r.status for r in records}
+
+        count, statuses = _with_queue(async_db, run, tmp_path)
+
+        assert count == 2
+        assert statuses == {"a": "failed", "b": "failed", "c": "completed"}
@@ -0,0 +1,98 @@
+"""
+测试周期报表快照
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.models.alarm import Alarm
+from app.models.history import PointHistory
+from app.models.point import Point
+from app.models.report import ReportSnapshot
+from app.services.report_snapshots import build_closed_snapshots, compare_periods, get_period_report
+
+# 2026-10-15 为周四
+NOW = datetime(2026, 10, 15, 12, 0)
+
+
+async def _seed(session):
+    point = Point(point_code="P1", point_name="温度", point_type="AI", unit="℃")
+    session.add(point)
+    await session.flush()
+    session.add_all([
+        PointHistory(point_id=point.id, value=20.0 + h, recorded_at=datetime(2026, 10, 14, h)) for h in range(3)
+    ])
+    # 9月每天一条，10月12日至15日每天 day-11 条
+    alarms = [datetime(2026, 9, d, 8) for d in range(1, 31)]
+    alarms += [datetime(2026, 10, d, 8) for d in range(12, 16) for _ in range(d - 11)]
+    session.add_all([
+        Alarm(alarm_no=f"AL{i}", point_id=point.id, alarm_level="major" if i % 2 else "minor",
+              alarm_message="m", created_at=created_at)
+        for i, created_at in enumerate(alarms)
+    ])
+    await session.commit()
+
+
+class TestReportSnapshots:
+    """周期报表快照测试"""
+
+    def test_closed_periods_served_from_snapshots(self, async_db):
+        """测试已结束周期生成快照后重复查看只读一条快照，本周由日快照加当天实时统计组成"""
+
+        async def run(session):
+            await _seed(session)
+            results = {}
+            for name, period_type, moment in (
+                ("daily", "daily", datetime(2026, 10, 14, 9)),
+                ("weekly", "weekly", NOW),
+                ("monthly", "monthly", datetime(2026, 9, 1)),
+            ):
+                first = await get_period_report(session, period_type, moment, now=NOW)
+                async_db.statements.clear()
+                again = await get_period_report(session, period_type, moment, now=NOW)
+                results[name] = (first, again, len(async_db.statements))
+            return results
+
+        results = async_db.run(run)
+
+        daily, daily_again, daily_queries = results["daily"]
+        assert daily == daily_again
+        assert daily_queries == 1
+        assert daily["points"] == [{"code": "P1", "name": "温度", "unit": "℃", "min": 20.0, "max": 22.0, "avg": 21.0}]
+        assert daily["alarm_total"] == 3
+
+        weekly, weekly_again, weekly_queries = results["weekly"]
+        assert weekly == weekly_again
+        # 周一至周三的日快照一次读取，当天实时统计一次
+        assert weekly_queries == 2
+        assert [d["alarm_count"] for d in weekly["daily_alarms"]] == [1, 2, 3, 4, 0, 0, 0]
+        assert weekly["total_alarms"] == 10
+        assert weekly["week_start"] == "2026-10-12"
+
+        monthly, monthly_again, monthly_queries = results["monthly"]
+        assert monthly == monthly_again
+        assert monthly_queries == 1
+        assert monthly["total_alarms"] == 30
+        assert monthly["alarm_by_level"] == {"major": 15, "minor": 15}
+
+    def test_compare_and_scheduled_build(self, async_db):
+        """测试周期对比与调度生成最近结束周期的快照"""
+
+        async def run(session):
+            await _seed(session)
+            await build_closed_snapshots(session, now=NOW)
+            snapshots = (await session.execute(
+                select(ReportSnapshot.period_type, ReportSnapshot.period_start)
+            )).all()
+            comparison = await compare_periods(session, "daily", NOW, 4, now=NOW)
+            return snapshots, comparison
+
+        snapshots, comparison = async_db.run(run)
+
+        assert {(t, s) for t, s in snapshots if t != "daily"} == {
+            ("weekly", datetime(2026, 10, 5)), ("monthly", datetime(2026, 9, 1))
+        }
+        assert ("daily", datetime(2026, 10, 14)) in snapshots
+        assert [(c["period_start"], c["alarm_total"], c["is_closed"]) for c in comparison] == [
+            ("2026-10-12", 1, True), ("2026-10-13", 2, True), ("2026-10-14", 3, True), ("2026-10-15", 4, False)
+        ]
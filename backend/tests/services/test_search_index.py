@@ -0,0 +1,146 @@
+"""
+测试运维全文检索索引
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models.alarm import Alarm
+from app.models.operation import KnowledgeBase, WorkOrder
+from app.services.search_index import (
+    ALARM_INDEX_DAYS, RECENT_WINDOWS, get_search_index, invalidate_search_index, search_index, tokenize
+)
+
+
+class TestTokenize:
+    """分词测试"""
+
+    def test_cjk_bigram_and_words(self):
+        """测试中文二字切分、英文小写和全角归一化"""
+        assert tokenize("冷水机组 UPS-01") == ["冷水", "水机", "机组", "ups", "01"]
+        assert tokenize("Ｃｈｉｌｌｅｒ高压") == ["chiller", "高压"]
+        assert tokenize("电") == ["电"]
+
+
+class TestSearchIndex:
+    """检索索引测试"""
+
+    def setup_method(self):
+        invalidate_search_index()
+
+    def test_ranked_search_with_incremental_updates(self, async_db):
+        """测试排序、高亮，以及提交写入后增量更新索引而不重新加载"""
+
+        async def run(session):
+            session.add_all([
+                KnowledgeBase(title="冷水机组高压报警处理", content="检查冷却塔风机和冷却水流量", tags="冷机,高压"),
+                KnowledgeBase(title="UPS 电池更换", content="冷水机组停机期间也可更换电池"),
+                WorkOrder(order_no="WO1", title="机房空调漏水", description="精密空调冷凝水管堵塞",
+                          root_cause="冷凝水泵故障"),
+                Alarm(alarm_no="AL1", point_id=1, alarm_level="major", alarm_message="冷水机组出水温度过高"),
+            ])
+            await session.commit()
+
+            index = await get_search_index(session)
+            loads = []
+            original = index.load
+
+            async def spy(db, doc_type):
+                loads.append(doc_type)
+                await original(db, doc_type)
+
+            index.load = spy
+
+            ranked = index.search("冷水机组")
+            scoped = index.search("冷水机组", ["knowledge"])
+            single = index.search("泵")
+            none = index.search("冷水 漏水")
+
+            # 新增、修改、删除后提交，索引增量更新
+            article = KnowledgeBase(title="冷凝水泵检修", content="更换机械密封")
+            session.add(article)
+            order = (await session.execute(WorkOrder.__table__.select())).first()
+            work_order = await session.get(WorkOrder, order.id)
+            work_order.solution = "疏通冷凝水管，更换水泵"
+            await session.commit()
+            after_write = (await get_search_index(session)).search("水泵")
+
+            await session.delete(article)
+            await session.commit()
+            after_delete = (await get_search_index(session)).search("水泵")
+
+            # 批量 UPDATE 无法逐条跟踪，下次检索时重建该类型
+            await session.execute(update(Alarm).values(alarm_message="冷却水流量低"))
+            await session.commit()
+            after_bulk = (await get_search_index(session)).search("流量")
+            return ranked, scoped, single, none, after_write, after_delete, after_bulk, loads
+
+        ranked, scoped, single, none, after_write, after_delete, after_bulk, loads = \
+            async_db.run(run)
+
+        total, hits = ranked
+        assert total == 3
+        assert {h["type"] for h in hits} == {"knowledge", "alarm"}
+        # 标题命中的知识排在正文命中的知识之前
+        total, hits = scoped
+        assert total == 2
+        assert [h["title"] for h in hits] == ["冷水机组高压报警处理", "UPS 电池更换"]
+        assert hits[0]["highlights"]["title"] == "<em>冷水机组</em>高压报警处理"
+        assert hits[1]["highlights"] == {"content": "<em>冷水机组</em>停机期间也可更换电池"}
+        assert [h["type"] for h in single[1]] == ["work_order"]
+        assert none == (0, [])
+
+        assert {(h["type"], h["title"]) for h in after_write[1]} == {
+            ("knowledge", "冷凝水泵检修"), ("work_order", "机房空调漏水")
+        }
+        assert [h["type"] for h in after_delete[1]] == ["work_order"]
+        assert {h["type"] for h in after_bulk[1]} == {"knowledge", "alarm"}
+        assert loads == ["alarm"]
+        assert search_index().stale == set()
+
+    def test_partial_device_codes(self, async_db):
+        """测试设备编码的字母或数字部分可检索到完整编码"""
+
+        async def run(session):
+            session.add_all([
+                KnowledgeBase(title="UPS01 电池巡检", content="检查电池内阻"),
+                KnowledgeBase(title="CRAC12 回风温度高", content="清洗 UPS 间空调滤网"),
+            ])
+            await session.commit()
+            index = await get_search_index(session, ["knowledge"])
+            return {q: index.ranked_ids(q, "knowledge") for q in ("UPS", "ups01", "01", "CRAC", "crac 回风", "CRAC13")}
+
+        ids = async_db.run(run)
+
+        assert ids["UPS"] == [1, 2]
+        assert ids["ups01"] == [1]
+        assert ids["01"] == [1]
+        assert ids["CRAC"] == [2]
+        assert ids["crac 回风"] == [2]
+        assert ids["CRAC13"] == []
+
+    def test_alarms_limited_to_recent_window(self, async_db, monkeypatch):
+        """测试告警只索引近期窗口内最新的若干条，处理旧告警不会重新加入索引"""
+        now = datetime.now()
+        monkeypatch.setitem(RECENT_WINDOWS, "alarm", ("created_at", ALARM_INDEX_DAYS, 2))
+
+        async def run(session):
+            session.add_all([
+                Alarm(alarm_no=f"AL{i}", point_id=1, alarm_level="major", alarm_message="冷水机组出水温度过高",
+                      created_at=now - timedelta(days=days))
+                for i, days in enumerate([1, 2, 3, ALARM_INDEX_DAYS + 1])
+            ])
+            await session.commit()
+            index = await get_search_index(session, ["alarm"])
+            loaded = index.ranked_ids("冷水机组", "alarm")
+
+            old = await session.get(Alarm, 4)
+            old.ack_remark = "冷水机组已复位"
+            await session.commit()
+            after_ack = index.ranked_ids("冷水机组", "alarm")
+            return loaded, after_ack
+
+        loaded, after_ack = async_db.run(run)
+
+        assert sorted(loaded) == [1, 2]
+        assert sorted(after_ack) == [1, 2]
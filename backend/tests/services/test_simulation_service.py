@@ -0,0 +1,100 @@
+"""
+测试模拟计算服务与收益蒙特卡洛引擎
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.energy import LoadRegulationConfig, PowerDevice, PUEHistory
+from app.services.benefit_monte_carlo import MonteCarloEngine, summarize
+from app.services.simulation_service import SimulationService
+
+
+class TestMonteCarloEngine:
+    """蒙特卡洛引擎测试"""
+
+    def test_fixed_seed_is_reproducible(self):
+        """测试固定种子结果可复现，分位数有序"""
+        peaks = np.random.default_rng(0).normal(800, 40, 60)
+
+        def run(seed):
+            engine = MonteCarloEngine(draws=10000, seed=seed)
+            return engine.demand_adjustment(peaks, 1000, 900, 38, 2) + engine.peak_shift(100, 4, 0.6, 300)
+
+        first, second = run(7), run(7)
+        assert np.array_equal(first, second)
+        assert not np.array_equal(first, run(8))
+
+        stats = summarize(first)
+        assert stats["draws"] == 10000
+        assert stats["p10"] < stats["p50"] < stats["p90"]
+
+    def test_demand_adjustment_matches_closed_form_without_overrun(self):
+        """测试申报需量高于所有抽样峰值时收益等于申报差额 × 需量电价 × 12"""
+        engine = MonteCarloEngine(draws=2000, seed=1)
+        samples = engine.demand_adjustment(np.full(30, 500.0), 1000, 900, 38, 2)
+        assert np.allclose(samples, 100 * 38 * 12)
+
+        # 新申报需量低于峰值时出现超需量加价，收益下降且分布展开
+        risky = engine.demand_adjustment(np.linspace(700, 980, 30), 1000, 850, 38, 2)
+        assert summarize(risky)["p10"] < 150 * 38 * 12
+        assert risky.std() > 0
+
+
+class TestSimulationService:
+    """模拟服务测试"""
+
+    def test_combined_simulation_distribution(self, async_db):
+        """测试组合模拟一次读取数据并给出各场景与组合收益分布"""
+
+        async def run(session):
+            now = datetime.now()
+            rng = np.random.default_rng(3)
+            session.add_all([
+                PUEHistory(record_time=now - timedelta(hours=h), total_power=float(p),
+                           it_power=float(p) * 0.6, pue=1.6)
+                for h, p in zip(range(1, 24 * 20), rng.normal(700, 50, 24 * 20))
+            ])
+            device = PowerDevice(device_code="AC-01", device_name="空调1", device_type="HVAC", rated_power=100)
+            session.add(device)
+            await session.flush()
+            session.add(LoadRegulationConfig(
+                device_id=device.id, regulation_type="temperature",
+                min_value=22, max_value=28, current_value=24, power_factor=0.1, base_power=100
+            ))
+            await session.commit()
+
+            service = SimulationService(session)
+            scenarios = [
+                {"type": "demand_adjustment", "params": {"new_declared_demand": 1000, "historical_days": 15}},
+                {"type": "device_regulation", "params": {"device_id": device.id, "target_value": 26}},
+            ]
+            combined = await service.run_combined_simulation(scenarios, draws=5000, seed=11)
+            again = await service.run_combined_simulation(scenarios, draws=5000, seed=11)
+            single = await service.simulate_device_regulation(device.id, 26)
+            return combined, again, single
+
+        combined, again, single = async_db.run(run)
+
+        assert combined["scenarios_count"] == 2
+        assert combined["combined_benefit"]["distribution"] == again["combined_benefit"]["distribution"]
+        regulation = combined["results"][1]
+        assert regulation["result"].benefit == single.benefit
+        dist = regulation["benefit_distribution"]
+        assert dist["p10"] < single.benefit["annual_saving"] < dist["p90"] * 1.2
+        total = combined["combined_benefit"]["distribution"]
+        assert total["p50"] > dist["p50"] and total["draws"] == 5000
+
+    def test_benefit_with_confidence_uses_sampled_percentiles(self, async_db):
+        """测试置信区间取抽样分位数"""
+
+        async def run(session):
+            service = SimulationService(session)
+            return await service.calculate_benefit_with_confidence(
+                10000, {"data_quality": 0.9, "assumption_risk": 0.8, "implementation_risk": 0.7}
+            )
+
+        result = async_db.run(run)
+        assert result["low_estimate"] < result["most_likely"] < result["high_estimate"]
+        assert result["low_estimate"] == result["distribution"]["p10"]
+        assert result["confidence"] == 0.79
@@ -0,0 +1,59 @@
+"""
+测试数据采集周期
+"""
+import importlib
+
+from sqlalchemy import func, select
+
+from app.models.history import PointHistory
+from app.models.point import Point, PointRealtime
+from app.services.capacity_telemetry import capacity_telemetry
+from app.services.demand_engine import DemandEngine
+from app.services.realtime_dispatch import dispatch_registry
+from app.services.simulator import DataSimulator
+
+# app.services 导出的 simulator 实例与模块同名，按模块路径取模块
+simulator_module = importlib.import_module("app.services.simulator")
+
+
+class TestCollectionCycle:
+    """采集周期测试"""
+
+    def test_failed_rollup_keeps_point_data(self, async_db, monkeypatch):
+        """测试需量、容量汇总写入失败时只回滚该步骤，本周期采集的点位数据仍然提交"""
+
+        async def failing_ingest(self, meter_point_id, timestamp, power):
+            # 重复的点位编码使 flush 失败
+            self.db.add(Point(point_code="P1", point_name="重复", point_type="AI"))
+            await self.db.flush()
+
+        async def failing_flush(session):
+            session.add(Point(point_code="P2", point_name="重复", point_type="AI"))
+            await session.flush()
+            return []
+
+        async def meter_totals(session, point_values):
+            return {1: sum(point_values.values())}
+
+        monkeypatch.setattr(DemandEngine, "ingest", failing_ingest)
+        monkeypatch.setattr(capacity_telemetry, "flush", failing_flush)
+        monkeypatch.setattr(dispatch_registry, "meter_totals", meter_totals)
+
+        async def run(session_factory):
+            async with session_factory() as session:
+                session.add_all([
+                    Point(point_code="P1", point_name="负载率", point_type="AI", min_range=0, max_range=100),
+                    Point(point_code="P2", point_name="电流", point_type="AI", min_range=0, max_range=100),
+                ])
+                await session.commit()
+
+            monkeypatch.setattr(simulator_module, "async_session", session_factory)
+            await DataSimulator().run_collection_cycle()
+
+            async with session_factory() as session:
+                points = (await session.execute(select(func.count(Point.id)))).scalar()
+                realtime = (await session.execute(select(func.count(PointRealtime.point_id)))).scalar()
+                history = (await session.execute(select(func.count(PointHistory.id)))).scalar()
+            return points, realtime, history
+
+        assert async_db.run_with_factory(run) == (2, 2, 2)
@@ -0,0 +1,105 @@
+"""
+测试资产/容量/运维统计
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import update
+
+from app.models.asset import Asset, AssetStatus, AssetType
+from app.models.capacity import CapacityStatus, PowerCapacity, SpaceCapacity
+from app.models.operation import (
+    InspectionStatus, InspectionTask, KnowledgeBase, WorkOrder, WorkOrderStatus
+)
+from app.services.statistics import (
+    get_asset_statistics, get_capacity_statistics, get_operation_statistics, invalidate_statistics
+)
+
+
+class TestStatistics:
+    """统计面板测试"""
+
+    def setup_method(self):
+        invalidate_statistics()
+
+    def test_single_query_results(self, async_db):
+        """测试每个统计面板只执行一次查询，结果与逐项统计一致"""
+        today = date.today()
+
+        async def run(session):
+            session.add_all([
+                Asset(asset_code="A1", asset_name="A1", asset_type=AssetType.server, status=AssetStatus.in_use,
+                      department="研发", purchase_price=1000, warranty_end=today + timedelta(days=10)),
+                Asset(asset_code="A2", asset_name="A2", asset_type=AssetType.server, status=AssetStatus.scrapped,
+                      department="研发", purchase_price=500, warranty_end=today + timedelta(days=10)),
+                Asset(asset_code="A3", asset_name="A3", asset_type=AssetType.pdu, status=AssetStatus.in_use,
+                      purchase_price=250.5, warranty_end=today + timedelta(days=60)),
+                SpaceCapacity(name="S1", total_u_positions=42, used_u_positions=10, status=CapacityStatus.normal),
+                PowerCapacity(name="P1", total_capacity_kw=100, used_capacity_kw=90, status=CapacityStatus.critical),
+                PowerCapacity(name="P2", total_capacity_kw=50, used_capacity_kw=10, status=CapacityStatus.normal),
+                WorkOrder(order_no="W1", title="W1", status=WorkOrderStatus.pending),
+                WorkOrder(order_no="W2", title="W2", status=WorkOrderStatus.completed),
+                InspectionTask(task_no="T1", status=InspectionStatus.overdue),
+                KnowledgeBase(title="K1", content="c"),
+            ])
+            await session.commit()
+
+            results = []
+            for getter in (get_asset_statistics, get_capacity_statistics, get_operation_statistics):
+                async_db.statements.clear()
+                results.append(await getter(session))
+                results.append(len(async_db.statements))
+            return results
+
+        asset, asset_queries, capacity, capacity_queries, operation, operation_queries = \
+            async_db.run(run)
+
+        assert (asset_queries, capacity_queries, operation_queries) == (1, 1, 1)
+
+        assert asset.total_count == 3
+        assert asset.by_status == {"in_use": 2, "scrapped": 1}
+        assert asset.by_type == {"server": 2, "pdu": 1}
+        assert asset.by_department == {"研发": 2}
+        assert asset.total_value == 1750.5
+        assert asset.warranty_expiring_count == 1
+
+        assert capacity["power"] == {"total_capacity_kw": 150, "used_capacity_kw": 100,
+                                     "available_capacity_kw": 50, "usage_rate": 66.67, "count": 2}
+        assert capacity["space"]["available_u_positions"] == 32
+        assert capacity["cooling"]["count"] == 0
+        assert capacity["status_summary"] == {"normal": 2, "warning": 0, "critical": 1, "full": 0}
+        assert capacity["total_capacity_records"] == 3
+
+        assert (operation.total_orders, operation.pending_orders, operation.completed_orders) == (2, 1, 1)
+        assert (operation.overdue_inspections, operation.knowledge_count) == (1, 1)
+
+    def test_cache_invalidated_on_commit(self, async_db):
+        """测试统计结果缓存，相关模型写入提交后失效"""
+
+        async def run(session):
+            session.add(PowerCapacity(name="P1", total_capacity_kw=100, used_capacity_kw=10))
+            await session.commit()
+            first = await get_capacity_statistics(session)
+
+            async_db.statements.clear()
+            cached = await get_capacity_statistics(session)
+            cached["power"]["count"] = 99       # 返回副本，修改不影响缓存
+            cached_queries = len(async_db.statements)
+
+            # 无关模型的写入不影响缓存
+            session.add(KnowledgeBase(title="K1", content="c"))
+            await session.commit()
+            async_db.statements.clear()
+            await get_capacity_statistics(session)
+            unrelated_queries = len(async_db.statements)
+
+            await session.execute(update(PowerCapacity).values(used_capacity_kw=60))
+            await session.commit()
+            changed = await get_capacity_statistics(session)
+            return first, cached_queries, unrelated_queries, changed
+
+        first, cached_queries, unrelated_queries, changed = async_db.run(run)
+
+        assert first["power"]["count"] == 1
+        assert cached_queries == 0
+        assert unrelated_queries == 0
+        assert changed["power"]["used_capacity_kw"] == 60
@@ -0,0 +1,137 @@
+"""
+测试分时电价编译服务
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from app.models.energy import ElectricityPricing, PricingConfig
+from app.services.pricing_service import PricingService
+from app.services.tariff_compiler import (
+    DEFAULT_HOUR_PERIODS,
+    TIME_PERIODS,
+    compile_tariff,
+    get_cached_tariff,
+    get_tariff,
+    invalidate_tariff_cache,
+)
+
+
+class TestCompileTariff:
+    """电价编译测试"""
+
+    def test_wraparound_and_aliases(self):
+        """测试跨零点时段、别名归一和分钟级边界"""
+        tariff = compile_tariff([
+            ("valley", "23:00", "07:00", 0.4),
+            ("normal", "07:00", "10:30", 0.7),
+            ("high", "10:30", "23:00", 1.0),
+        ])
+
+        assert tariff.period_at(datetime(2026, 3, 1, 23, 30)) == "valley"
+        assert tariff.period_at(datetime(2026, 3, 1, 6, 59)) == "valley"
+        assert tariff.period_at(datetime(2026, 3, 1, 10, 29)) == "flat"
+        assert tariff.period_at(datetime(2026, 3, 1, 10, 30)) == "peak"
+        assert tariff.price_at(datetime(2026, 3, 1, 10, 30)) == 1.0
+        # 10:00-10:30 平段、10:30-11:00 高峰，整点时段取平均电价
+        assert abs(tariff.hour_prices[10] - 0.85) < 1e-9
+        assert tariff.slot_period(42) == "peak"
+
+    def test_unconfigured_minutes_use_default_map(self):
+        """测试未配置的分钟按默认时段划分"""
+        tariff = compile_tariff([("sharp", "11:00", "12:00", 1.5)])
+
+        assert tariff.hour_period(11) == "sharp"
+        assert tariff.price_at(datetime(2026, 3, 1, 11, 15)) == 1.5
+        for hour in (0, 8, 9, 22):
+            assert tariff.hour_period(hour) == DEFAULT_HOUR_PERIODS[hour]
+
+    def test_vectorized_cost_matches_scalar(self):
+        """测试向量化计费与逐点计费一致"""
+        tariff = compile_tariff([
+            ("valley", "22:00", "08:00", 0.35),
+            ("peak", "08:00", "22:00", 0.95),
+        ])
+        start = datetime(2026, 3, 1)
+        stamps = [start + timedelta(minutes=15 * i) for i in range(96 * 3)]
+        power = np.linspace(100, 500, len(stamps))
+
+        expected = sum(p * 0.25 * tariff.price_at(t) for t, p in zip(stamps, power))
+        assert abs(tariff.cost(stamps, power) - expected) < 1e-6
+        energy = tariff.energy_by_period(stamps, power)
+        assert set(energy) == set(TIME_PERIODS)
+        assert abs(sum(energy.values()) - power.sum() * 0.25) < 1e-6
+
+
+class TestTariffCache:
+    """编译缓存测试"""
+
+    def setup_method(self):
+        invalidate_tariff_cache()
+
+    def teardown_method(self):
+        invalidate_tariff_cache()
+
+    def test_cache_range_and_pricing_service(self, async_db):
+        """测试生效区间、全局配置和电价服务复用缓存"""
+        today = date.today()
+
+        async def scenario(session):
+            session.add_all([
+                ElectricityPricing(pricing_name="高峰", period_type="peak", start_time="08:00",
+                                   end_time="22:00", price=1.0, effective_date=today - timedelta(days=10)),
+                ElectricityPricing(pricing_name="低谷", period_type="valley", start_time="22:00",
+                                   end_time="08:00", price=0.3, effective_date=today - timedelta(days=10)),
+                ElectricityPricing(pricing_name="新高峰", period_type="peak", start_time="08:00",
+                                   end_time="22:00", price=1.2, effective_date=today + timedelta(days=5)),
+                PricingConfig(demand_price=38.0, declared_demand=800.0, transmission_fee=0.1,
+                              government_fund=0.05, auxiliary_fee=0.0, other_fee=0.0,
+                              effective_date=today - timedelta(days=30)),
+            ])
+            await session.commit()
+
+            tariff = await get_tariff(session)
+            pricing = await PricingService(session).get_current_pricing()
+            again = await get_tariff(session, today + timedelta(days=4))
+            return tariff, pricing, again
+
+        tariff, pricing, again = async_db.run(scenario)
+
+        assert tariff.source == "electricity_pricing"
+        assert tariff.expire_date == today + timedelta(days=4)
+        assert again is tariff
+        assert tariff.period_prices["peak"] == 1.0
+        assert tariff.demand_price == 38.0
+        assert abs(tariff.fixed_fee_per_kwh - 0.15) < 1e-9
+        assert [p["price"] for p in pricing["peak"]] == [1.0]
+        assert [p["name"] for p in pricing["valley"]] == ["低谷"]
+        # 清空缓存后同步查询回落到默认时段划分
+        invalidate_tariff_cache()
+        assert get_cached_tariff().source == "default"
+
+    def test_range_starts_after_expired_rows(self, async_db):
+        """测试生效区间从已失效配置的后一天开始，较早日期重新编译并包含当时有效的时段"""
+
+        async def scenario(session):
+            session.add_all([
+                ElectricityPricing(pricing_name="高峰", period_type="peak", start_time="08:00",
+                                   end_time="22:00", price=1.0, effective_date=date(2026, 1, 1),
+                                   expire_date=date(2026, 6, 1)),
+                ElectricityPricing(pricing_name="低谷", period_type="valley", start_time="22:00",
+                                   end_time="08:00", price=0.3, effective_date=date(2026, 3, 1)),
+            ])
+            await session.commit()
+
+            october = await get_tariff(session, date(2026, 10, 1))
+            april = await get_tariff(session, date(2026, 4, 15))
+            return october, april
+
+        october, april = async_db.run(scenario)
+
+        assert october.effective_date == date(2026, 6, 2)
+        assert october.expire_date is None
+        assert not october.covers(date(2026, 4, 15))
+        assert "peak" not in {row["period_type"] for row in october.rows}
+        assert april is not october
+        assert (april.effective_date, april.expire_date) == (date(2026, 3, 1), date(2026, 6, 1))
+        assert april.period_prices["peak"] == 1.0
@@ -0,0 +1,81 @@
+"""
+测试模板方案批量生成
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models.energy import EnergySavingProposal
+from app.services.template_generator import TemplateGenerator
+
+
+class TestTemplateBatch:
+    """批量生成测试"""
+
+    def test_batch_queries_isolation_and_codes(self, async_db, monkeypatch):
+        """测试批量生成的查询数与模板数无关，单个模板失败不影响其他模板，方案编号不重复"""
+        today = datetime.now().strftime("%Y%m%d")
+
+        async def broken(self, analysis_days):
+            raise RuntimeError("VPP 数据缺失")
+
+        monkeypatch.setattr(TemplateGenerator, "generate_vpp_response_proposal", broken)
+
+        async def run(session):
+            session.add(EnergySavingProposal(
+                proposal_code=f"A2-{today}-001", proposal_type="A", template_id="A2", template_name="需量控制方案"
+            ))
+            await session.commit()
+
+            async_db.statements.clear()
+            results = await TemplateGenerator(session, enable_trace=False).generate_batch(
+                ["A1", "A2", "A3", "A4", "A5", "B1", "A2"]
+            )
+            reads = [s for s in async_db.statements if not s.lstrip().upper().startswith("INSERT")]
+            await session.commit()
+            codes = (await session.execute(
+                select(EnergySavingProposal.proposal_code).order_by(EnergySavingProposal.proposal_code)
+            )).scalars().all()
+            return results, len(reads), codes
+
+        results, read_count, codes = async_db.run(run)
+
+        # 预取 9 条 + 当日方案编号 1 条
+        assert read_count == 10
+        assert [r["template_id"] for r in results] == ["A1", "A2", "A3", "A4", "A5", "B1", "A2"]
+        failed = [r for r in results if r["error"]]
+        assert [(r["template_id"], r["error"], r["proposal"]) for r in failed] == [("A4", "VPP 数据缺失", None)]
+        assert all(r["elapsed_ms"] >= 0 for r in results)
+
+        batch_codes = [r["proposal"].proposal_code for r in results if r["proposal"] is not None]
+        assert len(set(batch_codes)) == len(batch_codes) == 6
+        assert f"A2-{today}-002" in batch_codes and f"A2-{today}-003" in batch_codes
+        assert codes == sorted([f"A2-{today}-001"] + batch_codes)
+
+    @pytest.mark.parametrize("enable_trace,expected", [(True, 1), (False, 3)])
+    def test_traced_batch_runs_sequentially(self, async_db, monkeypatch, enable_trace, expected):
+        """测试启用追溯时各模板逐个生成，不并发使用共享会话"""
+        active = []
+        peak = []
+
+        async def tracked(self, template_id, analysis_days):
+            active.append(template_id)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(template_id)
+            return EnergySavingProposal(
+                proposal_code=await self._generate_proposal_code(template_id), proposal_type="A",
+                template_id=template_id, template_name=template_id
+            )
+
+        monkeypatch.setattr(TemplateGenerator, "_run_template", tracked)
+
+        async def run(session):
+            return await TemplateGenerator(session, enable_trace=enable_trace).generate_batch(["A1", "A2", "A3"])
+
+        results = async_db.run(run)
+
+        assert max(peak) == expected
+        assert [r["error"] for r in results] == [None, None, None]
@@ -0,0 +1,130 @@
+"""
+测试VPP方案计算器的一次性数据加载与报告缓存
+"""
+import statistics
+from datetime import date, datetime, timedelta, time
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.vpp_data import (
+    AdjustableLoad, ElectricityBill, ElectricityPrice, LoadCurve, TimePeriodType, VPPConfig
+)
+from app.services.vpp_calculator import VPPCalculator, invalidate_analysis_cache
+
+MONTHS = ["2025-08", "2025-09", "2025-10"]
+
+
+async def _seed(session) -> list:
+    for i, month in enumerate(MONTHS):
+        session.add(ElectricityBill(
+            month=month, total_consumption=1.0e6 + i * 1.0e5, peak_consumption=3.5e5,
+            valley_consumption=2.5e5, total_cost=8.0e5, basic_fee=1.0e5, market_purchase_fee=5.4e5,
+            transmission_fee=1.9e5, system_operation_fee=3.0e4, government_fund=2.5e4
+        ))
+    loads = np.random.default_rng(5).normal(3000, 400, 96 * 10).tolist()
+    start = datetime(2025, 10, 1)
+    session.add_all([
+        LoadCurve(timestamp=start + timedelta(minutes=15 * i), load_value=v,
+                  date=(start + timedelta(minutes=15 * i)).date())
+        for i, v in enumerate(loads)
+    ])
+    session.add_all([
+        AdjustableLoad(equipment_name="冷机", rated_power=500, adjustable_ratio=30),
+        AdjustableLoad(equipment_name="水泵", rated_power=200, adjustable_ratio=50, is_active=False),
+        ElectricityPrice(period_type=TimePeriodType.PEAK, price=0.95, start_time=time(8), end_time=time(11)),
+        ElectricityPrice(period_type=TimePeriodType.VALLEY, price=0.32, start_time=time(23), end_time=time(7)),
+        VPPConfig(config_key="daily_shift_hours", config_value=5),
+    ])
+    await session.commit()
+    return loads
+
+
+class TestVPPCalculator:
+    """VPP计算器测试"""
+
+    def setup_method(self):
+        invalidate_analysis_cache()
+
+    def test_full_analysis_matches_individual_metrics(self, async_db):
+        """测试完整报告与单项指标计算结果一致，负荷标准差与逐点计算一致"""
+
+        async def run(session):
+            loads = await _seed(session)
+            calculator = VPPCalculator(session)
+            report = await calculator.generate_full_analysis(MONTHS, date(2025, 10, 1), date(2025, 10, 10))
+            return loads, report, {
+                "load": await calculator.calc_load_metrics(date(2025, 10, 1), date(2025, 10, 10)),
+                "transfer": await calculator.calc_transfer_potential(),
+                "fluctuation": await calculator.calc_fluctuation_rate(MONTHS),
+                "price": await calculator.calc_average_price(MONTHS[-1]),
+                "cost": await calculator.calc_cost_structure(MONTHS[-1]),
+            }
+
+        loads, report, single = async_db.run(run)
+
+        assert report["load_characteristics"] == single["load"]
+        assert report["transfer_potential"] == single["transfer"]
+        assert report["electricity_usage"]["fluctuation_rate"] == single["fluctuation"]
+        assert report["electricity_usage"]["average_price"] == single["price"]
+        assert report["cost_structure"] == single["cost"]
+
+        assert single["load"]["load_std"]["value"] == round(statistics.stdev(loads), 2)
+        assert single["load"]["data_source"]["data_points"] == len(loads)
+        assert single["transfer"]["transferable_load"]["value"] == 150
+
+    def test_report_cached_until_data_changes(self, async_db):
+        """测试报告按数据版本缓存，数据变化后重新计算"""
+
+        async def run(session):
+            await _seed(session)
+            calculator = VPPCalculator(session)
+            args = (MONTHS, date(2025, 10, 1), date(2025, 10, 10))
+            first = await calculator.generate_full_analysis(*args)
+
+            queries = []
+            original = calculator.load_snapshot
+
+            async def spy(*a, **kw):
+                queries.append(a)
+                return await original(*a, **kw)
+
+            calculator.load_snapshot = spy
+            cached = await calculator.generate_full_analysis(*args)
+            cached["summary"]["roi"] = None      # 返回副本，修改不影响缓存
+
+            session.add(AdjustableLoad(equipment_name="照明", rated_power=100, adjustable_ratio=40))
+            await session.commit()
+            changed = await calculator.generate_full_analysis(*args)
+            return first, cached, changed, queries
+
+        first, cached, changed, queries = async_db.run(run)
+
+        assert len(queries) == 1
+        assert cached["transfer_potential"] == first["transfer_potential"]
+        assert first["summary"]["roi"] is not None
+        assert changed["transfer_potential"]["transferable_load"]["value"] == 190
+
+    def test_in_place_edit_refreshes_cached_report(self, async_db):
+        """测试原地修改负荷曲线和电价后缓存的报告失效"""
+
+        async def run(session):
+            loads = await _seed(session)
+            calculator = VPPCalculator(session)
+            args = (MONTHS, date(2025, 10, 1), date(2025, 10, 10))
+            first = await calculator.generate_full_analysis(*args)
+
+            curve = (await session.execute(select(LoadCurve).order_by(LoadCurve.id))).scalars().first()
+            curve.load_value = max(loads) + 1000
+            price = (await session.execute(
+                select(ElectricityPrice).where(ElectricityPrice.period_type == TimePeriodType.PEAK)
+            )).scalar_one()
+            price.price = 1.25
+            await session.commit()
+            return loads, first, await calculator.generate_full_analysis(*args)
+
+        loads, first, changed = async_db.run(run)
+
+        assert first["load_characteristics"]["P_max"]["value"] == round(max(loads), 2)
+        assert changed["load_characteristics"]["P_max"]["value"] == round(max(loads) + 1000, 2)
+        assert changed["transfer_potential"]["price_spread"]["data_source"]["peak_price"] == 1.25